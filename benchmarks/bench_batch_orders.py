@@ -0,0 +1,161 @@
+"""
+批量下单吞吐基准测试
+在模拟的GUI后端上对比逐笔调用 /xiadan、并发调用 /xiadan（在执行器中连续排队）与一次调用 /xiadan/batch 的下单吞吐(笔/秒)
+
+模拟耗时（可按实际客户端调整）:
+- 激活窗口 40ms，查找下单弹窗(Desktop().windows) 60ms，遍历弹窗控件树 30ms
+- 发送按键 5ms，填写数量 10ms，点击按钮 10ms
+- 发送按键后弹窗 20ms 出现，点击确认后 20ms 关闭（期间查找弹窗仍会返回上一笔的弹窗）
+并校验每笔订单都在本笔按键调起的弹窗中确认
+
+运行: python -m benchmarks.bench_batch_orders [订单数]
+"""
+
+import itertools
+import sys
+import time
+
+from src.service.element_cache import ElementCache
+from src.service.order_executor import OrderExecutor, FakeGuiBackend
+from src.service.order_placer import OrderPlacer
+
+ACTIVATE_COST = 0.04
+FIND_DIALOG_COST = 0.06
+TREE_WALK_COST = 0.03
+SEND_KEY_COST = 0.005
+INPUT_COST = 0.01
+DIALOG_OPEN_DELAY = 0.02
+DIALOG_CLOSE_DELAY = 0.02
+CLICK_COST = 0.01
+
+
+class FakeElement:
+    def __init__(self, control_id):
+        self._control_id = control_id
+
+    def control_id(self):
+        return self._control_id
+
+    def is_enabled(self):
+        return True
+
+
+class FakeDialog:
+    """模拟下单弹窗：发送按键后延迟出现，点击确认后延迟关闭"""
+
+    _handles = itertools.count(1)
+
+    def __init__(self, code, opens_at):
+        self.handle = next(self._handles)
+        self.code = code
+        self.opens_at = opens_at
+        self.closes_at = None
+
+    def descendants(self):
+        time.sleep(TREE_WALK_COST)
+        return [FakeElement(cid) for cid in (1034, 1006, 1528)]
+
+    def is_visible(self):
+        now = time.monotonic()
+        return now >= self.opens_at and (self.closes_at is None or now < self.closes_at)
+
+
+class FakeWindowService:
+    """提供OrderPlacer所需方法的模拟WindowService"""
+
+    def __init__(self):
+        self.element_cache = ElementCache()
+        self.dialog_lookups = 0
+        self.dialogs = []
+        self.confirmed = []
+
+    def send_key(self, keys):
+        time.sleep(SEND_KEY_COST)
+        self.dialogs.append(FakeDialog(keys.split()[0], time.monotonic() + DIALOG_OPEN_DELAY))
+
+    def get_target_window(self, params, retries=3, delay=0.5):
+        time.sleep(FIND_DIALOG_COST)
+        self.dialog_lookups += 1
+        # 与Desktop().windows()一样返回第一个显示中的弹窗，上一笔的弹窗未关闭时会先返回它
+        return next((dialog for dialog in self.dialogs if dialog.is_visible()), None)
+
+    def input_text_to_element(self, window, control_id, text):
+        self.element_cache.find(window, control_id)
+        time.sleep(INPUT_COST)
+
+    def click_element(self, window, control_id):
+        self.element_cache.find(window, control_id)
+        time.sleep(CLICK_COST)
+        if control_id == 1006 and window.closes_at is None:
+            self.confirmed.append(window.code)
+            window.closes_at = time.monotonic() + DIALOG_CLOSE_DELAY
+
+
+def make_orders(count):
+    return [{"code": f"{600000 + i:06d}", "status": "1" if i % 2 else "2", "amount": 100}
+            for i in range(count)]
+
+
+def run_single(orders):
+    """逐笔调用：每个HTTP请求单独排队、激活、查找弹窗"""
+    backend = FakeGuiBackend(activate_delay=ACTIVATE_COST)
+    executor = OrderExecutor(backend)
+    executor.start()
+    window_service = FakeWindowService()
+    placer = OrderPlacer(window_service)
+    start = time.perf_counter()
+    for order in orders:
+        executor.execute(lambda b, o=order: placer.place(o['code'], o['status'], o['amount']),
+                         activate=True)
+        # 客户端逐笔调用，请求之间执行器处于空闲状态，下一笔需要重新激活
+        time.sleep(0.001)
+    elapsed = time.perf_counter() - start
+    executor.stop()
+    return elapsed, backend.activations, window_service
+
+
+def run_queued(orders):
+    """并发逐笔调用：所有请求同时到达，在执行器中连续执行（合并激活），上一笔的弹窗可能仍在关闭中"""
+    backend = FakeGuiBackend(activate_delay=ACTIVATE_COST)
+    executor = OrderExecutor(backend)
+    executor.start()
+    window_service = FakeWindowService()
+    placer = OrderPlacer(window_service)
+    start = time.perf_counter()
+    tickets = [executor.submit(lambda b, o=order: placer.place(o['code'], o['status'], o['amount']), activate=True)
+               for order in orders]
+    for ticket in tickets:
+        executor.wait(ticket)
+    elapsed = time.perf_counter() - start
+    executor.stop()
+    return elapsed, backend.activations, window_service
+
+
+def run_batch(orders):
+    """批量调用：一次激活，复用弹窗查找和控件映射"""
+    backend = FakeGuiBackend(activate_delay=ACTIVATE_COST)
+    executor = OrderExecutor(backend)
+    executor.start()
+    window_service = FakeWindowService()
+    placer = OrderPlacer(window_service)
+    start = time.perf_counter()
+    results = executor.execute(lambda b: placer.place_batch(orders), activate=True)
+    elapsed = time.perf_counter() - start
+    executor.stop()
+    assert all(r['success'] for r in results), results
+    return elapsed, backend.activations, window_service
+
+
+def run(count=20):
+    orders = make_orders(count)
+    print(f"订单数: {count}")
+    for name, runner in (("逐笔 /xiadan", run_single), ("并发 /xiadan", run_queued), ("批量 /xiadan/batch", run_batch)):
+        elapsed, activations, window_service = runner(orders)
+        matched = window_service.confirmed == [order['code'] for order in orders]
+        print(f"{name:<20} {count / elapsed:7.1f} 笔/秒  总耗时 {elapsed * 1000:7.1f}ms  "
+              f"激活 {activations} 次  弹窗查找 {window_service.dialog_lookups} 次  "
+              f"{'每笔在本笔弹窗中确认' if matched else '确认的弹窗与订单不一致'}")
+
+
+if __name__ == "__main__":
+    run(*[int(a) for a in sys.argv[1:2]])
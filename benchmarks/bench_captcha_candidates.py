@@ -0,0 +1,76 @@
+"""
+验证码多候选基准测试（离线，Linux可运行）
+模拟交易端校验：按候选顺序提交，答错则提交下一个；统计单一预处理参数与多候选两种方式的
+首次通过率、N次内通过率、平均尝试次数和识别耗时；
+再模拟完整会话（每轮候选都失败后刷新成下一张验证码，最多3轮），统计会话通过率
+
+为了离线运行只使用模板匹配（min_margin=0，不回退Tesseract）
+
+运行: python -m benchmarks.bench_captcha_candidates [测试样本数] [每轮最多候选数]
+"""
+
+import sys
+import time
+
+from benchmarks.captcha_samples import generate_samples
+from src.service.captcha_solver import CaptchaSolver, preprocess_captcha
+from src.service.digit_recognizer import DigitRecognizer
+
+
+def submit_round(solver, image, label, max_candidates):
+    """提交一张验证码的候选，返回(是否通过, 尝试次数)"""
+    attempts = 0
+    for candidate in solver.candidates(image)[:max_candidates]:
+        attempts += 1
+        if candidate.text == label:
+            return True, attempts
+    return False, attempts
+
+
+def run(test_count=300, max_candidates=2, max_rounds=3):
+    train = [(preprocess_captcha(image), label) for image, label in generate_samples(300, seed=1)]
+    recognizer, _ = DigitRecognizer.train(train)
+    solver = CaptchaSolver(None, recognizer=recognizer, min_margin=0.0)
+    test = generate_samples(test_count, seed=2)
+
+    try:
+        single_ok, latencies = 0, []
+        for image, label in test:
+            start = time.perf_counter()
+            single_ok += solver.solve(image).text == label
+            latencies.append(time.perf_counter() - start)
+        print(f"单一预处理: 首次通过率 {single_ok / test_count * 100:5.1f}%   "
+              f"平均耗时 {sum(latencies) / test_count * 1000:5.2f} ms")
+
+        first_ok, passed, latencies = 0, 0, []
+        for image, label in test:
+            start = time.perf_counter()
+            candidates = solver.candidates(image)
+            latencies.append(time.perf_counter() - start)
+            texts = [c.text for c in candidates[:max_candidates]]
+            first_ok += texts[:1] == [label]
+            passed += label in texts
+        print(f"多候选:     首次通过率 {first_ok / test_count * 100:5.1f}%   "
+              f"{max_candidates}个候选内通过率 {passed / test_count * 100:5.1f}%   "
+              f"平均耗时 {sum(latencies) / test_count * 1000:5.2f} ms")
+
+        # 完整会话：失败后刷新验证码（取下一张样本）
+        stream = iter(generate_samples(test_count * max_rounds, seed=3))
+        for _ in range(test_count):
+            attempts = 0
+            for _ in range(max_rounds):
+                image, label = next(stream)
+                ok, used = submit_round(solver, image, label, max_candidates)
+                attempts += used
+                if ok:
+                    break
+            solver.record_session(ok, attempts)
+        stats = solver.get_stats()
+        print(f"会话(最多{max_rounds}轮): 通过率 {stats['successes'] / stats['sessions'] * 100:5.1f}%   "
+              f"平均尝试 {stats['attempts_per_success']} 次/成功")
+    finally:
+        solver.close()
+
+
+if __name__ == "__main__":
+    run(*[int(a) for a in sys.argv[1:3]])
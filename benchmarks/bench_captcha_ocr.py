@@ -0,0 +1,89 @@
+"""
+验证码识别基准测试
+在合成数字验证码上对比:
+1. 原实现: 保存到 cache/image.png -> 读回 -> pytesseract.image_to_string（每次启动tesseract进程）
+2. CaptchaSolver首轮: 内存预处理 -> 常驻OCR工作进程
+3. CaptchaSolver复现: 同一批验证码再次出现，命中感知哈希缓存
+
+运行: python -m benchmarks.bench_captcha_ocr [样本数] [tesseract路径]
+未找到tesseract时只测量预处理、哈希和缓存命中的开销
+"""
+
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+from benchmarks.captcha_samples import generate_samples
+from src.service.captcha_solver import CaptchaSolver, image_hash, preprocess_captcha
+
+
+def legacy_recognize(image, image_path):
+    """原先的实现"""
+    import pytesseract
+    from PIL import Image
+    image.save(image_path)
+    text = pytesseract.image_to_string(Image.open(image_path), config='--psm 6 digits')
+    return ''.join(filter(str.isdigit, text))
+
+
+def report(name, latencies, correct, total):
+    latencies = sorted(latencies)
+    p50 = latencies[len(latencies) // 2] * 1000
+    p95 = latencies[int(len(latencies) * 0.95) - 1] * 1000
+    print(f"{name:<24} 准确率 {correct / total * 100:6.1f}%   P50 {p50:8.2f} ms   P95 {p95:8.2f} ms")
+
+
+def run(count=100, tesseract_cmd=None):
+    samples = generate_samples(count)
+    tesseract_cmd = tesseract_cmd or shutil.which('tesseract')
+    print(f"样本数: {count}, tesseract: {tesseract_cmd or '未找到'}")
+
+    # 预处理+哈希（纯内存，与OCR引擎无关）
+    latencies = []
+    hashes = set()
+    for image, _ in samples:
+        start = time.perf_counter()
+        hashes.add(image_hash(preprocess_captcha(image)))
+        latencies.append(time.perf_counter() - start)
+    report("预处理+感知哈希", latencies, len(hashes), count)
+    print(f"  (此行准确率为哈希唯一率: {len(hashes)}/{count} 个不同哈希)")
+
+    if not tesseract_cmd:
+        return
+
+    import pytesseract
+    pytesseract.pytesseract.tesseract_cmd = tesseract_cmd
+    with tempfile.TemporaryDirectory() as tmp:
+        image_path = os.path.join(tmp, 'image.png')
+        latencies, correct = [], 0
+        for image, label in samples:
+            start = time.perf_counter()
+            text = legacy_recognize(image, image_path)
+            latencies.append(time.perf_counter() - start)
+            correct += text == label
+        report("原实现(落盘+新进程)", latencies, correct, count)
+
+    solver = CaptchaSolver(tesseract_cmd)
+    try:
+        solver.warmup()
+        for name in ("CaptchaSolver首轮", "CaptchaSolver复现"):
+            latencies, correct = [], 0
+            for image, label in samples:
+                start = time.perf_counter()
+                result = solver.solve(image)
+                latencies.append(time.perf_counter() - start)
+                correct += result.text == label
+                # 模拟交易端验证：正确的结果被记住
+                if result.text == label:
+                    solver.remember(result)
+            report(name, latencies, correct, count)
+        print(f"统计: {solver.get_stats()}")
+    finally:
+        solver.close()
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    run(int(args[0]) if args else 100, args[1] if len(args) > 1 else None)
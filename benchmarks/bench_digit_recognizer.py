@@ -0,0 +1,74 @@
+"""
+数字模板匹配识别基准测试（离线，Linux可运行）
+用一组合成验证码训练模板，在另一组上测量准确率、不同余量阈值下的覆盖率和单张耗时；
+找到tesseract时同时测量每张启动tesseract进程的耗时作对比
+
+运行: python -m benchmarks.bench_digit_recognizer [训练样本数] [测试样本数]
+"""
+
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+from benchmarks.captcha_samples import generate_samples
+from src.service.captcha_solver import preprocess_captcha, to_png_bytes
+from src.service.digit_recognizer import DigitRecognizer
+from src.service.ocr_worker import recognize_with_cli
+
+MARGINS = (0.05, 0.1, 0.15)
+
+
+def percentile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * q))] * 1000
+
+
+def run(train_count=300, test_count=500):
+    start = time.perf_counter()
+    train = [(preprocess_captcha(image), label) for image, label in generate_samples(train_count, seed=1)]
+    recognizer, report = DigitRecognizer.train(train)
+    print(f"训练: {train_count} 张, 跳过 {report['skipped']}, 模板 {report['templates']} 个, "
+          f"耗时 {(time.perf_counter() - start) * 1000:.0f} ms")
+
+    # 走一遍保存/加载，测的是生产环境实际加载的模板
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'captcha_templates.npz')
+        recognizer.save(path)
+        print(f"模板文件: {os.path.getsize(path) / 1024:.0f} KB")
+        recognizer = DigitRecognizer.load(path)
+
+    test = generate_samples(test_count, seed=2)
+    latencies, results = [], []
+    for image, label in test:
+        begin = time.perf_counter()
+        text, margin = recognizer.recognize(preprocess_captcha(image))
+        latencies.append(time.perf_counter() - begin)
+        results.append((margin, text == label))
+
+    correct = sum(ok for _, ok in results)
+    print(f"测试: {test_count} 张（与训练集不同的种子）")
+    print(f"模板匹配(含预处理)     准确率 {correct / test_count * 100:6.1f}%   "
+          f"P50 {percentile(latencies, 0.5):6.2f} ms   P95 {percentile(latencies, 0.95):6.2f} ms")
+    for threshold in MARGINS:
+        accepted = [ok for margin, ok in results if margin >= threshold]
+        print(f"  余量>={threshold:<5} 直接采用 {len(accepted) / test_count * 100:6.1f}%   "
+              f"其中准确率 {sum(accepted) / max(len(accepted), 1) * 100:6.1f}%（其余回退Tesseract）")
+
+    tesseract_cmd = shutil.which('tesseract')
+    if not tesseract_cmd:
+        print("未找到tesseract，跳过Tesseract对比")
+        return
+    latencies, correct = [], 0
+    for image, label in test[:100]:
+        begin = time.perf_counter()
+        text, _ = recognize_with_cli(tesseract_cmd, to_png_bytes(preprocess_captcha(image)))
+        latencies.append(time.perf_counter() - begin)
+        correct += ''.join(filter(str.isdigit, text)) == label
+    print(f"Tesseract(每张启动进程)  准确率 {correct / len(latencies) * 100:6.1f}%   "
+          f"P50 {percentile(latencies, 0.5):6.2f} ms   P95 {percentile(latencies, 0.95):6.2f} ms")
+
+
+if __name__ == "__main__":
+    run(*[int(a) for a in sys.argv[1:3]])
@@ -0,0 +1,109 @@
+"""
+控件元素缓存基准测试
+1. 模拟下单确认弹窗(confirm_order)的控件查找序列，对比每次遍历控件树与ElementCache的耗时
+2. 轮询等待尚未出现的控件（如验证码弹窗2405，每50ms查找一次），统计控件树遍历次数
+
+运行: python -m benchmarks.bench_element_cache [节点数] [轮数]
+"""
+
+import sys
+import time
+
+from src.service.element_cache import ElementCache
+
+
+class FakeElement:
+    """模拟pywinauto的UIA元素包装对象"""
+
+    __slots__ = ('_control_id',)
+
+    def __init__(self, control_id):
+        self._control_id = control_id
+
+    def control_id(self):
+        return self._control_id
+
+    def is_enabled(self):
+        return True
+
+
+class FakeWindow:
+    """模拟窗口：每次descendants()都重新创建包装对象，与pywinauto行为一致"""
+
+    def __init__(self, handle, node_count, target_ids):
+        self.handle = handle
+        self.walks = 0
+        # 目标控件分散在树中不同位置
+        ids = list(range(100000, 100000 + node_count))
+        step = max(1, node_count // (len(target_ids) + 1))
+        for i, control_id in enumerate(target_ids):
+            ids[min(node_count - 1, (i + 1) * step)] = control_id
+        self._ids = ids
+
+    def descendants(self):
+        self.walks += 1
+        return [FakeElement(control_id) for control_id in self._ids]
+
+
+def find_uncached(window, control_id):
+    """原先的实现：每次查找都完整遍历控件树"""
+    for element in window.descendants():
+        if element.control_id() == control_id:
+            return element
+    return None
+
+
+# confirm_order 的查找序列：刷新、可用数量、仓位按钮、确认按钮
+CONFIRM_ORDER_LOOKUPS = [1528, 1034, 12093, 1006]
+
+
+def run(node_count=5000, rounds=50):
+    print(f"控件节点数: {node_count}, 模拟下单确认次数: {rounds}")
+
+    window = FakeWindow(1, node_count, CONFIRM_ORDER_LOOKUPS)
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for control_id in CONFIRM_ORDER_LOOKUPS:
+            assert find_uncached(window, control_id) is not None
+    uncached = time.perf_counter() - start
+    uncached_walks = window.walks
+
+    cache = ElementCache()
+    start = time.perf_counter()
+    for i in range(rounds):
+        # 每次下单弹出一个新的确认弹窗（新句柄）
+        window = FakeWindow(1000 + i, node_count, CONFIRM_ORDER_LOOKUPS)
+        for control_id in CONFIRM_ORDER_LOOKUPS:
+            assert cache.find(window, control_id) is not None
+    cached = time.perf_counter() - start
+
+    print(f"无缓存:   {uncached / rounds * 1000:8.3f} ms/次  控件树遍历 {uncached_walks / rounds:.1f} 次/单")
+    print(f"元素缓存: {cached / rounds * 1000:8.3f} ms/次  控件树遍历 {cache.stats['tree_walks'] / rounds:.1f} 次/单")
+    print(f"加速比: {uncached / cached:.1f}x")
+    print(f"缓存统计: {cache.get_stats()}")
+
+
+def run_polling(node_count=5000, wait=1.0, appear_after=0.6, interval=0.05):
+    """轮询等待一个appear_after秒后才出现的控件"""
+    window = FakeWindow(1, node_count, CONFIRM_ORDER_LOOKUPS)
+    cache = ElementCache()
+    start = time.monotonic()
+    found_at = None
+    polls = 0
+    while time.monotonic() - start < wait:
+        if time.monotonic() - start >= appear_after and 2405 not in window._ids:
+            window._ids[0] = 2405
+        polls += 1
+        if cache.find(window, 2405) is not None:
+            found_at = time.monotonic() - start
+            break
+        time.sleep(interval)
+    print(f"轮询等待控件2405（{appear_after:.1f}s后出现，每{interval * 1000:.0f}ms查找一次）: "
+          f"查找 {polls} 次，控件树遍历 {window.walks} 次，"
+          f"出现后 {(found_at - appear_after) * 1000:.0f} ms 找到（miss_interval={cache.miss_interval}s）")
+
+
+if __name__ == "__main__":
+    args = [int(a) for a in sys.argv[1:3]]
+    run(*args)
+    run_polling(*args[:1])
@@ -0,0 +1,57 @@
+"""
+按键编译缓存基准测试
+按真实下单场景的按键串分布，对比每次解析+解析键码与CompiledKeyCache命中的耗时
+
+运行: python -m benchmarks.bench_key_cache [调用次数]
+"""
+
+import random
+import sys
+import time
+
+from src.util.key_compiler import PacingProfile, CompiledKeyCache, build_batches, compile_keys
+
+
+def order_mix(count, seed=7):
+    """生成下单按键串序列：自选池内买卖为主，穿插刷新/切换/复制"""
+    rng = random.Random(seed)
+    codes = [f"{600000 + i * 7:06d}" for i in range(40)] + [f"{300000 + i * 3:06d}" for i in range(40)]
+    keys = []
+    for _ in range(count):
+        roll = rng.random()
+        if roll < 0.7:
+            side = '21' if rng.random() < 0.5 else '23'
+            keys.append(f"{rng.choice(codes)} ENTER {side} ENTER")
+        elif roll < 0.8:
+            keys.append('F5')
+        elif roll < 0.9:
+            keys.append('F4')
+        else:
+            keys.append('{CTRL+C}')
+    return keys
+
+
+def run(count=200000):
+    keys = order_mix(count)
+    pacing = PacingProfile()
+
+    start = time.perf_counter()
+    for k in keys:
+        build_batches(compile_keys(k), pacing)
+    uncached = time.perf_counter() - start
+
+    cache = CompiledKeyCache()
+    start = time.perf_counter()
+    for k in keys:
+        cache.get(k, pacing)
+    cached = time.perf_counter() - start
+
+    print(f"按键串数量: {count}，不同按键串: {len(set(keys))}")
+    print(f"每次编译: {uncached / count * 1e6:8.2f} us/次")
+    print(f"编译缓存: {cached / count * 1e6:8.2f} us/次")
+    print(f"加速比: {uncached / cached:.1f}x")
+    print(f"缓存统计: {cache.get_stats()}")
+
+
+if __name__ == "__main__":
+    run(*[int(a) for a in sys.argv[1:2]])
@@ -0,0 +1,238 @@
+"""
+日志基准测试
+16个线程同时调用 add_log，对比原先的同步日志（全局锁内通过logging.FileHandler写文件并flush）与队列日志:
+1. 调用方吞吐和每次 add_log 的耗时（P50/P99/最大）
+2. 所有日志写入磁盘的总耗时（队列日志需等待 flush()）
+3. 慢磁盘（每次写入额外延迟1ms，模拟杀毒软件扫描、网络盘等）
+4. 正确性: 行数、每个线程的日志顺序、行格式
+5. 界面: 用模拟的Text组件和主循环，验证只在主线程中插入、每次插入不超过UI_BATCH_SIZE条
+
+原先的日志界面写入发生在调用线程中，无界面环境下无法对比，这里只对比文件部分
+运行: python -m benchmarks.bench_logger
+"""
+
+import logging
+import os
+import re
+import shutil
+import tempfile
+import threading
+import time
+from collections import deque
+
+from src.util.logger import Logger
+
+THREADS = 16
+PER_THREAD = 5000
+SLOW_PER_THREAD = 200
+LINE = re.compile(r'^\d{4}-\d\d-\d\d \d\d:\d\d:\d\d,\d{3} - t(\d+) (\d+) ')
+
+
+class LegacyLogger:
+    """原先的 Logger.add_log（未绑定界面时）"""
+
+    def __init__(self, path):
+        self.lock = threading.Lock()
+        self.log_cache = deque(maxlen=1000)
+        self.file_logger = logging.getLogger(f'LegacyLogger-{path}')
+        self.file_logger.setLevel(logging.INFO)
+        self.file_logger.propagate = False
+        self.handler = logging.FileHandler(path, encoding='utf-8')
+        self.handler.setFormatter(logging.Formatter('%(asctime)s - %(message)s'))
+        self.file_logger.addHandler(self.handler)
+
+    def add_log(self, message):
+        with self.lock:
+            self.file_logger.info(message)
+            self.log_cache.append(message)
+
+    def flush(self, timeout=None):
+        # 同步写入，add_log返回时已写入
+        return True
+
+    def close(self):
+        self.file_logger.removeHandler(self.handler)
+        self.handler.close()
+
+
+class SlowFile:
+    """每次写入额外延迟，其余行为不变"""
+
+    def __init__(self, file, delay=0.001):
+        self._file = file
+        self.delay = delay
+
+    def write(self, data):
+        time.sleep(self.delay)
+        return self._file.write(data)
+
+    def __getattr__(self, name):
+        return getattr(self._file, name)
+
+
+def new_logger(path):
+    Logger._instance = None
+    logger = Logger()
+    # 队列日志固定写当前目录的app.log，这里换到测试文件
+    logger._file.close()
+    logger._file = open(path, 'a', encoding='utf-8')
+    return logger
+
+
+def hammer(logger, per_thread):
+    """返回 (调用方总耗时s, 全部写入磁盘耗时s, 每次调用耗时列表us)"""
+    latencies = []
+    lock = threading.Lock()
+    barrier = threading.Barrier(THREADS + 1)
+    payload = 'x' * 60
+
+    def worker(index):
+        local = []
+        barrier.wait()
+        for i in range(per_thread):
+            start = time.perf_counter()
+            logger.add_log(f"t{index} {i} 下单 600000 买入 100 {payload}")
+            local.append((time.perf_counter() - start) * 1e6)
+        with lock:
+            latencies.extend(local)
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(THREADS)]
+    for t in threads:
+        t.start()
+    barrier.wait()
+    start = time.perf_counter()
+    for t in threads:
+        t.join()
+    callers = time.perf_counter() - start
+    assert logger.flush(timeout=120)
+    durable = time.perf_counter() - start
+    latencies.sort()
+    return callers, durable, latencies
+
+
+def verify_file(path, per_thread):
+    counts = [0] * THREADS
+    ordered = True
+    bad = 0
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            match = LINE.match(line)
+            if not match:
+                bad += 1
+                continue
+            thread, seq = int(match.group(1)), int(match.group(2))
+            ordered = ordered and seq == counts[thread]
+            counts[thread] += 1
+    return all(count == per_thread for count in counts) and ordered and bad == 0
+
+
+def report(name, per_thread, callers, durable, latencies, ok):
+    total = THREADS * per_thread
+    print(f"  {name:6s} 调用方 {total / callers:9.0f} 条/秒   add_log P50 {latencies[len(latencies) // 2]:7.1f} us   "
+          f"P99 {latencies[int(len(latencies) * 0.99)]:8.1f} us   最大 {latencies[-1] / 1000:7.1f} ms   "
+          f"全部写入磁盘 {durable * 1000:7.0f} ms   {'行数/顺序/格式正确' if ok else '文件内容错误'}")
+
+
+def run_case(directory, slow):
+    per_thread = SLOW_PER_THREAD if slow else PER_THREAD
+    for name in ("原同步", "队列"):
+        path = os.path.join(directory, f"{name}-{slow}.log")
+        if name == "原同步":
+            logger = LegacyLogger(path)
+            if slow:
+                logger.handler.stream = SlowFile(logger.handler.stream)
+        else:
+            logger = new_logger(path)
+            if slow:
+                logger._file = SlowFile(logger._file)
+        callers, durable, latencies = hammer(logger, per_thread)
+        logger.close()
+        report(name, per_thread, callers, durable, latencies, verify_file(path, per_thread))
+        if name == "队列":
+            print(f"         写入批次 {logger.get_stats()['batches']}，平均每批 "
+                  f"{logger.get_stats()['written'] / max(1, logger.get_stats()['batches']):.0f} 条")
+
+
+class FakeText:
+    """模拟tk.Text: 记录调用线程和每次插入的行数"""
+
+    def __init__(self):
+        self.lines = []
+        self.inserts = []
+        self.threads = set()
+        self.timers = []
+
+    def after(self, ms, callback):
+        self.timers.append((time.monotonic() + ms / 1000, callback))
+
+    def config(self, **kwargs):
+        self.threads.add(threading.current_thread().name)
+
+    def insert(self, index, text):
+        self.threads.add(threading.current_thread().name)
+        new = text.splitlines()
+        self.inserts.append(len(new))
+        self.lines.extend(new)
+
+    def index(self, index):
+        return f"{len(self.lines) + 1}.0"
+
+    def delete(self, start, end):
+        del self.lines[:int(end.split('.')[0]) - 1]
+
+    def see(self, index):
+        pass
+
+    def run_until(self, condition, timeout=10):
+        """模拟Tk主循环: 在当前线程中执行到期的after回调"""
+        deadline = time.monotonic() + timeout
+        while not condition() and time.monotonic() < deadline:
+            self.timers.sort(key=lambda timer: timer[0])
+            if self.timers and self.timers[0][0] <= time.monotonic():
+                self.timers.pop(0)[1]()
+            else:
+                time.sleep(0.001)
+
+
+def verify_ui(directory):
+    logger = new_logger(os.path.join(directory, 'ui.log'))
+    logger.add_log("绑定界面前的日志")
+    widget = FakeText()
+    logger.bind_ui(widget)
+    widget.run_until(lambda: widget.inserts)
+    replayed = bool(widget.lines) and '绑定界面前' in widget.lines[0]
+    threads = [threading.Thread(target=lambda i=i: [logger.add_log(f"t{i} {n}") for n in range(300)])
+               for i in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    start = time.monotonic()
+    widget.run_until(lambda: not logger._ui_pending and widget.inserts)
+    elapsed = time.monotonic() - start
+    logger.close()
+    main_only = widget.threads == {threading.current_thread().name}
+    print(f"界面: 1201条日志分 {len(widget.inserts)} 次插入（每次最多 {max(widget.inserts)} 条，间隔 "
+          f"{Logger.UI_INTERVAL_MS} ms），耗时 {elapsed * 1000:.0f} ms，Text保留 {len(widget.lines)} 行，"
+          f"{'只在主线程中操作组件' if main_only else '有其它线程操作组件: ' + str(widget.threads)}，"
+          f"回放绑定前日志: {'是' if replayed else '否'}")
+
+
+def run():
+    directory = tempfile.mkdtemp()
+    cwd = os.getcwd()
+    os.chdir(directory)
+    try:
+        print(f"{THREADS} 个线程并发 add_log:")
+        print(f"普通磁盘（每线程 {PER_THREAD} 条）:")
+        run_case(directory, slow=False)
+        print(f"慢磁盘，每次写入+1ms（每线程 {SLOW_PER_THREAD} 条）:")
+        run_case(directory, slow=True)
+        verify_ui(directory)
+    finally:
+        os.chdir(cwd)
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    run()
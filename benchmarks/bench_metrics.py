@@ -0,0 +1,142 @@
+"""
+指标记录基准测试
+1. 分位数精度: 对数正态分布的延迟样本（中位数约5ms，长尾到数秒），对比直方图与精确排序的P50/P90/P99/P999
+2. observe() 开销: 单线程，以及16个线程同时记录同一个指标时，对比单锁（所有线程共用一把锁和一个直方图）与分片
+3. /metrics 导出耗时（200个标签组合）
+4. Flask请求钩子的额外耗时: 对比有无 before/after_request 计时钩子的 /health（test_client，同一进程）
+
+FlaskApp依赖pywin32，非Windows平台无法导入，这里用相同的钩子挂到一个最小Flask应用上
+
+运行: python -m benchmarks.bench_metrics
+"""
+
+import random
+import threading
+import time
+
+from flask import Flask, g, jsonify, request
+
+from src.util import metrics
+from src.util.metrics import MetricsRegistry
+
+SAMPLES = 200_000
+THREADS = 16
+PER_THREAD = 20_000
+
+
+def exact(values, q):
+    return values[max(0, int(q * len(values) + 0.5) - 1)]
+
+
+def accuracy():
+    rng = random.Random(1)
+    values = [rng.lognormvariate(-5.3, 1.2) for _ in range(SAMPLES)]
+    histogram = MetricsRegistry().histogram('accuracy_seconds', '精度')
+    for value in values:
+        histogram.observe(value)
+    values.sort()
+    print(f"分位数精度（{SAMPLES} 个样本）:")
+    for q in metrics.QUANTILES:
+        real = exact(values, q)
+        estimate = histogram.percentile(q)
+        print(f"  P{q * 100:g}: 精确 {real * 1000:9.3f} ms   直方图 {estimate * 1000:9.3f} ms   "
+              f"误差 {abs(estimate - real) / real * 100:5.2f}%")
+    buckets = len(histogram.collect()[()]['buckets'])
+    print(f"  占用桶数 {buckets}（精确计算需要保存全部 {SAMPLES} 个样本）")
+
+
+def observe_cost(shards):
+    """返回 (单线程 ns/次, 多线程 ns/次)"""
+    histogram = metrics.Histogram('cost_seconds', '开销', ('route',), shards=shards)
+    labels = ('/xiadan',)
+    start = time.perf_counter()
+    for i in range(PER_THREAD * 4):
+        histogram.observe(0.003, labels)
+    single = (time.perf_counter() - start) / (PER_THREAD * 4) * 1e9
+
+    barrier = threading.Barrier(THREADS + 1)
+
+    def worker():
+        barrier.wait()
+        for i in range(PER_THREAD):
+            histogram.observe(0.003, labels)
+    threads = [threading.Thread(target=worker) for _ in range(THREADS)]
+    for t in threads:
+        t.start()
+    barrier.wait()
+    start = time.perf_counter()
+    for t in threads:
+        t.join()
+    multi = (time.perf_counter() - start) / (THREADS * PER_THREAD) * 1e9
+    assert histogram.collect()[labels]['count'] == PER_THREAD * 4 + THREADS * PER_THREAD
+    return single, multi
+
+
+def render_cost():
+    registry = MetricsRegistry()
+    histogram = registry.histogram('http_request_duration_seconds', '耗时', ('method', 'route', 'status'))
+    rng = random.Random(2)
+    for i in range(50_000):
+        histogram.observe(rng.lognormvariate(-5.3, 1.2), ('GET', f'/route/{i % 50}', str(200 + i % 4)))
+    start = time.perf_counter()
+    text = registry.render()
+    elapsed = (time.perf_counter() - start) * 1000
+    print(f"/metrics 导出: 200个标签组合 {elapsed:.2f} ms，{len(text) / 1024:.0f} KB")
+
+
+def build_app(with_hooks):
+    app = Flask(__name__)
+    latency = MetricsRegistry().histogram('http_request_duration_seconds', '耗时', ('method', 'route', 'status'))
+
+    @app.route('/health')
+    def health():
+        return jsonify({"status": "success", "timestamp": time.time()})
+
+    if with_hooks:
+        @app.before_request
+        def start_timer():
+            g.request_start = time.perf_counter()
+
+        @app.after_request
+        def record_latency(response):
+            start = g.pop('request_start', None)
+            if start is not None:
+                route = request.url_rule.rule if request.url_rule is not None else 'unmatched'
+                latency.observe(time.perf_counter() - start, (request.method, route, str(response.status_code)))
+            return response
+    return app, latency
+
+
+def hook_cost():
+    """两个应用交替测量，减少CPU频率、缓存等带来的顺序偏差"""
+    apps = {with_hooks: build_app(with_hooks) for with_hooks in (False, True)}
+    clients = {with_hooks: app.test_client() for with_hooks, (app, _) in apps.items()}
+    rounds = {False: [], True: []}
+    for client in clients.values():
+        for _ in range(500):
+            client.get('/health')
+    for _ in range(9):
+        for with_hooks, client in clients.items():
+            start = time.perf_counter()
+            for _ in range(1000):
+                client.get('/health')
+            rounds[with_hooks].append((time.perf_counter() - start) / 1000 * 1e6)
+    without, with_hooks = (sorted(rounds[key])[4] for key in (False, True))
+    print(f"Flask /health 每个请求: 无钩子 {without:.1f} us   有计时钩子 {with_hooks:.1f} us   "
+          f"额外 {with_hooks - without:.1f} us")
+    print(f"  记录到: {apps[True][1].snapshot()[('GET', '/health', '200')]}")
+
+
+def run():
+    accuracy()
+    print(f"\nobserve() 开销（{THREADS}个线程并发记录同一个指标）:")
+    for name, shards in (("单锁", 1), (f"分片x{metrics.SHARDS}", metrics.SHARDS)):
+        single, multi = observe_cost(shards)
+        print(f"  {name:8s} 单线程 {single:6.0f} ns/次   {THREADS}线程 {multi:6.0f} ns/次")
+    print()
+    render_cost()
+    hook_cost()
+
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,130 @@
+"""
+代理磁盘缓存基准测试
+本地桩服务（每个请求延迟30ms，300个URL，每个响应约4KB），模拟程序重启:
+1. 第一次运行: 按热点分布请求，填充缓存后关闭代理服务
+2. 重启: 新建代理服务（内存缓存为空），重放同样的请求
+对比只有内存缓存和内存+磁盘缓存两种配置，测量:
+- 重启耗时（创建代理服务，磁盘缓存需要打开SQLite）
+- 重启后的缓存命中率、上游请求数、调用方延迟P50/P99
+- 磁盘缓存的写入开销（第一次运行的调用方延迟）
+
+运行: python -m benchmarks.bench_proxy_disk_cache
+"""
+
+import os
+import random
+import shutil
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from flask import Flask, request
+
+from src.service.cache_policy import CachePolicy
+from src.service.disk_cache import DiskCache
+from src.service.proxy_service import ProxyService
+
+DELAY = 0.03
+URLS = 300
+REQUESTS = 2000
+upstream_hits = 0
+hits_lock = threading.Lock()
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        global upstream_hits
+        with hits_lock:
+            upstream_hits += 1
+        time.sleep(DELAY)
+        body = (f'{{"path": "{self.path}", "rows": [' + ','.join(['{"price": 10.01, "volume": 123456}'] * 110) + ']}')
+        body = body.encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def workload(seed=1):
+    """热点分布（Zipf）: 少数URL占大部分请求"""
+    rng = random.Random(seed)
+    weights = [1 / (rank + 1) for rank in range(URLS)]
+    return rng.choices(range(URLS), weights=weights, k=REQUESTS)
+
+
+def build(db_path):
+    disk_cache = DiskCache(db_path) if db_path else None
+    proxy_service = ProxyService(upstream_scheme='http', max_retries=0, disk_cache=disk_cache,
+                                 cache_policy=CachePolicy(default_ttl=300, default_stale_ttl=0))
+    app = Flask(__name__)
+
+    @app.route('/proxy/<path:url>', methods=['GET'])
+    def proxy(url):
+        return proxy_service.proxy_request(url, request)
+    return proxy_service, app.test_client()
+
+
+def replay(client, host, sequence):
+    """按顺序请求，返回 (延迟列表ms, 上游请求数)"""
+    global upstream_hits
+    with hits_lock:
+        upstream_hits = 0
+    latencies = []
+    for index in sequence:
+        start = time.perf_counter()
+        response = client.get(f"/proxy/{host}/quote/{index}.json")
+        latencies.append((time.perf_counter() - start) * 1000)
+        assert response.status_code == 200
+    return sorted(latencies), upstream_hits
+
+
+def percentile(latencies, p):
+    return latencies[min(len(latencies) - 1, int(len(latencies) * p))]
+
+
+def run():
+    upstream = ThreadingHTTPServer(('127.0.0.1', 0), StubHandler)
+    upstream.daemon_threads = True
+    threading.Thread(target=upstream.serve_forever, daemon=True).start()
+    host = f"127.0.0.1:{upstream.server_address[1]}"
+    directory = tempfile.mkdtemp()
+    sequence = workload()
+    print(f"{REQUESTS} 个请求，{URLS} 个URL（热点分布），上游延迟 {DELAY * 1000:.0f} ms")
+    try:
+        for name, db_path in (("只有内存缓存", None), ("内存+磁盘缓存", os.path.join(directory, 'proxy_cache.sqlite3'))):
+            proxy_service, client = build(db_path)
+            first, first_upstream = replay(client, host, sequence)
+            proxy_service.close()
+
+            start = time.perf_counter()
+            proxy_service, client = build(db_path)
+            restart_ms = (time.perf_counter() - start) * 1000
+            start = time.perf_counter()
+            client.get(f"/proxy/{host}/quote/0.json")
+            first_hit_ms = (time.perf_counter() - start) * 1000
+            after, after_upstream = replay(client, host, sequence[1:])
+            stats = proxy_service.get_stats()
+            proxy_service.close()
+
+            size = f"   磁盘 {os.path.getsize(db_path) / 1024:.0f} KB" if db_path else ""
+            print(f"{name}:")
+            print(f"  首次运行  上游 {first_upstream:4d} 次   P50 {percentile(first, 0.5):6.2f} ms   "
+                  f"P99 {percentile(first, 0.99):6.2f} ms   总耗时 {sum(first) / 1000:5.2f} s")
+            print(f"  重启耗时 {restart_ms:6.2f} ms   重启后第一个热点请求 {first_hit_ms:6.2f} ms{size}")
+            print(f"  重启后    上游 {after_upstream:4d} 次   P50 {percentile(after, 0.5):6.2f} ms   "
+                  f"P99 {percentile(after, 0.99):6.2f} ms   总耗时 {sum(after) / 1000:5.2f} s   "
+                  f"命中率 {stats['cache_hit_rate']}（磁盘命中 {stats['disk_hits']} 次）")
+    finally:
+        upstream.shutdown()
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,242 @@
+"""
+代理上游 HTTP/1.1 与 HTTP/2 对比
+本地TLS桩服务（自签名证书，每个请求延迟50ms）:
+- HTTP/1.1: ThreadingHTTPServer + ssl
+- HTTP/2: asyncio + h2，ALPN协商h2
+测量:
+1. 冷启动的第一个请求（包含TCP+TLS握手）与预建连接(prewarm)后的第一个请求
+2. 64个线程并发请求不同URL（不命中缓存）: 吞吐、P50/P99、桩服务收到的TCP连接数、
+   /proxy/stats 的连接池指标（upstream_*）
+
+需要 openssl 命令行生成证书
+运行: python -m benchmarks.bench_proxy_http2
+"""
+
+import asyncio
+import os
+import shutil
+import ssl
+import subprocess
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import h2.config
+import h2.connection
+import h2.events
+import h2.exceptions
+from flask import Flask, request
+
+from src.service.proxy_service import ProxyService
+
+DELAY = 0.05
+THREADS = 64
+ROUNDS = 5
+connections = {'HTTP/1.1': 0, 'HTTP/2': 0}
+
+
+def body_for(path):
+    return f'{{"path": "{path}", "price": 10.01, "volume": 123456}}'.encode('utf-8')
+
+
+def make_certificate(directory):
+    cert, key = os.path.join(directory, 'cert.pem'), os.path.join(directory, 'key.pem')
+    subprocess.run(['openssl', 'req', '-x509', '-newkey', 'rsa:2048', '-nodes', '-keyout', key, '-out', cert,
+                    '-days', '1', '-subj', '/CN=127.0.0.1'], check=True, capture_output=True)
+    return cert, key
+
+
+class Http1Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # 响应头和响应体分两次写入，不关闭Nagle时会与客户端的延迟ACK叠加出约40ms延迟
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        time.sleep(DELAY)
+        body = body_for(self.path)
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_HEAD(self):
+        self.send_response(200)
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+    def log_message(self, format, *args):
+        pass
+
+
+class TLSHttp1Server(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 256
+    context = None
+
+    def get_request(self):
+        sock, address = super().get_request()
+        connections['HTTP/1.1'] += 1
+        # 握手放到处理线程中，不阻塞accept
+        return self.context.wrap_socket(sock, server_side=True, do_handshake_on_connect=False), address
+
+
+class H2Protocol(asyncio.Protocol):
+    """最小的HTTP/2服务端: 每个请求延迟DELAY后返回JSON"""
+
+    def connection_made(self, transport):
+        connections['HTTP/2'] += 1
+        self.transport = transport
+        self.conn = h2.connection.H2Connection(h2.config.H2Configuration(client_side=False, header_encoding='utf-8'))
+        self.conn.initiate_connection()
+        transport.write(self.conn.data_to_send())
+
+    def data_received(self, data):
+        try:
+            events = self.conn.receive_data(data)
+        except h2.exceptions.ProtocolError:
+            self.transport.close()
+            return
+        for event in events:
+            if isinstance(event, h2.events.RequestReceived):
+                headers = dict(event.headers)
+                asyncio.get_running_loop().call_later(DELAY, self.respond, event.stream_id,
+                                                      headers[':method'], headers[':path'])
+            elif isinstance(event, h2.events.ConnectionTerminated):
+                self.transport.close()
+        self.transport.write(self.conn.data_to_send())
+
+    def respond(self, stream_id, method, path):
+        body = body_for(path)
+        try:
+            self.conn.send_headers(stream_id, [(':status', '200'), ('content-type', 'application/json'),
+                                               ('content-length', str(len(body)))], end_stream=method == 'HEAD')
+            if method != 'HEAD':
+                self.conn.send_data(stream_id, body, end_stream=True)
+        except h2.exceptions.StreamClosedError:
+            return
+        self.transport.write(self.conn.data_to_send())
+
+
+def start_http1(cert, key):
+    context = ssl.create_default_context(ssl.Purpose.CLIENT_AUTH)
+    context.load_cert_chain(cert, key)
+    TLSHttp1Server.context = context
+    server = TLSHttp1Server(('127.0.0.1', 0), Http1Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server.server_address[1], server.shutdown
+
+
+def start_http2(cert, key):
+    context = ssl.create_default_context(ssl.Purpose.CLIENT_AUTH)
+    context.load_cert_chain(cert, key)
+    context.set_alpn_protocols(['h2'])
+    loop = asyncio.new_event_loop()
+    threading.Thread(target=loop.run_forever, daemon=True).start()
+    server = asyncio.run_coroutine_threadsafe(
+        loop.create_server(H2Protocol, '127.0.0.1', 0, ssl=context), loop).result()
+
+    def stop():
+        server.close()
+        loop.call_soon_threadsafe(loop.stop)
+    return server.sockets[0].getsockname()[1], stop
+
+
+def build(http2):
+    proxy_service = ProxyService(max_retries=0, http2=http2)
+    app = Flask(__name__)
+
+    @app.route('/proxy/<path:url>', methods=['GET'])
+    def proxy(url):
+        return proxy_service.proxy_request(url, request)
+    return proxy_service, app
+
+
+def timed_get(client, path):
+    start = time.perf_counter()
+    response = client.get(path)
+    assert response.status_code == 200, response.data
+    return (time.perf_counter() - start) * 1000
+
+
+def first_request(host, http2, prewarm):
+    proxy_service, app = build(http2)
+    if prewarm:
+        proxy_service.prewarm([host])
+    elapsed = timed_get(app.test_client(), f"/proxy/{host}/first.json")
+    proxy_service.close()
+    return elapsed
+
+
+def burst(host, http2):
+    """THREADS个线程并发请求不同URL，重复ROUNDS轮"""
+    proxy_service, app = build(http2)
+    latencies = []
+    lock = threading.Lock()
+    barrier = threading.Barrier(THREADS)
+
+    def worker(index):
+        client = app.test_client()
+        barrier.wait()
+        for round_no in range(ROUNDS):
+            elapsed = timed_get(client, f"/proxy/{host}/quote/{round_no}-{index}.json")
+            with lock:
+                latencies.append(elapsed)
+
+    def sample():
+        # 记录进行中请求数最多时的连接池状态
+        while not done.is_set():
+            current = proxy_service.get_pool_stats()
+            if current['active_requests'] >= during[0]['active_requests']:
+                during[0] = current
+            time.sleep(0.005)
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(THREADS)]
+    during = [proxy_service.get_pool_stats()]
+    done = threading.Event()
+    sampler = threading.Thread(target=sample)
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    sampler.start()
+    for t in threads:
+        t.join()
+    done.set()
+    sampler.join()
+    during = during[0]
+    elapsed = time.perf_counter() - start
+    stats = proxy_service.get_stats()
+    proxy_service.close()
+    latencies.sort()
+    return elapsed, latencies, during, stats
+
+
+def run():
+    directory = tempfile.mkdtemp()
+    try:
+        cert, key = make_certificate(directory)
+        servers = [("HTTP/1.1", False, start_http1(cert, key)), ("HTTP/2", True, start_http2(cert, key))]
+        print(f"TLS桩服务，上游延迟 {DELAY * 1000:.0f} ms，{THREADS} 线程 x {ROUNDS} 轮并发请求不同URL")
+        for name, http2, (port, stop) in servers:
+            host = f"127.0.0.1:{port}"
+            first_request(host, http2, prewarm=False)   # 预热Python侧的导入和Flask
+            cold = sorted(first_request(host, http2, prewarm=False) for _ in range(5))[2]
+            warm = sorted(first_request(host, http2, prewarm=True) for _ in range(5))[2]
+            connections[name] = 0
+            elapsed, latencies, during, stats = burst(host, http2)
+            total = len(latencies)
+            print(f"{name}:")
+            print(f"  第一个请求: 冷启动 {cold:6.2f} ms   预建连接后 {warm:6.2f} ms")
+            print(f"  并发: {total / elapsed:7.1f} req/s   P50 {latencies[total // 2]:6.1f} ms   "
+                  f"P99 {latencies[int(total * 0.99)]:6.1f} ms   桩服务收到连接 {connections[name]} 个")
+            print(f"  连接池(请求中): 进行中 {during['active_requests']}  连接 {during.get('connections', '-')}  "
+                  f"空闲 {during.get('idle_connections', '-')}  使用率 {during.get('utilization', '-')}   "
+                  f"峰值进行中 {stats['upstream_peak_active_requests']}")
+            stop()
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,173 @@
+"""
+代理大响应转发基准测试
+本地桩服务返回多MB的JSON（客户端接受gzip时返回gzip压缩体，每64KB停顿1ms模拟网络），对比:
+1. 原实现: stream=False 整体缓冲，去掉content-encoding后以解压后的明文返回
+2. 流式转发: ProxyService（Flask服务）边收边发，保留gzip
+3. 异步HTTP服务: AsyncHttpApp 边收边发，保留gzip
+测量首字节时间(TTFB)、总耗时、客户端收到的字节数和服务端Python内存分配峰值(tracemalloc)
+注: werkzeug 每个响应结束后会用 rfile.read(10_000_000) 排空连接，客户端断开时会临时分配约10MB，
+    两种Flask模式的内存峰值都包含这部分，与响应大小无关
+
+运行: python -m benchmarks.bench_proxy_streaming [响应大小MB]
+"""
+
+import asyncio
+import gzip
+import http.client
+import json
+import sys
+import threading
+import time
+import tracemalloc
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+from flask import Flask, Response, request
+
+from src.service.async_http_service import AsyncHttpApp
+from src.service.http_server import create_server
+from src.service.proxy_service import ProxyService
+
+CHUNK = 64 * 1024
+
+
+def make_payload(megabytes):
+    rows, size, i = [], 0, 0
+    while size < megabytes * 1024 * 1024:
+        row = {"code": f"{i:06d}", "name": f"股票{i}", "price": round(10 + i % 997 * 0.01, 2),
+               "volume": i * 137 % 1000003, "time": "2025-01-02 15:00:00"}
+        rows.append(row)
+        size += 110
+        i += 1
+    raw = json.dumps(rows, ensure_ascii=False).encode('utf-8')
+    return raw, gzip.compress(raw, 6)
+
+
+class BigStubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    raw = b''
+    compressed = b''
+
+    def do_GET(self):
+        gzipped = 'gzip' in self.headers.get('Accept-Encoding', '')
+        body = self.compressed if gzipped else self.raw
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        if gzipped:
+            self.send_header('Content-Encoding', 'gzip')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        for offset in range(0, len(body), CHUNK):
+            self.wfile.write(body[offset:offset + CHUNK])
+            time.sleep(0.001)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def legacy_app(upstream_host):
+    """原实现的复刻"""
+    session = requests.Session()
+    app = Flask(__name__)
+
+    @app.route('/proxy/<path:url>')
+    def proxy(url):
+        headers = {k: v for k, v in request.headers if k.lower() not in {'host', 'content-length', 'transfer-encoding'}}
+        resp = session.request('GET', f"http://{url}", headers=headers, timeout=(3, 10), stream=False)
+        excluded = {'content-encoding', 'content-length', 'transfer-encoding'}
+        return Response(resp.content, status=resp.status_code,
+                        headers={k: v for k, v in resp.headers.items() if k.lower() not in excluded})
+    return app, session.close
+
+
+def streaming_app():
+    proxy_service = ProxyService(upstream_scheme='http', max_retries=0)
+    app = Flask(__name__)
+
+    @app.route('/proxy/<path:url>')
+    def proxy(url):
+        return proxy_service.proxy_request(url, request)
+    return app, proxy_service.close
+
+
+def start_wsgi(app):
+    server = create_server('127.0.0.1', 0, app, threads=8)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    def stop():
+        server.shutdown()
+        server.server_close()
+    return server.server_address[1], stop
+
+
+def start_async():
+    proxy_service = ProxyService(upstream_scheme='http', max_retries=0)
+    server = AsyncHttpApp(proxy_service, host='127.0.0.1', port=0)
+    loop = asyncio.new_event_loop()
+    threading.Thread(target=loop.run_forever, daemon=True).start()
+    asyncio.run_coroutine_threadsafe(server.start(), loop).result()
+
+    def stop():
+        asyncio.run_coroutine_threadsafe(server.stop(), loop).result()
+        loop.call_soon_threadsafe(loop.stop)
+        proxy_service.close()
+    return server.port, stop
+
+
+def fetch(port, path):
+    """返回 (TTFB ms, 总耗时 ms, 收到的字节数, content-encoding)"""
+    conn = http.client.HTTPConnection('127.0.0.1', port, timeout=60)
+    start = time.perf_counter()
+    conn.request('GET', path, headers={'Accept-Encoding': 'gzip'})
+    response = conn.getresponse()
+    first = response.read1(CHUNK)
+    ttfb = time.perf_counter() - start
+    received = len(first)
+    while True:
+        chunk = response.read1(CHUNK)
+        if not chunk:
+            break
+        received += len(chunk)
+    total = time.perf_counter() - start
+    conn.close()
+    return ttfb * 1000, total * 1000, received, response.getheader('Content-Encoding') or '-'
+
+
+def run(megabytes=8):
+    raw, compressed = make_payload(megabytes)
+    BigStubHandler.raw, BigStubHandler.compressed = raw, compressed
+    upstream = ThreadingHTTPServer(('127.0.0.1', 0), BigStubHandler)
+    upstream.daemon_threads = True
+    threading.Thread(target=upstream.serve_forever, daemon=True).start()
+    host = f"127.0.0.1:{upstream.server_address[1]}"
+    print(f"响应: 明文 {len(raw) / 1024 / 1024:.1f} MB, gzip {len(compressed) / 1024 / 1024:.2f} MB")
+
+    legacy, legacy_close = legacy_app(host)
+    streaming, streaming_close = streaming_app()
+    modes = [
+        ("原实现(缓冲+解压)", lambda: start_wsgi(legacy), legacy_close),
+        ("流式转发(Flask)", lambda: start_wsgi(streaming), streaming_close),
+        ("流式转发(aiohttp)", start_async, None),
+    ]
+    for name, start, close in modes:
+        port, stop = start()
+        # 每次带不同参数，避免命中缓存
+        fetch(port, f"/proxy/{host}/big.json?warmup=1")
+        results = [fetch(port, f"/proxy/{host}/big.json?n={n}") for n in range(3)]
+        tracemalloc.start()
+        tracemalloc.reset_peak()
+        fetch(port, f"/proxy/{host}/big.json?memory=1")
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        stop()
+        if close:
+            close()
+        ttfb = sorted(r[0] for r in results)[1]
+        total = sorted(r[1] for r in results)[1]
+        print(f"{name:<18} TTFB {ttfb:8.1f} ms   总耗时 {total:8.1f} ms   "
+              f"收到 {results[0][2] / 1024 / 1024:6.2f} MB ({results[0][3]})   内存峰值 {peak / 1024 / 1024:6.1f} MB")
+    upstream.shutdown()
+
+
+if __name__ == "__main__":
+    run(*[int(a) for a in sys.argv[1:2]])
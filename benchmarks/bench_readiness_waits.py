@@ -0,0 +1,148 @@
+"""
+就绪等待延迟基准测试
+用可配置响应延迟的模拟客户端，对比获取持仓流程中"固定sleep"、"等待控件出现"与"等待内容变化"的端到端耗时，
+并统计复制到刷新前旧数据的次数（"已在查询页"场景：表格控件切换前就已显示，等待控件出现时第一次轮询就返回）
+
+运行: python -m benchmarks.bench_readiness_waits
+"""
+
+import time
+
+from src.util.wait import wait_until, wait_for_change, WaitTimeoutError
+
+
+class SimulatedClient:
+    """
+    模拟同花顺客户端：每个操作在指定延迟后才生效
+    :param activate_delay: 窗口进入前台所需时间
+    :param page_delay: 切换页面后表格控件出现所需时间
+    :param copy_delay: CTRL+C 后剪切板出现数据所需时间
+    :param on_page: 已在查询页，表格控件一开始就显示着刷新前的旧数据
+    """
+
+    OLD = "证券代码\t证券名称\n600000\t浦发银行"
+    NEW = "证券代码\t证券名称\n600000\t浦发银行\n300033\t同花顺"
+
+    def __init__(self, activate_delay, page_delay, copy_delay, on_page=False):
+        self.activate_delay = activate_delay
+        self.page_delay = page_delay
+        self.copy_delay = copy_delay
+        self.on_page = on_page
+        self._foreground_at = None
+        self._page_ready_at = None
+        self._clipboard_at = None
+        self._copied = None
+
+    def activate(self):
+        self._foreground_at = time.monotonic() + self.activate_delay
+
+    def send_key(self, key):
+        now = time.monotonic()
+        if key == 'F4':
+            self._page_ready_at = now + self.page_delay
+        elif key == '{CTRL+C}':
+            self._clipboard_at = now + self.copy_delay
+            self._copied = self.table_content()
+
+    def is_foreground(self):
+        return self._foreground_at is not None and time.monotonic() >= self._foreground_at
+
+    def page_ready(self):
+        return self._page_ready_at is not None and time.monotonic() >= self._page_ready_at
+
+    def find_table(self):
+        return self.on_page or self.page_ready()
+
+    def table_content(self):
+        """表格当前显示的内容（对应截图指纹），表格不可见时返回None"""
+        if self.page_ready():
+            return self.NEW
+        return self.OLD if self.on_page else None
+
+    def get_clipboard(self):
+        if self._clipboard_at is not None and time.monotonic() >= self._clipboard_at:
+            return self._copied
+        return None
+
+
+def fixed_sleep_flow(client):
+    """原先的流程：固定等待 0.3s + 0.3s，剪切板最多重试3次(间隔0.1s)"""
+    client.activate()
+    time.sleep(0.3)
+    client.send_key('F5')
+    time.sleep(0.3)
+    client.send_key('F4')
+    client.send_key('{CTRL+C}')
+    for _ in range(3):
+        data = client.get_clipboard()
+        if data:
+            return data
+        time.sleep(0.1)
+    return None
+
+
+def element_flow(client, timeout=2.0):
+    """只等待表格控件出现：控件切换前就已显示时第一次轮询就返回"""
+    client.activate()
+    wait_until(client.is_foreground, timeout=0.5, interval=0.01)
+    client.send_key('F5')
+    client.send_key('F4')
+    wait_until(client.find_table, timeout=timeout, interval=0.01)
+    client.send_key('{CTRL+C}')
+    return wait_until(client.get_clipboard, timeout=timeout, interval=0.01)
+
+
+def content_flow(client, timeout=2.0):
+    """当前的流程：发送F5/F4前记下表格内容，等待内容变化并稳定（未变化时最多等0.3秒）"""
+    client.activate()
+    wait_until(client.is_foreground, timeout=0.5, interval=0.01)
+    before = client.table_content()
+    client.send_key('F5')
+    client.send_key('F4')
+    wait_for_change(client.table_content, before, timeout=timeout, interval=0.01)
+    client.send_key('{CTRL+C}')
+    return wait_until(client.get_clipboard, timeout=timeout, interval=0.01)
+
+
+PROFILES = [
+    ("快速客户端", 0.005, 0.02, 0.01, False),
+    ("一般客户端", 0.03, 0.08, 0.05, False),
+    ("繁忙客户端", 0.1, 0.25, 0.3, False),
+    ("已在查询页", 0.03, 0.08, 0.05, True),
+    ("已在查询页(繁忙)", 0.1, 0.25, 0.3, True),
+]
+
+FLOWS = [("固定sleep", fixed_sleep_flow), ("等待控件", element_flow), ("等待内容", content_flow)]
+
+
+def measure(flow, profile, rounds):
+    """返回 (平均耗时, 失败次数, 读到旧数据次数)"""
+    latencies = []
+    failures = stale = 0
+    for _ in range(rounds):
+        client = SimulatedClient(*profile)
+        start = time.perf_counter()
+        try:
+            data = flow(client)
+            if data is None:
+                failures += 1
+            elif data != client.NEW:
+                stale += 1
+        except WaitTimeoutError:
+            failures += 1
+        latencies.append(time.perf_counter() - start)
+    return sum(latencies) / len(latencies), failures, stale
+
+
+def run(rounds=5):
+    print(f"{'客户端':<12}" + "".join(f"{name:>24}" for name, _ in FLOWS))
+    for name, *profile in PROFILES:
+        cells = []
+        for _, flow in FLOWS:
+            latency, failures, stale = measure(flow, profile, rounds)
+            cells.append(f"{latency * 1000:8.1f}ms 失败{failures} 旧数据{stale}")
+        print(f"{name:<12}" + "".join(f"{cell:>24}" for cell in cells))
+
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,155 @@
+"""
+代理响应缓存基准测试
+对比原实现（dict + RLock，超过1000条删除最早插入的500条）与 ResponseCache（LRU + TTL + 字节上限）:
+1. 多线程命中 / 插入开销（1/4/16线程）
+2. 热点保留：少量热点URL + 持续的一次性URL，热点的命中率
+3. 内存上限：写入大响应时缓存实际占用的字节数
+4. 后台清理：过期后不再读取的条目能否释放
+
+运行: python -m benchmarks.bench_response_cache [每线程操作数]
+"""
+
+import random
+import sys
+import threading
+import time
+from datetime import datetime, timedelta
+
+from src.service.response_cache import ResponseCache
+
+THREADS = (1, 4, 16)
+
+
+class LegacyCache:
+    """原 ProxyService 中的缓存实现"""
+
+    def __init__(self, ttl=10):
+        self.ttl = ttl
+        self.response_cache = {}
+        self.cache_lock = threading.RLock()
+
+    def get(self, key):
+        with self.cache_lock:
+            if key in self.response_cache:
+                cached_data, timestamp = self.response_cache[key]
+                if datetime.now() - timestamp < timedelta(seconds=self.ttl):
+                    return cached_data
+                del self.response_cache[key]
+            return None
+
+    def set(self, key, value, size=None):
+        with self.cache_lock:
+            self.response_cache[key] = (value, datetime.now())
+            if len(self.response_cache) > 1000:
+                for k in list(self.response_cache.keys())[:500]:
+                    del self.response_cache[k]
+
+    def stored_bytes(self):
+        with self.cache_lock:
+            return sum(len(v['content']) for v, _ in self.response_cache.values())
+
+
+def new_cache(kind, **kwargs):
+    if kind == 'legacy':
+        return LegacyCache()
+    return ResponseCache(sweep_interval=0, **kwargs)
+
+
+def make_value(size):
+    return {'content': b'x' * size, 'status': 200, 'headers': {'Content-Type': 'application/json'}}
+
+
+def run_threads(threads, target):
+    workers = [threading.Thread(target=target, args=(i,)) for i in range(threads)]
+    start = time.perf_counter()
+    for w in workers:
+        w.start()
+    for w in workers:
+        w.join()
+    return time.perf_counter() - start
+
+
+def bench_ops(ops):
+    print("== 多线程开销（每次操作平均耗时 / 总吞吐）==")
+    value = make_value(2048)
+    for kind in ('legacy', 'lru'):
+        for threads in THREADS:
+            cache = new_cache(kind)
+            keys = [f"GET:https://basic.10jqka.com.cn/mapp/{i}/stock_base_info.json" for i in range(500)]
+            for key in keys:
+                cache.set(key, value, 2200)
+
+            def hit(index):
+                rng = random.Random(index)
+                for _ in range(ops):
+                    cache.get(keys[rng.randrange(500)])
+
+            def insert(index):
+                for n in range(ops):
+                    cache.set(f"GET:https://example.com/{index}/{n}", value, 2200)
+
+            hit_time = run_threads(threads, hit)
+            insert_time = run_threads(threads, insert)
+            total = ops * threads
+            print(f"{kind:<7} {threads:>2}线程   命中 {hit_time / total * 1e6:6.2f} us/次 ({total / hit_time:9.0f}/s)   "
+                  f"插入 {insert_time / total * 1e6:6.2f} us/次 ({total / insert_time:9.0f}/s)")
+
+
+def bench_hot_set(rounds=20000):
+    print("== 热点保留（100个热点URL + 每轮一个一次性URL）==")
+    value = make_value(1024)
+    for kind in ('legacy', 'lru'):
+        cache = new_cache(kind)
+        rng = random.Random(7)
+        hot_hits = hot_lookups = 0
+        for n in range(rounds):
+            key = f"hot:{rng.randrange(100)}"
+            hot_lookups += 1
+            if cache.get(key) is None:
+                cache.set(key, value, 1100)
+            else:
+                hot_hits += 1
+            cache.set(f"cold:{n}", value, 1100)
+        print(f"{kind:<7} 热点命中率 {hot_hits / hot_lookups * 100:6.2f}%")
+
+
+def bench_memory(count=2000, body=256 * 1024):
+    print(f"== 内存上限（写入 {count} 个 {body // 1024}KB 响应，共 {count * body // 1024 // 1024}MB）==")
+    legacy = LegacyCache()
+    cache = ResponseCache(max_bytes=64 * 1024 * 1024, sweep_interval=0)
+    peak_legacy = peak = 0
+    for n in range(count):
+        value = make_value(body)
+        legacy.set(f"k{n}", value)
+        cache.set(f"k{n}", value, body)
+        if n % 50 == 0:
+            peak_legacy = max(peak_legacy, legacy.stored_bytes())
+            peak = max(peak, cache.get_stats()['bytes'])
+    stats = cache.get_stats()
+    print(f"legacy  峰值 {peak_legacy / 1024 / 1024:7.1f} MB（无字节上限）")
+    print(f"lru     峰值 {peak / 1024 / 1024:7.1f} MB（上限 64MB）  淘汰 {stats['evictions']} 条 / "
+          f"{stats['evicted_bytes'] / 1024 / 1024:.0f} MB")
+
+
+def bench_sweeper():
+    print("== 后台清理（1000个条目TTL 0.2秒，之后不再读取）==")
+    cache = ResponseCache(ttl=0.2, sweep_interval=0.1)
+    for n in range(1000):
+        cache.set(f"k{n}", make_value(4096), 4200)
+    before = cache.get_stats()['bytes']
+    time.sleep(0.5)
+    stats = cache.get_stats()
+    cache.stop()
+    print(f"lru     清理前 {before / 1024:.0f} KB -> 0.5秒后 {stats['bytes'] / 1024:.0f} KB，过期 {stats['expirations']} 条"
+          f"（原实现只在再次读取同一URL时删除）")
+
+
+def run(ops=20000):
+    bench_ops(ops)
+    bench_hot_set()
+    bench_memory()
+    bench_sweeper()
+
+
+if __name__ == "__main__":
+    run(*[int(a) for a in sys.argv[1:2]])
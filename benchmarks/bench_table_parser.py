@@ -0,0 +1,107 @@
+"""
+剪切板表格解析基准测试
+在合成的5000行持仓导出数据上，对比原先的 _format_hold_data（字符串字典）与 table_parser 的解析耗时和内存
+
+运行: python -m benchmarks.bench_table_parser [行数]
+"""
+
+import random
+import sys
+import time
+import tracemalloc
+from decimal import Decimal
+
+from src.util.table_parser import iter_rows, parse_table, get_schema, typed_records
+
+HEADERS = ["证券代码", "证券名称", "股票余额", "可用余额", "冻结数量", "成本价", "市价", "盈亏",
+           "盈亏比例(%)", "当日盈亏", "当日盈亏比(%)", "市值", "仓位占比(%)", "当日买入",
+           "当日卖出", "交易市场", "序号", ""]
+
+
+def make_export(rows, seed=3):
+    """生成合成的持仓导出（与同花顺复制出的格式一致：制表符分隔，CRLF换行）"""
+    rng = random.Random(seed)
+    lines = ["\t".join(HEADERS)]
+    for i in range(rows):
+        amount = rng.randrange(100, 100000, 100)
+        price = rng.uniform(1, 300)
+        cost = price * rng.uniform(0.7, 1.3)
+        lines.append("\t".join([
+            f"{rng.randrange(1, 688999):06d}", f"股票{i}", str(amount), str(amount), "0",
+            f"{cost:.3f}", f"{price:.3f}", f"{(price - cost) * amount:.3f}",
+            f"{(price - cost) / cost * 100:.3f}", f"{rng.uniform(-5000, 5000):.2f}",
+            f"{rng.uniform(-10, 10):.2f}", f"{price * amount:.3f}", f"{rng.uniform(0, 50):.2f}",
+            "0", "0", "深圳Ａ股", str(i + 1), ""
+        ]))
+    return "\r\n".join(lines)
+
+
+def format_hold_data_legacy(table_data):
+    """原先的实现：整串切分，每行构建字符串字典"""
+    lines = table_data.splitlines()
+    if len(lines) < 2:
+        return []
+    headers = lines[0].split('\t')
+    result = []
+    for line in lines[1:]:
+        values = line.split('\t')
+        if len(values) != len(headers):
+            continue
+        item = {headers[i]: values[i] for i in range(len(headers))}
+        result.append(item)
+    return result
+
+
+def format_hold_data_legacy_converted(table_data):
+    """原实现 + 调用方自行转换数值列（目前每个客户端都要做一遍）"""
+    rows = format_hold_data_legacy(table_data)
+    for row in rows:
+        for key in NUMERIC_HEADERS:
+            row[key] = Decimal(row[key]) if '.' in row[key] else int(row[key])
+    return rows
+
+
+NUMERIC_HEADERS = [h for h in HEADERS if h and h not in ("证券代码", "证券名称", "交易市场")]
+
+
+def measure(func, data, rounds=5):
+    """返回(平均耗时秒, 结果占用内存字节)"""
+    start = time.perf_counter()
+    for _ in range(rounds):
+        func(data)
+    elapsed = (time.perf_counter() - start) / rounds
+
+    tracemalloc.start()
+    result = func(data)
+    retained, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    return elapsed, retained
+
+
+def run(rows=5000):
+    data = make_export(rows)
+    get_schema.cache_clear()
+
+    def stream_sum(text):
+        # 流式消费：逐行累加市值，不保留行对象
+        return sum(Decimal(row["市值"]) for row in iter_rows(text))
+
+    cases = [
+        ("原实现(字符串字典)", format_hold_data_legacy),
+        ("原实现+调用方转换", format_hold_data_legacy_converted),
+        ("TableRow(字符串)", parse_table),
+        ("TableRow(已类型化)", lambda text: parse_table(text, typed=True)),
+        ("TableRow.to_dict()", lambda text: [row.to_dict() for row in iter_rows(text)]),
+        ("to_dict()+typed_records", lambda text: typed_records([row.to_dict() for row in iter_rows(text)])),
+        ("流式消费(不保留行)", stream_sum),
+    ]
+    print(f"行数: {rows}, 数据大小: {len(data.encode('utf-8')) / 1024:.0f} KB")
+    for name, func in cases:
+        elapsed, retained = measure(func, data)
+        print(f"{name:<22} 解析 {elapsed * 1000:8.2f} ms   结果占用 {retained / 1024 / 1024:7.2f} MB")
+    print("注: 原实现只切分字符串，数值仍是文本，调用方还需再转换一次")
+
+
+if __name__ == "__main__":
+    run(*[int(a) for a in sys.argv[1:2]])
@@ -0,0 +1,62 @@
+"""
+合成数字验证码样本
+按固定随机种子生成，与同花顺查询验证码相近：4位数字、浅色背景、彩色字符、少量噪点和干扰线
+样本完全由种子决定，基准测试和模板训练在任何机器上得到的是同一组图片
+"""
+
+import random
+
+from PIL import Image, ImageDraw, ImageFont
+
+WIDTH, HEIGHT = 60, 22
+DIGITS = '0123456789'
+
+
+def _load_font(size=16):
+    try:
+        return ImageFont.load_default(size=size)
+    except TypeError:
+        # Pillow < 10.1 只有固定大小的位图字体
+        return ImageFont.load_default()
+
+
+def make_captcha(text, rng, font=None):
+    """
+    生成一张验证码
+    :param text: 数字串
+    :param rng: random.Random
+    """
+    font = font or _load_font()
+    background = tuple(rng.randint(225, 255) for _ in range(3))
+    image = Image.new('RGB', (WIDTH, HEIGHT), background)
+    draw = ImageDraw.Draw(image)
+
+    x = rng.randint(3, 7)
+    for char in text:
+        color = tuple(rng.randint(0, 110) for _ in range(3))
+        draw.text((x, rng.randint(1, 4)), char, fill=color, font=font)
+        x += rng.randint(12, 14)
+
+    # 噪点和一条浅色干扰线
+    for _ in range(rng.randint(10, 25)):
+        image.putpixel((rng.randrange(WIDTH), rng.randrange(HEIGHT)),
+                       tuple(rng.randint(100, 200) for _ in range(3)))
+    draw.line(
+        (rng.randrange(WIDTH // 3), rng.randrange(HEIGHT), rng.randrange(WIDTH * 2 // 3, WIDTH), rng.randrange(HEIGHT)),
+        fill=tuple(rng.randint(160, 210) for _ in range(3))
+    )
+    return image
+
+
+def generate_samples(count=200, seed=7, length=4):
+    """
+    生成一组带标签的验证码
+    :return: [(PIL图片, 文本), ...]
+    """
+    rng = random.Random(seed)
+    font = _load_font()
+    samples = []
+    for _ in range(count):
+        text = ''.join(rng.choice(DIGITS) for _ in range(length))
+        samples.append((make_captcha(text, rng, font), text))
+    return samples
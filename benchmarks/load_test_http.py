@@ -0,0 +1,218 @@
+"""
+HTTP服务压测
+启动本地桩上游服务，分别用 development（Werkzeug开发服务器）、production（固定线程池）和
+aiohttp（异步HTTP服务，单事件循环）模式启动HTTP服务，并发驱动 /health 和 /proxy，输出每秒请求数和P50/P99延迟
+
+- /proxy(缓存命中): 每次请求同一个URL，10秒缓存内只转发一次
+- /proxy(转发):     每次请求带不同参数，全部转发到桩服务
+- /health(空闲连接): 先建立64个不发请求的连接（多于工作线程数），再驱动 /health
+
+HTTP服务运行在独立进程中，避免与压测客户端争抢GIL。
+Windows下直接使用FlaskApp的Flask应用；其它平台FlaskApp无法导入(依赖pywin32)，
+使用挂载同一个ProxyService、路由相同的Flask应用
+
+运行: python -m benchmarks.load_test_http [并发数] [每项持续秒数] [桩服务延迟毫秒]
+"""
+
+import asyncio
+import http.client
+import json
+import multiprocessing
+import socket
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from flask import Flask, jsonify, request
+
+from src.service.async_http_service import AsyncHttpApp
+from src.service.http_server import create_server
+from src.service.proxy_service import ProxyService
+
+PAYLOAD = json.dumps({"code": "300033", "name": "同花顺", "data": list(range(200))}).encode('utf-8')
+
+
+class StubUpstreamHandler(BaseHTTPRequestHandler):
+    """桩上游：返回固定JSON，可配置延迟"""
+
+    protocol_version = "HTTP/1.1"
+    delay = 0.0
+
+    def do_GET(self):
+        if self.delay:
+            time.sleep(self.delay)
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(PAYLOAD)))
+        self.end_headers()
+        self.wfile.write(PAYLOAD)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_stub_upstream(delay):
+    StubUpstreamHandler.delay = delay
+    server = ThreadingHTTPServer(('127.0.0.1', 0), StubUpstreamHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def build_app():
+    """返回 (Flask应用, 清理函数)"""
+    proxy_service = ProxyService(cache_ttl=10, upstream_scheme='http', max_retries=0)
+    try:
+        from src.service.flask_service import FlaskApp
+    except ImportError:
+        app = Flask(__name__)
+
+        @app.route('/health', methods=['GET'])
+        def health_check():
+            return jsonify({"status": "success", "timestamp": time.time()})
+
+        @app.route('/proxy/<path:url>', methods=['GET', 'POST', 'PUT', 'DELETE'])
+        def proxy(url):
+            return proxy_service.proxy_request(url, request)
+
+        return app, proxy_service.close
+
+    flask_app = FlaskApp(host='127.0.0.1', port=0)
+    flask_app.proxy_service = proxy_service
+
+    def cleanup():
+        flask_app.order_executor.stop()
+        proxy_service.close()
+    return flask_app.app, cleanup
+
+
+def drive(port, make_path, concurrency, duration):
+    """并发请求，返回 (请求数, 错误数, 延迟列表)"""
+    latencies = []
+    errors = [0]
+    lock = threading.Lock()
+    deadline = time.perf_counter() + duration
+
+    def client(index):
+        local, local_errors, n = [], 0, 0
+        conn = http.client.HTTPConnection('127.0.0.1', port, timeout=10)
+        while time.perf_counter() < deadline:
+            path = make_path(index, n)
+            n += 1
+            start = time.perf_counter()
+            try:
+                conn.request('GET', path)
+                response = conn.getresponse()
+                response.read()
+                if response.status != 200:
+                    local_errors += 1
+                if response.getheader('Connection', '').lower() == 'close':
+                    conn.close()
+            except (OSError, http.client.HTTPException):
+                local_errors += 1
+                conn.close()
+                conn = http.client.HTTPConnection('127.0.0.1', port, timeout=10)
+                continue
+            local.append(time.perf_counter() - start)
+        conn.close()
+        with lock:
+            latencies.extend(local)
+            errors[0] += local_errors
+
+    threads = [threading.Thread(target=client, args=(i,)) for i in range(concurrency)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return len(latencies), errors[0], latencies
+
+
+def percentile(values, q):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * q))] * 1000
+
+
+def serve_async(ready, stop):
+    """子进程：在独立事件循环线程中启动异步HTTP服务（与应用中运行在信令事件循环上相同）"""
+    proxy_service = ProxyService(cache_ttl=10, upstream_scheme='http', max_retries=0)
+    server = AsyncHttpApp(proxy_service, host='127.0.0.1', port=0)
+    loop = asyncio.new_event_loop()
+    thread = threading.Thread(target=loop.run_forever, daemon=True)
+    thread.start()
+    asyncio.run_coroutine_threadsafe(server.start(), loop).result()
+    ready.put(server.port)
+    stop.wait()
+    start = time.perf_counter()
+    asyncio.run_coroutine_threadsafe(server.stop(), loop).result()
+    loop.call_soon_threadsafe(loop.stop)
+    thread.join(timeout=5)
+    proxy_service.close()
+    ready.put((time.perf_counter() - start) * 1000)
+
+
+def serve(mode, ready, stop):
+    """子进程：启动HTTP服务，把端口号放入ready队列，stop事件置位后关闭并回报关闭耗时"""
+    if mode == 'aiohttp':
+        return serve_async(ready, stop)
+    app, cleanup = build_app()
+    server = create_server('127.0.0.1', 0, app, mode=mode, threads=32, backlog=128, idle_timeout=5)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    ready.put(server.server_address[1])
+    stop.wait()
+    start = time.perf_counter()
+    server.shutdown()
+    server.server_close()
+    thread.join(timeout=5)
+    cleanup()
+    ready.put((time.perf_counter() - start) * 1000)
+
+
+def open_idle_connections(port, count=64):
+    """建立count个只连接不发请求的连接（模拟浏览器预连接、慢客户端）"""
+    return [socket.create_connection(('127.0.0.1', port)) for _ in range(count)]
+
+
+def run(concurrency=32, duration=5, upstream_delay_ms=5):
+    upstream = start_stub_upstream(upstream_delay_ms / 1000)
+    upstream_host = f"127.0.0.1:{upstream.server_address[1]}"
+    cases = [
+        ("/health", lambda i, n: "/health"),
+        ("/proxy(缓存命中)", lambda i, n: f"/proxy/{upstream_host}/stock_base_info.json"),
+        ("/proxy(转发)", lambda i, n: f"/proxy/{upstream_host}/stock_base_info.json?c={i}&n={n}"),
+    ]
+    print(f"并发 {concurrency}，每项 {duration} 秒，桩服务延迟 {upstream_delay_ms} ms")
+
+    context = multiprocessing.get_context('spawn')
+    for mode in ("development", "production", "aiohttp"):
+        ready, stop = context.Queue(), context.Event()
+        process = context.Process(target=serve, args=(mode, ready, stop), daemon=True)
+        process.start()
+        port = ready.get(timeout=30)
+        try:
+            for name, make_path in cases:
+                count, errors, latencies = drive(port, make_path, concurrency, duration)
+                print(f"{mode:<12} {name:<16} {count / duration:8.0f} req/s   "
+                      f"P50 {percentile(latencies, 0.5):7.2f} ms   P99 {percentile(latencies, 0.99):7.2f} ms   错误 {errors}")
+            idle = open_idle_connections(port)
+            try:
+                count, errors, latencies = drive(port, lambda i, n: "/health", concurrency, duration)
+            finally:
+                for connection in idle:
+                    connection.close()
+            print(f"{mode:<12} {'/health(空闲连接)':<16} {count / duration:8.0f} req/s   "
+                  f"P50 {percentile(latencies, 0.5):7.2f} ms   P99 {percentile(latencies, 0.99):7.2f} ms   错误 {errors}")
+        finally:
+            stop.set()
+            print(f"{mode:<12} 关闭耗时 {ready.get(timeout=30):.0f} ms")
+            process.join(timeout=10)
+
+    upstream.shutdown()
+
+
+if __name__ == "__main__":
+    args = [int(a) for a in sys.argv[1:4]]
+    run(*args)
@@ -1,38 +1,37 @@
-import win32con
-
+# 虚拟键码(与win32con.VK_*取值一致)，直接写数值以便在非Windows环境下也能导入
 KEY_MAP = {
-    'ENTER': win32con.VK_RETURN,
-    'ESC': win32con.VK_ESCAPE,
-    'F1': win32con.VK_F1,
-    'F2': win32con.VK_F2,
-    'F3': win32con.VK_F3,
-    'F4': win32con.VK_F4,
-    'F5': win32con.VK_F5,
-    'F6': win32con.VK_F6,
-    'F7': win32con.VK_F7,
-    'F8': win32con.VK_F8,
-    'F9': win32con.VK_F9,
-    'F10': win32con.VK_F10,
-    'F11': win32con.VK_F11,
-    'F12': win32con.VK_F12,
-    'CTRL': win32con.VK_CONTROL,
-    'ALT': win32con.VK_MENU,
-    'SHIFT': win32con.VK_SHIFT,
-    'TAB': win32con.VK_TAB,
-    'CAPSLOCK': win32con.VK_CAPITAL,
-    'DEL': win32con.VK_DELETE,
-    'INSERT': win32con.VK_INSERT,
-    'HOME': win32con.VK_HOME,
-    'END': win32con.VK_END,
-    'PAGEUP': win32con.VK_PRIOR,
-    'PAGEDOWN': win32con.VK_NEXT,
-    'WIN': win32con.VK_LWIN,
-    'UP': win32con.VK_UP,
-    'DOWN': win32con.VK_DOWN,
-    'LEFT': win32con.VK_LEFT,
-    'RIGHT': win32con.VK_RIGHT,
-    '+': win32con.VK_ADD,
-    '-': win32con.VK_SUBTRACT,
-    '*': win32con.VK_MULTIPLY,
-    '/': win32con.VK_DIVIDE
-} 
\ No newline at end of file
+    'ENTER': 0x0D,      # VK_RETURN
+    'ESC': 0x1B,        # VK_ESCAPE
+    'F1': 0x70,         # VK_F1
+    'F2': 0x71,         # VK_F2
+    'F3': 0x72,         # VK_F3
+    'F4': 0x73,         # VK_F4
+    'F5': 0x74,         # VK_F5
+    'F6': 0x75,         # VK_F6
+    'F7': 0x76,         # VK_F7
+    'F8': 0x77,         # VK_F8
+    'F9': 0x78,         # VK_F9
+    'F10': 0x79,        # VK_F10
+    'F11': 0x7A,        # VK_F11
+    'F12': 0x7B,        # VK_F12
+    'CTRL': 0x11,       # VK_CONTROL
+    'ALT': 0x12,        # VK_MENU
+    'SHIFT': 0x10,      # VK_SHIFT
+    'TAB': 0x09,        # VK_TAB
+    'CAPSLOCK': 0x14,   # VK_CAPITAL
+    'DEL': 0x2E,        # VK_DELETE
+    'INSERT': 0x2D,     # VK_INSERT
+    'HOME': 0x24,       # VK_HOME
+    'END': 0x23,        # VK_END
+    'PAGEUP': 0x21,     # VK_PRIOR
+    'PAGEDOWN': 0x22,   # VK_NEXT
+    'WIN': 0x5B,        # VK_LWIN
+    'UP': 0x26,         # VK_UP
+    'DOWN': 0x28,       # VK_DOWN
+    'LEFT': 0x25,       # VK_LEFT
+    'RIGHT': 0x27,      # VK_RIGHT
+    '+': 0x6B,          # VK_ADD
+    '-': 0x6D,          # VK_SUBTRACT
+    '*': 0x6A,          # VK_MULTIPLY
+    '/': 0x6F           # VK_DIVIDE
+}
@@ -1,6 +1,7 @@
 from src.app.automation import AutomationApp
 import tkinter as tk
 import sys
+import multiprocessing
 import win32event
 import win32api
 import win32gui
@@ -96,4 +97,6 @@ def dev():
     reloader.watch_files('**/*.py')
 
 if __name__ == "__main__":
+    # 打包后OCR工作进程以spawn方式启动，需要freeze_support
+    multiprocessing.freeze_support()
     main()
\ No newline at end of file
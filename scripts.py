@@ -1,5 +1,6 @@
 import subprocess
 import os
+import shutil
 
 def build():
     icon_path = "icon.ico"
@@ -20,10 +21,48 @@ def build():
     # 拷贝Tesseract-OCR目录到dist目录
     tesseract_dir = "Tesseract-OCR"
     if os.path.exists(tesseract_dir):
-        import shutil
         dist_dir = "dist"
         target_path = os.path.join(dist_dir, tesseract_dir)
         if not os.path.exists(target_path):  # 检查目标目录是否已存在
             shutil.copytree(tesseract_dir, target_path)
     else:
-        raise FileNotFoundError(f"Tesseract-OCR目录 {tesseract_dir} 不存在") 
\ No newline at end of file
+        raise FileNotFoundError(f"Tesseract-OCR目录 {tesseract_dir} 不存在") 
+
+    # 拷贝验证码数字模板(如果已训练)
+    templates_path = os.path.join("config", "captcha_templates.npz")
+    if os.path.exists(templates_path):
+        os.makedirs(os.path.join("dist", "config"), exist_ok=True)
+        shutil.copy2(templates_path, os.path.join("dist", templates_path))
+
+def train_captcha():
+    """
+    从已标注的验证码图片训练数字模板
+    用法: poetry run train_captcha <样本目录> [模板文件]
+    样本文件名以验证码文本开头，例如 5260.png、5260_1.png
+    """
+    import sys
+    from PIL import Image
+    from src.models.app_model import AppModel
+    from src.service.captcha_solver import preprocess_captcha
+    from src.service.digit_recognizer import DigitRecognizer
+
+    if len(sys.argv) < 2:
+        raise SystemExit("用法: train_captcha <样本目录> [模板文件]")
+    sample_dir = sys.argv[1]
+    output_path = sys.argv[2] if len(sys.argv) > 2 else AppModel().get_captcha_config()['templates_path']
+
+    samples = []
+    for name in sorted(os.listdir(sample_dir)):
+        stem, ext = os.path.splitext(name)
+        label = stem.split('_')[0]
+        if ext.lower() not in ('.png', '.bmp', '.jpg') or not label.isdigit():
+            continue
+        with Image.open(os.path.join(sample_dir, name)) as image:
+            samples.append((preprocess_captcha(image), label))
+
+    recognizer, report = DigitRecognizer.train(samples)
+    os.makedirs(os.path.dirname(output_path) or '.', exist_ok=True)
+    recognizer.save(output_path)
+    print(f"样本 {report['samples']} 张，跳过 {report['skipped']} 张（切分数量与标注不符），验证码长度 {report['length']}")
+    print(f"各数字字符数: {report['glyphs']}")
+    print(f"模板已保存到: {output_path}")
@@ -5,6 +5,7 @@ from src.view.automation_view import AutomationView
 from src.view.system_tray import SystemTray
 from src.controller.automation_controller import AutomationController
 from src.service.flask_service import FlaskApp
+from src.service.async_http_service import AsyncHttpApp
 from src.service.signaling_server import WebRTCSignalingService
 from src.service.window_monitor import WindowMonitor
 from src.util.logger import Logger
@@ -26,7 +27,9 @@ class AutomationApp:
         # 初始化http服务
         self.flask_server = self.init_http_server()
         
-        # 初始化WebRTC信令服务
+        # 初始化WebRTC信令服务（启用时异步HTTP服务也运行在同一个事件循环上）
+        self.signaling_loop = None
+        self.async_http_server = None
         self.signaling_service = self.init_signaling_server()
 
         # 初始化窗口监控服务
@@ -67,6 +70,16 @@ class AutomationApp:
             if self.system_tray:
                 self.system_tray.stop_tray()
 
+            # 停止异步HTTP服务（在其事件循环中关闭）
+            if self.async_http_server and self.signaling_loop:
+                asyncio.run_coroutine_threadsafe(
+                    self.async_http_server.stop(), self.signaling_loop
+                ).result(timeout=5)
+
+            # 停止HTTP服务（同时停止下单执行器）
+            if self.flask_server:
+                self.flask_server.stop()
+
             # 退出主循环
             self.root.quit()
             self.root.destroy()
@@ -101,14 +114,25 @@ class AutomationApp:
     def init_signaling_server(self):
         """初始化WebRTC信令服务"""
         signaling_service = WebRTCSignalingService(host="0.0.0.0", port=8000)
+        async_http_config = self.controller.model.get_async_http_config()
+        if async_http_config.get('enabled', False):
+            self.async_http_server = AsyncHttpApp.from_flask_app(
+                self.flask_server,
+                port=async_http_config.get('port', 5001),
+                backlog=async_http_config.get('backlog', 128)
+            )
         
         # 在后台线程中启动信令服务器
         def start_signaling_server():
             loop = asyncio.new_event_loop()
             asyncio.set_event_loop(loop)
+            self.signaling_loop = loop
             
             try:
                 loop.run_until_complete(signaling_service.start_server())
+                if self.async_http_server:
+                    loop.run_until_complete(self.async_http_server.start())
+                    self.log(f"异步HTTP服务已启动：http://<本机IP地址>:{self.async_http_server.port}/health")
                 # 保持事件循环运行
                 loop.run_forever()
             except Exception as e:
@@ -153,4 +177,4 @@ class AutomationApp:
         """使用新的Logger类记录日志"""
         self.logger.add_log(message)
 
-        
\ No newline at end of file
+        
\ No newline at end of file
@@ -26,6 +26,66 @@ class AppModel:
             'window_monitor': {
                 'enabled': True,           # 是否启用窗口监控
                 'check_interval': 5        # 检查间隔（秒）
+            },
+            'key_pacing': {
+                'key_interval': 0.05,      # 相邻按键间隔（秒），0表示连续按键一次性提交
+                'combo_interval': 0.1,     # 组合键内按下/释放间隔（秒）
+                'pause': 0.5               # 空按键代表的停顿（秒）
+            },
+            'tracing': {
+                'enabled': True,           # 是否记录GUI操作各阶段耗时（/debug/traces）
+                'sample_rate': 1.0,        # 采样率(0~1)，GUI操作本身耗时数百毫秒，全量记录的开销可忽略
+                'max_traces': 200,         # 保留最近多少条trace
+                'max_spans': 500           # 每条trace最多记录的阶段数
+            },
+            'snapshot_cache': {
+                'max_age': 3               # 持仓/资金快照默认最大年龄（秒）
+            },
+            'captcha': {
+                'templates_path': 'config/captcha_templates.npz',  # 数字模板（train_captcha生成）
+                'min_margin': 0.1,         # 模板匹配最低余量(最佳与次佳数字的相关系数差)，低于该值回退到Tesseract
+                'ocr_workers': 2,          # OCR引擎数，多种预处理参数并行识别（未安装tesserocr时为同时运行的tesseract数）
+                'max_rounds': 3,           # 验证码最多识别几轮（每轮失败后刷新验证码）
+                'max_candidates': 2        # 每轮最多提交几个候选
+            },
+            'http_server': {
+                'mode': 'production',      # production 固定线程池；development Werkzeug开发服务器
+                'threads': 32,             # 工作线程数（同时处理的连接数）
+                'backlog': 128,            # 监听队列长度
+                'idle_timeout': 5          # 连接建立后等待请求的最长时间（秒），0表示不限制；每个连接只处理一个请求，不保持连接
+            },
+            'proxy_cache': {
+                'default_ttl': 10,         # 代理缓存默认新鲜期（秒）
+                'stale_ttl': 30,           # 过期后仍先返回旧响应（同时后台刷新）的时间（秒）
+                'respect_cache_control': True,  # 遵循上游Cache-Control（no-store/max-age等）
+                'rules': [],               # 按host/路径的规则，如 {"host": "basic.10jqka.com.cn", "path": "/mapp/*", "ttl": 30}
+                'disk_enabled': False,     # 是否启用磁盘缓存（cache/proxy_cache.sqlite3，重启后仍可命中）
+                'disk_max_mb': 256         # 磁盘缓存总大小上限（MB）
+            },
+            'proxy_upstream': {
+                'http2': False,            # 是否使用HTTP/2转发（并发请求在少量TLS连接上多路复用）
+                'prewarm_hosts': [],       # 启动时预先建立连接的host，如 ["basic.10jqka.com.cn", "d.10jqka.com.cn"]
+                'prewarm_connections': 4   # HTTP/1.1下每个host预建的连接数（HTTP/2只需一个）
+            },
+            'proxy_routes': {
+                'allow_unlisted': False,   # 是否代理未列出的host（False时返回403）
+                'default': {               # 路由中未写的字段使用的设置
+                    'max_concurrency': 16,     # 同时转发到一个host的请求数上限（小于HTTP线程数，给下单接口留出线程）
+                    'connect_timeout': 3,      # 连接超时（秒）
+                    'read_timeout': 10,        # 读取超时（秒）
+                    'queue_timeout': 0.5,      # 并发已满时最多等待多少秒，超时返回503
+                    'failure_threshold': 5,    # 连续失败（超时/连接失败/5xx）多少次后熔断
+                    'reset_timeout': 30        # 熔断多少秒后放行一个试探请求
+                },
+                'routes': [                # 允许的host（通配符），可单独设置上面的字段
+                    {'host': '10jqka.com.cn'},
+                    {'host': '*.10jqka.com.cn'}
+                ]
+            },
+            'async_http': {
+                'enabled': False,          # 是否在信令服务的事件循环上启动异步HTTP服务
+                'port': 5001,              # 异步HTTP服务端口（与Flask服务并行，接口相同）
+                'backlog': 128             # 监听队列长度
             }
         }
         try:
@@ -70,3 +130,80 @@ class AppModel:
             self._config['window_monitor'] = {}
         self._config['window_monitor']['enabled'] = enabled
         self._save_config()
+
+    def get_key_pacing_config(self):
+        """获取按键节奏配置（客户端丢键时可适当调大间隔）"""
+        return self._config.get('key_pacing', {
+            'key_interval': 0.05,
+            'combo_interval': 0.1,
+            'pause': 0.5
+        })
+
+    def get_tracing_config(self):
+        """获取分阶段耗时追踪配置"""
+        return self._config.get('tracing', {
+            'enabled': True,
+            'sample_rate': 1.0,
+            'max_traces': 200,
+            'max_spans': 500
+        })
+
+    def get_snapshot_cache_config(self):
+        """获取持仓/资金快照缓存配置"""
+        return self._config.get('snapshot_cache', {
+            'max_age': 3
+        })
+
+    def get_captcha_config(self):
+        """获取验证码识别配置"""
+        return self._config.get('captcha', {
+            'templates_path': 'config/captcha_templates.npz',
+            'min_margin': 0.1,
+            'ocr_workers': 2,
+            'max_rounds': 3,
+            'max_candidates': 2
+        })
+
+    def get_http_server_config(self):
+        """获取HTTP服务器配置"""
+        return self._config.get('http_server', {
+            'mode': 'production',
+            'threads': 32,
+            'backlog': 128,
+            'idle_timeout': 5
+        })
+
+    def get_async_http_config(self):
+        """获取异步HTTP服务配置"""
+        return self._config.get('async_http', {
+            'enabled': False,
+            'port': 5001,
+            'backlog': 128
+        })
+
+    def get_proxy_cache_config(self):
+        """获取代理缓存策略配置"""
+        return self._config.get('proxy_cache', {
+            'default_ttl': 10,
+            'stale_ttl': 30,
+            'respect_cache_control': True,
+            'rules': [],
+            'disk_enabled': False,
+            'disk_max_mb': 256
+        })
+
+    def get_proxy_routes_config(self):
+        """获取代理允许的host及每个host的并发/超时/熔断配置"""
+        return self._config.get('proxy_routes', {
+            'allow_unlisted': False,
+            'default': {},
+            'routes': [{'host': '10jqka.com.cn'}, {'host': '*.10jqka.com.cn'}]
+        })
+
+    def get_proxy_upstream_config(self):
+        """获取代理上游连接配置"""
+        return self._config.get('proxy_upstream', {
+            'http2': False,
+            'prewarm_hosts': [],
+            'prewarm_connections': 4
+        })
@@ -0,0 +1,327 @@
+"""
+异步HTTP服务
+基于aiohttp.web，与WebRTC信令服务共用同一个asyncio事件循环，提供与Flask服务相同的
+/health、/position、/xiadan、/proxy 接口
+
+特性:
+1. 单线程事件循环 - 并发的代理请求只占用协程，不再每个请求占用一个系统线程
+2. GUI操作仍走下单执行器 - 通过asyncio.wrap_future等待票据，不阻塞事件循环
+3. 非阻塞代理 - 使用aiohttp客户端转发，与ProxyService共享缓存、请求合并和统计；
+   响应体按上游的压缩格式原样转发，大响应边收边发
+"""
+
+import asyncio
+import json
+import time
+from functools import partial
+
+import aiohttp
+from aiohttp import web
+
+from src.service.upstream_router import UpstreamRejected
+from src.util.logger import Logger
+from src.util.table_parser import typed_records
+from src.util.tracing import Tracer
+
+json_dumps = partial(json.dumps, ensure_ascii=False)
+
+
+def json_response(data, status=200):
+    """与Flask服务一致：JSON不转义中文"""
+    return web.json_response(data, status=status, dumps=json_dumps)
+
+
+class AsyncHttpApp:
+    """aiohttp.web 前端（需在事件循环中 start()/stop()）"""
+
+    def __init__(self, proxy_service, order_executor=None, order_placer=None, position_cache=None,
+                 on_orders_changed=None, host='0.0.0.0', port=5001, backlog=128, gui_task_timeout=60):
+        """
+        :param proxy_service: ProxyService，共享缓存、请求头过滤和统计
+        :param order_executor: OrderExecutor，下单等GUI操作提交到这里串行执行
+        :param order_placer: OrderPlacer
+        :param position_cache: 持仓SnapshotCache
+        :param on_orders_changed: 下单后回调（丢弃持仓/资金快照）
+        :param backlog: 监听队列长度
+        :param gui_task_timeout: GUI任务最长等待时间（秒），包括排队时间
+        """
+        self.proxy_service = proxy_service
+        self.order_executor = order_executor
+        self.order_placer = order_placer
+        self.position_cache = position_cache
+        self.on_orders_changed = on_orders_changed
+        self.host = host
+        self.port = port
+        self.backlog = backlog
+        self.gui_task_timeout = gui_task_timeout
+        self.logger = Logger.get_instance()
+
+        self.app = web.Application()
+        self.app.on_response_prepare.append(self._add_cors_header)
+        self.app.router.add_get('/health', self.health_check)
+        self.app.router.add_get('/position', self.get_position)
+        self.app.router.add_get('/xiadan', self.xiadan)
+        self.app.router.add_route('*', '/proxy/{url:.+}', self.proxy)
+        self.runner = None
+        self.client_session = None
+
+    @classmethod
+    def from_flask_app(cls, flask_app, host='0.0.0.0', port=5001, backlog=128):
+        """与FlaskApp共享下单执行器、快照缓存和代理服务"""
+        return cls(
+            flask_app.proxy_service,
+            order_executor=flask_app.order_executor,
+            order_placer=flask_app.order_placer,
+            position_cache=flask_app.position_cache,
+            on_orders_changed=flask_app.invalidate_snapshots,
+            host=host,
+            port=port,
+            backlog=backlog,
+            gui_task_timeout=flask_app.gui_task_timeout
+        )
+
+    async def start(self):
+        """在当前事件循环中开始监听"""
+        self.client_session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(limit=200, limit_per_host=100, ssl=False),
+            timeout=aiohttp.ClientTimeout(sock_connect=3, sock_read=10),
+            headers=dict(self.proxy_service.session.headers),
+            auto_decompress=False   # 与ProxyService一致：保留上游的压缩格式
+        )
+        self.runner = web.AppRunner(self.app, access_log=None)
+        await self.runner.setup()
+        site = web.TCPSite(self.runner, self.host, self.port, backlog=self.backlog)
+        await site.start()
+        # port=0时取实际端口
+        self.port = self.runner.addresses[0][1]
+        self.logger.add_log(f"异步HTTP服务已启动，监听地址：{self.host}:{self.port}")
+
+    async def stop(self):
+        """停止监听并关闭代理连接"""
+        if self.runner is not None:
+            await self.runner.cleanup()
+            self.runner = None
+        if self.client_session is not None:
+            await self.client_session.close()
+            self.client_session = None
+        self.logger.add_log("异步HTTP服务已停止")
+
+    @staticmethod
+    async def _add_cors_header(request, response):
+        """与Flask服务的CORS(默认允许所有来源)一致"""
+        response.headers.setdefault('Access-Control-Allow-Origin', '*')
+
+    async def run_gui_task(self, action, name, activate=False):
+        """
+        把GUI操作提交到下单执行器并等待结果（不阻塞事件循环）
+        :param action: 无参函数，在执行器工作线程中运行
+        """
+        # 根span包含排队时间，执行器工作线程中的span挂在它下面
+        with Tracer.get_instance().span(name, root=True, route=f"async:{name}"):
+            ticket = self.order_executor.submit(lambda backend: action(), name=name, activate=activate)
+            # 超时时wait_for取消包装的future，尚未开始执行的票据随之取消
+            return await asyncio.wait_for(asyncio.wrap_future(ticket.future), self.gui_task_timeout)
+
+    async def health_check(self, request):
+        return json_response({"status": "success", "timestamp": time.time()})
+
+    async def get_position(self, request):
+        try:
+            max_age = request.query.get('max_age')
+            max_age = float(max_age) if max_age is not None else None
+            if max_age is not None and max_age < 0:
+                raise ValueError("max_age不能为负数")
+        except ValueError:
+            return json_response({"status": "error", "message": "max_age参数必须为非负数字(秒)"}, 400)
+        try:
+            # 快照足够新直接返回；否则在线程中等待刷新（与Flask请求合并为同一次GUI刷新）
+            snapshot = self.position_cache.peek(max_age)
+            if snapshot is None:
+                loop = asyncio.get_running_loop()
+                snapshot = await loop.run_in_executor(None, self.position_cache.get, max_age)
+            data = typed_records(snapshot.data) if request.query.get('typed') == '1' else snapshot.data
+            return json_response({
+                "status": "success",
+                "data": data,
+                "cache_age": round(snapshot.age, 3)
+            })
+        except Exception as e:
+            self.logger.add_log(f"获取持仓失败: {str(e)}")
+            return json_response({"status": "error", "message": f"获取持仓失败: {str(e)}"}, 500)
+
+    async def xiadan(self, request):
+        code = request.query.get('code')
+        status = request.query.get('status')
+        amount = request.query.get('amount')
+        try:
+            if code is None:
+                return json_response({"status": "error", "message": "code不能为空"})
+            if status is None:
+                return json_response({"status": "error", "message": "status不能为空,1:闪电买入,2:闪电卖出"})
+            keyStr, _ = await self.run_gui_task(
+                lambda: self.order_placer.place(code, status, amount),
+                name='xiadan',
+                activate=True
+            )
+            if self.on_orders_changed:
+                self.on_orders_changed()
+            return json_response({"status": "success", "message": f"已发送按键 {keyStr}"})
+        except Exception as e:
+            self.logger.add_log(f"按键发送失败: {str(e)}")
+            return json_response({"status": "error", "message": f"下单异常: {str(e)}"})
+
+    async def proxy(self, request):
+        """代理接口 - 与Flask服务的 /proxy 行为一致（缓存、请求头过滤、错误码）"""
+        proxy_service = self.proxy_service
+        url = request.match_info['url']
+        proxy_service.record('total_requests')
+        try:
+            target_url = proxy_service.build_target_url(url, request.query_string.encode('utf-8'))
+            # 不在允许列表的host直接返回403
+            proxy_service.router.route_for(target_url)
+
+            # 过期的缓存先返回旧响应，由ProxyService的刷新线程向上游确认
+            headers = proxy_service.filter_request_headers(request.headers)
+            cached_response = proxy_service.serve_cached(request.method, target_url, headers, source='memory')
+            if cached_response is None and proxy_service.disk_cache is not None:
+                # 磁盘缓存是同步的SQLite查询，放到线程中执行，不阻塞事件循环
+                loop = asyncio.get_running_loop()
+                cached_response = await loop.run_in_executor(
+                    None, proxy_service.serve_cached, request.method, target_url, headers, 'disk'
+                )
+            if cached_response:
+                return web.Response(
+                    body=cached_response['content'],
+                    status=cached_response['status'],
+                    headers=cached_response['headers']
+                )
+
+            if request.method == 'GET':
+                # 与Flask服务的请求共用同一个合并表
+                key = proxy_service.cache_key('GET', target_url, headers)
+                future, leader = proxy_service.single_flight.acquire(key)
+                if leader:
+                    def on_stream():
+                        # 流式响应无法共享，开始流式转发前就让等待者各自转发
+                        proxy_service.single_flight.release(key, future, {'stream': None, 'upstream': None})
+                    try:
+                        data = await self._forward('GET', target_url, headers, request=request, on_stream=on_stream)
+                    except BaseException as e:
+                        if not future.done():
+                            proxy_service.single_flight.release(key, future, exception=e)
+                        raise
+                    if not future.done():
+                        proxy_service.single_flight.release(key, future, data)
+                else:
+                    # shield: 本请求被取消时不能取消其它请求共享的future
+                    data = await asyncio.shield(asyncio.wrap_future(future))
+                    if 'stream' in data:
+                        data = await self._forward('GET', target_url, headers, request=request)
+                    else:
+                        proxy_service.record('coalesced_requests')
+            else:
+                body = await request.read() if request.method in ['POST', 'PUT', 'PATCH'] else None
+                data = await self._forward(request.method, target_url, headers, body, request=request)
+
+            if 'response' in data:
+                return data['response']
+            return web.Response(body=data['content'], status=data['status'], headers=data['headers'])
+
+        except UpstreamRejected as e:
+            proxy_service.record('rejected_requests')
+            return json_response({"status": "error", "message": e.message}, e.status)
+        except asyncio.TimeoutError:
+            proxy_service.record('failed_requests')
+            self.logger.add_log(f"代理超时: {url}")
+            return json_response({"status": "error", "message": "请求超时"}, 504)
+        except aiohttp.ClientConnectionError as e:
+            proxy_service.record('failed_requests')
+            self.logger.add_log(f"代理连接失败: {url}, 错误: {str(e)}")
+            return json_response({"status": "error", "message": "连接失败,请检查网络"}, 502)
+        except aiohttp.ClientError as e:
+            proxy_service.record('failed_requests')
+            self.logger.add_log(f"代理失败: {url}, 错误: {str(e)}")
+            return json_response({"status": "error", "message": f"代理失败: {str(e)}"}, 502)
+        except Exception as e:
+            proxy_service.record('failed_requests')
+            self.logger.add_log(f"代理异常: {url}, 错误: {str(e)}")
+            return json_response({"status": "error", "message": f"代理异常: {str(e)}"}, 500)
+
+    async def _forward(self, method, target_url, headers, body=None, request=None, on_stream=None):
+        """
+        使用aiohttp客户端转发请求
+        响应体超过ProxyService.stream_threshold时直接流式写给request的客户端
+
+        Args:
+            request: 客户端请求，传入时大响应流式返回
+            on_stream: 开始流式转发前的回调
+
+        Returns:
+            dict: {'content', 'status', 'headers'}，流式转发时为 {'response': 已发送完的StreamResponse}
+        """
+        proxy_service = self.proxy_service
+        # 与Flask服务共用每个host的并发名额和熔断器;事件循环中不等待名额,已满直接返回503
+        route = proxy_service.router.route_for(target_url)
+        route.acquire(wait=False)
+        try:
+            return await self._forward_route(method, target_url, headers, body, request, on_stream, route)
+        finally:
+            route.release()
+
+    async def _forward_route(self, method, target_url, headers, body, request, on_stream, route):
+        """按host路由的超时转发,并把结果记入熔断器"""
+        proxy_service = self.proxy_service
+        timeout = aiohttp.ClientTimeout(sock_connect=route.timeout[0], sock_read=route.timeout[1])
+        try:
+            resp = await self.client_session.request(method, target_url, headers=headers, data=body, timeout=timeout)
+        except BaseException:
+            route.record(False)
+            raise
+        route.record(resp.status < 500)
+        async with resp:
+            if resp.status >= 400:
+                proxy_service.record('failed_requests')
+                self.logger.add_log(f"代理失败: {target_url} -> {resp.status}")
+
+            response_headers = proxy_service.filter_response_headers(resp.headers)
+            length = resp.content_length
+            buffered, size = [], 0
+            if request is None or length is None or length <= proxy_service.stream_threshold:
+                # 长度未知时先读一段，读完了就按小响应处理
+                while request is None or size <= proxy_service.stream_threshold:
+                    chunk = await resp.content.readany()
+                    if not chunk:
+                        content = b''.join(buffered)
+                        proxy_service.store(method, target_url, headers, resp.status, content, response_headers)
+                        return {
+                            'content': content,
+                            'status': resp.status,
+                            'headers': response_headers
+                        }
+                    buffered.append(chunk)
+                    size += len(chunk)
+
+            proxy_service.record('streamed_responses')
+            if on_stream:
+                on_stream()
+            response = web.StreamResponse(status=resp.status, headers=response_headers)
+            if length is not None:
+                response.content_length = length
+            await response.prepare(request)
+            for chunk in buffered:
+                await response.write(chunk)
+            # 完整读完且不超过cache_body_limit时写入缓存
+            tee = list(buffered)
+            async for chunk in resp.content.iter_chunked(proxy_service.STREAM_CHUNK_SIZE):
+                if tee is not None:
+                    size += len(chunk)
+                    if size <= proxy_service.cache_body_limit:
+                        tee.append(chunk)
+                    else:
+                        tee = None
+                await response.write(chunk)
+            await response.write_eof()
+
+        if tee is not None:
+            proxy_service.store(method, target_url, headers, resp.status, b''.join(tee), response_headers)
+        return {'response': response}
@@ -0,0 +1,121 @@
+"""
+代理缓存策略
+按 host/路径规则决定响应的新鲜期(ttl)和过期后仍可先返回旧响应的时间窗口(stale_ttl)，并遵循上游的Cache-Control
+
+规则示例(按顺序匹配,第一条命中的生效,未命中使用默认值):
+    {'host': 'basic.10jqka.com.cn', 'path': '/mapp/*', 'ttl': 30, 'stale_ttl': 120}
+    {'host': '*.10jqka.com.cn', 'ttl': 5}
+host/path 使用通配符(fnmatch)，不写表示匹配所有
+
+Cache-Control:
+1. no-store - 不缓存
+2. no-cache - 不缓存（每次都要向上游确认）
+3. s-maxage / max-age - 新鲜期不超过该值
+4. must-revalidate / proxy-revalidate - 过期后不返回旧响应
+5. stale-while-revalidate=N - 过期后N秒内可先返回旧响应
+"""
+
+from fnmatch import fnmatchcase
+from urllib.parse import urlsplit
+
+
+def parse_cache_control(value):
+    """
+    解析Cache-Control
+    :return: {指令(小写): 值或None}
+    """
+    directives = {}
+    for part in (value or '').split(','):
+        name, _, argument = part.strip().partition('=')
+        if name:
+            directives[name.lower()] = argument.strip().strip('"') or None
+    return directives
+
+
+def get_header(headers, name):
+    """不区分大小写地读取响应头"""
+    name = name.lower()
+    for key, value in headers.items():
+        if key.lower() == name:
+            return value
+    return None
+
+
+def _seconds(value):
+    try:
+        return max(0, int(value))
+    except (TypeError, ValueError):
+        return None
+
+
+class CachePolicy:
+    """按规则和Cache-Control计算缓存时间"""
+
+    def __init__(self, default_ttl=10, default_stale_ttl=30, rules=None, respect_cache_control=True):
+        """
+        :param default_ttl: 未命中规则时的新鲜期（秒）
+        :param default_stale_ttl: 未命中规则时，过期后仍可返回旧响应（同时后台刷新）的时间（秒）
+        :param rules: [{'host', 'path', 'ttl', 'stale_ttl'}]，按顺序匹配
+        :param respect_cache_control: 是否遵循上游的Cache-Control
+        """
+        self.default_ttl = default_ttl
+        self.default_stale_ttl = default_stale_ttl
+        self.rules = [dict(rule) for rule in (rules or [])]
+        self.respect_cache_control = respect_cache_control
+
+    @classmethod
+    def from_config(cls, config):
+        """根据 AppModel.get_proxy_cache_config() 创建"""
+        return cls(
+            default_ttl=config.get('default_ttl', 10),
+            default_stale_ttl=config.get('stale_ttl', 30),
+            rules=config.get('rules', []),
+            respect_cache_control=config.get('respect_cache_control', True)
+        )
+
+    def rule_for(self, target_url):
+        """
+        按规则取URL的缓存时间
+        :return: (ttl, stale_ttl)
+        """
+        parts = urlsplit(target_url)
+        host = (parts.hostname or '').lower()
+        path = parts.path or '/'
+        for rule in self.rules:
+            if fnmatchcase(host, rule.get('host', '*').lower()) and fnmatchcase(path, rule.get('path', '*')):
+                return rule.get('ttl', self.default_ttl), rule.get('stale_ttl', self.default_stale_ttl)
+        return self.default_ttl, self.default_stale_ttl
+
+    def lifetime(self, target_url, headers):
+        """
+        计算响应的缓存时间
+        :param headers: 上游响应头
+        :return: (ttl, stale_ttl)，两者都为0表示不缓存
+        """
+        ttl, stale_ttl = self.rule_for(target_url)
+        if not self.respect_cache_control:
+            return ttl, stale_ttl
+
+        directives = parse_cache_control(get_header(headers, 'Cache-Control'))
+        if 'no-store' in directives or 'no-cache' in directives:
+            return 0, 0
+        max_age = _seconds(directives.get('s-maxage', directives.get('max-age')))
+        if max_age is not None:
+            ttl = min(ttl, max_age)
+        if 'must-revalidate' in directives or 'proxy-revalidate' in directives:
+            stale_ttl = 0
+        elif 'stale-while-revalidate' in directives:
+            stale = _seconds(directives['stale-while-revalidate'])
+            if stale is not None:
+                stale_ttl = stale
+        return ttl, stale_ttl
+
+
+def etag_matches(if_none_match, etag):
+    """客户端的If-None-Match是否与缓存的ETag一致(弱比较)"""
+    if not if_none_match or not etag:
+        return False
+    if if_none_match.strip() == '*':
+        return True
+    normalize = lambda tag: tag.strip()[2:] if tag.strip().startswith('W/') else tag.strip()
+    return normalize(etag) in {normalize(tag) for tag in if_none_match.split(',')}
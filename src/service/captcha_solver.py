@@ -0,0 +1,519 @@
+"""
+验证码识别
+内存中完成 预处理 -> 感知哈希查缓存 -> 模板匹配 -> OCR识别，不再保存到磁盘再读回
+
+特性:
+1. 预处理 - 灰度、自动对比度、Otsu二值化、裁剪到文字区域并放大，提升识别率
+2. OCR引擎 - 安装了tesserocr时使用常驻OCR工作进程，通过管道发送PNG字节，识别不再启动tesseract；
+   未安装时在调用线程中直接通过tesseract的stdin/stdout识别（每次都要启动tesseract，再经工作进程转发只会多一次往返），
+   两种方式都不读写临时文件
+3. 感知哈希缓存 - 对预处理后的图片计算dHash，验证通过的识别结果会被记住，再次遇到相同验证码直接返回
+4. 模板匹配 - 加载了数字模板时先用DigitRecognizer识别（几毫秒），置信度不足才交给Tesseract
+5. 多候选 - 用几种预处理参数在线程池中并行识别，按 投票数 -> 来源 -> 预处理参数顺序 -> 置信度 排序，供调用方依次尝试
+"""
+
+import io
+import multiprocessing
+import os
+import queue
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, replace
+
+from PIL import Image, ImageFilter, ImageOps
+
+from src.service import ocr_worker
+from src.service.digit_recognizer import DigitRecognizer
+from src.util.logger import Logger
+from src.util.tracing import Tracer, traced
+
+
+@dataclass(frozen=True)
+class CaptchaResult:
+    """一次验证码识别结果"""
+    text: str
+    confidence: float   # OCR为0~1；模板匹配为匹配余量；缓存命中为1
+    image_hash: int     # 预处理后图片的感知哈希
+    source: str         # 'cache'、'template' 或 'ocr'
+    elapsed_ms: float
+    variant: str = 'otsu'   # 使用的预处理参数（DECODE_VARIANTS中的名称）
+    votes: int = 1          # 得到相同文本的预处理参数个数
+
+
+# 候选识别使用的预处理参数: (名称, preprocess_captcha参数)
+DECODE_VARIANTS = (
+    ('otsu', {}),                       # 自动阈值
+    ('dark', {'threshold': 100}),       # 低阈值，去掉浅色干扰线和噪点
+    ('denoise', {'denoise': True}),     # 中值滤波
+)
+# 来源优先级：缓存 > 模板匹配(已达到余量阈值) > OCR
+SOURCE_PRIORITY = {'cache': 2, 'template': 1, 'ocr': 0}
+
+
+def otsu_threshold(histogram):
+    """
+    根据灰度直方图计算Otsu阈值
+    :param histogram: 256级灰度直方图（Image.histogram()）
+    """
+    total = sum(histogram)
+    if total == 0:
+        return 128
+    sum_all = sum(i * count for i, count in enumerate(histogram))
+    sum_background, weight_background = 0, 0
+    best_threshold, best_variance = 128, -1.0
+    for i, count in enumerate(histogram):
+        weight_background += count
+        if weight_background == 0:
+            continue
+        weight_foreground = total - weight_background
+        if weight_foreground == 0:
+            break
+        sum_background += i * count
+        mean_background = sum_background / weight_background
+        mean_foreground = (sum_all - sum_background) / weight_foreground
+        variance = weight_background * weight_foreground * (mean_background - mean_foreground) ** 2
+        if variance > best_variance:
+            best_variance, best_threshold = variance, i
+    return best_threshold + 1
+
+
+def preprocess_captcha(image, threshold=None, denoise=False, padding=2, scale=2):
+    """
+    验证码预处理：灰度 -> 自动对比度 -> 二值化(黑字白底) -> [中值滤波] -> 裁剪到文字区域 -> 放大
+    :param image: PIL图片
+    :param threshold: 二值化阈值，不传使用Otsu自动计算
+    :param denoise: 是否中值滤波（去掉孤立噪点和干扰线，但也会侵蚀细笔画，默认关闭）
+    :param padding: 裁剪后保留的边距(像素)
+    :param scale: 放大倍数，tesseract对过小的字符识别率低
+    :return: 'L'模式的PIL图片
+    """
+    gray = ImageOps.autocontrast(image.convert('L'))
+    if threshold is None:
+        threshold = otsu_threshold(gray.histogram())
+    binary = gray.point(lambda p: 0 if p < threshold else 255)
+
+    # 统一为黑字白底：深色像素占多数说明是白字黑底
+    histogram = binary.histogram()
+    if histogram[0] > histogram[255]:
+        binary = ImageOps.invert(binary)
+    if denoise:
+        binary = binary.filter(ImageFilter.MedianFilter(3))
+
+    bbox = ImageOps.invert(binary).getbbox()
+    if bbox:
+        left, top, right, bottom = bbox
+        binary = binary.crop((
+            max(left - padding, 0),
+            max(top - padding, 0),
+            min(right + padding, binary.width),
+            min(bottom + padding, binary.height)
+        ))
+
+    if scale > 1:
+        binary = binary.resize((binary.width * scale, binary.height * scale), Image.NEAREST)
+    return binary
+
+
+def image_hash(image, size=8):
+    """
+    计算差值感知哈希(dHash)
+    :param image: PIL图片（通常为预处理后的图片）
+    :return: size*size 位整数
+    """
+    small = image.convert('L').resize((size + 1, size), Image.BILINEAR)
+    pixels = list(small.getdata())
+    value = 0
+    for row in range(size):
+        offset = row * (size + 1)
+        for col in range(size):
+            value = (value << 1) | (pixels[offset + col] > pixels[offset + col + 1])
+    return value
+
+
+def captcha_fingerprint(image):
+    """验证码图片的感知哈希（与缓存使用的哈希一致），用于判断验证码是否已更换"""
+    return image_hash(preprocess_captcha(image))
+
+
+def hamming_distance(a, b):
+    """两个哈希值的汉明距离"""
+    return bin(a ^ b).count('1')
+
+
+def to_png_bytes(image):
+    """图片编码为PNG字节"""
+    buffer = io.BytesIO()
+    image.save(buffer, format='PNG')
+    return buffer.getvalue()
+
+
+class CliOcrEngine:
+    """在当前进程中调用tesseract命令行识别（未安装tesserocr时使用，接口与OcrWorker一致）"""
+
+    def __init__(self, tesseract_cmd, timeout=10):
+        """
+        :param tesseract_cmd: tesseract可执行文件路径
+        :param timeout: 单次识别超时时间(秒)
+        """
+        self.tesseract_cmd = tesseract_cmd
+        self.timeout = timeout
+        self.restarts = 0
+
+    def start(self):
+        """无需启动"""
+
+    def recognize(self, png_bytes):
+        """
+        识别图片
+        :param png_bytes: PNG图片字节
+        :return: (文本, 置信度0~1)
+        """
+        return ocr_worker.recognize_with_cli(self.tesseract_cmd, png_bytes, timeout=self.timeout)
+
+    def close(self):
+        """无需关闭"""
+
+
+def create_ocr_engine(tesseract_cmd, timeout=10):
+    """创建OCR引擎：安装了tesserocr时使用常驻工作进程，否则在当前进程中调用tesseract命令行"""
+    if ocr_worker.tesserocr_available():
+        return OcrWorker(tesseract_cmd, timeout)
+    return CliOcrEngine(tesseract_cmd, timeout)
+
+
+class OcrWorker:
+    """常驻OCR工作进程的客户端（线程安全，请求串行执行）"""
+
+    def __init__(self, tesseract_cmd, timeout=10):
+        """
+        :param tesseract_cmd: tesseract可执行文件路径
+        :param timeout: 单次识别超时时间(秒)，超时后重启工作进程
+        """
+        self.tesseract_cmd = tesseract_cmd
+        self.timeout = timeout
+        self.restarts = 0
+        self._process = None
+        self._conn = None
+        self._lock = threading.Lock()
+
+    def start(self):
+        """启动工作进程（已启动时直接返回）"""
+        with self._lock:
+            self._ensure_started()
+
+    def _ensure_started(self):
+        if self._process is not None and self._process.is_alive():
+            return
+        self._terminate()
+        # spawn与Windows下的行为一致，也避免fork持有主进程的GUI句柄和锁
+        context = multiprocessing.get_context('spawn')
+        parent_conn, child_conn = context.Pipe()
+        process = context.Process(
+            target=ocr_worker.worker_main,
+            args=(child_conn, self.tesseract_cmd),
+            name='OcrWorker',
+            daemon=True
+        )
+        process.start()
+        child_conn.close()
+        self._process, self._conn = process, parent_conn
+
+    def recognize(self, png_bytes):
+        """
+        识别图片
+        :param png_bytes: PNG图片字节
+        :return: (文本, 置信度0~1)
+        """
+        with self._lock:
+            self._ensure_started()
+            try:
+                self._conn.send_bytes(png_bytes)
+                if not self._conn.poll(self.timeout):
+                    raise TimeoutError(f"OCR识别超时({self.timeout}秒)")
+                text, confidence, error = self._conn.recv()
+            except (TimeoutError, EOFError, OSError):
+                # 工作进程卡死或已退出，下次调用时重新启动
+                self._terminate()
+                self.restarts += 1
+                raise
+        if error:
+            raise Exception(f"OCR识别失败: {error}")
+        return text, confidence
+
+    def _terminate(self):
+        """结束工作进程（调用方需持有锁）"""
+        if self._conn is not None:
+            try:
+                self._conn.send_bytes(b'')
+            except Exception:
+                pass
+            self._conn.close()
+        if self._process is not None:
+            self._process.join(timeout=1)
+            if self._process.is_alive():
+                self._process.terminate()
+        self._process, self._conn = None, None
+
+    def close(self):
+        """关闭工作进程"""
+        with self._lock:
+            self._terminate()
+
+
+class CaptchaSolver:
+    """验证码识别器（线程安全）"""
+
+    _instance = None
+    _instance_lock = threading.Lock()
+
+    @classmethod
+    def get_instance(cls, tesseract_cmd, templates_path=None, min_margin=0.1, ocr_workers=2):
+        """
+        获取共享实例（所有PositionService共用OCR引擎）
+        :param templates_path: 数字模板文件，存在时启用模板匹配
+        :param min_margin: 模板匹配结果的最低匹配余量
+        :param ocr_workers: OCR引擎数量（多候选识别时并行使用）
+        """
+        with cls._instance_lock:
+            if cls._instance is None:
+                recognizer = None
+                if templates_path and os.path.exists(templates_path):
+                    try:
+                        recognizer = DigitRecognizer.load(templates_path)
+                    except Exception as e:
+                        Logger.get_instance().add_log(f"加载验证码模板失败: {str(e)}")
+                cls._instance = cls(tesseract_cmd, recognizer=recognizer, min_margin=min_margin,
+                                    ocr_workers=ocr_workers)
+            return cls._instance
+
+    def __init__(self, tesseract_cmd, cache_size=256, max_distance=0, worker=None,
+                 recognizer=None, min_margin=0.1, ocr_workers=1):
+        """
+        :param tesseract_cmd: tesseract可执行文件路径
+        :param cache_size: 最多记住的验证码数量
+        :param max_distance: 感知哈希允许的最大汉明距离，0表示哈希完全一致才算同一张验证码
+        :param worker: OCR引擎（OcrWorker或CliOcrEngine），传入时只使用这一个
+        :param recognizer: DigitRecognizer，不传则只使用Tesseract
+        :param min_margin: 模板匹配余量(最佳与次佳数字的相关系数差)低于该值时回退到Tesseract
+        :param ocr_workers: 不传worker时创建的OCR引擎数量（同时识别的候选数上限）
+        """
+        self.workers = [worker] if worker else [create_ocr_engine(tesseract_cmd) for _ in range(max(1, ocr_workers))]
+        self._idle_workers = queue.Queue()
+        for item in self.workers:
+            self._idle_workers.put(item)
+        self.recognizer = recognizer
+        self.min_margin = min_margin
+        self.cache_size = cache_size
+        self.max_distance = max_distance
+        self.logger = Logger.get_instance()
+        self._cache = OrderedDict()     # 感知哈希 -> 验证通过的文本
+        self._pool = None               # 多候选识别线程池（首次使用时创建）
+        self._lock = threading.Lock()
+        self.stats = {
+            'solves': 0,
+            'cache_hits': 0,
+            'template_hits': 0,
+            'ocr_calls': 0,
+            'ocr_errors': 0,
+            'remembered': 0,
+            'forgotten': 0,
+            'total_ms': 0.0,
+            'sessions': 0,      # 验证码会话（一次弹窗到通过或放弃）
+            'successes': 0,
+            'failures': 0,
+            'attempts': 0       # 提交验证码的总次数
+        }
+
+    @property
+    def worker(self):
+        """第一个OCR引擎"""
+        return self.workers[0]
+
+    def warmup(self):
+        """启动OCR引擎并各识别一张空白图片，使首个验证码不用承担启动开销"""
+        blank = to_png_bytes(Image.new('L', (10, 10), color=255))
+        for item in self.workers:
+            item.start()
+            item.recognize(blank)
+
+    def solve(self, image):
+        """
+        识别验证码（单一预处理参数）
+        :param image: 验证码PIL图片（例如控件的capture_as_image()）
+        :return: CaptchaResult，识别失败时text为空字符串
+        """
+        start = time.perf_counter()
+        processed = preprocess_captcha(image)
+        hash_value = image_hash(processed)  # 与 captcha_fingerprint(image) 相同
+
+        text = self._lookup(hash_value)
+        if text is not None:
+            result = CaptchaResult(text, 1.0, hash_value, 'cache', 0.0)
+        else:
+            result = self._decode(processed, hash_value, DECODE_VARIANTS[0][0])
+        return self._finish(result, start)
+
+    @traced()
+    def candidates(self, image, variants=DECODE_VARIANTS):
+        """
+        用多种预处理参数并行识别，返回去重后的候选列表
+        :param image: 验证码PIL图片
+        :param variants: [(名称, preprocess_captcha参数), ...]
+        :return: CaptchaResult列表，最可信的在前；全部识别失败时为空列表
+        """
+        start = time.perf_counter()
+        base = preprocess_captcha(image, **variants[0][1])
+        hash_value = image_hash(base)
+
+        text = self._lookup(hash_value)
+        if text is not None:
+            Tracer.get_instance().current().set('source', 'cache')
+            return [self._finish(CaptchaResult(text, 1.0, hash_value, 'cache', 0.0), start)]
+
+        futures = [self._get_pool().submit(self._decode, base, hash_value, variants[0][0])]
+        for name, params in variants[1:]:
+            futures.append(self._get_pool().submit(
+                lambda params=params, name=name: self._decode(preprocess_captcha(image, **params), hash_value, name)
+            ))
+
+        length = self.recognizer.length if self.recognizer is not None else None
+        grouped = {}
+        for future in futures:
+            result = future.result()
+            if not result.text or (length and len(result.text) != length):
+                continue
+            best = grouped.get(result.text)
+            if best is None:
+                grouped[result.text] = result
+            else:
+                # 同一文本保留来源/置信度更好的一个，票数累加
+                keep = result if self._rank(result)[1:] > self._rank(best)[1:] else best
+                grouped[result.text] = replace(keep, votes=best.votes + result.votes)
+
+        ranked = sorted(grouped.values(), key=self._rank, reverse=True)
+        Tracer.get_instance().current().set('candidates', len(ranked))
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        with self._lock:
+            self.stats['solves'] += 1
+            self.stats['total_ms'] += elapsed_ms
+        return [replace(result, elapsed_ms=elapsed_ms) for result in ranked]
+
+    @staticmethod
+    def _rank(result):
+        # 票数相同时，主预处理参数(靠前)的结果优先，其次按置信度
+        order = next((i for i, (name, _) in enumerate(DECODE_VARIANTS) if name == result.variant), len(DECODE_VARIANTS))
+        return result.votes, SOURCE_PRIORITY[result.source], -order, result.confidence
+
+    def _get_pool(self):
+        with self._lock:
+            if self._pool is None:
+                self._pool = ThreadPoolExecutor(max_workers=len(DECODE_VARIANTS), thread_name_prefix='CaptchaDecode')
+            return self._pool
+
+    def _decode(self, processed, hash_value, variant):
+        """识别一张预处理后的图片：模板匹配置信度足够时直接采用，否则交给OCR引擎"""
+        if self.recognizer is not None:
+            try:
+                text, confidence = self.recognizer.recognize(processed)
+            except Exception as e:
+                text, confidence = '', 0.0
+                self.logger.add_log(f"模板匹配识别失败: {str(e)}")
+            if text and confidence >= self.min_margin:
+                with self._lock:
+                    self.stats['template_hits'] += 1
+                return CaptchaResult(text, confidence, hash_value, 'template', 0.0, variant)
+
+        text, confidence = '', 0.0
+        with self._lock:
+            self.stats['ocr_calls'] += 1
+        worker = self._idle_workers.get()
+        try:
+            raw_text, confidence = worker.recognize(to_png_bytes(processed))
+            text = ''.join(filter(str.isdigit, raw_text))
+        except Exception as e:
+            with self._lock:
+                self.stats['ocr_errors'] += 1
+            self.logger.add_log(f"OCR 识别失败: {str(e)}")
+        finally:
+            self._idle_workers.put(worker)
+        return CaptchaResult(text, confidence, hash_value, 'ocr', 0.0, variant)
+
+    def _finish(self, result, start):
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        with self._lock:
+            self.stats['solves'] += 1
+            self.stats['total_ms'] += elapsed_ms
+            if result.source == 'cache':
+                self.stats['cache_hits'] += 1
+        return replace(result, elapsed_ms=elapsed_ms)
+
+    def _lookup(self, hash_value):
+        """按感知哈希查找已验证的结果"""
+        with self._lock:
+            text = self._cache.get(hash_value)
+            if text is not None:
+                self._cache.move_to_end(hash_value)
+                return text
+            if self.max_distance > 0:
+                for key, value in self._cache.items():
+                    if hamming_distance(key, hash_value) <= self.max_distance:
+                        self._cache.move_to_end(key)
+                        return value
+        return None
+
+    def remember(self, result):
+        """验证码验证通过后记住识别结果"""
+        if not result.text:
+            return
+        with self._lock:
+            self._cache[result.image_hash] = result.text
+            self._cache.move_to_end(result.image_hash)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+            self.stats['remembered'] += 1
+
+    def forget(self, result):
+        """验证码验证失败后丢弃结果（缓存命中却验证失败时也要移除）"""
+        with self._lock:
+            if self._cache.pop(result.image_hash, None) is not None:
+                self.stats['forgotten'] += 1
+
+    def record_session(self, success, attempts):
+        """
+        记录一次验证码会话的结果
+        :param success: 是否最终通过
+        :param attempts: 本次会话提交验证码的次数
+        """
+        with self._lock:
+            self.stats['sessions'] += 1
+            self.stats['successes' if success else 'failures'] += 1
+            self.stats['attempts'] += attempts
+
+    def get_stats(self):
+        """获取识别统计"""
+        with self._lock:
+            stats = self.stats.copy()
+            stats['cache_size'] = len(self._cache)
+        stats['ocr_workers'] = len(self.workers)
+        stats['ocr_engine'] = 'tesserocr' if isinstance(self.workers[0], OcrWorker) else 'cli'
+        stats['worker_restarts'] = sum(item.restarts for item in self.workers)
+        stats['templates_loaded'] = self.recognizer is not None
+        stats['avg_ms'] = round(stats['total_ms'] / stats['solves'], 2) if stats['solves'] else 0
+        stats['total_ms'] = round(stats['total_ms'], 2)
+        stats['attempts_per_success'] = round(stats['attempts'] / stats['successes'], 2) if stats['successes'] else None
+        if stats['solves'] > 0:
+            stats['hit_rate'] = f"{stats['cache_hits'] / stats['solves'] * 100:.2f}%"
+        else:
+            stats['hit_rate'] = "0%"
+        return stats
+
+    def close(self):
+        """关闭OCR引擎和识别线程池"""
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=True)
+        for item in self.workers:
+            item.close()
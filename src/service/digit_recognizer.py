@@ -0,0 +1,197 @@
+"""
+数字模板匹配识别器
+验证码只有几位数字，按列投影切分字符后与训练得到的字形模板做相关匹配，几毫秒内完成识别；
+置信度不足时由调用方回退到Tesseract
+
+输入为预处理后的黑字白底图片（captcha_solver.preprocess_captcha 的输出）
+模板由 `poetry run train_captcha <样本目录>` 从已标注的验证码训练得到
+"""
+
+from collections import Counter
+
+import numpy as np
+from PIL import Image
+
+# 字符归一化后的尺寸(高, 宽)
+GLYPH_SHAPE = (16, 12)
+DIGITS = '0123456789'
+
+
+def to_mask(image):
+    """黑字白底图片 -> 布尔数组，True表示字符像素"""
+    return np.asarray(image.convert('L')) < 128
+
+
+def segment_glyphs(mask, expected_length=None, min_mass_ratio=0.15, noise_ratio=0.06):
+    """
+    按列投影切分字符
+    :param mask: 布尔数组，True为字符像素
+    :param expected_length: 期望的字符数，不为None时拆分粘连字符、丢弃多余的噪声块
+    :param min_mass_ratio: 像素数小于最大字符块该比例的块视为噪声
+    :param noise_ratio: 字符像素数不超过图片高度该比例的列视为空白（干扰线穿过的列）
+    :return: [(起始列, 结束列), ...]（结束列不包含）
+    """
+    projection = mask.sum(axis=0)
+    filled = projection > mask.shape[0] * noise_ratio
+    segments = []
+    start = None
+    for col, value in enumerate(filled):
+        if value and start is None:
+            start = col
+        elif not value and start is not None:
+            segments.append((start, col))
+            start = None
+    if start is not None:
+        segments.append((start, len(filled)))
+    if not segments:
+        return []
+
+    masses = [int(projection[s:e].sum()) for s, e in segments]
+    largest = max(masses)
+    segments = [seg for seg, mass in zip(segments, masses) if mass >= largest * min_mass_ratio]
+
+    if expected_length:
+        # 字符粘连：在最宽块的中部、投影最小处拆开
+        while 0 < len(segments) < expected_length:
+            index = max(range(len(segments)), key=lambda i: segments[i][1] - segments[i][0])
+            s, e = segments[index]
+            if e - s < 4:
+                break
+            quarter = (e - s) // 4
+            cut = s + quarter + int(np.argmin(projection[s + quarter:e - quarter]))
+            segments[index:index + 1] = [(s, cut), (cut, e)]
+        # 多出的块：依次丢弃像素最少的
+        while len(segments) > expected_length:
+            index = min(range(len(segments)), key=lambda i: projection[segments[i][0]:segments[i][1]].sum())
+            del segments[index]
+    return segments
+
+
+def _longest_run(flags):
+    """最长的连续True区间，返回切片（数字字形在竖直方向是连通的，上下分离的噪点、干扰线被裁掉）"""
+    best, start = slice(0, 0), None
+    for i, value in enumerate(list(flags) + [False]):
+        if value and start is None:
+            start = i
+        elif not value and start is not None:
+            if i - start > best.stop - best.start:
+                best = slice(start, i)
+            start = None
+    return best
+
+
+def normalize_glyph(glyph):
+    """
+    字符归一化：裁掉上下空白和分离的噪点，按高度等比缩放后居中放入 GLYPH_SHAPE，再做零均值、单位范数
+    :param glyph: 单个字符的布尔数组
+    :return: 一维float32向量
+    """
+    glyph = glyph[_longest_run(glyph.any(axis=1))]
+    if not glyph.size:
+        return np.zeros(GLYPH_SHAPE[0] * GLYPH_SHAPE[1], dtype=np.float32)
+    height, width = GLYPH_SHAPE
+    target_width = min(width, max(1, round(glyph.shape[1] * height / glyph.shape[0])))
+    scaled = Image.fromarray(glyph.astype(np.uint8) * 255).resize((target_width, height), Image.BILINEAR)
+
+    canvas = np.zeros(GLYPH_SHAPE, dtype=np.float32)
+    offset = (width - target_width) // 2
+    canvas[:, offset:offset + target_width] = np.asarray(scaled, dtype=np.float32) / 255.0
+
+    vector = canvas.ravel()
+    vector -= vector.mean()
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm > 0 else vector
+
+
+class DigitRecognizer:
+    """
+    数字模板匹配识别器
+    每个数字保留若干个训练样本字形作为模板（同一数字的字形受二值化影响差异较大，
+    多模板最近邻比单个平均模板准确得多）
+    """
+
+    def __init__(self, templates, labels, length=None):
+        """
+        :param templates: (N, 16*12) 数组，每行一个归一化模板，按数字升序排列
+        :param labels: (N,) 数组，每个模板对应的数字(0~9)，每个数字至少一个模板
+        :param length: 验证码的字符数，None表示不限定
+        """
+        self.templates = np.asarray(templates, dtype=np.float32)
+        self.labels = np.asarray(labels, dtype=np.int8)
+        # 每个数字第一个模板的位置，用于按数字分组取最大相关系数
+        self.offsets = np.searchsorted(self.labels, np.arange(len(DIGITS)))
+        self.length = length
+
+    def recognize(self, image):
+        """
+        识别预处理后的验证码图片
+        :return: (文本, 置信度)，置信度为各字符 最佳数字与次佳数字相关系数之差 的最小值(0~2)，
+                 差值越大越不容易认错
+        """
+        mask = to_mask(image)
+        segments = segment_glyphs(mask, self.length)
+        if not segments or (self.length and len(segments) != self.length):
+            return '', 0.0
+
+        vectors = np.stack([normalize_glyph(mask[:, s:e]) for s, e in segments])
+        scores = np.maximum.reduceat(vectors @ self.templates.T, self.offsets, axis=1)
+        ranked = np.sort(scores, axis=1)
+        text = ''.join(DIGITS[i] for i in scores.argmax(axis=1))
+        confidence = float((ranked[:, -1] - ranked[:, -2]).min())
+        return text, confidence
+
+    @classmethod
+    def train(cls, samples, max_templates=200):
+        """
+        从已标注样本训练模板
+        :param samples: [(预处理后的图片, 文本), ...]
+        :param max_templates: 每个数字最多保留的模板数
+        :return: (DigitRecognizer, 训练报告dict)
+        """
+        samples = list(samples)
+        length = Counter(len(label) for _, label in samples).most_common(1)[0][0] if samples else None
+        vectors = {digit: [] for digit in DIGITS}
+        skipped = 0
+        for image, label in samples:
+            mask = to_mask(image)
+            segments = segment_glyphs(mask, len(label))
+            if len(segments) != len(label) or not label.isdigit():
+                skipped += 1
+                continue
+            for (s, e), digit in zip(segments, label):
+                vectors[digit].append(normalize_glyph(mask[:, s:e]))
+
+        missing = [digit for digit, items in vectors.items() if not items]
+        if missing:
+            raise Exception(f"训练样本中缺少数字: {''.join(missing)}")
+
+        templates, labels = [], []
+        for index, digit in enumerate(DIGITS):
+            items = vectors[digit]
+            # 样本过多时等间隔抽取
+            step = max(1, len(items) / max_templates)
+            chosen = [items[int(i * step)] for i in range(min(len(items), max_templates))]
+            templates.extend(chosen)
+            labels.extend([index] * len(chosen))
+        report = {
+            'samples': len(samples),
+            'skipped': skipped,
+            'length': length,
+            'glyphs': {digit: len(items) for digit, items in vectors.items()},
+            'templates': len(templates)
+        }
+        return cls(np.stack(templates), labels, length), report
+
+    def save(self, path):
+        """保存模板到.npz文件"""
+        np.savez(path, templates=self.templates, labels=self.labels, length=self.length or 0)
+
+    @classmethod
+    def load(cls, path):
+        """从.npz文件加载模板"""
+        with np.load(path) as data:
+            templates, labels = data['templates'], data['labels']
+            if templates.ndim != 2 or templates.shape[1] != GLYPH_SHAPE[0] * GLYPH_SHAPE[1] \
+                    or len(labels) != len(templates) or set(labels.tolist()) != set(range(len(DIGITS))):
+                raise Exception(f"模板文件格式不正确: {path}")
+            return cls(templates, labels, int(data['length']) or None)
@@ -0,0 +1,242 @@
+"""
+磁盘响应缓存
+代理缓存的第二层（SQLite），位于内存缓存之下，程序重启后仍可命中
+
+特性:
+1. 持久化 - 响应体、响应头、新鲜期和过期时间写入SQLite，时间使用墙上时钟，重启后继续有效
+2. 后台写入 - 写入请求放入队列，由写线程批量提交，调用方不等待磁盘IO；队列满时丢弃写入
+3. 大小上限 - 每批提交后删除已过期的条目，总大小仍超过上限时从最早写入的条目开始删除
+4. WAL模式 - 读取与后台写入互不阻塞
+5. 文件损坏时删除重建
+"""
+
+import json
+import os
+import queue
+import sqlite3
+import threading
+import time
+
+from src.util.logger import Logger
+
+
+class DiskCache:
+    """SQLite磁盘缓存（线程安全，写入异步）"""
+
+    SCHEMA_VERSION = 1
+
+    def __init__(self, path, max_bytes=256 * 1024 * 1024, queue_size=1000, batch_size=100):
+        """
+        :param path: SQLite文件路径（目录不存在时自动创建）
+        :param max_bytes: 所有条目的总大小上限（字节）
+        :param queue_size: 待写入队列长度，写线程跟不上时丢弃新的写入
+        :param batch_size: 每个事务最多提交的写入数
+        """
+        self.logger = Logger.get_instance()
+        self.path = path
+        self.max_bytes = max_bytes
+        self.batch_size = batch_size
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._read_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self.stats = {
+            'hits': 0,
+            'misses': 0,
+            'writes': 0,
+            'dropped_writes': 0,
+            'evictions': 0,
+            'expirations': 0
+        }
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        try:
+            self._reader = self._open()
+        except sqlite3.DatabaseError as e:
+            self.logger.add_log(f"磁盘缓存文件损坏，重建: {path}, 错误: {str(e)}")
+            self._remove_files()
+            self._reader = self._open()
+
+        self._writer = threading.Thread(target=self._write_loop, daemon=True, name="DiskCache-Writer")
+        self._writer.start()
+
+    def get(self, key):
+        """
+        读取条目
+        :return: {'content', 'status', 'headers', 'etag', 'last_modified', 'fresh_until', 'expires_at'}
+                 (fresh_until/expires_at 为墙上时钟)，不存在或已过期返回None
+        """
+        with self._read_lock:
+            row = self._reader.execute(
+                "SELECT status, headers, content, etag, last_modified, fresh_until, expires_at "
+                "FROM entries WHERE key = ?", (key,)
+            ).fetchone()
+        if row is None or row[6] <= time.time():
+            self._record('misses')
+            return None
+        self._record('hits')
+        return {
+            'status': row[0],
+            'headers': json.loads(row[1]),
+            'content': row[2],
+            'etag': row[3],
+            'last_modified': row[4],
+            'fresh_until': row[5],
+            'expires_at': row[6]
+        }
+
+    def put(self, key, entry, ttl):
+        """
+        异步写入条目
+        :param entry: {'content', 'status', 'headers', 'etag', 'last_modified', 'fresh_until'}，fresh_until为墙上时钟
+        :param ttl: 条目保留时间（秒）
+        :return: 是否放入写入队列
+        """
+        now = time.time()
+        row = (key, entry['status'], json.dumps(entry['headers'], ensure_ascii=False), entry['content'],
+               entry['etag'], entry['last_modified'], entry['fresh_until'], now + ttl, now,
+               len(entry['content']) + len(key))
+        return self._enqueue(('put', row))
+
+    def delete(self, key):
+        """异步删除条目"""
+        return self._enqueue(('delete', key))
+
+    def clear(self):
+        """异步清空缓存"""
+        return self._enqueue(('clear',))
+
+    def flush(self, timeout=5):
+        """等待已排队的写入全部提交"""
+        done = threading.Event()
+        try:
+            self._queue.put(('flush', done), timeout=timeout)
+        except queue.Full:
+            return False
+        return done.wait(timeout)
+
+    def close(self, timeout=5):
+        """提交剩余写入后停止写线程并关闭数据库"""
+        if self._writer is None:
+            return
+        try:
+            self._queue.put(None, timeout=timeout)
+        except queue.Full:
+            pass
+        self._writer.join(timeout=timeout)
+        self._writer = None
+        with self._read_lock:
+            self._reader.close()
+
+    def get_stats(self):
+        """获取磁盘缓存统计"""
+        with self._read_lock:
+            entries, size = self._reader.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries").fetchone()
+        with self._stats_lock:
+            stats = self.stats.copy()
+        stats['entries'] = entries
+        stats['bytes'] = size
+        stats['max_bytes'] = self.max_bytes
+        stats['pending_writes'] = self._queue.qsize()
+        lookups = stats['hits'] + stats['misses']
+        if lookups > 0:
+            stats['hit_rate'] = f"{stats['hits'] / lookups * 100:.2f}%"
+        else:
+            stats['hit_rate'] = "0%"
+        return stats
+
+    def _open(self):
+        conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        try:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            version = conn.execute("PRAGMA user_version").fetchone()[0]
+            if version != self.SCHEMA_VERSION:
+                conn.execute("DROP TABLE IF EXISTS entries")
+                conn.execute(f"PRAGMA user_version={self.SCHEMA_VERSION}")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS entries ("
+                "key TEXT PRIMARY KEY, status INTEGER, headers TEXT, content BLOB, etag TEXT, last_modified TEXT, "
+                "fresh_until REAL, expires_at REAL, stored_at REAL, size INTEGER)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS entries_stored_at ON entries (stored_at)")
+            conn.execute("SELECT COUNT(*) FROM entries").fetchone()
+        except sqlite3.DatabaseError:
+            conn.close()
+            raise
+        return conn
+
+    def _remove_files(self):
+        for suffix in ('', '-wal', '-shm'):
+            try:
+                os.remove(self.path + suffix)
+            except FileNotFoundError:
+                pass
+
+    def _enqueue(self, operation):
+        try:
+            self._queue.put_nowait(operation)
+            return True
+        except queue.Full:
+            self._record('dropped_writes')
+            return False
+
+    def _record(self, key, count=1):
+        with self._stats_lock:
+            self.stats[key] += count
+
+    def _write_loop(self):
+        conn = self._open()
+        running = True
+        while running:
+            operations = [self._queue.get()]
+            while len(operations) < self.batch_size:
+                try:
+                    operations.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            waiters = []
+            writes = 0
+            try:
+                conn.execute("BEGIN")
+                for operation in operations:
+                    if operation is None:
+                        running = False
+                    elif operation[0] == 'put':
+                        conn.execute("INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", operation[1])
+                        writes += 1
+                    elif operation[0] == 'delete':
+                        conn.execute("DELETE FROM entries WHERE key = ?", (operation[1],))
+                    elif operation[0] == 'clear':
+                        conn.execute("DELETE FROM entries")
+                    elif operation[0] == 'flush':
+                        waiters.append(operation[1])
+                self._evict(conn)
+                conn.execute("COMMIT")
+                self._record('writes', writes)
+            except sqlite3.Error as e:
+                if conn.in_transaction:
+                    conn.execute("ROLLBACK")
+                self.logger.add_log(f"磁盘缓存写入失败: {str(e)}")
+            for waiter in waiters:
+                waiter.set()
+        conn.close()
+
+    def _evict(self, conn):
+        """删除过期条目，总大小仍超过上限时从最早写入的条目开始删除（在写事务中调用）"""
+        expired = conn.execute("DELETE FROM entries WHERE expires_at <= ?", (time.time(),)).rowcount
+        if expired:
+            self._record('expirations', expired)
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        evicted = []
+        for key, size in conn.execute("SELECT key, size FROM entries ORDER BY stored_at"):
+            evicted.append((key,))
+            total -= size
+            if total <= self.max_bytes:
+                break
+        conn.executemany("DELETE FROM entries WHERE key = ?", evicted)
+        self._record('evictions', len(evicted))
@@ -0,0 +1,184 @@
+"""
+控件元素缓存
+按窗口缓存 control_id -> 元素 的映射，一次 descendants() 遍历服务该窗口后续所有查找
+
+失效规则:
+1. 以窗口句柄区分窗口，句柄变化即视为新窗口，重新遍历
+2. 命中的元素需通过存活校验（访问元素属性不抛异常，隐藏的控件仍视为有效），元素失效时重新遍历一次；
+   等待控件就绪的调用方传 visible=True，缓存的元素还必须可见，不可见时按第3条的间隔重新遍历
+3. 未在缓存中找到的control_id也会重新遍历（控件可能是后出现的，例如验证码弹窗），
+   但距上次遍历不足 miss_interval 时直接返回未找到，避免轮询等待时每50ms遍历一次整棵控件树
+"""
+
+import threading
+import time
+from collections import OrderedDict
+
+from src.util.tracing import Tracer, traced
+
+
+class ElementCache:
+    """按窗口划分的控件元素缓存（线程安全）"""
+
+    _instance = None
+    _instance_lock = threading.Lock()
+
+    @classmethod
+    def get_instance(cls):
+        """获取全局共享的元素缓存（窗口句柄全局唯一，各服务可共用）"""
+        if not cls._instance:
+            with cls._instance_lock:
+                if not cls._instance:
+                    cls._instance = cls()
+        return cls._instance
+
+    def __init__(self, max_windows=8, miss_interval=0.3):
+        """
+        初始化元素缓存
+        :param max_windows: 最多缓存的窗口数量，超出时淘汰最久未使用的窗口
+        :param miss_interval: 未找到的control_id距上次遍历超过该时间(秒)才重新遍历
+        """
+        self.max_windows = max_windows
+        self.miss_interval = miss_interval
+        self._windows = OrderedDict()   # 窗口键 -> {control_id: element}
+        self._walked_at = {}            # 窗口键 -> 最近一次遍历的时间(monotonic)
+        self._lock = threading.RLock()
+        self.stats = {
+            'hits': 0,
+            'misses': 0,
+            'negative_hits': 0,
+            'stale': 0,
+            'tree_walks': 0
+        }
+
+    def find(self, window, control_id, visible=False):
+        """
+        查找单个控件
+        :param window: 目标窗口
+        :param control_id: 控件的control_id
+        :param visible: 只返回当前可见的控件（切换页面后等待新页面的控件，隐藏的旧控件视为未找到）
+        :return: 找到的元素，未找到返回None
+        """
+        key = self._window_key(window)
+        with self._lock:
+            elements = self._windows.get(key)
+            if elements is not None:
+                self._windows.move_to_end(key)
+                element = elements.get(control_id)
+                if element is not None and not self._is_alive(element):
+                    self.stats['stale'] += 1
+                elif element is not None and (not visible or self._is_visible(element)):
+                    self.stats['hits'] += 1
+                    return element
+                elif self._walked_recently(key):
+                    # 刚遍历过仍不存在（或仍不可见），不重复遍历
+                    self.stats['negative_hits'] += 1
+                    return None
+
+            self.stats['misses'] += 1
+            element = self._build(window, key).get(control_id)
+            if element is not None and visible and not self._is_visible(element):
+                return None
+            return element
+
+    def find_many(self, window, control_ids):
+        """
+        批量查找控件，任一控件缺失或失效时只重新遍历一次
+        :param window: 目标窗口
+        :param control_ids: control_id列表
+        :return: 找到的元素列表（按control_ids顺序，未找到的跳过）
+        """
+        wanted = list(dict.fromkeys(control_ids))
+        key = self._window_key(window)
+        with self._lock:
+            elements = self._windows.get(key)
+            if elements is not None:
+                self._windows.move_to_end(key)
+                found = [elements.get(cid) for cid in wanted]
+                present = [e for e in found if e is not None]
+                if all(self._is_alive(e) for e in present):
+                    if len(present) == len(found):
+                        self.stats['hits'] += 1
+                        return found
+                    if self._walked_recently(key):
+                        self.stats['negative_hits'] += 1
+                        return present
+
+            self.stats['misses'] += 1
+            elements = self._build(window, key)
+            return [elements[cid] for cid in wanted if cid in elements]
+
+    def invalidate(self, window=None):
+        """
+        使缓存失效
+        :param window: 指定窗口，不传则清空所有窗口的缓存
+        """
+        with self._lock:
+            if window is None:
+                self._windows.clear()
+                self._walked_at.clear()
+            else:
+                key = self._window_key(window)
+                self._windows.pop(key, None)
+                self._walked_at.pop(key, None)
+
+    def get_stats(self):
+        """获取缓存统计"""
+        with self._lock:
+            stats = self.stats.copy()
+            stats['cached_windows'] = len(self._windows)
+            stats['cached_elements'] = sum(len(e) for e in self._windows.values())
+
+        lookups = stats['hits'] + stats['negative_hits'] + stats['misses']
+        if lookups > 0:
+            stats['hit_rate'] = f"{(stats['hits'] + stats['negative_hits']) / lookups * 100:.2f}%"
+        else:
+            stats['hit_rate'] = "0%"
+        return stats
+
+    @traced('ElementCache.tree_walk')
+    def _build(self, window, key):
+        """遍历一次窗口的所有后代元素并建立映射（调用方需持有锁）"""
+        self.stats['tree_walks'] += 1
+        elements = {}
+        for element in window.descendants():
+            try:
+                control_id = element.control_id()
+            except Exception:
+                continue
+            # 与原先的线性查找保持一致：重复的control_id取第一个
+            elements.setdefault(control_id, element)
+
+        Tracer.get_instance().current().set('elements', len(elements))
+        self._windows[key] = elements
+        self._windows.move_to_end(key)
+        self._walked_at[key] = time.monotonic()
+        while len(self._windows) > self.max_windows:
+            evicted, _ = self._windows.popitem(last=False)
+            self._walked_at.pop(evicted, None)
+        return elements
+
+    def _walked_recently(self, key):
+        """该窗口距上次遍历是否不足miss_interval（调用方需持有锁）"""
+        walked_at = self._walked_at.get(key)
+        return walked_at is not None and time.monotonic() - walked_at < self.miss_interval
+
+    def _window_key(self, window):
+        """窗口键：优先使用窗口句柄，无句柄时退化为对象标识"""
+        handle = getattr(window, 'handle', None)
+        return handle if handle else id(window)
+
+    def _is_alive(self, element):
+        """校验元素是否仍然存在（已销毁的UIA元素访问属性会抛异常；隐藏或禁用的控件仍然有效）"""
+        try:
+            element.is_enabled()
+            return True
+        except Exception:
+            return False
+
+    def _is_visible(self, element):
+        """元素当前是否可见（隐藏的页面、已关闭弹窗残留的控件返回False）"""
+        try:
+            return bool(element.is_visible())
+        except Exception:
+            return False
@@ -1,10 +1,22 @@
-from flask import Flask, request, jsonify
+from flask import Flask, Response, g, request, jsonify, copy_current_request_context, has_request_context
 from flask_cors import CORS
+import os
 import threading
 from src.util.logger import Logger
+from src.util.metrics import MetricsRegistry
+from src.util.tracing import Tracer
 import time
 from src.service.window_service import WindowService
 from src.service.proxy_service import ProxyService
+from src.service.cache_policy import CachePolicy
+from src.service.disk_cache import DiskCache
+from src.service.upstream_router import UpstreamRouter
+from src.service.order_executor import OrderExecutor, ThsGuiBackend
+from src.service.order_placer import OrderPlacer
+from src.service.snapshot_cache import SnapshotCache
+from src.service.http_server import create_server
+from src.models.app_model import AppModel
+from src.util.table_parser import typed_records
 
 class FlaskApp:
     def __init__(self, host='0.0.0.0', port=5000, controller=None):
@@ -21,14 +33,60 @@ class FlaskApp:
         self.app = Flask(__name__)
         self.running = False
         self.thread = None
+        self.server = None
+        self.server_config = AppModel().get_http_server_config()
         self.logger = Logger.get_instance()
 
+        # 分阶段耗时追踪 - GUI操作各阶段的span，见 /debug/traces
+        tracing_config = AppModel().get_tracing_config()
+        self.tracer = Tracer.get_instance()
+        self.tracer.configure(
+            enabled=tracing_config.get('enabled', True),
+            sample_rate=tracing_config.get('sample_rate', 1.0),
+            max_traces=tracing_config.get('max_traces', 200),
+            max_spans=tracing_config.get('max_spans', 500)
+        )
+
+        # 下单执行器 - 所有驱动GUI的请求在同一个工作线程中串行执行
+        self.gui_task_timeout = 60
+        self.order_executor = OrderExecutor(
+            ThsGuiBackend(controller, self.window_service),
+            max_queue_size=64
+        )
+        self.order_executor.start()
+        self.order_placer = OrderPlacer(self.window_service)
+
+        # 持仓/资金快照缓存 - 并发请求合并为一次GUI刷新
+        snapshot_config = AppModel().get_snapshot_cache_config()
+        self.position_cache = SnapshotCache(
+            lambda: self.run_gui_task(self.controller.get_position, name='get_position'),
+            max_age=snapshot_config.get('max_age', 3)
+        )
+        self.balance_cache = SnapshotCache(
+            lambda: self.run_gui_task(self.controller.get_balance, name='get_balance'),
+            max_age=snapshot_config.get('max_age', 3)
+        )
+
         # 初始化代理服务 - 支持高并发
+        proxy_cache_config = AppModel().get_proxy_cache_config()
+        self.proxy_upstream_config = AppModel().get_proxy_upstream_config()
+        disk_cache = None
+        if proxy_cache_config.get('disk_enabled', False):
+            # 磁盘缓存 - 重启后仍可命中,避免重启后的请求全部打到上游
+            disk_cache = DiskCache(
+                os.path.join(AppModel().get_cache_dir(), 'proxy_cache.sqlite3'),
+                max_bytes=proxy_cache_config.get('disk_max_mb', 256) * 1024 * 1024
+            )
         self.proxy_service = ProxyService(
-            cache_ttl=10,           # 缓存10秒
+            cache_policy=CachePolicy.from_config(proxy_cache_config),  # 按host/路径的缓存时间
             pool_connections=100,   # 连接池数量(翻倍)
             pool_maxsize=200,       # 最大并发连接数(翻倍)
-            max_retries=3           # 失败自动重试3次
+            max_retries=3,          # 失败自动重试3次
+            cache_max_entries=1000, # 最多缓存1000个响应
+            cache_max_bytes=64 * 1024 * 1024,  # 缓存总大小上限64MB
+            disk_cache=disk_cache,
+            http2=self.proxy_upstream_config.get('http2', False),  # HTTP/2多路复用
+            router=UpstreamRouter.from_config(AppModel().get_proxy_routes_config())  # 允许的host及并发/超时/熔断
         )
 
         # 配置CORS
@@ -37,6 +95,7 @@ class FlaskApp:
         # 设置JSON编码
         self.app.config['JSON_AS_ASCII'] = False
 
+        self._register_metrics()
         self._register_routes()
 
     def add_route(self, path, handler, methods=['GET']):
@@ -69,34 +128,170 @@ class FlaskApp:
         )
 
     def run(self):
-        """启动Flask服务器"""
+        """启动HTTP服务器（阻塞直到stop()）"""
         if not self.running:
-            self._run_server()
             self.running = True
+            self._start_prewarm()
+            self._run_server()
 
     def run_async(self):
         """异步启动服务器"""
         if not self.running:
-            self.thread = threading.Thread(target=self.run)
+            self.thread = threading.Thread(target=self.run, name='HttpServer')
             self.thread.daemon = True
             self.thread.start()
-            self.running = True
+
+    def _start_prewarm(self):
+        """后台预先建立到常用host的连接，不阻塞服务启动"""
+        hosts = self.proxy_upstream_config.get('prewarm_hosts', [])
+        if not hosts:
+            return
+
+        def prewarm():
+            warmed = self.proxy_service.prewarm(hosts, self.proxy_upstream_config.get('prewarm_connections', 4))
+            self.logger.add_log(f"代理预建连接完成: {warmed} 个")
+        threading.Thread(target=prewarm, daemon=True, name='ProxyPrewarm').start()
 
     def stop(self):
-        """停止服务器（需要自行实现关闭逻辑）"""
-        # Flask开发服务器没有原生停止方法，通常通过发送中断信号
+        """停止服务器：停止接收请求、断开连接，并停止下单执行器和代理连接池"""
         self.running = False
-        print("请使用Ctrl+C停止服务器")
+        server, self.server = self.server, None
+        if server is not None:
+            server.shutdown()
+            server.server_close()
+        if self.thread is not None and self.thread is not threading.current_thread():
+            self.thread.join(timeout=5)
+        self.order_executor.stop()
+        self.proxy_service.close()
+        self.logger.add_log("HTTP服务已停止")
+
+    def run_gui_task(self, func, name=None, activate=False):
+        """
+        把GUI操作提交到下单执行器，并在当前请求线程中等待结果
+        Args:
+            func (callable): 无参函数，在执行器工作线程中运行（在请求中调用时可使用request/jsonify）
+            name (str): 任务名称
+            activate (bool): 执行前是否需要激活同花顺窗口（连续排队的任务只激活一次）
+        Returns:
+            func的返回值（票据编号记录在 g.order_ticket，响应头 X-Order-Ticket 中返回）
+        Raises:
+            TimeoutError: 超过gui_task_timeout，尚未开始执行的任务已取消
+        """
+        name = name or func.__name__
+        attrs = {}
+        force = False
+        # 异步HTTP服务刷新快照时没有Flask请求上下文
+        if has_request_context():
+            task = copy_current_request_context(func)
+            attrs['route'] = request.path
+            # ?trace=1 忽略采样率，强制记录本次请求
+            force = request.args.get('trace') == '1'
+        else:
+            task = func
+        # 根span包含排队时间；执行器在提交时复制上下文，工作线程中的span挂在它下面
+        with self.tracer.span(name, root=True, force=force, **attrs):
+            ticket = self.order_executor.submit(lambda backend: task(), name=name, activate=activate)
+            if has_request_context():
+                g.order_ticket = ticket.ticket_id
+            return self.order_executor.wait(ticket, timeout=self.gui_task_timeout)
+
+    def invalidate_snapshots(self):
+        """下单/撤单后持仓和资金必然变化，丢弃快照"""
+        self.position_cache.invalidate()
+        self.balance_cache.invalidate()
+
+    def _get_max_age(self):
+        """
+        解析请求中的max_age参数
+        Returns:
+            float或None(未传)
+        Raises:
+            ValueError: 参数不是非负数字
+        """
+        max_age = request.args.get('max_age')
+        if max_age is None:
+            return None
+        max_age = float(max_age)
+        if max_age < 0:
+            raise ValueError("max_age不能为负数")
+        return max_age
 
     def _run_server(self):
+        config = self.server_config
         try:
+            self.server = create_server(
+                self.host,
+                self.port,
+                self.app,
+                mode=config.get('mode', 'production'),
+                threads=config.get('threads', 32),
+                backlog=config.get('backlog', 128),
+                idle_timeout=config.get('idle_timeout', 5)
+            )
             # 添加更详细的启动日志
-            self.logger.add_log(f"HTTP服务初始化完成，监听地址：{self.host}:{self.port}")
-            self.app.run(host=self.host, port=self.port, debug=False, use_reloader=False)
+            self.logger.add_log(
+                f"HTTP服务初始化完成，监听地址：{self.host}:{self.port}，模式：{config.get('mode', 'production')}"
+            )
+            self.server.serve_forever()
         except Exception as e:
+            self.running = False
             self.logger.add_log(f"HTTP服务启动失败: {str(e)}")
             raise  # 抛出异常以便上层捕获
+
+    def _http_server_stats(self):
+        """HTTP服务器统计的数值项，服务器未启动或不提供统计时为空"""
+        server = self.server
+        if server is None or not hasattr(server, 'get_stats'):
+            return {}
+        return self._numeric_stats(server.get_stats())
+
+    def _register_metrics(self):
+        """按路由和状态码记录请求耗时，并把已有的统计字典注册为回调指标"""
+        self.metrics = MetricsRegistry.get_instance()
+        self.request_latency = self.metrics.histogram(
+            'http_request_duration_seconds', 'HTTP请求耗时（流式响应只计到响应头）', ('method', 'route', 'status')
+        )
+        self.metrics.gauge('proxy_stats', '代理服务统计（/proxy/stats中的数值项）',
+                           lambda: self._numeric_stats(self.proxy_service.get_stats()), ('key',))
+        self.metrics.gauge('order_executor_stats', '下单执行器统计（/orders/stats中的数值项）',
+                           lambda: self._numeric_stats(self.order_executor.get_stats()), ('key',))
+        self.metrics.gauge('logger_stats', '日志队列统计（已写入、丢弃、待写入等）',
+                           lambda: self._numeric_stats(self.logger.get_stats()), ('key',))
+        self.metrics.gauge('http_server_stats', 'HTTP服务器统计（工作线程、排队和空闲连接等，开发服务器无此项）',
+                           self._http_server_stats, ('key',))
+
+        @self.app.before_request
+        def start_timer():
+            g.request_start = time.perf_counter()
+
+        @self.app.after_request
+        def record_latency(response):
+            start = g.pop('request_start', None)
+            if start is not None:
+                # 按路由模板记录（/proxy/<path:url>），未匹配的路径归为一类，避免标签数量无限增长
+                route = request.url_rule.rule if request.url_rule is not None else 'unmatched'
+                self.request_latency.observe(
+                    time.perf_counter() - start, (request.method, route, str(response.status_code))
+                )
+            return response
+
+    @staticmethod
+    def _numeric_stats(stats):
+        """统计字典中的数值项 -> {(键,): 数值}"""
+        return {
+            (key,): value for key, value in stats.items()
+            if isinstance(value, (int, float)) and not isinstance(value, bool)
+        }
+
     def _register_routes(self):
+        @self.app.after_request
+        def add_ticket_header(response):
+            # 提交过GUI任务的请求返回票据编号，超时后可通过 /orders/<ticket> 查询，而不是重试下单
+            ticket_id = g.get('order_ticket')
+            if ticket_id is not None:
+                response.headers['X-Order-Ticket'] = str(ticket_id)
+            return response
+
         # 基础健康检查
         @self.app.route('/health', methods=['GET'])
         def health_check():
@@ -106,11 +301,16 @@ class FlaskApp:
         @self.app.route('/balance', methods=['GET'])
         def get_balance():
             try:
-                # 调用controller获取资金余额
-                balance = self.controller.get_balance()
+                max_age = self._get_max_age()
+            except ValueError:
+                return jsonify({"status": "error", "message": "max_age参数必须为非负数字(秒)"}), 400
+            try:
+                # 快照未超过max_age直接返回，否则调用controller刷新
+                snapshot = self.balance_cache.get(max_age)
                 return jsonify({
                     "status": "success",
-                    "data": balance
+                    "data": snapshot.data,
+                    "cache_age": round(snapshot.age, 3)
                 })
             except Exception as e:
                 self.logger.add_log(f"获取资金余额失败: {str(e)}")
@@ -123,11 +323,18 @@ class FlaskApp:
         @self.app.route('/position', methods=['GET'])
         def get_position():
             try:
-                # 调用controller获取持仓信息
-                position = self.controller.get_position()
+                max_age = self._get_max_age()
+            except ValueError:
+                return jsonify({"status": "error", "message": "max_age参数必须为非负数字(秒)"}), 400
+            try:
+                # 快照未超过max_age直接返回，否则调用controller刷新
+                snapshot = self.position_cache.get(max_age)
+                # 默认值均为字符串；typed=1 时数值列输出为JSON数字（每列一个类型）
+                data = typed_records(snapshot.data) if request.args.get('typed') == '1' else snapshot.data
                 return jsonify({
                     "status": "success",
-                    "data": position
+                    "data": data,
+                    "cache_age": round(snapshot.age, 3)
                 })
             except Exception as e:
                 self.logger.add_log(f"获取持仓失败: {str(e)}")
@@ -136,12 +343,43 @@ class FlaskApp:
                     "message": f"获取持仓失败: {str(e)}"
                 }), 500
 
+        # 持仓变更流
+        @self.app.route('/position/changes', methods=['GET'])
+        def get_position_changes():
+            """持仓增量接口
+            参数:
+                cursor (str, optional): 上次返回的游标，不传或已失效(如服务重启)时返回全量持仓(reset=true)
+                max_age (float, optional): 同/position，可接受的持仓快照最大年龄(秒)
+            """
+            cursor = request.args.get('cursor')
+            try:
+                max_age = self._get_max_age()
+            except ValueError:
+                return jsonify({"status": "error", "message": "max_age参数必须为非负数字(秒)"}), 400
+            try:
+                # 按新鲜度要求刷新持仓（刷新时会计算增量）
+                snapshot = self.position_cache.get(max_age)
+                changes = self.controller.position_service.change_feed.changes_since(cursor)
+                return jsonify({
+                    "status": "success",
+                    "data": changes,
+                    "cache_age": round(snapshot.age, 3)
+                })
+            except Exception as e:
+                self.logger.add_log(f"获取持仓变更失败: {str(e)}")
+                return jsonify({
+                    "status": "error",
+                    "message": f"获取持仓变更失败: {str(e)}"
+                }), 500
+
         # 获取今日成交
         @self.app.route('/today_trades', methods=['GET'])
         def get_today_trades():
             try:
                 # 调用controller获取今日成交信息
-                trades = self.controller.get_today_trades()
+                trades = self.run_gui_task(self.controller.get_today_trades)
+                if request.args.get('typed') == '1':
+                    trades = typed_records(trades)
                 return jsonify({
                     "status": "success",
                     "data": trades
@@ -158,7 +396,7 @@ class FlaskApp:
         def get_current_page():
             try:
                 # 调用controller获取当前页面信息
-                page_info = self.controller.get_current_page()
+                page_info = self.run_gui_task(self.controller.get_current_page)
                 return jsonify({
                     "status": "success",
                     "data": page_info
@@ -174,7 +412,7 @@ class FlaskApp:
         @self.app.route('/click', methods=['GET'])
         def click():
             try:
-                self.controller.handle_click()
+                self.run_gui_task(self.controller.handle_click)
                 return jsonify({"status": "success", "message": "下单成功"})
             except Exception as e:
                 self.logger.add_log(f"下单异常: {str(e)}")
@@ -186,11 +424,8 @@ class FlaskApp:
             # 从url上获取参数，key
             key = request.args.get('key')
             try:
-                # 先激活窗口
-                self.controller.handle_activate_window()
-                time.sleep(0.1)
-                self.window_service.send_key(key)
-                time.sleep(0.1)
+                # 由执行器激活窗口（等待其进入前台）后再发送按键
+                self.run_gui_task(lambda: self.window_service.send_key(key), name='send_key', activate=True)
                 return jsonify({"status": "success", "message": f"已发送按键 {key}"})
             except Exception as e:
                 self.logger.add_log(f"按键发送失败: {str(e)}")
@@ -208,30 +443,55 @@ class FlaskApp:
                     return jsonify({"status": "error", "message": "code不能为空"})
                 if status is None:
                     return jsonify({"status": "error", "message": "status不能为空,1:闪电买入,2:闪电卖出"})
-                # 先激活窗口
-                self.controller.handle_activate_window()
-                time.sleep(0.1)
-                # 发送代码
-                keyStr = code + ' ENTER '
-                if status == '1':
-                    keyStr = keyStr + '21 ENTER'
-                elif status == '2':
-                    keyStr = keyStr + '23 ENTER'
-
-                self.window_service.send_key(keyStr)
-                # 获取window
-                window = self.window_service.get_target_window({'class_name': '#32770', 'title':''})
-                # 如果有amount参数
-                if amount:
-                    self.window_service.input_text_to_element(window, 1034, amount)
-                
-                # 下单点击
-                self.window_service.click_element(window, 1006)
-                return jsonify({"status": "success", "message": f"已发送按键 {keyStr}"})
+                # 由执行器激活窗口（连续下单只激活一次）后再下单
+                keyStr, _ = self.run_gui_task(
+                    lambda: self.order_placer.place(code, status, amount),
+                    name='xiadan',
+                    activate=True
+                )
+                self.invalidate_snapshots()
+                return jsonify({"status": "success", "message": f"已发送按键 {keyStr}", "ticket": g.order_ticket})
             except Exception as e:
                 self.logger.add_log(f"按键发送失败: {str(e)}")
-                return jsonify({"status": "error", "message": f"下单异常: {str(e)}"})
+                return jsonify({"status": "error", "message": f"下单异常: {str(e)}", "ticket": g.get('order_ticket')})
                
+        # 批量下单
+        @self.app.route('/xiadan/batch', methods=['POST'])
+        def xiadan_batch():
+            """批量下单接口
+            请求体(JSON): {"orders": [{"code": "600000", "status": "1", "amount": 100}, ...]}
+                          也可以直接传订单数组
+            整批订单只激活一次窗口，并复用下单弹窗的查找结果
+            """
+            payload = request.get_json(silent=True)
+            orders = payload.get('orders') if isinstance(payload, dict) else payload
+            if not isinstance(orders, list) or not orders:
+                return jsonify({"status": "error", "message": "orders不能为空,格式为[{code,status,amount}]"}), 400
+            if not all(isinstance(order, dict) for order in orders):
+                return jsonify({"status": "error", "message": "orders中的每一项必须是对象"}), 400
+
+            try:
+                start = time.time()
+                results = self.run_gui_task(
+                    lambda: self.order_placer.place_batch(orders, reactivate=self.order_executor.backend.activate),
+                    name='xiadan_batch',
+                    activate=True
+                )
+                self.invalidate_snapshots()
+                succeeded = sum(1 for r in results if r['success'])
+                return jsonify({
+                    "status": "success" if succeeded == len(results) else "partial" if succeeded else "error",
+                    "message": f"批量下单完成,成功{succeeded}笔,失败{len(results) - succeeded}笔",
+                    "ticket": g.order_ticket,
+                    "data": {
+                        "results": results,
+                        "elapsed_ms": round((time.time() - start) * 1000, 2)
+                    }
+                })
+            except Exception as e:
+                self.logger.add_log(f"批量下单失败: {str(e)}")
+                return jsonify({"status": "error", "message": f"批量下单异常: {str(e)}", "ticket": g.get('order_ticket')})
+
         # 撤单接口
         @self.app.route('/cancel_all_orders', methods=['GET'])
         def cancel_all_orders():
@@ -258,7 +518,11 @@ class FlaskApp:
                 }), 400
 
             try:
-                result = self.controller.handle_cancel_all_orders(cancel_type)
+                result = self.run_gui_task(
+                    lambda: self.controller.handle_cancel_all_orders(cancel_type),
+                    name='cancel_all_orders'
+                )
+                self.invalidate_snapshots()
 
                 # 构造返回消息
                 operation_name = {
@@ -272,20 +536,21 @@ class FlaskApp:
                     return jsonify({
                         "status": "success",
                         "message": f"{operation_name}操作已执行",
+                        "ticket": g.order_ticket,
                         "data": {"operation": operation_name, "type": cancel_type or 'A'}
                     })
                 else:
                     return jsonify({
                         "status": "error",
-                        "message": f"{operation_name}失败"
+                        "message": f"{operation_name}失败",
+                        "ticket": g.order_ticket
                     })
             except Exception as e:
                 self.logger.add_log(f"撤单失败: {str(e)}")
-                return jsonify({"status": "error", "message": f"撤单失败: {str(e)}"})
+                return jsonify({"status": "error", "message": f"撤单失败: {str(e)}", "ticket": g.get('order_ticket')})
 
         # 下单确认
-        @self.app.route('/confirm_order', methods=['GET'])
-        def confirm_order():
+        def confirm_order_task():
             # 从url上获取参数 position (可用仓位,可选)
             position = request.args.get('position')
             position_int = None
@@ -376,6 +641,65 @@ class FlaskApp:
                 self.logger.add_log(f"下单确认失败: {str(e)}")
                 return jsonify({"status": "error", "message": f"下单确认失败: {str(e)}"}), 500
 
+        @self.app.route('/confirm_order', methods=['GET'])
+        def confirm_order():
+            # 弹窗操作同样需要与其它GUI任务串行执行
+            try:
+                response = self.run_gui_task(confirm_order_task, name='confirm_order')
+                self.invalidate_snapshots()
+                return response
+            except Exception as e:
+                self.logger.add_log(f"下单确认失败: {str(e)}")
+                return jsonify({"status": "error", "message": f"下单确认失败: {str(e)}"}), 500
+
+        # 快照缓存统计接口
+        @self.app.route('/snapshot/stats', methods=['GET'])
+        def snapshot_stats():
+            """获取持仓/资金快照缓存的命中统计"""
+            try:
+                return jsonify({
+                    "status": "success",
+                    "data": {
+                        "position": self.position_cache.get_stats(),
+                        "balance": self.balance_cache.get_stats()
+                    }
+                })
+            except Exception as e:
+                return jsonify({"status": "error", "message": str(e)}), 500
+
+        # 验证码识别统计接口
+        @self.app.route('/captcha/stats', methods=['GET'])
+        def captcha_stats():
+            """获取验证码识别统计（缓存命中、模板命中、平均尝试次数等）"""
+            try:
+                return jsonify({
+                    "status": "success",
+                    "data": self.controller.position_service.captcha_solver.get_stats()
+                })
+            except Exception as e:
+                return jsonify({"status": "error", "message": str(e)}), 500
+
+        # 下单执行器统计接口
+        @self.app.route('/orders/stats', methods=['GET'])
+        def order_stats():
+            """获取下单执行器的队列深度、等待时间和执行时间"""
+            try:
+                return jsonify({
+                    "status": "success",
+                    "data": self.order_executor.get_stats()
+                })
+            except Exception as e:
+                return jsonify({"status": "error", "message": str(e)}), 500
+
+        # 查询任务票据
+        @self.app.route('/orders/<int:ticket_id>', methods=['GET'])
+        def order_ticket(ticket_id):
+            """查询下单任务的执行状态"""
+            ticket = self.order_executor.get_ticket(ticket_id)
+            if ticket is None:
+                return jsonify({"status": "error", "message": f"未找到任务: {ticket_id}"}), 404
+            return jsonify({"status": "success", "data": ticket.to_dict()})
+
         # 高性能代理接口
         @self.app.route('/proxy/<path:url>', methods=['GET', 'POST', 'PUT', 'DELETE'])
         def proxy(url):
@@ -387,6 +711,57 @@ class FlaskApp:
             """
             return self.proxy_service.proxy_request(url, request)
 
+        # 窗口缓存统计接口
+        @self.app.route('/window/stats', methods=['GET'])
+        def window_stats():
+            """获取窗口句柄索引等缓存的统计信息"""
+            try:
+                return jsonify({
+                    "status": "success",
+                    "data": self.window_service.get_cache_stats()
+                })
+            except Exception as e:
+                return jsonify({"status": "error", "message": str(e)}), 500
+
+        # 指标接口（Prometheus文本格式）
+        @self.app.route('/metrics', methods=['GET'])
+        def metrics():
+            return Response(self.metrics.render(), mimetype='text/plain; version=0.0.4; charset=utf-8')
+
+        # 各路由的请求耗时分位数
+        @self.app.route('/metrics/latency', methods=['GET'])
+        def latency_stats():
+            """获取各路由/状态码的请求数和耗时P50/P90/P99/P999"""
+            try:
+                return jsonify({
+                    "status": "success",
+                    "data": [
+                        dict(method=method, route=route, status=status, **stats)
+                        for (method, route, status), stats in sorted(self.request_latency.snapshot().items())
+                    ]
+                })
+            except Exception as e:
+                return jsonify({"status": "error", "message": str(e)}), 500
+
+        # 最近的GUI操作分阶段耗时
+        @self.app.route('/debug/traces', methods=['GET'])
+        def debug_traces():
+            """
+            获取最近完成的trace（新的在前）
+            参数: limit 条数(默认20)，name 只看某类操作(如get_position)，min_ms 只看总耗时不小于该值的
+            """
+            try:
+                traces = self.tracer.get_traces(
+                    limit=int(request.args.get('limit', 20)),
+                    name=request.args.get('name'),
+                    min_ms=float(request.args.get('min_ms', 0))
+                )
+                return jsonify({"status": "success", "data": {"stats": self.tracer.get_stats(), "traces": traces}})
+            except ValueError:
+                return jsonify({"status": "error", "message": "limit/min_ms必须是数字"}), 400
+            except Exception as e:
+                return jsonify({"status": "error", "message": str(e)}), 500
+
         # 代理统计接口
         @self.app.route('/proxy/stats', methods=['GET'])
         def proxy_stats():
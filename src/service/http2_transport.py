@@ -0,0 +1,101 @@
+"""
+HTTP/2 上游传输
+代理服务可选的上游连接方式（httpx），同一host的并发请求在少量TLS连接上多路复用，
+避免HTTP/1.1连接池为每个并发请求单独握手
+
+接口与 requests 的流式响应保持一致，代理服务的转发逻辑不需要区分两种传输:
+1. 响应对象提供 status_code / headers / close()
+2. iter_raw() 返回未解压的数据块（保留上游的content-encoding）
+3. httpx的异常转换为对应的 requests 异常
+"""
+
+from contextlib import contextmanager
+
+import httpx
+import requests
+
+
+class Http2Response:
+    """httpx流式响应的包装"""
+
+    def __init__(self, response):
+        self._response = response
+        self.status_code = response.status_code
+        self.headers = response.headers
+        self.http_version = response.http_version
+        self.history = []
+
+    def iter_raw(self, chunk_size):
+        """按原始编码读取响应体"""
+        with translate_errors():
+            yield from self._response.iter_raw(chunk_size)
+
+    def close(self):
+        self._response.close()
+
+
+@contextmanager
+def translate_errors():
+    """把httpx的异常转换为requests的异常（代理服务按requests异常返回504/502）"""
+    try:
+        yield
+    except httpx.TimeoutException as e:
+        raise requests.exceptions.Timeout(str(e)) from e
+    except httpx.TransportError as e:
+        raise requests.exceptions.ConnectionError(str(e)) from e
+    except httpx.HTTPError as e:
+        raise requests.exceptions.RequestException(str(e)) from e
+
+
+class Http2Transport:
+    """基于httpx的HTTP/2上游连接（线程安全）"""
+
+    def __init__(self, headers=None, max_connections=20, max_retries=3, timeout=(3, 10), verify=False):
+        """
+        :param headers: 默认请求头
+        :param max_connections: 最多保持的连接数（HTTP/2下每个host通常只需要一个连接）
+        :param max_retries: 建立连接失败时的重试次数
+        :param timeout: (连接超时, 读取超时)
+        :param verify: 是否校验证书
+        """
+        self.max_connections = max_connections
+        connect_timeout, read_timeout = timeout
+        limits = httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections,
+                              keepalive_expiry=60)
+        self._transport = httpx.HTTPTransport(http2=True, verify=verify, limits=limits, retries=max_retries)
+        self.client = httpx.Client(
+            transport=self._transport,
+            headers=dict(headers or {}),
+            timeout=httpx.Timeout(read_timeout, connect=connect_timeout)
+        )
+
+    def request(self, method, url, headers=None, data=None, timeout=None):
+        """
+        发送请求，只读取响应头，响应体通过 iter_raw() 读取
+        :param timeout: (连接超时, 读取超时)，不传使用创建时的设置
+        :return: Http2Response
+        """
+        if timeout is not None:
+            timeout = httpx.Timeout(timeout[1], connect=timeout[0])
+        else:
+            timeout = self.client.timeout
+        with translate_errors():
+            request = self.client.build_request(method, url, headers=headers, content=data, timeout=timeout)
+            return Http2Response(self.client.send(request, stream=True))
+
+    def get_pool_stats(self):
+        """
+        连接池状态（httpx没有公开连接池接口，读取的是httpcore连接池的属性）
+        :return: {'connections': 已建立的连接数, 'idle_connections': 空闲连接数}，
+                 httpx/httpcore的内部结构变化、读不到连接池时返回空字典
+        """
+        connections = getattr(getattr(self._transport, '_pool', None), 'connections', None)
+        if connections is None:
+            return {}
+        return {
+            'connections': len(connections),
+            'idle_connections': sum(1 for connection in connections if connection.is_idle())
+        }
+
+    def close(self):
+        self.client.close()
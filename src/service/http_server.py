@@ -0,0 +1,229 @@
+"""
+HTTP服务器
+在Werkzeug的BaseWSGIServer上加一个固定大小的工作线程池，替代开发服务器"每个连接一个新线程"的模型
+
+特性:
+1. 固定线程池 - 连接由常驻工作线程处理，线程数可配置，突发连接在队列中排队而不是无限创建线程
+2. 连接积压 - listen() 的 backlog 可配置
+3. 空闲连接不占用工作线程 - 已建立但还没有发出请求的连接（浏览器预连接、慢客户端）先在选择器中等待，
+   收到数据后才交给工作线程；超过 idle_timeout 秒仍没有请求的连接直接关闭
+   （不支持持久连接：Werkzeug的请求处理器在每个响应后都会发送 Connection: close，一个连接只处理一个请求，
+   idle_timeout 只限制连接建立后到发出请求前的等待）
+4. 可停止 - shutdown() 停止接收新连接，并断开等待中和处理中的连接
+"""
+
+import queue
+import select
+import selectors
+import socket
+import threading
+import time
+from collections import deque
+
+from werkzeug.serving import BaseWSGIServer, WSGIRequestHandler, make_server
+
+
+class PooledRequestHandler(WSGIRequestHandler):
+    """请求处理器，timeout为读取请求的超时（由服务器设置）"""
+
+    protocol_version = "HTTP/1.1"
+
+    def log_request(self, code="-", size="-"):
+        # 高并发下逐条打印访问日志本身就是瓶颈，这里不输出
+        pass
+
+
+class PooledWSGIServer(BaseWSGIServer):
+    """固定工作线程池的WSGI服务器"""
+
+    multithread = True
+    IDLE_POLL_INTERVAL = 0.1        # 检查空闲连接超时的间隔（秒）
+    MAX_IDLE_CONNECTIONS = 256      # 最多同时等待的空闲连接，超出时关闭最早的（Windows的select最多512个）
+
+    def __init__(self, host, port, app, threads=32, backlog=128, idle_timeout=5):
+        """
+        :param threads: 工作线程数（同时处理的请求数上限）
+        :param backlog: 监听队列长度
+        :param idle_timeout: 连接建立后等待请求的最长时间（秒），等待期间不占用工作线程；0表示不限制
+        """
+        # request_queue_size 在 server_activate() 中作为 listen() 的参数
+        self.request_queue_size = backlog
+        handler = type('PooledRequestHandler', (PooledRequestHandler,), {'timeout': idle_timeout or None})
+        super().__init__(host, port, app, handler=handler)
+        self.threads = threads
+        self.idle_timeout = idle_timeout
+        self._queue = queue.Queue()
+        self._connections = set()
+        self._lock = threading.Lock()
+        self._workers = []
+        self.stats = {
+            'accepted': 0,
+            'active': 0,
+            'max_queued': 0,
+            'idle': 0,
+            'max_idle': 0,
+            'idle_timeouts': 0
+        }
+        for i in range(threads):
+            worker = threading.Thread(target=self._worker_loop, name=f"HttpWorker-{i}", daemon=True)
+            worker.start()
+            self._workers.append(worker)
+
+        # 空闲连接: 监听线程放入_pending并唤醒选择器线程，由选择器线程注册和等待
+        self._selector = selectors.DefaultSelector()
+        self._pending = deque()
+        self._idle = {}                 # 连接 -> (客户端地址, 截止时间)
+        self._wakeup_reader, self._wakeup_writer = socket.socketpair()
+        self._wakeup_reader.setblocking(False)
+        self._selector.register(self._wakeup_reader, selectors.EVENT_READ)
+        self._idle_running = True
+        self._idle_thread = threading.Thread(target=self._idle_loop, name="HttpIdle", daemon=True)
+        self._idle_thread.start()
+
+    def process_request(self, request, client_address):
+        """接收到新连接（在监听线程中调用）：已有数据的直接交给工作线程，否则先等待请求"""
+        with self._lock:
+            self.stats['accepted'] += 1
+        readable = select.select([request], [], [], 0)[0]
+        if readable:
+            self._dispatch(request, client_address)
+            return
+        self._pending.append((request, client_address))
+        try:
+            self._wakeup_writer.send(b'\0')
+        except OSError:
+            pass
+
+    def _dispatch(self, request, client_address):
+        """交给工作线程处理"""
+        self._queue.put((request, client_address))
+        with self._lock:
+            self.stats['max_queued'] = max(self.stats['max_queued'], self._queue.qsize())
+
+    def _idle_loop(self):
+        """选择器线程：等待空闲连接发来请求，超时关闭"""
+        while self._idle_running:
+            for key, _ in self._selector.select(self.IDLE_POLL_INTERVAL):
+                connection = key.fileobj
+                if connection is self._wakeup_reader:
+                    try:
+                        while connection.recv(4096):
+                            pass
+                    except OSError:
+                        pass
+                    continue
+                self._selector.unregister(connection)
+                client_address, _ = self._idle.pop(connection)
+                self._dispatch(connection, client_address)
+
+            while self._pending:
+                connection, client_address = self._pending.popleft()
+                deadline = time.monotonic() + self.idle_timeout if self.idle_timeout else None
+                try:
+                    self._selector.register(connection, selectors.EVENT_READ)
+                except (ValueError, OSError):
+                    self.shutdown_request(connection)
+                    continue
+                self._idle[connection] = (client_address, deadline)
+                if len(self._idle) > self.MAX_IDLE_CONNECTIONS:
+                    self._close_idle(next(iter(self._idle)))
+
+            now = time.monotonic()
+            for connection, (_, deadline) in list(self._idle.items()):
+                if deadline is not None and now >= deadline:
+                    self._close_idle(connection)
+
+            with self._lock:
+                self.stats['idle'] = len(self._idle)
+                self.stats['max_idle'] = max(self.stats['max_idle'], len(self._idle))
+
+        for connection in list(self._idle):
+            self._close_idle(connection, timeout=False)
+        self._selector.close()
+
+    def _close_idle(self, connection, timeout=True):
+        """关闭一个等待中的空闲连接（选择器线程中调用）"""
+        self._selector.unregister(connection)
+        self._idle.pop(connection, None)
+        if timeout:
+            with self._lock:
+                self.stats['idle_timeouts'] += 1
+        self.shutdown_request(connection)
+
+    def _worker_loop(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                break
+            request, client_address = item
+            with self._lock:
+                self._connections.add(request)
+                self.stats['active'] += 1
+            try:
+                self.finish_request(request, client_address)
+            except Exception:
+                self.handle_error(request, client_address)
+            finally:
+                with self._lock:
+                    self._connections.discard(request)
+                    self.stats['active'] -= 1
+                self.shutdown_request(request)
+
+    def shutdown(self):
+        """停止接收新连接，断开已有连接并结束工作线程"""
+        super().shutdown()
+        # 停止选择器线程，关闭等待中的空闲连接
+        self._idle_running = False
+        try:
+            self._wakeup_writer.send(b'\0')
+        except OSError:
+            pass
+        self._idle_thread.join(self.IDLE_POLL_INTERVAL * 10)
+        while self._pending:
+            self.shutdown_request(self._pending.popleft()[0])
+        with self._lock:
+            connections = list(self._connections)
+        for connection in connections:
+            try:
+                # 唤醒阻塞在读取请求上的连接
+                connection.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+        # 丢弃尚未处理的连接
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is not None:
+                self.shutdown_request(item[0])
+        for _ in self._workers:
+            self._queue.put(None)
+
+    def server_close(self):
+        super().server_close()
+        self._wakeup_reader.close()
+        self._wakeup_writer.close()
+
+    def get_stats(self):
+        """获取服务器统计"""
+        with self._lock:
+            stats = self.stats.copy()
+        stats['threads'] = self.threads
+        stats['backlog'] = self.request_queue_size
+        stats['idle_timeout_seconds'] = self.idle_timeout
+        stats['queued'] = self._queue.qsize()
+        return stats
+
+
+def create_server(host, port, app, mode='production', threads=32, backlog=128, idle_timeout=5):
+    """
+    创建HTTP服务器
+    :param mode: production 固定线程池；development Werkzeug开发服务器（每个连接一个线程）
+    :return: 支持 serve_forever() / shutdown() / server_close() 的服务器对象
+    """
+    if mode == 'development':
+        return make_server(host, port, app, threaded=True)
+    if mode != 'production':
+        raise ValueError(f"不支持的HTTP服务器模式: {mode}")
+    return PooledWSGIServer(host, port, app, threads=threads, backlog=backlog, idle_timeout=idle_timeout)
@@ -0,0 +1,120 @@
+"""
+按键注入器
+把编译好的按键批次提交给操作系统，每个批次只调用一次SendInput
+
+注入器接口只有一个方法 send(events)，events 为 ((vk, is_key_up), ...)
+- SendInputInjector: Windows实现，基于 user32.SendInput
+- RecordingInjector: 只记录事件，用于非Windows环境测试和基准测试
+"""
+
+import time
+
+
+class KeyInjector:
+    """按键注入器接口"""
+
+    def send(self, events):
+        """
+        一次性提交一批按键事件
+        :param events: ((vk, is_key_up), ...)
+        """
+        raise NotImplementedError
+
+
+class SendInputInjector(KeyInjector):
+    """基于 user32.SendInput 的按键注入器"""
+
+    INPUT_KEYBOARD = 1
+    KEYEVENTF_KEYUP = 0x0002
+
+    def __init__(self):
+        # 延迟导入，保证模块在非Windows环境下也能被导入
+        import ctypes
+        from ctypes import wintypes
+
+        class KEYBDINPUT(ctypes.Structure):
+            _fields_ = [("wVk", wintypes.WORD),
+                        ("wScan", wintypes.WORD),
+                        ("dwFlags", wintypes.DWORD),
+                        ("time", wintypes.DWORD),
+                        ("dwExtraInfo", ctypes.c_size_t)]
+
+        class MOUSEINPUT(ctypes.Structure):
+            _fields_ = [("dx", wintypes.LONG),
+                        ("dy", wintypes.LONG),
+                        ("mouseData", wintypes.DWORD),
+                        ("dwFlags", wintypes.DWORD),
+                        ("time", wintypes.DWORD),
+                        ("dwExtraInfo", ctypes.c_size_t)]
+
+        class HARDWAREINPUT(ctypes.Structure):
+            _fields_ = [("uMsg", wintypes.DWORD),
+                        ("wParamL", wintypes.WORD),
+                        ("wParamH", wintypes.WORD)]
+
+        class _INPUTUNION(ctypes.Union):
+            _fields_ = [("mi", MOUSEINPUT),
+                        ("ki", KEYBDINPUT),
+                        ("hi", HARDWAREINPUT)]
+
+        class INPUT(ctypes.Structure):
+            _fields_ = [("type", wintypes.DWORD),
+                        ("union", _INPUTUNION)]
+
+        self._ctypes = ctypes
+        self._input_type = INPUT
+        self._send_input = ctypes.windll.user32.SendInput
+        self._send_input.argtypes = (wintypes.UINT, ctypes.POINTER(INPUT), ctypes.c_int)
+        self._send_input.restype = wintypes.UINT
+
+    def build_inputs(self, events):
+        """
+        预先构建INPUT数组
+        :param events: ((vk, is_key_up), ...)
+        :return: ctypes INPUT数组
+        """
+        inputs = (self._input_type * len(events))()
+        for i, (vk, is_key_up) in enumerate(events):
+            inputs[i].type = self.INPUT_KEYBOARD
+            inputs[i].union.ki.wVk = vk
+            inputs[i].union.ki.dwFlags = self.KEYEVENTF_KEYUP if is_key_up else 0
+        return inputs
+
+    def send(self, events):
+        if not events:
+            return
+        inputs = self.build_inputs(events)
+        sent = self._send_input(len(events), inputs, self._ctypes.sizeof(self._input_type))
+        if sent != len(events):
+            error_code = self._ctypes.GetLastError()
+            raise Exception(f"SendInput 注入按键失败，已注入 {sent}/{len(events)} 个事件，错误码：{error_code}")
+
+
+class RecordingInjector(KeyInjector):
+    """只记录按键事件的注入器（用于测试）"""
+
+    def __init__(self):
+        self.calls = []     # 每次send提交的事件批次
+
+    @property
+    def events(self):
+        """按提交顺序展开的全部事件"""
+        return [event for batch in self.calls for event in batch]
+
+    def send(self, events):
+        if events:
+            self.calls.append(tuple(events))
+
+
+def inject_batches(injector, batches, sleep=time.sleep):
+    """
+    依次提交按键批次
+    :param injector: KeyInjector
+    :param batches: key_compiler.build_batches 的结果
+    :param sleep: 等待函数（测试时可替换）
+    """
+    for events, delay in batches:
+        if events:
+            injector.send(events)
+        if delay > 0:
+            sleep(delay)
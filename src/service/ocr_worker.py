@@ -0,0 +1,105 @@
+"""
+OCR工作进程
+常驻子进程，通过管道接收PNG图片字节，返回 (文本, 置信度, 错误信息)
+
+- 引擎在进程内常驻（需要安装tesserocr），识别不再启动任何外部进程
+- 引擎创建失败时通过 tesseract 的 stdin/stdout 识别，图片不落盘
+- 未安装tesserocr时不启动工作进程，由主进程直接调用 recognize_with_cli（见 tesserocr_available）
+
+注意：本模块会在子进程中被导入，只能依赖标准库（PIL/tesserocr按需导入）
+"""
+
+import importlib.util
+import io
+import os
+import subprocess
+
+# 与原先 pytesseract 的 '--psm 6 digits' 一致，额外输出tsv以获得置信度
+CLI_ARGS = ['--psm', '6', 'digits', 'tsv']
+
+
+def parse_tsv(tsv):
+    """
+    解析tesseract的tsv输出
+    :return: (文本, 置信度0~1)，置信度取各单词的最小值
+    """
+    words, confidences = [], []
+    for line in tsv.splitlines()[1:]:
+        columns = line.split('\t')
+        if len(columns) < 12:
+            continue
+        try:
+            confidence = float(columns[10])
+        except ValueError:
+            continue
+        text = columns[11].strip()
+        if confidence >= 0 and text:
+            words.append(text)
+            confidences.append(confidence)
+    if not words:
+        return '', 0.0
+    return ''.join(words), min(confidences) / 100.0
+
+
+def recognize_with_cli(tesseract_cmd, png_bytes, timeout=10):
+    """通过tesseract命令行识别（图片经stdin传入）"""
+    result = subprocess.run(
+        [tesseract_cmd, 'stdin', 'stdout'] + CLI_ARGS,
+        input=png_bytes,
+        capture_output=True,
+        timeout=timeout,
+        creationflags=getattr(subprocess, 'CREATE_NO_WINDOW', 0)
+    )
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.decode('utf-8', 'ignore').strip() or f"tesseract退出码{result.returncode}")
+    return parse_tsv(result.stdout.decode('utf-8', 'ignore'))
+
+
+def tesserocr_available():
+    """是否安装了tesserocr（只查找模块，不导入）"""
+    return importlib.util.find_spec('tesserocr') is not None
+
+
+def _create_engine(tesseract_cmd):
+    """创建常驻的tesserocr引擎，未安装时返回None"""
+    try:
+        from tesserocr import PyTessBaseAPI, PSM
+    except ImportError:
+        return None
+    tessdata_dir = os.path.join(os.path.dirname(tesseract_cmd), 'tessdata')
+    api = PyTessBaseAPI(path=tessdata_dir, psm=PSM.SINGLE_BLOCK)
+    api.SetVariable('tessedit_char_whitelist', '0123456789')
+    return api
+
+
+def worker_main(conn, tesseract_cmd):
+    """
+    工作进程入口
+    :param conn: multiprocessing管道的子进程端，收到空字节串时退出
+    :param tesseract_cmd: tesseract可执行文件路径
+    """
+    try:
+        api = _create_engine(tesseract_cmd)
+    except Exception:
+        api = None
+
+    while True:
+        try:
+            png_bytes = conn.recv_bytes()
+        except (EOFError, OSError):
+            break
+        if not png_bytes:
+            break
+        try:
+            if api is not None:
+                from PIL import Image
+                api.SetImage(Image.open(io.BytesIO(png_bytes)))
+                text, confidence = api.GetUTF8Text(), api.MeanTextConf() / 100.0
+            else:
+                text, confidence = recognize_with_cli(tesseract_cmd, png_bytes)
+            conn.send((text, confidence, None))
+        except Exception as e:
+            conn.send(('', 0.0, str(e)))
+
+    if api is not None:
+        api.End()
@@ -0,0 +1,334 @@
+"""
+下单执行引擎
+所有驱动同花顺GUI的操作都提交到同一个有界队列，由唯一的工作线程串行执行，
+避免多个HTTP请求线程同时操作GUI导致按键交错、下单错乱
+
+特性:
+1. 有界队列 - 队列满时立即拒绝，而不是让请求线程无限堆积
+2. 票据 - 提交后返回带编号的票据(OrderTicket)，调用方可等待结果或稍后查询；
+   等待超时时尚未开始执行的任务会被取消，避免客户端重试后重复下单
+3. 合并激活 - 连续排队、且都需要激活窗口的任务只激活一次
+4. 指标 - 队列深度、排队等待时间、执行时间
+5. 追踪 - 提交时复制调用方的上下文（contextvars），任务在该上下文中执行，
+   工作线程中记录的span挂到提交方（如HTTP请求）的trace下
+"""
+
+import contextvars
+import itertools
+import queue
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+from dataclasses import dataclass, field
+from src.util.logger import Logger
+from src.util.tracing import Tracer
+
+
+class GuiBackend:
+    """GUI后端接口，由执行器的工作线程独占使用"""
+
+    def activate(self):
+        """激活目标窗口（需要激活的任务执行前调用）"""
+        raise NotImplementedError
+
+
+class ThsGuiBackend(GuiBackend):
+    """同花顺客户端后端"""
+
+    def __init__(self, controller, window_service):
+        """
+        :param controller: AutomationController
+        :param window_service: 工作线程使用的WindowService
+        """
+        self.controller = controller
+        self.window_service = window_service
+
+    def activate(self):
+        hwnd = self.controller.handle_activate_window()
+        self.window_service.wait_for_foreground(hwnd)
+        return hwnd
+
+
+class FakeGuiBackend(GuiBackend):
+    """
+    模拟GUI后端（用于非Windows环境测试）
+    :param activate_delay: 每次激活耗时（秒）
+    :param action_delay: 每个动作耗时（秒）
+    """
+
+    def __init__(self, activate_delay=0.0, action_delay=0.0):
+        self.activate_delay = activate_delay
+        self.action_delay = action_delay
+        self.activations = 0
+        self.actions = []
+
+    def activate(self):
+        if self.activate_delay:
+            time.sleep(self.activate_delay)
+        self.activations += 1
+
+    def perform(self, name):
+        """执行一个模拟动作并记录"""
+        if self.action_delay:
+            time.sleep(self.action_delay)
+        self.actions.append(name)
+        return name
+
+
+@dataclass
+class OrderTicket:
+    """任务票据"""
+    ticket_id: int
+    name: str
+    action: object
+    activate: bool
+    future: Future = field(default_factory=Future)
+    context: contextvars.Context = field(default_factory=contextvars.copy_context)
+    submitted_at: float = field(default_factory=time.monotonic)
+    started_at: float = None
+    finished_at: float = None
+
+    def result(self, timeout=None):
+        """等待并返回任务结果（任务异常会在此处重新抛出）"""
+        return self.future.result(timeout=timeout)
+
+    def to_dict(self):
+        """票据状态（用于查询接口）"""
+        if self.future.cancelled():
+            status = 'cancelled'
+        elif self.future.done():
+            status = 'failed' if self.future.exception() else 'done'
+        elif self.started_at is not None:
+            status = 'running'
+        else:
+            status = 'queued'
+
+        data = {"ticket": self.ticket_id, "name": self.name, "status": status}
+        if self.started_at is not None:
+            data["wait_ms"] = round((self.started_at - self.submitted_at) * 1000, 2)
+        if self.finished_at is not None:
+            data["service_ms"] = round((self.finished_at - self.started_at) * 1000, 2)
+        if status == 'failed':
+            data["error"] = str(self.future.exception())
+        return data
+
+
+class OrderExecutor:
+    """单写者下单执行器"""
+
+    MAX_TRACKED_TICKETS = 1000  # 最多保留的历史票据数量
+
+    def __init__(self, backend, max_queue_size=64, name="Order-Executor"):
+        """
+        :param backend: GuiBackend，工作线程独占
+        :param max_queue_size: 队列最大长度，超过时拒绝新任务
+        :param name: 工作线程名称
+        """
+        self.backend = backend
+        self.max_queue_size = max_queue_size
+        self.name = name
+        self.logger = Logger.get_instance()
+        self.tracer = Tracer.get_instance()
+
+        self._queue = queue.Queue(maxsize=max_queue_size)
+        self._ids = itertools.count(1)
+        self._tickets = OrderedDict()
+        self._tickets_lock = threading.Lock()
+        self._thread = None
+        self._running = False
+
+        self.stats = {
+            'submitted': 0,
+            'completed': 0,
+            'failed': 0,
+            'rejected': 0,
+            'cancelled': 0,
+            'activations': 0,
+            'coalesced_activations': 0,
+            'total_wait_ms': 0.0,
+            'max_wait_ms': 0.0,
+            'total_service_ms': 0.0,
+            'max_service_ms': 0.0
+        }
+        self.stats_lock = threading.Lock()
+
+    def start(self):
+        """启动工作线程"""
+        if self._running:
+            return
+        self._running = True
+        self._thread = threading.Thread(target=self._worker_loop, daemon=True, name=self.name)
+        self._thread.start()
+
+    def stop(self, timeout=5):
+        """
+        停止工作线程（已排队的任务会先执行完）
+        :param timeout: 最长等待时间（秒）；队列一直是满的时，取消仍在排队的任务
+        """
+        if not self._running:
+            return
+        self._running = False
+        deadline = time.monotonic() + timeout
+        try:
+            self._queue.put(None, timeout=timeout)
+        except queue.Full:
+            cancelled = 0
+            while True:
+                cancelled += self._cancel_queued()
+                try:
+                    self._queue.put_nowait(None)
+                    break
+                except queue.Full:
+                    # 取消期间又有任务提交进来，继续取消
+                    continue
+            self.logger.add_log(f"{self.name} 停止时队列已满，已取消 {cancelled} 个排队中的任务")
+        if self._thread:
+            self._thread.join(max(0, deadline - time.monotonic()))
+
+    def _cancel_queued(self):
+        """取出并取消所有排队中的任务，返回取消的数量"""
+        cancelled = 0
+        while True:
+            try:
+                ticket = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if ticket is not None and ticket.future.cancel():
+                cancelled += 1
+        with self.stats_lock:
+            self.stats['cancelled'] += cancelled
+        return cancelled
+
+    def submit(self, action, name=None, activate=False):
+        """
+        提交任务
+        :param action: 可调用对象，签名为 action(backend)
+        :param name: 任务名称（用于查询和日志）
+        :param activate: 执行前是否需要激活目标窗口
+        :return: OrderTicket
+        :raises Exception: 队列已满
+        """
+        ticket = OrderTicket(
+            ticket_id=next(self._ids),
+            name=name or getattr(action, '__name__', 'task'),
+            action=action,
+            activate=activate
+        )
+        try:
+            self._queue.put_nowait(ticket)
+        except queue.Full:
+            with self.stats_lock:
+                self.stats['rejected'] += 1
+            raise Exception(f"下单队列已满({self.max_queue_size})，请稍后重试")
+
+        with self.stats_lock:
+            self.stats['submitted'] += 1
+        with self._tickets_lock:
+            self._tickets[ticket.ticket_id] = ticket
+            while len(self._tickets) > self.MAX_TRACKED_TICKETS:
+                self._tickets.popitem(last=False)
+        return ticket
+
+    def execute(self, action, name=None, activate=False, timeout=30):
+        """
+        提交任务并等待结果
+        :param timeout: 最长等待时间（秒），包括排队时间
+        :return: 任务返回值
+        """
+        return self.wait(self.submit(action, name=name, activate=activate), timeout=timeout)
+
+    def wait(self, ticket, timeout=30):
+        """
+        等待票据的结果；超时时取消尚未开始执行的任务
+        :param timeout: 最长等待时间（秒）
+        :return: 任务返回值
+        :raises TimeoutError: 等待超时（任务已取消，或已在执行中无法取消）
+        """
+        try:
+            return ticket.result(timeout=timeout)
+        except FutureTimeoutError:
+            if ticket.future.cancel():
+                message = f"任务[{ticket.ticket_id}:{ticket.name}]排队超过{timeout}秒，已取消"
+            else:
+                message = f"任务[{ticket.ticket_id}:{ticket.name}]执行超过{timeout}秒，仍在执行中"
+            self.logger.add_log(message)
+            raise FutureTimeoutError(message) from None
+
+    def get_ticket(self, ticket_id):
+        """查询票据，不存在（或已被淘汰）返回None"""
+        with self._tickets_lock:
+            return self._tickets.get(ticket_id)
+
+    def get_stats(self):
+        """获取执行器指标"""
+        with self.stats_lock:
+            stats = self.stats.copy()
+
+        finished = stats['completed'] + stats['failed']
+        stats['queue_depth'] = self._queue.qsize()
+        stats['max_queue_size'] = self.max_queue_size
+        stats['avg_wait_ms'] = round(stats['total_wait_ms'] / finished, 2) if finished else 0
+        stats['avg_service_ms'] = round(stats['total_service_ms'] / finished, 2) if finished else 0
+        for key in ('total_wait_ms', 'max_wait_ms', 'total_service_ms', 'max_service_ms'):
+            stats[key] = round(stats[key], 2)
+        return stats
+
+    def _worker_loop(self):
+        """工作线程：串行执行队列中的任务"""
+        # 上一个任务是否已激活窗口；只有连续排队的任务才能复用，空闲期间焦点可能被用户切走
+        activated = False
+        while True:
+            try:
+                ticket = self._queue.get_nowait()
+            except queue.Empty:
+                activated = False
+                ticket = self._queue.get()
+            if ticket is None:
+                break
+            if not ticket.future.set_running_or_notify_cancel():
+                # 等待方已超时取消
+                with self.stats_lock:
+                    self.stats['cancelled'] += 1
+                continue
+
+            ticket.started_at = time.monotonic()
+            try:
+                if ticket.activate and activated:
+                    with self.stats_lock:
+                        self.stats['coalesced_activations'] += 1
+                # 在提交方的上下文中执行
+                result = ticket.context.run(self._run_ticket, ticket, ticket.activate and not activated)
+                # 不需要激活的任务可能切换了前台窗口，下一个任务需重新激活
+                activated = ticket.activate
+                ticket.finished_at = time.monotonic()
+                ticket.future.set_result(result)
+                self._record(ticket, failed=False)
+            except Exception as e:
+                activated = False
+                ticket.finished_at = time.monotonic()
+                ticket.future.set_exception(e)
+                self._record(ticket, failed=True)
+                self.logger.add_log(f"任务执行失败[{ticket.ticket_id}:{ticket.name}]: {str(e)}")
+
+    def _run_ticket(self, ticket, activate):
+        """执行任务（需要时先激活窗口），排队时间记录在span属性中"""
+        wait_ms = round((ticket.started_at - ticket.submitted_at) * 1000, 2)
+        with self.tracer.span(f"OrderExecutor.{ticket.name}", ticket=ticket.ticket_id, wait_ms=wait_ms):
+            if activate:
+                with self.tracer.span('OrderExecutor.activate'):
+                    self.backend.activate()
+                with self.stats_lock:
+                    self.stats['activations'] += 1
+            return ticket.action(self.backend)
+
+    def _record(self, ticket, failed):
+        """记录任务的排队和执行耗时"""
+        wait_ms = (ticket.started_at - ticket.submitted_at) * 1000
+        service_ms = (ticket.finished_at - ticket.started_at) * 1000
+        with self.stats_lock:
+            self.stats['failed' if failed else 'completed'] += 1
+            self.stats['total_wait_ms'] += wait_ms
+            self.stats['max_wait_ms'] = max(self.stats['max_wait_ms'], wait_ms)
+            self.stats['total_service_ms'] += service_ms
+            self.stats['max_service_ms'] = max(self.stats['max_service_ms'], service_ms)
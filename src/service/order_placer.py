@@ -0,0 +1,148 @@
+"""
+闪电下单
+发送 代码+买卖快捷键 调起下单弹窗，填写数量后点击确认；批量下单时整批只激活一次窗口
+
+弹窗校验: 按键通过SendInput异步提交，发送后上一笔的弹窗可能仍在关闭中。每笔（单笔和批量相同）先等待上一笔的弹窗关闭
+再发送按键，并且只在句柄不同于上一笔的新弹窗中填写数量和确认，避免把数量填进旧弹窗；
+上一笔的弹窗记录在OrderPlacer实例上，执行器连续执行的两个 /xiadan 请求之间同样生效
+"""
+
+from src.util.logger import Logger
+from src.util.tracing import traced
+from src.util.wait import wait_until, WaitTimeoutError
+
+
+class OrderPlacer:
+    """闪电下单操作（需在下单执行器的工作线程中调用）"""
+
+    # 下单弹窗查找参数
+    DIALOG_PARAMS = {'class_name': '#32770', 'title': ''}
+    # 买卖方向对应的键盘精灵快捷键：1 闪电买入，2 闪电卖出
+    STATUS_KEYS = {'1': '21', '2': '23'}
+    # 等待上一笔弹窗关闭、本笔弹窗出现的最长时间（秒）
+    DIALOG_TIMEOUT = 2.0
+    DIALOG_POLL_INTERVAL = 0.05
+
+    def __init__(self, window_service):
+        """
+        :param window_service: WindowService（或提供相同方法的对象）
+        """
+        self.window_service = window_service
+        self.logger = Logger.get_instance()
+        # 上一笔使用的下单弹窗（只在执行器的工作线程中读写）
+        self._last_dialog = None
+
+    @classmethod
+    def build_keys(cls, code, status):
+        """
+        构造下单按键串，例如 '600000 ENTER 21 ENTER'
+        :param code: 股票代码
+        :param status: 1 闪电买入，2 闪电卖出，其它值只输入代码
+        """
+        keys = code + ' ENTER '
+        if status in cls.STATUS_KEYS:
+            keys = keys + cls.STATUS_KEYS[status] + ' ENTER'
+        return keys
+
+    @traced(root=True)
+    def place(self, code, status, amount=None):
+        """
+        下单一笔（先等待上一笔的弹窗关闭，且不会再次使用它）
+        :param code: 股票代码
+        :param status: 1 闪电买入，2 闪电卖出
+        :param amount: 数量，可选
+        :return: (按键串, 本次使用的下单弹窗)
+        """
+        previous = self._last_dialog
+        if previous is not None:
+            self._wait_closed(previous)
+
+        keys = self.build_keys(code, status)
+        self.window_service.send_key(keys)
+        dialog = self._wait_for_dialog(self._handle(previous))
+        # 填写或确认失败时弹窗可能仍在显示，下一笔同样要等它关闭
+        self._last_dialog = dialog
+
+        # 如果有amount参数
+        if amount:
+            self.window_service.input_text_to_element(dialog, 1034, str(amount))
+
+        # 下单点击
+        self.window_service.click_element(dialog, 1006)
+        return keys, dialog
+
+    @traced(root=True)
+    def place_batch(self, orders, reactivate=None):
+        """
+        批量下单（调用前已激活窗口，整批只激活一次；每笔只操作本笔按键调起的弹窗）
+        :param orders: [{'code': ..., 'status': ..., 'amount': ...}, ...]
+        :param reactivate: 某笔下单失败后用于恢复窗口焦点的回调，可选
+        :return: 每笔订单的结果列表
+        """
+        results = []
+        for index, order in enumerate(orders):
+            code = str(order.get('code') or '')
+            status = str(order.get('status') or '')
+            amount = order.get('amount')
+            result = {"index": index, "code": code, "status": status, "amount": amount}
+            try:
+                if not code:
+                    raise ValueError("code不能为空")
+                if status not in self.STATUS_KEYS:
+                    raise ValueError("status参数错误,1:闪电买入,2:闪电卖出")
+                keys, _ = self.place(code, status, amount)
+                result.update({"success": True, "message": f"已发送按键 {keys}"})
+            except ValueError as e:
+                result.update({"success": False, "message": str(e)})
+            except Exception as e:
+                self.logger.add_log(f"批量下单第{index + 1}笔失败: {str(e)}")
+                result.update({"success": False, "message": f"下单异常: {str(e)}"})
+                # 界面状态未知，恢复焦点（下一笔仍会等待本笔的弹窗关闭）
+                if reactivate:
+                    try:
+                        reactivate()
+                    except Exception as e2:
+                        self.logger.add_log(f"批量下单恢复窗口焦点失败: {str(e2)}")
+            results.append(result)
+        return results
+
+    def _wait_closed(self, dialog):
+        """等待上一笔的弹窗关闭，超时抛出异常（此时还未发送本笔按键）"""
+        try:
+            wait_until(lambda: not self._is_open(dialog),
+                       timeout=self.DIALOG_TIMEOUT, interval=self.DIALOG_POLL_INTERVAL)
+        except WaitTimeoutError as e:
+            raise Exception(f"上一笔的下单弹窗未关闭: {str(e)}")
+
+    def _wait_for_dialog(self, previous_handle):
+        """等待本笔按键调起的下单弹窗（句柄不同于上一笔的弹窗）"""
+        def new_dialog():
+            dialog = self.window_service.get_target_window(self.DIALOG_PARAMS, retries=1, delay=0)
+            if dialog is None or not self._is_open(dialog):
+                return None
+            if previous_handle is not None and self._handle(dialog) == previous_handle:
+                return None
+            return dialog
+
+        try:
+            return wait_until(new_dialog, timeout=self.DIALOG_TIMEOUT, interval=self.DIALOG_POLL_INTERVAL)
+        except WaitTimeoutError as e:
+            raise Exception(f"未找到下单弹窗: {str(e)}")
+
+    @staticmethod
+    def _handle(dialog):
+        """弹窗的窗口句柄"""
+        if dialog is None:
+            return None
+        try:
+            return dialog.handle
+        except Exception:
+            return None
+
+    @staticmethod
+    def _is_open(dialog):
+        """弹窗是否仍在显示（已销毁的窗口访问属性会抛异常）"""
+        try:
+            return bool(dialog.is_visible())
+        except Exception:
+            return False
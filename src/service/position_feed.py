@@ -0,0 +1,116 @@
+"""
+持仓变更流
+保存上一次解析的持仓（按证券代码索引），每次刷新后计算增量，下游通过游标只拉取变化部分
+
+变更事件:
+- added:   新增持仓，fields为整行数据
+- removed: 持仓清空，fields为被移除前的整行数据
+- changed: 持仓变化，fields只包含发生变化的字段（新值）
+
+游标格式为 "<纪元>:<序号>"，纪元在每个进程（每个变更流实例）启动时随机生成，
+服务重启后旧游标的纪元不匹配，返回全量同步，而不是把新进程从0开始的序号误认为有效游标
+"""
+
+import secrets
+import threading
+import time
+from collections import deque
+
+
+class PositionChangeFeed:
+    """持仓变更流（线程安全）"""
+
+    def __init__(self, key_field='证券代码', max_events=2000):
+        """
+        :param key_field: 用于标识一行持仓的字段
+        :param max_events: 最多保留的变更事件数量，游标早于保留范围时需要全量同步
+        """
+        self.key_field = key_field
+        self._holdings = {}                         # 证券代码 -> 行数据
+        self._events = deque(maxlen=max_events)
+        self._seq = 0
+        self.epoch = secrets.token_hex(4)
+        self._lock = threading.Lock()
+
+    def update(self, rows):
+        """
+        用最新的持仓数据计算增量
+        :param rows: 持仓行列表（dict）
+        :return: 本次产生的变更事件列表
+        """
+        holdings = {}
+        for row in rows:
+            code = row.get(self.key_field)
+            if code:
+                holdings[code] = row
+
+        now = time.time()
+        with self._lock:
+            events = []
+            for code, row in holdings.items():
+                previous = self._holdings.get(code)
+                if previous is None:
+                    events.append(self._event('added', code, dict(row), now))
+                else:
+                    changed = {k: v for k, v in row.items() if previous.get(k) != v}
+                    changed.update({k: None for k in previous if k not in row})
+                    if changed:
+                        events.append(self._event('changed', code, changed, now))
+            for code, row in self._holdings.items():
+                if code not in holdings:
+                    events.append(self._event('removed', code, dict(row), now))
+
+            self._holdings = holdings
+            self._events.extend(events)
+            return events
+
+    def changes_since(self, cursor=None):
+        """
+        获取游标之后的变更
+        :param cursor: 上次返回的游标（"<纪元>:<序号>"），不传表示首次同步
+        :return: dict
+            cursor:   最新游标，下次请求时带上
+            reset:    为True时表示游标无效（首次同步、格式错误、已过期或服务重启），需用snapshot全量替换本地数据
+            changes:  变更事件列表
+            snapshot: 全量持仓（仅reset时返回）
+        """
+        seq = self._parse_cursor(cursor)
+        with self._lock:
+            current = f"{self.epoch}:{self._seq}"
+            oldest = self._events[0]['seq'] if self._events else self._seq + 1
+            valid = seq is not None and oldest - 1 <= seq <= self._seq
+            if not valid:
+                return {
+                    "cursor": current,
+                    "reset": True,
+                    "changes": [],
+                    "snapshot": list(self._holdings.values())
+                }
+            return {
+                "cursor": current,
+                "reset": False,
+                "changes": [e for e in self._events if e['seq'] > seq]
+            }
+
+    def _parse_cursor(self, cursor):
+        """解析游标，纪元不匹配或格式错误时返回None"""
+        if not cursor:
+            return None
+        epoch, _, seq = str(cursor).partition(':')
+        if epoch != self.epoch:
+            return None
+        try:
+            return int(seq)
+        except ValueError:
+            return None
+
+    def _event(self, change_type, code, fields, timestamp):
+        """生成一个变更事件（调用方需持有锁）"""
+        self._seq += 1
+        return {
+            "seq": self._seq,
+            "type": change_type,
+            "code": code,
+            "fields": fields,
+            "timestamp": timestamp
+        }
@@ -1,11 +1,15 @@
 import os
 import threading
-import time
+from functools import partial
 import pytesseract
-from PIL import Image
 from src.util.logger import Logger
+from src.service.captcha_solver import CaptchaSolver, captcha_fingerprint
 from src.service.window_service import WindowService
 from src.models.app_model import AppModel
+from src.service.position_feed import PositionChangeFeed
+from src.util.table_parser import iter_rows
+from src.util.wait import wait_until, WaitTimeoutError
+from src.util.tracing import traced
 
 class PositionService:
     # 类级别的OCR初始化标志和锁
@@ -16,6 +20,8 @@ class PositionService:
         self.window_service = WindowService()
         self.model = AppModel()
         self.logger = Logger()
+        # 持仓变更流：保存上一次的持仓，每次获取持仓后计算增量
+        self.change_feed = PositionChangeFeed()
 
         # 设置tesseract路径(快速操作，不耗时)
         self._setup_tesseract_path()
@@ -34,6 +40,16 @@ class PositionService:
             self.logger.add_log(f"Tesseract路径已设置: {pytesseract.pytesseract.tesseract_cmd}")
         except Exception as e:
             self.logger.add_log(f"设置tesseract路径失败: {str(e)}")
+        # 所有实例共用一个验证码识别器（及其OCR引擎）
+        captcha_config = self.model.get_captcha_config()
+        self.captcha_solver = CaptchaSolver.get_instance(
+            pytesseract.pytesseract.tesseract_cmd,
+            templates_path=captcha_config.get('templates_path'),
+            min_margin=captcha_config.get('min_margin', 0.1),
+            ocr_workers=captcha_config.get('ocr_workers', 2)
+        )
+        self.captcha_max_rounds = captcha_config.get('max_rounds', 3)
+        self.captcha_max_candidates = captcha_config.get('max_candidates', 2)
 
     def _warmup_ocr(self):
         """后台预热OCR引擎（耗时操作）"""
@@ -44,11 +60,8 @@ class PositionService:
             try:
                 self.logger.add_log("开始OCR引擎预热...")
 
-                # 创建一个小的测试图片(10x10白色图片)
-                test_image = Image.new('RGB', (10, 10), color='white')
-
-                # 执行一次OCR操作进行预热
-                pytesseract.image_to_string(test_image, config='--psm 6 digits')
+                # 启动OCR引擎并识别一张空白图片
+                self.captcha_solver.warmup()
 
                 PositionService._ocr_warmed_up = True
                 self.logger.add_log("OCR引擎预热完成")
@@ -58,14 +71,6 @@ class PositionService:
                 import traceback
                 self.logger.add_log(f"详细错误: {traceback.format_exc()}")
 
-    def _get_captcha_image_path(self) -> str:
-        """获取验证码图片保存路径"""
-        # 创建cache目录
-        cache_dir = self.model.get_cache_dir()
-        os.makedirs(cache_dir, exist_ok=True)
-        # 返回图片路径
-        return os.path.join(cache_dir, "image.png")
-
     def _click_button(self, window, control_id: int) -> bool:
         """模拟点击按钮"""
         button_result = self.window_service.find_element_in_window(window, control_id)
@@ -74,15 +79,166 @@ class PositionService:
             return True
         return False
 
-    def _verify_captcha_input(self, window, control_id=2406) -> bool:
-        """监测验证码输入是否成功"""
-        # 获取验证码输入框
-        input_result = self.window_service.find_element_in_window(window, control_id)
-        if input_result:
-            # 存在说输入错误
-            return False
-        return True
+    @traced()
+    def _focus_trading_window(self, window):
+        """点击交易窗口(达到聚焦效果，否则快捷键会失效)，并等待其进入前台"""
+        window.click_input()
+        self.window_service.wait_for_foreground(window.handle)
+
+    @traced()
+    def _copy_table(self, window, timeout=3.0):
+        """
+        复制表格内容到剪切板，等待复制完成或验证码弹窗出现
+        Args:
+            window: 交易窗口
+            timeout: 最长等待时间(秒)
+        Returns:
+            验证码图片元素，没有验证码弹窗时返回None
+        """
+        # 先清空剪切板，剪切板非空即表示复制完成
+        self.window_service.clear_clipboard()
+        self.window_service.send_key('{CTRL+C}')
+
+        def copy_settled():
+            if self.window_service.get_clipboard(retries=1):
+                return ('clipboard', None)
+            image = self.window_service.find_element_in_window(window, 2405)
+            if image is not None:
+                return ('captcha', image)
+            return None
+
+        try:
+            _, image = wait_until(copy_settled, timeout=timeout, interval=0.05)
+            return image
+        except WaitTimeoutError:
+            # 既没有数据也没有验证码，交由读取剪切板的步骤报告错误
+            self.logger.add_log("等待复制结果超时")
+            return None
+
+    def _error_shown(self, window, control_id=2406, refresh=False) -> bool:
+        """验证码错误提示是否正在显示"""
+        return self.window_service.find_element_in_window(window, control_id, visible=True, refresh=refresh) is not None
+
+    def _verify_captcha_input(self, window, error_before, control_id=2406, timeout=1.0) -> bool:
+        """
+        监测验证码输入是否成功（本次提交后出现错误提示即失败，验证码弹窗关闭即成功）
+        Args:
+            window: 交易窗口
+            error_before: 提交前错误提示是否已在显示（上一个候选留下的）
+        """
+        shown = error_before
+
+        def outcome():
+            nonlocal shown
+            if self.window_service.find_element_in_window(window, 2405) is None:
+                return 'closed'
+            # 只认本次提交后的变化：提示出现即错误；上一次的提示消失后再出现也算
+            visible = self._error_shown(window, control_id)
+            if visible and not shown:
+                return 'error'
+            shown = visible
+            return None
+
+        try:
+            return wait_until(outcome, timeout=timeout, interval=0.05) == 'closed'
+        except WaitTimeoutError:
+            # 弹窗仍在，沿用原先的判断：错误提示显示中即失败（上一次的提示未消失也算本次错误）
+            return not self._error_shown(window, control_id)
+
+    @traced()
+    def _submit_captcha(self, window, text) -> bool:
+        """输入验证码并点击确定，返回是否通过"""
+        try:
+            # 清空上一个候选留下的内容
+            self.window_service.input_text_to_element(window, 2404, text, clear=True)
+        except Exception as e:
+            self.logger.add_log(f"输入验证码失败: {str(e)}")
+            raise Exception(f"输入验证码失败: {str(e)}")
+        # 提交前重新遍历控件树，记录错误提示当前是否显示（缓存中可能还留着上一次的错误提示）
+        error_before = self._error_shown(window, refresh=True)
+        if not self._click_button(window, 1):
+            raise Exception("未找到验证码确定按钮")
+        return self._verify_captcha_input(window, error_before)
+
+    @traced()
+    def _refresh_captcha(self, window, image_element, old_hash, timeout=2.0):
+        """
+        点击验证码图片换一张，等待图片变化
+        Returns:
+            新的验证码图片元素，弹窗已关闭或图片未变化时返回None
+        """
+        image_element.click_input()
+
+        def changed():
+            element = self.window_service.find_element_in_window(window, 2405)
+            if element is None:
+                return ('closed', None)
+            if captcha_fingerprint(element.capture_as_image()) != old_hash:
+                return ('changed', element)
+            return None
+
+        try:
+            _, element = wait_until(changed, timeout=timeout, interval=0.1)
+            return element
+        except WaitTimeoutError:
+            self.logger.add_log("刷新验证码超时")
+            return None
+
+    @traced()
+    def _pass_captcha(self, window, image_element) -> bool:
+        """
+        通过验证码：识别出多个候选，按可信度依次提交；
+        候选都失败后刷新验证码重新识别，最多 captcha_max_rounds 轮
+        Args:
+            window: 交易窗口
+            image_element: 验证码图片元素
+        Returns:
+            是否通过
+        """
+        attempts = 0
+        for round_index in range(self.captcha_max_rounds):
+            image = image_element.capture_as_image()
+            candidates = self.captcha_solver.candidates(image)
+            self.logger.add_log(
+                f"验证码第{round_index + 1}轮候选: " +
+                (", ".join(f"{c.text}({c.source}/{c.variant}, 票数{c.votes}, 置信度{c.confidence:.2f})" for c in candidates) or "无") +
+                (f", 耗时{candidates[0].elapsed_ms:.1f}ms" if candidates else "")
+            )
+            image_hash = candidates[0].image_hash if candidates else captcha_fingerprint(image)
+
+            for candidate in candidates[:self.captcha_max_candidates]:
+                attempts += 1
+                if self._submit_captcha(window, candidate.text):
+                    self.captcha_solver.remember(candidate)
+                    self.captcha_solver.record_session(True, attempts)
+                    return True
+                self.logger.add_log(f"验证码输入错误: {candidate.text}")
+                self.captcha_solver.forget(candidate)
+                image_element = self.window_service.find_element_in_window(window, 2405)
+                if image_element is None:
+                    break
+                if captcha_fingerprint(image_element.capture_as_image()) != image_hash:
+                    # 交易端已换了一张验证码，剩下的候选作废
+                    break
+            else:
+                # 候选用完（或没有候选），主动刷新验证码
+                image_element = self._refresh_captcha(window, image_element, image_hash)
+
+            if image_element is None:
+                break
+
+        self.captcha_solver.record_session(False, attempts)
+        # 点击取消按钮
+        self._click_button(window, 2)
+        return False
+
+    def _read_copied_table(self, window, image_element):
+        """读取复制出的表格，弹出了验证码时先通过验证码"""
+        if image_element is not None and not self._pass_captcha(window, image_element):
+            raise Exception("验证码输入错误")
+        return self._get_clipboard_data()
 
+    @traced(root=True)
     def get_position(self):
         """获取当前持仓"""
         # 先激活程序
@@ -103,121 +259,46 @@ class PositionService:
             raise Exception("未找到交易窗口")
 
         #点击下窗口(达到聚焦效果，否则快捷键会失效)
-        window_result.click_input()
+        self._focus_trading_window(window_result)
 
-        time.sleep(0.3)
+        # 表格控件在切换前就已存在，记下当前显示的内容，以内容变化判断刷新完成
+        read_grid = partial(self.window_service.element_fingerprint, window_result, 1047)
+        before = read_grid()
 
         # 先刷新数据，确保获取最新持仓信息
         self.window_service.send_key('F5')
-        time.sleep(0.3)
 
         # 快捷键操作
         self.window_service.send_key('F4')
 
-
-        # 点击内容区域
+        # 等待表格显示刷新后的数据，再点击内容区域
+        self.window_service.wait_for_content(read_grid, before)
         self.window_service.click_element(window_result, 1047)
-        
-        self.window_service.send_key('{CTRL+C}')
-        # 查找验证码图片元素
-        image_result = self.window_service.find_element_in_window(window_result, 2405)
-        #image_result如果为none，则直接获取剪切板数据
-        if image_result is None:
-            # 如果没有验证码弹窗，可以直接获取剪切板数据
-            data = self._get_clipboard_data()
-            self.logger.add_log(f"剪切板数据1: {data}")
-            return data
-
-        # 获取验证码图片路径
-        image_path = self._get_captcha_image_path()
-        # 保存图片
-        image_result.capture_as_image().save(image_path)
-        self.logger.add_log(f"验证码图片已保存到: {image_path}")
-
-        # 使用 OCR 识别图片内容
-        ocr_text = self._recognize_image_with_ocr(image_path)
-        if not ocr_text:
-            return False
-
-        # 查找验证码输入框并输入验证码
-        try:
-            self.window_service.input_text_to_element(window_result, 2404, ocr_text)
-        except Exception as e:
-            self.logger.add_log(f"输入验证码失败: {str(e)}")
-            raise Exception(f"输入验证码失败: {str(e)}")
-        
-        # 点击确定按钮
-        if self._click_button(window_result, 1):
-            # 检查验证码是否成功
-            if self._verify_captcha_input(window_result):
-                # 获取剪切板数据
-                data = self._get_clipboard_data()
-                self.logger.add_log(f"剪切板数据2: {data}")
-                return data
-            else:
-                self.logger.add_log(f"验证码输入错误")
-                # 点击取消按钮
-                self._click_button(window_result, 2)
-                raise Exception("验证码输入错误")
-        return False
 
-    def _clean_digits(self, text: str) -> str:
-        """清理字符串，只保留数字
-        Args:
-            text: 原始字符串
-        Returns:
-            只包含数字的字符串
-        """
-        return ''.join(filter(str.isdigit, text))
-
-    def _recognize_image_with_ocr(self, image_path: str) -> str:
-        """使用OCR识别图片中的文字"""
-        try:
-            # 打开图片
-            image = Image.open(image_path)
-            # 识别图片中的文字，只识别数字
-            # tesseract路径已在__init__中设置，无需重复设置
-            ocr_text = pytesseract.image_to_string(image, config='--psm 6 digits')
-            # 清理字符串，只保留数字
-            ocr_text = self._clean_digits(ocr_text)
-            self.logger.add_log(f"OCR 识别结果: {ocr_text}")
-            return ocr_text
-        except Exception as e:
-            error_msg = f"OCR 识别失败: {str(e)}"
-            self.logger.add_log(error_msg)
-            return ""
+        # 复制表格，返回验证码图片元素(如果弹出了验证码)
+        image_result = self._copy_table(window_result)
+        data = self._read_copied_table(window_result, image_result)
+        self.logger.add_log(f"剪切板数据: {data}")
+        self.change_feed.update(data)
+        return data
 
+    @traced()
     def _get_clipboard_data(self):
-        """获取剪切板数据"""
-        data = self.window_service.get_clipboard()
+        """获取剪切板数据（复制前已清空剪切板，等待其出现新内容）"""
+        data = self.window_service.wait_for_clipboard_change()
         return self._format_hold_data(data)
 
+    @traced()
     def _format_hold_data(self, table_data: str) -> list[dict]:
         """将表结构数据转换为JSON格式
         Args:
             table_data: 表结构数据，包含表头和内容
         Returns:
-            返回格式化后的JSON数据列表
+            返回格式化后的JSON数据列表（值均为字符串，与原先一致；接口传 typed=1 时再按列转换数值）
         """
-        # 分割表头和内容
-        lines = table_data.splitlines()
-        if len(lines) < 2:
-            return []
-        
-        # 获取表头
-        headers = lines[0].split('\t')
-        # 处理数据行
-        result = []
-        for line in lines[1:]:
-            values = line.split('\t')
-            if len(values) != len(headers):
-                continue
-            # 构建字典
-            item = {headers[i]: values[i] for i in range(len(headers))}
-            result.append(item)
-        
-        return result 
-    
+        return [row.to_dict() for row in iter_rows(table_data)]
+
+    @traced(root=True)
     def get_balance(self):
         """获取资金余额"""
         # 先激活程序
@@ -238,15 +319,7 @@ class PositionService:
             raise Exception("未找到交易窗口")
 
         #点击下窗口(达到聚焦效果，否则快捷键会失效)
-        window_result.click_input()
-        time.sleep(0.3)
-
-        # 先刷新数据，确保获取最新资金信息
-        self.window_service.send_key('F5')
-        time.sleep(0.3)
-
-        # 快捷键操作
-        self.window_service.send_key('F4')
+        self._focus_trading_window(window_result)
 
         # 定义需要获取的字段及其对应的control_id
         balance_fields = {
@@ -261,8 +334,23 @@ class PositionService:
             '当日盈亏比': 1029
         }
 
-        # 批量获取所有control_id对应的元素
         control_ids = list(balance_fields.values())
+
+        def read_panel():
+            # 资金面板在切换前可能已存在（隐藏或显示着刷新前的数值），以可见且数值变化判断就绪
+            if self.window_service.find_element_in_window(window_result, control_ids[0], visible=True) is None:
+                return None
+            return tuple(e.window_text() for e in self.window_service.find_element_in_window(window_result, control_ids))
+        before = read_panel()
+
+        # 先刷新数据，确保获取最新资金信息
+        self.window_service.send_key('F5')
+
+        # 快捷键操作
+        self.window_service.send_key('F4')
+
+        # 等待资金面板显示刷新后的数值，再批量获取所有control_id对应的元素
+        self.window_service.wait_for_content(read_panel, before)
         elements = self.window_service.find_element_in_window(window_result, control_ids)
 
         # 构建结果字典
@@ -279,6 +367,7 @@ class PositionService:
         self.logger.add_log(f"资金余额: {result}")
         return result
 
+    @traced(root=True)
     def get_today_trades(self):
         """获取当日成交"""
         try:
@@ -296,12 +385,11 @@ class PositionService:
             raise Exception("未找到交易窗口")
 
         # 点击窗口(达到聚焦效果，否则快捷键会失效)
-        window_result.click_input()
-        time.sleep(0.3)
+        self._focus_trading_window(window_result)
 
         # 快捷键操作进入查询界面
         self.window_service.send_key('F4')
-        time.sleep(0.1)
+        self.window_service.wait_for_element(window_result, 200)
 
         # 在树形菜单中找到"当日成交"按钮并点击
         # 路径: control_id=200 -> "查询[F4]" -> "当日成交"
@@ -314,58 +402,22 @@ class PositionService:
         if today_trades_button is None:
             raise Exception("未找到'当日成交'按钮")
 
+        # 查询页面的表格控件共用1047，记下点击前显示的内容（可能是其它查询的表格）
+        read_grid = partial(self.window_service.element_fingerprint, window_result, 1047)
+        before = read_grid()
+
         # 点击"当日成交"按钮
         today_trades_button.click_input()
         self.logger.add_log("已点击'当日成交'按钮")
-        time.sleep(0.3)
         # 先刷新数据，确保获取最新成交信息
         self.window_service.send_key('F5')
-        time.sleep(0.1)
 
-        # 点击内容区域
+        # 等待表格显示当日成交，再点击内容区域
+        self.window_service.wait_for_content(read_grid, before)
         self.window_service.click_element(window_result, 1047)
 
-        self.window_service.send_key('{CTRL+C}')
-
-        # 查找验证码图片元素
-        image_result = self.window_service.find_element_in_window(window_result, 2405)
-
-        # 如果没有验证码弹窗，可以直接获取剪切板数据
-        if image_result is None:
-            data = self._get_clipboard_data()
-            self.logger.add_log(f"今日成交数据: {data}")
-            return data
-
-        # 获取验证码图片路径
-        image_path = self._get_captcha_image_path()
-        # 保存图片
-        image_result.capture_as_image().save(image_path)
-        self.logger.add_log(f"验证码图片已保存到: {image_path}")
-
-        # 使用 OCR 识别图片内容
-        ocr_text = self._recognize_image_with_ocr(image_path)
-        if not ocr_text:
-            raise Exception("OCR识别验证码失败")
-
-        # 查找验证码输入框并输入验证码
-        try:
-            self.window_service.input_text_to_element(window_result, 2404, ocr_text)
-        except Exception as e:
-            self.logger.add_log(f"输入验证码失败: {str(e)}")
-            raise Exception(f"输入验证码失败: {str(e)}")
-
-        # 点击确定按钮
-        if self._click_button(window_result, 1):
-            # 检查验证码是否成功
-            if self._verify_captcha_input(window_result):
-                # 获取剪切板数据
-                data = self._get_clipboard_data()
-                self.logger.add_log(f"今日成交数据: {data}")
-                return data
-            else:
-                self.logger.add_log("验证码输入错误")
-                # 点击取消按钮
-                self._click_button(window_result, 2)
-                raise Exception("验证码输入错误")
-
-        raise Exception("获取今日成交失败")
\ No newline at end of file
+        # 复制表格，返回验证码图片元素(如果弹出了验证码)
+        image_result = self._copy_table(window_result)
+        data = self._read_copied_table(window_result, image_result)
+        self.logger.add_log(f"今日成交数据: {data}")
+        return data
@@ -3,19 +3,35 @@
 负责转发HTTP请求到目标服务器,支持连接池复用和缓存
 
 性能优化:
-1. 连接池复用 - 避免重复TCP/SSL握手
-2. 内存缓存 - GET请求结果缓存
-3. 自动重试 - 失败自动重试提升成功率
-4. 线程安全 - 支持多线程并发请求
+1. 连接池复用 - 避免重复TCP/SSL握手;可选HTTP/2上游传输,并发请求在少量连接上多路复用;
+   启动时可预先建立到常用host的连接
+2. 内存缓存 - GET请求结果缓存(LRU + TTL + 总字节数上限,后台清理过期条目)
+   可选的磁盘缓存(SQLite)位于内存缓存之下,重启后仍可命中,写入由后台线程完成
+   按host/路径规则和上游Cache-Control决定缓存时间
+   响应体按上游的压缩格式原样转发和缓存,不同Accept-Encoding分开缓存
+3. 流式转发 - 大响应边收边发,不在内存中缓冲整个响应体;只有小于上限的响应体同时写入缓存
+4. 过期先返回 - 过期后一段时间内先返回旧响应,后台用If-None-Match刷新(未变化时上游只返回304)
+5. 请求合并 - 相同URL的并发GET只转发一次,其余请求等待同一个响应
+6. 自动重试 - 失败自动重试提升成功率
+7. 线程安全 - 支持多线程并发请求
+8. 上游路由 - 只转发允许列表中的host,每个host独立的并发上限、超时和熔断器,上游异常时快速返回503
 """
 
 import requests
+import ssl
 import urllib3
 import threading
-from datetime import datetime, timedelta
+import time
+from concurrent.futures import ThreadPoolExecutor
 from flask import request, Response, jsonify
 from requests.adapters import HTTPAdapter
 from urllib3.util.retry import Retry
+from urllib3.util.ssl_ import create_urllib3_context
+from src.service.cache_policy import CachePolicy, etag_matches, get_header
+from src.service.http2_transport import Http2Transport
+from src.service.response_cache import ResponseCache
+from src.service.single_flight import SingleFlight
+from src.service.upstream_router import UpstreamRejected, UpstreamRouter
 from src.util.logger import Logger
 
 # 禁用SSL证书验证警告
@@ -25,18 +41,46 @@ urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
 class ProxyService:
     """代理服务类 - 负责HTTP请求转发"""
 
-    def __init__(self, cache_ttl=10, pool_connections=100, pool_maxsize=200, max_retries=3):
+    EXCLUDED_REQUEST_HEADERS = {'host', 'content-length', 'transfer-encoding'}
+    # 响应体原样转发(保留content-encoding),长度由框架重新计算,逐跳头不转发
+    EXCLUDED_RESPONSE_HEADERS = {'content-length', 'transfer-encoding', 'connection', 'keep-alive'}
+    STREAM_CHUNK_SIZE = 64 * 1024
+    # 304时用上游的这些头更新缓存条目
+    REVALIDATION_HEADERS = ('cache-control', 'etag', 'expires', 'last-modified', 'date')
+    # 回给客户端的304响应保留的头
+    NOT_MODIFIED_HEADERS = ('cache-control', 'etag', 'expires', 'last-modified')
+
+    def __init__(self, cache_ttl=10, pool_connections=100, pool_maxsize=200, max_retries=3, upstream_scheme='https',
+                 cache_max_entries=1000, cache_max_bytes=64 * 1024 * 1024, cache_policy=None, refresh_workers=4,
+                 stream_threshold=256 * 1024, cache_body_limit=1024 * 1024, disk_cache=None, http2=False,
+                 router=None):
         """
         初始化代理服务
 
         Args:
-            cache_ttl (int): 缓存过期时间(秒),默认10秒
+            cache_ttl (int): 缓存过期时间(秒),默认10秒(未传cache_policy时使用)
             pool_connections (int): 每个host的连接池数量,默认100
             pool_maxsize (int): 最大并发连接数,默认200
             max_retries (int): 失败重试次数,默认3次
+            upstream_scheme (str): 转发使用的协议,默认https(压测时可指向本地http桩服务)
+            cache_max_entries (int): 最多缓存的响应数,默认1000
+            cache_max_bytes (int): 缓存响应的总大小上限(字节),默认64MB
+            cache_policy (CachePolicy): 按host/路径的缓存时间规则,默认所有URL使用cache_ttl
+            refresh_workers (int): 后台刷新过期响应的线程数,默认4
+            stream_threshold (int): 响应体超过该大小(字节)时流式转发,默认256KB
+            cache_body_limit (int): 写入缓存的响应体大小上限(字节),默认1MB
+            disk_cache (DiskCache): 内存缓存之下的磁盘缓存,默认不使用
+            http2 (bool): 是否使用HTTP/2转发(httpx),默认使用requests的HTTP/1.1连接池
+            router (UpstreamRouter): host允许列表及每个host的并发上限/超时/熔断器,默认转发所有host
         """
         self.logger = Logger.get_instance()
         self.cache_ttl = cache_ttl
+        self.cache_policy = cache_policy or CachePolicy(default_ttl=cache_ttl)
+        self.upstream_scheme = upstream_scheme
+        self.pool_maxsize = pool_maxsize
+        self.router = router or UpstreamRouter()
+        self.stream_threshold = stream_threshold
+        self.cache_body_limit = cache_body_limit
 
         # 创建高性能的requests session
         self.session = requests.Session()
@@ -56,9 +100,12 @@ class ProxyService:
             max_retries=retry_strategy,         # 启用重试
             pool_block=False                    # 池满时不阻塞,直接失败
         )
+        # 不校验证书时共用一个SSLContext;否则urllib3每建一个HTTPS连接都会重新加载一次系统CA证书(约40ms CPU)
+        adapter.init_poolmanager(pool_connections, pool_maxsize, block=False, ssl_context=self._unverified_ssl_context())
         self.session.mount('http://', adapter)
         self.session.mount('https://', adapter)
         self.session.verify = False
+        self._adapter = adapter
 
         # 设置默认请求头 - 减少每次请求的开销
         self.session.headers.update({
@@ -68,65 +115,221 @@ class ProxyService:
             'Connection': 'keep-alive'
         })
 
-        # 内存缓存 - 使用线程锁保证线程安全
-        self.response_cache = {}
-        self.cache_lock = threading.RLock()  # 可重入锁,避免死锁
+        # HTTP/2传输 - 同一host的并发请求复用一个TLS连接(Connection头在HTTP/2中不允许)
+        self.http2_transport = None
+        if http2:
+            self.http2_transport = Http2Transport(
+                headers={k: v for k, v in self.session.headers.items() if k.lower() != 'connection'},
+                max_connections=pool_connections,
+                max_retries=max_retries
+            )
+
+        # 内存缓存 - LRU + TTL + 字节上限,线程安全
+        self.response_cache = ResponseCache(
+            ttl=cache_ttl,
+            max_entries=cache_max_entries,
+            max_bytes=cache_max_bytes
+        )
+
+        # 磁盘缓存 - 内存未命中时查询,命中后放回内存
+        self.disk_cache = disk_cache
+
+        # 请求合并 - 缓存未命中时,相同URL的并发GET等待同一次转发
+        self.single_flight = SingleFlight()
+
+        # 后台刷新 - 返回旧响应的同时在这里向上游确认
+        self._refresh_executor = ThreadPoolExecutor(max_workers=refresh_workers, thread_name_prefix='ProxyRefresh')
+        self._refreshing = set()
+        self._refresh_lock = threading.Lock()
 
         # 统计信息
         self.stats = {
             'total_requests': 0,
             'cache_hits': 0,
+            'disk_hits': 0,
+            'coalesced_requests': 0,
+            'stale_hits': 0,
+            'background_refreshes': 0,
+            'refresh_failures': 0,
+            'not_modified': 0,
+            'streamed_responses': 0,
+            'client_not_modified': 0,
             'failed_requests': 0,
-            'retried_requests': 0
+            'retried_requests': 0,
+            'rejected_requests': 0,
+            'prewarmed_connections': 0
         }
         self.stats_lock = threading.Lock()
+        # 正在进行的上游请求数(连接池使用情况)
+        self._upstream_active = 0
+        self._upstream_peak = 0
+
+    @staticmethod
+    def _unverified_ssl_context():
+        """不校验证书的SSLContext(与 session.verify = False 一致)"""
+        context = create_urllib3_context(cert_reqs=ssl.CERT_NONE)
+        context.check_hostname = False
+        context.verify_mode = ssl.CERT_NONE
+        return context
+
+    def build_target_url(self, url, query_string=b''):
+        """
+        构建目标URL
 
-    def _get_cache_key(self, url, method):
-        """生成缓存键"""
-        return f"{method}:{url}"
+        Args:
+            url (str): 目标URL路径(不含协议)
+            query_string (bytes): 原始查询字符串
+        """
+        target_url = f"{self.upstream_scheme}://{url}"
+        if query_string:
+            target_url += f"?{query_string.decode('utf-8')}"
+        return target_url
 
-    def _get_from_cache(self, cache_key):
+    def filter_request_headers(self, headers):
         """
-        从缓存获取响应 - 线程安全
+        转发的请求头 - 只排除会冲突的头
+        客户端未声明Accept-Encoding时要求上游不压缩(响应体原样转发,不能使用session默认的gzip)
+        """
+        filtered = {k: v for k, v in headers.items() if k.lower() not in self.EXCLUDED_REQUEST_HEADERS}
+        if get_header(filtered, 'Accept-Encoding') is None:
+            filtered['Accept-Encoding'] = 'identity'
+        return filtered
+
+    def filter_response_headers(self, headers):
+        """返回给客户端的响应头 - 排除会导致问题的头"""
+        return {k: v for k, v in headers.items() if k.lower() not in self.EXCLUDED_RESPONSE_HEADERS}
+
+    def cache_key(self, method, target_url, headers):
+        """
+        缓存键(也用作请求合并的键)
+        响应体按上游的压缩格式缓存,因此客户端接受的压缩格式不同时分开缓存
+
+        Args:
+            headers (dict): 过滤后的请求头
+        """
+        encodings = []
+        for token in (get_header(headers, 'Accept-Encoding') or 'identity').split(','):
+            name, _, params = token.strip().lower().partition(';')
+            if name and params.replace(' ', '') not in ('q=0', 'q=0.0', 'q=0.00', 'q=0.000'):
+                encodings.append(name)
+        return f"{method}:{target_url}|{','.join(sorted(encodings)) or 'identity'}"
+
+    def serve_cached(self, method, target_url, headers, source='all'):
+        """
+        用缓存响应请求(只缓存GET)
+        1. 新鲜 - 直接返回
+        2. 已过期但在stale窗口内 - 返回旧响应,并在后台向上游确认
+        3. 客户端的If-None-Match与缓存的ETag一致 - 返回304
+
+        Args:
+            headers (dict): 过滤后的请求头(后台刷新时转发)
+            source (str): 查找范围 all/memory/disk; 事件循环中只查内存,未命中再到线程中查磁盘
 
         Returns:
-            dict or None: 缓存的响应数据,如果不存在或已过期返回None
+            dict or None: {'content', 'status', 'headers'},未命中返回None
         """
-        with self.cache_lock:
-            if cache_key in self.response_cache:
-                cached_data, timestamp = self.response_cache[cache_key]
-                # 检查是否过期
-                if datetime.now() - timestamp < timedelta(seconds=self.cache_ttl):
-                    # 更新统计
-                    with self.stats_lock:
-                        self.stats['cache_hits'] += 1
-                    return cached_data
-                else:
-                    # 删除过期缓存
-                    del self.response_cache[cache_key]
+        if method != 'GET':
+            return None
+        cache_key = self.cache_key(method, target_url, headers)
+        entry = self._get_from_cache(cache_key, source)
+        if entry is None:
             return None
 
-    def _set_to_cache(self, cache_key, data):
+        if time.monotonic() >= entry['fresh_until']:
+            self.record('stale_hits')
+            self._refresh_in_background(cache_key, target_url, headers, entry)
+
+        if etag_matches(get_header(headers, 'If-None-Match'), entry['etag']):
+            self.record('client_not_modified')
+            return {
+                'content': b'',
+                'status': 304,
+                'headers': {k: v for k, v in entry['headers'].items() if k.lower() in self.NOT_MODIFIED_HEADERS}
+            }
+        return entry
+
+    def store(self, method, target_url, request_headers, status, content, headers):
+        """
+        按缓存策略缓存GET请求的成功响应
+
+        Args:
+            request_headers (dict): 过滤后的请求头(决定缓存键)
+            headers (dict): 过滤后的响应头
+        """
+        if method != 'GET' or status != 200 or len(content) > self.cache_body_limit:
+            return
+        ttl, stale_ttl = self.cache_policy.lifetime(target_url, headers)
+        if ttl + stale_ttl <= 0:
+            return
+        now = time.monotonic()
+        cache_key = self.cache_key(method, target_url, request_headers)
+        entry = {
+            'content': content,
+            'status': status,
+            'headers': headers,
+            'etag': get_header(headers, 'ETag'),
+            'last_modified': get_header(headers, 'Last-Modified'),
+            'fresh_until': now + ttl
+        }
+        # 条目保留到stale窗口结束
+        self.response_cache.set(cache_key, entry, self._entry_size(cache_key, entry), ttl=ttl + stale_ttl)
+        if self.disk_cache is not None:
+            # 磁盘上的时间使用墙上时钟,重启后仍然有效
+            self.disk_cache.put(cache_key, dict(entry, fresh_until=time.time() + ttl), ttl + stale_ttl)
+
+    def record(self, key):
+        """统计计数 +1 (total_requests / failed_requests / retried_requests)"""
+        with self.stats_lock:
+            self.stats[key] += 1
+
+    def _get_from_cache(self, cache_key, source='all'):
         """
-        设置缓存 - 线程安全
+        从缓存获取响应 - 线程安全
 
         Args:
-            cache_key (str): 缓存键
-            data (dict): 要缓存的数据
+            source (str): all 先查内存再查磁盘; memory 只查内存; disk 只查磁盘(SQLite查询,会阻塞)
+
+        Returns:
+            dict or None: 缓存的响应数据,如果不存在或已过期返回None
         """
-        with self.cache_lock:
-            self.response_cache[cache_key] = (data, datetime.now())
+        cached_data = self.response_cache.get(cache_key) if source != 'disk' else None
+        if cached_data is None and source != 'memory' and self.disk_cache is not None:
+            cached_data = self._load_from_disk(cache_key)
+        if cached_data is not None:
+            # 更新统计
+            with self.stats_lock:
+                self.stats['cache_hits'] += 1
+        return cached_data
 
-            # 简单的缓存清理:如果缓存项超过1000个,清空一半
-            if len(self.response_cache) > 1000:
-                keys_to_delete = list(self.response_cache.keys())[:500]
-                for key in keys_to_delete:
-                    del self.response_cache[key]
+    def _load_from_disk(self, cache_key):
+        """从磁盘缓存读取,并按剩余时间放回内存缓存"""
+        row = self.disk_cache.get(cache_key)
+        if row is None:
+            return None
+        now = time.time()
+        entry = {
+            'content': row['content'],
+            'status': row['status'],
+            'headers': row['headers'],
+            'etag': row['etag'],
+            'last_modified': row['last_modified'],
+            'fresh_until': time.monotonic() + (row['fresh_until'] - now)
+        }
+        self.response_cache.set(cache_key, entry, self._entry_size(cache_key, entry), ttl=row['expires_at'] - now)
+        self.record('disk_hits')
+        return entry
+
+    @staticmethod
+    def _entry_size(cache_key, data):
+        """估算缓存条目占用的字节数(响应体 + 响应头 + 键)"""
+        headers_size = sum(len(k) + len(v) for k, v in data['headers'].items())
+        return len(data['content']) + headers_size + len(cache_key)
 
     def clear_cache(self):
         """清空所有缓存 - 线程安全"""
-        with self.cache_lock:
-            self.response_cache.clear()
+        self.response_cache.clear()
+        if self.disk_cache is not None:
+            self.disk_cache.clear()
 
     def get_stats(self):
         """
@@ -135,14 +338,34 @@ class ProxyService:
         Returns:
             dict: 统计数据
         """
-        with self.cache_lock:
-            cache_size = len(self.response_cache)
+        cache_stats = self.response_cache.get_stats()
 
         with self.stats_lock:
             stats = self.stats.copy()
 
-        stats['cache_size'] = cache_size
-        stats['cache_ttl_seconds'] = self.cache_ttl
+        stats['cache_size'] = cache_stats['entries']
+        stats['cache_bytes'] = cache_stats['bytes']
+        stats['cache_max_entries'] = cache_stats['max_entries']
+        stats['cache_max_bytes'] = cache_stats['max_bytes']
+        stats['cache_evictions'] = cache_stats['evictions']
+        stats['cache_evicted_bytes'] = cache_stats['evicted_bytes']
+        stats['cache_expirations'] = cache_stats['expirations']
+        stats['cache_rejected'] = cache_stats['rejected']
+        stats['cache_ttl_seconds'] = self.cache_policy.default_ttl
+        stats['cache_stale_ttl_seconds'] = self.cache_policy.default_stale_ttl
+        stats['cache_rules'] = len(self.cache_policy.rules)
+        stats['inflight_requests'] = self.single_flight.get_stats()['inflight']
+        for key, value in self.get_pool_stats().items():
+            stats[f'upstream_{key}'] = value
+        stats['upstream_routes'] = self.router.get_stats()
+        if self.disk_cache is not None:
+            disk_stats = self.disk_cache.get_stats()
+            stats['disk_cache_size'] = disk_stats['entries']
+            stats['disk_cache_bytes'] = disk_stats['bytes']
+            stats['disk_cache_max_bytes'] = disk_stats['max_bytes']
+            stats['disk_cache_evictions'] = disk_stats['evictions']
+            stats['disk_cache_pending_writes'] = disk_stats['pending_writes']
+            stats['disk_cache_dropped_writes'] = disk_stats['dropped_writes']
 
         # 计算缓存命中率
         if stats['total_requests'] > 0:
@@ -163,98 +386,365 @@ class ProxyService:
         Returns:
             Response: Flask响应对象
         """
-        # 更新统计
-        with self.stats_lock:
-            self.stats['total_requests'] += 1
+        self.record('total_requests')
 
         try:
             # 构建目标URL - 默认使用https协议
-            target_url = f"https://{url}"
-            if flask_request.query_string:
-                target_url += f"?{flask_request.query_string.decode('utf-8')}"
+            target_url = self.build_target_url(url, flask_request.query_string)
+            # 不在允许列表的host直接返回403(缓存中也不会有)
+            self.router.route_for(target_url)
+
+            # 对于GET请求,优先从缓存获取(过期的先返回旧响应,后台刷新)
+            headers = self.filter_request_headers(flask_request.headers)
+            cached_response = self.serve_cached(flask_request.method, target_url, headers)
+            if cached_response:
+                # 缓存命中!直接返回,几乎零延迟
+                return Response(
+                    cached_response['content'],
+                    status=cached_response['status'],
+                    headers=cached_response['headers']
+                )
 
-            # 对于GET请求,优先从缓存获取
             if flask_request.method == 'GET':
-                cache_key = self._get_cache_key(target_url, 'GET')
-                cached_response = self._get_from_cache(cache_key)
-                if cached_response:
-                    # 缓存命中!直接返回,几乎零延迟
-                    return Response(
-                        cached_response['content'],
-                        status=cached_response['status'],
-                        headers=cached_response['headers']
-                    )
-
-            # 准备请求头 - 只排除会冲突的头
-            excluded_headers = {'host', 'content-length', 'transfer-encoding'}
-            headers = {k: v for k, v in flask_request.headers
-                      if k.lower() not in excluded_headers}
-
-            # 使用session转发请求 - 自动复用连接,自动重试
-            resp = self.session.request(
-                method=flask_request.method,
-                url=target_url,
-                headers=headers,
-                data=flask_request.get_data() if flask_request.method in ['POST', 'PUT', 'PATCH'] else None,
-                timeout=(3, 10),  # (连接超时, 读取超时) - 更合理的超时设置
-                stream=False      # 直接获取完整响应
-            )
-
-            # 检查是否发生了重试
-            if hasattr(resp, 'history') and len(resp.history) > 0:
-                with self.stats_lock:
-                    self.stats['retried_requests'] += 1
-
-            # 只在出错时记录日志
-            if resp.status_code >= 400:
-                with self.stats_lock:
-                    self.stats['failed_requests'] += 1
-                self.logger.add_log(f"代理失败: {target_url} -> {resp.status_code}")
-
-            # 构建响应头 - 排除会导致问题的头
-            excluded_response_headers = {'content-encoding', 'content-length', 'transfer-encoding'}
-            response_headers = {
-                k: v for k, v in resp.headers.items()
-                if k.lower() not in excluded_response_headers
-            }
-
-            # 对于GET请求的成功响应,缓存起来
-            if flask_request.method == 'GET' and resp.status_code == 200:
-                cache_key = self._get_cache_key(target_url, 'GET')
-                self._set_to_cache(cache_key, {
-                    'content': resp.content,
-                    'status': resp.status_code,
-                    'headers': response_headers
-                })
+                # 相同的GET同一时刻只转发一次,其余请求等待同一个响应
+                data, leader = self.single_flight.do(
+                    self.cache_key('GET', target_url, headers),
+                    lambda: self._forward('GET', target_url, headers)
+                )
+                if not leader:
+                    if 'stream' in data:
+                        # 流式响应只能由一个客户端读取,其余请求各自转发
+                        data = self._forward('GET', target_url, headers)
+                    else:
+                        self.record('coalesced_requests')
+            else:
+                body = flask_request.get_data() if flask_request.method in ['POST', 'PUT', 'PATCH'] else None
+                data = self._forward(flask_request.method, target_url, headers, body)
+
+            if 'stream' in data:
+                # 边收边发,响应结束或客户端断开时释放上游连接
+                response = Response(data['stream'], status=data['status'], headers=data['headers'],
+                                    direct_passthrough=True)
+                response.call_on_close(data['upstream'].close)
+                return response
 
             # 直接返回响应
             return Response(
-                resp.content,
-                status=resp.status_code,
-                headers=response_headers
+                data['content'],
+                status=data['status'],
+                headers=data['headers']
             )
 
+        except UpstreamRejected as e:
+            # 快速失败,不占用线程等待上游
+            self.record('rejected_requests')
+            return jsonify({"status": "error", "message": e.message}), e.status
         except requests.exceptions.Timeout:
-            with self.stats_lock:
-                self.stats['failed_requests'] += 1
+            self.record('failed_requests')
             self.logger.add_log(f"代理超时: {url}")
             return jsonify({"status": "error", "message": "请求超时"}), 504
         except requests.exceptions.ConnectionError as e:
-            with self.stats_lock:
-                self.stats['failed_requests'] += 1
+            self.record('failed_requests')
             self.logger.add_log(f"代理连接失败: {url}, 错误: {str(e)}")
             return jsonify({"status": "error", "message": "连接失败,请检查网络"}), 502
         except requests.exceptions.RequestException as e:
-            with self.stats_lock:
-                self.stats['failed_requests'] += 1
+            self.record('failed_requests')
             self.logger.add_log(f"代理失败: {url}, 错误: {str(e)}")
             return jsonify({"status": "error", "message": f"代理失败: {str(e)}"}), 502
         except Exception as e:
-            with self.stats_lock:
-                self.stats['failed_requests'] += 1
+            self.record('failed_requests')
             self.logger.add_log(f"代理异常: {url}, 错误: {str(e)}")
             return jsonify({"status": "error", "message": f"代理异常: {str(e)}"}), 500
 
+    def _send(self, method, target_url, headers, body=None, timeout=(3, 10)):
+        """
+        发送请求,只读取响应头
+
+        Args:
+            timeout (tuple): (连接超时, 读取超时)
+
+        Returns:
+            tuple: (上游响应, 未解压的响应体数据块迭代器)
+        """
+        if self.http2_transport is not None:
+            resp = self.http2_transport.request(method, target_url, headers=headers, data=body, timeout=timeout)
+            return resp, resp.iter_raw(self.STREAM_CHUNK_SIZE)
+
+        try:
+            resp = self.session.request(
+                method=method,
+                url=target_url,
+                headers=headers,
+                data=body,
+                timeout=timeout,  # (连接超时, 读取超时) - 按host路由配置
+                stream=True,      # 先只读响应头,响应体按大小决定缓冲还是流式转发
+                verify=False      # 设置了REQUESTS_CA_BUNDLE等环境变量时session.verify会被覆盖,这里显式关闭
+            )
+        except requests.exceptions.ConnectionError as e:
+            # 重试用尽后的读取超时会被requests包装成ConnectionError,按超时返回504
+            reason = getattr(e.args[0], 'reason', None) if e.args else None
+            if isinstance(reason, urllib3.exceptions.ReadTimeoutError):
+                raise requests.exceptions.ReadTimeout(e, request=e.request) from e
+            raise
+        return resp, resp.raw.stream(self.STREAM_CHUNK_SIZE, decode_content=False)
+
+    def _forward(self, method, target_url, headers, body=None):
+        """
+        转发请求 - 自动复用连接,自动重试
+        响应体按上游的压缩格式原样读取;超过stream_threshold时不再缓冲,改为流式返回
+
+        Returns:
+            dict: {'content', 'status', 'headers'}
+                  或流式响应 {'stream': 数据块迭代器, 'upstream': 上游连接(结束后需close), 'status', 'headers'}
+        """
+        # 熔断中或并发已满时抛出UpstreamRejected(503)
+        route = self.router.route_for(target_url)
+        route.acquire()
+        self._acquire_upstream()
+        try:
+            resp, chunks = self._send(method, target_url, headers, body, route.timeout)
+        except BaseException:
+            self._release_upstream()
+            route.release()
+            route.record(False)
+            raise
+        route.record(resp.status_code < 500)
+
+        def release():
+            self._release_upstream()
+            route.release()
+        upstream = _UpstreamLease(resp, release)
+        try:
+            return self._read_response(method, target_url, headers, resp, upstream, chunks)
+        except BaseException:
+            upstream.close()
+            raise
+
+    def _read_response(self, method, target_url, headers, resp, upstream, chunks):
+        """读取上游响应:小响应缓冲后返回,大响应返回流式转发的迭代器"""
+        # 检查是否发生了重试
+        if hasattr(resp, 'history') and len(resp.history) > 0:
+            self.record('retried_requests')
+
+        # 只在出错时记录日志
+        if resp.status_code >= 400:
+            self.record('failed_requests')
+            self.logger.add_log(f"代理失败: {target_url} -> {resp.status_code}")
+
+        response_headers = self.filter_response_headers(resp.headers)
+        length = resp.headers.get('Content-Length')
+        length = int(length) if length and length.isdigit() else None
+
+        # 长度未知时先读一段,读完了就按小响应处理
+        buffered, size = [], 0
+        if length is None or length <= self.stream_threshold:
+            for chunk in chunks:
+                buffered.append(chunk)
+                size += len(chunk)
+                if size > self.stream_threshold:
+                    break
+            else:
+                upstream.close()
+                content = b''.join(buffered)
+                # 对于GET请求的成功响应,缓存起来
+                self.store(method, target_url, headers, resp.status_code, content, response_headers)
+                return {
+                    'content': content,
+                    'status': resp.status_code,
+                    'headers': response_headers
+                }
+
+        self.record('streamed_responses')
+        if length is not None:
+            response_headers['Content-Length'] = str(length)
+        return {
+            'stream': self._relay(method, target_url, headers, resp, response_headers, buffered, chunks),
+            'upstream': upstream,
+            'status': resp.status_code,
+            'headers': response_headers
+        }
+
+    def _relay(self, method, target_url, request_headers, resp, response_headers, buffered, chunks):
+        """转发剩余的数据块;完整读完且不超过cache_body_limit时写入缓存"""
+        tee = list(buffered)
+        size = sum(len(chunk) for chunk in tee)
+        yield from buffered
+        for chunk in chunks:
+            if tee is not None:
+                size += len(chunk)
+                if size <= self.cache_body_limit:
+                    tee.append(chunk)
+                else:
+                    tee = None
+            yield chunk
+        if tee is not None:
+            self.store(method, target_url, request_headers, resp.status_code, b''.join(tee), response_headers)
+
+    def prewarm(self, hosts, connections=4):
+        """
+        预先建立到常用host的连接(TCP+TLS握手),之后的第一个请求不再等待握手
+        HTTP/1.1每个host并发建立connections个连接,HTTP/2每个host一个连接即可多路复用
+
+        Args:
+            hosts (list): host列表,如 ['basic.10jqka.com.cn']
+            connections (int): HTTP/1.1下每个host预建的连接数
+
+        Returns:
+            int: 成功预建的连接数
+        """
+        per_host = 1 if self.http2_transport is not None else connections
+        targets = [f"{self.upstream_scheme}://{host}/" for host in hosts for _ in range(per_host)]
+        if not targets:
+            return 0
+
+        def warm(url):
+            try:
+                if self.http2_transport is not None:
+                    self.http2_transport.client.head(url)
+                else:
+                    self.session.head(url, timeout=(3, 5), verify=False)
+                return True
+            except Exception as e:
+                self.logger.add_log(f"代理预建连接失败: {url}, 错误: {str(e)}")
+                return False
+
+        with ThreadPoolExecutor(max_workers=len(targets), thread_name_prefix='ProxyPrewarm') as executor:
+            warmed = sum(executor.map(warm, targets))
+        with self.stats_lock:
+            self.stats['prewarmed_connections'] += warmed
+        return warmed
+
+    def get_pool_stats(self):
+        """
+        上游连接池使用情况
+
+        Returns:
+            dict: 协议、正在进行的上游请求数(及峰值)、已建立/空闲的连接数、连接池使用率
+                  （HTTP/2读不到连接池状态时不包含连接数和使用率）
+        """
+        with self.stats_lock:
+            active, peak = self._upstream_active, self._upstream_peak
+        stats = {
+            'protocol': 'HTTP/2' if self.http2_transport is not None else 'HTTP/1.1',
+            'active_requests': active,
+            'peak_active_requests': peak
+        }
+
+        if self.http2_transport is not None:
+            pool = self.http2_transport.get_pool_stats()
+            if not pool:
+                return stats
+            connections, idle = pool['connections'], pool['idle_connections']
+            in_use, capacity = connections - idle, self.http2_transport.max_connections
+        else:
+            pools = self._adapter.poolmanager.pools
+            idle = 0
+            for key in list(pools.keys()):
+                pool = pools.get(key)
+                if pool is not None and pool.pool is not None:
+                    idle += sum(1 for conn in list(pool.pool.queue) if conn is not None)
+            connections = idle + active
+            in_use, capacity = active, max(1, len(pools)) * self.pool_maxsize
+
+        stats['connections'] = connections
+        stats['idle_connections'] = idle
+        stats['utilization'] = f"{in_use / capacity * 100:.2f}%"
+        return stats
+
+    def _acquire_upstream(self):
+        with self.stats_lock:
+            self._upstream_active += 1
+            self._upstream_peak = max(self._upstream_peak, self._upstream_active)
+
+    def _release_upstream(self):
+        with self.stats_lock:
+            self._upstream_active -= 1
+
+    def _refresh_in_background(self, cache_key, target_url, headers, entry):
+        """在后台刷新过期的缓存响应,同一缓存键同时只有一个刷新"""
+        with self._refresh_lock:
+            if cache_key in self._refreshing:
+                return
+            self._refreshing.add(cache_key)
+        self.record('background_refreshes')
+        try:
+            self._refresh_executor.submit(self._background_refresh, cache_key, target_url, headers, entry)
+        except RuntimeError:
+            # 已关闭
+            with self._refresh_lock:
+                self._refreshing.discard(cache_key)
+
+    def _background_refresh(self, cache_key, target_url, headers, entry):
+        try:
+            # 与同一URL的普通转发合并
+            data, _ = self.single_flight.do(cache_key, lambda: self._revalidate(target_url, headers, entry))
+            if 'stream' in data and data['upstream'] is not None:
+                # 响应变大到需要流式转发,不再缓存
+                data['upstream'].close()
+        except Exception as e:
+            self.record('refresh_failures')
+            self.logger.add_log(f"代理后台刷新失败: {target_url}, 错误: {str(e)}")
+        finally:
+            with self._refresh_lock:
+                self._refreshing.discard(cache_key)
+
+    def _revalidate(self, target_url, headers, entry):
+        """
+        带If-None-Match/If-Modified-Since向上游确认缓存的响应
+        未变化(304)时只延长缓存时间,否则按普通响应缓存
+
+        Returns:
+            dict: 最新的完整响应 {'content', 'status', 'headers'}
+        """
+        conditional = {k: v for k, v in headers.items()
+                       if k.lower() not in ('if-none-match', 'if-modified-since')}
+        if entry['etag']:
+            conditional['If-None-Match'] = entry['etag']
+        if entry['last_modified']:
+            conditional['If-Modified-Since'] = entry['last_modified']
+
+        data = self._forward('GET', target_url, conditional)
+        if data['status'] != 304:
+            return data
+
+        self.record('not_modified')
+        updated = {k: v for k, v in data['headers'].items() if k.lower() in self.REVALIDATION_HEADERS}
+        response_headers = {k: v for k, v in entry['headers'].items()
+                            if k.lower() not in {h.lower() for h in updated}}
+        response_headers.update(updated)
+        self.store('GET', target_url, headers, entry['status'], entry['content'], response_headers)
+        return {
+            'content': entry['content'],
+            'status': entry['status'],
+            'headers': response_headers
+        }
+
     def close(self):
-        """关闭session,释放资源"""
+        """关闭session并停止缓存清理线程,释放资源(磁盘缓存提交剩余写入后关闭)"""
+        self._refresh_executor.shutdown(wait=False)
+        self.response_cache.stop()
+        if self.disk_cache is not None:
+            self.disk_cache.close()
+        if self.http2_transport is not None:
+            self.http2_transport.close()
         self.session.close()
+
+
+class _UpstreamLease:
+    """占用中的上游响应 - 关闭时释放连接并更新正在进行的上游请求数(可重复调用)"""
+
+    def __init__(self, response, on_release):
+        self._response = response
+        self._on_release = on_release
+        self._released = False
+        self._lock = threading.Lock()
+
+    def close(self):
+        with self._lock:
+            if self._released:
+                return
+            self._released = True
+        try:
+            self._response.close()
+        finally:
+            self._on_release()
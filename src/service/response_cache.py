@@ -0,0 +1,161 @@
+"""
+响应缓存
+代理服务的内存缓存：LRU淘汰 + TTL过期 + 总字节数上限
+
+特性:
+1. LRU - 命中的条目移到队尾，超出条目数或字节数上限时从队首(最久未使用)淘汰
+2. TTL - 每个条目记录过期时间，读取时发现过期立即删除
+3. 字节上限 - 记录每个条目的大小，总大小超过上限时淘汰；单个超过上限的条目不缓存
+4. 后台清理 - 清理线程定期删除已过期但一直没有再被读取的条目，及时释放内存
+"""
+
+import threading
+import time
+from collections import OrderedDict
+
+
+class ResponseCache:
+    """LRU + TTL + 字节上限的缓存（线程安全）"""
+
+    def __init__(self, ttl=10, max_entries=1000, max_bytes=64 * 1024 * 1024, sweep_interval=30):
+        """
+        :param ttl: 默认过期时间（秒）
+        :param max_entries: 最多缓存的条目数
+        :param max_bytes: 所有条目的总大小上限（字节）
+        :param sweep_interval: 后台清理过期条目的间隔（秒），0表示不启动清理线程
+        """
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.sweep_interval = sweep_interval
+        self._entries = OrderedDict()   # key -> (value, size, expires_at)
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._sweeper = None
+        self.stats = {
+            'hits': 0,
+            'misses': 0,
+            'inserts': 0,
+            'evictions': 0,
+            'evicted_bytes': 0,
+            'expirations': 0,
+            'rejected': 0
+        }
+        if sweep_interval:
+            self.start_sweeper()
+
+    def get(self, key):
+        """
+        读取条目
+        :return: 缓存的值，不存在或已过期返回None
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.stats['misses'] += 1
+                return None
+            if entry[2] <= time.monotonic():
+                self._remove(key)
+                self.stats['expirations'] += 1
+                self.stats['misses'] += 1
+                return None
+            self._entries.move_to_end(key)
+            self.stats['hits'] += 1
+            return entry[0]
+
+    def set(self, key, value, size, ttl=None):
+        """
+        写入条目
+        :param size: 条目大小（字节），用于字节上限
+        :param ttl: 本条目的过期时间（秒），不传使用默认值
+        :return: 是否写入（单个条目超过字节上限时不缓存）
+        """
+        if size > self.max_bytes:
+            with self._lock:
+                self.stats['rejected'] += 1
+            return False
+
+        expires_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (value, size, expires_at)
+            self._bytes += size
+            self.stats['inserts'] += 1
+            # 从最久未使用的条目开始淘汰
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                _, (_, evicted_size, _) = self._entries.popitem(last=False)
+                self._bytes -= evicted_size
+                self.stats['evictions'] += 1
+                self.stats['evicted_bytes'] += evicted_size
+        return True
+
+    def delete(self, key):
+        """删除条目"""
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+
+    def clear(self):
+        """清空缓存"""
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def sweep(self):
+        """
+        删除所有已过期的条目
+        :return: 删除的条目数
+        """
+        now = time.monotonic()
+        with self._lock:
+            expired = [key for key, entry in self._entries.items() if entry[2] <= now]
+            for key in expired:
+                self._remove(key)
+            self.stats['expirations'] += len(expired)
+        return len(expired)
+
+    def start_sweeper(self):
+        """启动后台清理线程"""
+        if self._sweeper is not None and self._sweeper.is_alive():
+            return
+        self._stop_event.clear()
+        self._sweeper = threading.Thread(target=self._sweep_loop, daemon=True, name="ResponseCache-Sweeper")
+        self._sweeper.start()
+
+    def stop(self):
+        """停止后台清理线程"""
+        self._stop_event.set()
+        if self._sweeper is not None:
+            self._sweeper.join(timeout=1)
+            self._sweeper = None
+
+    def __len__(self):
+        with self._lock:
+            return len(self._entries)
+
+    def get_stats(self):
+        """获取缓存统计"""
+        with self._lock:
+            stats = self.stats.copy()
+            stats['entries'] = len(self._entries)
+            stats['bytes'] = self._bytes
+
+        stats['max_entries'] = self.max_entries
+        stats['max_bytes'] = self.max_bytes
+        lookups = stats['hits'] + stats['misses']
+        if lookups > 0:
+            stats['hit_rate'] = f"{stats['hits'] / lookups * 100:.2f}%"
+        else:
+            stats['hit_rate'] = "0%"
+        return stats
+
+    def _remove(self, key):
+        """删除条目并扣减字节数（调用方持有锁）"""
+        _, size, _ = self._entries.pop(key)
+        self._bytes -= size
+
+    def _sweep_loop(self):
+        while not self._stop_event.wait(self.sweep_interval):
+            self.sweep()
@@ -0,0 +1,72 @@
+"""
+请求合并(single-flight)
+同一个键同一时刻只执行一次加载，并发的相同请求等待同一个结果
+
+用法:
+1. 线程中: single_flight.do(key, loader)
+2. 事件循环中: future, leader = acquire(key)；leader执行加载后调用 release()，
+   其它调用方 await asyncio.wrap_future(future)
+"""
+
+import threading
+from concurrent.futures import Future
+
+
+class SingleFlight:
+    """按键合并并发加载（线程安全，线程与事件循环中的调用方可以互相合并）"""
+
+    def __init__(self):
+        self._calls = {}    # key -> 正在进行的加载(Future)
+        self._lock = threading.Lock()
+        self.stats = {
+            'leaders': 0,
+            'coalesced': 0
+        }
+
+    def acquire(self, key):
+        """
+        加入某个键的加载
+        :return: (future, leader) leader为True时调用方负责加载并调用release()
+        """
+        with self._lock:
+            future = self._calls.get(key)
+            if future is not None:
+                self.stats['coalesced'] += 1
+                return future, False
+            future = self._calls[key] = Future()
+            self.stats['leaders'] += 1
+            return future, True
+
+    def release(self, key, future, result=None, exception=None):
+        """加载完成：移除进行中的记录，并把结果（或异常）交给所有等待者"""
+        with self._lock:
+            if self._calls.get(key) is future:
+                del self._calls[key]
+        if exception is not None:
+            future.set_exception(exception)
+        else:
+            future.set_result(result)
+
+    def do(self, key, loader):
+        """
+        执行加载，已有相同键的加载在进行时等待它的结果
+        :param loader: 无参可调用对象
+        :return: (结果, 是否由本次调用加载)
+        """
+        future, leader = self.acquire(key)
+        if not leader:
+            return future.result(), False
+        try:
+            result = loader()
+        except BaseException as e:
+            self.release(key, future, exception=e)
+            raise
+        self.release(key, future, result)
+        return result, True
+
+    def get_stats(self):
+        """获取合并统计"""
+        with self._lock:
+            stats = self.stats.copy()
+            stats['inflight'] = len(self._calls)
+        return stats
@@ -0,0 +1,136 @@
+"""
+快照缓存
+缓存持仓/资金等需要驱动GUI才能获取的数据，调用方通过max_age在新鲜度和延迟之间取舍
+
+特性:
+1. 新鲜度约定 - 快照未超过max_age直接返回，并告知调用方快照年龄
+2. 请求合并 - 同一时刻只有一个刷新在执行，并发调用方等待同一个结果，而不是各自驱动GUI
+3. 失败不缓存 - 刷新失败时异常传递给所有等待者，保留上一份成功的快照
+4. 失效代数 - invalidate() 时代数加一，失效前开始的刷新结果只返回给已在等待的调用方，不写入缓存
+   （避免下单前开始的刷新在下单后把旧持仓存为最新快照）
+"""
+
+import threading
+import time
+from concurrent.futures import Future
+from dataclasses import dataclass
+
+
+@dataclass(frozen=True)
+class Snapshot:
+    """一份快照"""
+    data: object
+    fetched_at: float   # time.monotonic()
+
+    @property
+    def age(self):
+        """快照年龄（秒）"""
+        return time.monotonic() - self.fetched_at
+
+
+class SnapshotCache:
+    """带新鲜度约定和请求合并的快照缓存（线程安全）"""
+
+    def __init__(self, loader, max_age=3.0):
+        """
+        :param loader: 无参可调用对象，返回最新数据（耗时操作）
+        :param max_age: 默认允许的最大快照年龄（秒）
+        """
+        self.loader = loader
+        self.max_age = max_age
+        self._snapshot = None
+        self._inflight = None   # 正在进行的刷新(Future)
+        self._generation = 0    # 失效代数，invalidate()时加一
+        self._lock = threading.Lock()
+        self.stats = {
+            'hits': 0,
+            'misses': 0,
+            'coalesced': 0,
+            'errors': 0,
+            'discarded': 0
+        }
+
+    def get(self, max_age=None):
+        """
+        获取快照
+        :param max_age: 本次允许的最大快照年龄（秒），不传使用默认值，0表示必须刷新
+        :return: Snapshot
+        """
+        max_age = self.max_age if max_age is None else max_age
+        with self._lock:
+            snapshot = self._snapshot
+            if snapshot is not None and snapshot.age <= max_age:
+                self.stats['hits'] += 1
+                return snapshot
+
+            if self._inflight is not None:
+                # 已有刷新在进行，等待它的结果（刷新开始于本次调用之后或同时，满足新鲜度）
+                self.stats['coalesced'] += 1
+                future = self._inflight
+                leader = False
+            else:
+                self.stats['misses'] += 1
+                future = self._inflight = Future()
+                generation = self._generation
+                leader = True
+
+        if not leader:
+            return future.result()
+
+        try:
+            snapshot = Snapshot(self.loader(), time.monotonic())
+        except Exception as e:
+            with self._lock:
+                if self._inflight is future:
+                    self._inflight = None
+                self.stats['errors'] += 1
+            future.set_exception(e)
+            raise
+
+        with self._lock:
+            if generation == self._generation:
+                self._snapshot = snapshot
+            else:
+                # 刷新期间已失效，数据可能早于失效原因（如下单），不缓存
+                self.stats['discarded'] += 1
+            if self._inflight is future:
+                self._inflight = None
+        future.set_result(snapshot)
+        return snapshot
+
+    def peek(self, max_age=None):
+        """
+        非阻塞查询：快照未超过max_age时返回(计为命中)，否则返回None，不触发刷新
+        供事件循环中的调用方先走快速路径，未命中再到线程中调用get()
+        """
+        max_age = self.max_age if max_age is None else max_age
+        with self._lock:
+            snapshot = self._snapshot
+            if snapshot is not None and snapshot.age <= max_age:
+                self.stats['hits'] += 1
+                return snapshot
+        return None
+
+    def invalidate(self):
+        """丢弃当前快照（例如下单后持仓必然变化），正在进行的刷新结果也不再缓存"""
+        with self._lock:
+            self._snapshot = None
+            self._generation += 1
+            # 之后的调用方不再合并到失效前开始的刷新，重新刷新
+            self._inflight = None
+
+    def get_stats(self):
+        """获取缓存统计"""
+        with self._lock:
+            stats = self.stats.copy()
+            snapshot = self._snapshot
+            stats['refreshing'] = self._inflight is not None
+
+        stats['max_age_seconds'] = self.max_age
+        stats['snapshot_age_seconds'] = round(snapshot.age, 3) if snapshot else None
+        requests = stats['hits'] + stats['misses'] + stats['coalesced']
+        if requests > 0:
+            stats['hit_rate'] = f"{(stats['hits'] + stats['coalesced']) / requests * 100:.2f}%"
+        else:
+            stats['hit_rate'] = "0%"
+        return stats
@@ -1,8 +1,8 @@
 import os
 from src.util.logger import Logger
+from src.util.tracing import traced
 from src.service.window_service import WindowService
 from src.models.app_model import AppModel
-import time
 
 class TradingService:
     def __init__(self):
@@ -10,6 +10,7 @@ class TradingService:
         self.model = AppModel()
         self.logger = Logger()
 
+    @traced(root=True)
     def cancel_all_orders(self, cancel_type=None):
         """撤销委托
         Args:
@@ -27,16 +28,14 @@ class TradingService:
 
             # 点击窗口达到聚焦效果，否则快捷键会失效
             window.click_input()
-            time.sleep(0.1)
+            self.window_service.wait_for_foreground(window.handle)
 
             # 先刷新数据，确保获取最新委托信息
             self.window_service.send_key('F5')
-            time.sleep(0.1)
 
             # 使用F3快捷键打开委托撤单界面
             self.window_service.send_key('F3')
             self.logger.add_log("已打开委托撤单界面")
-            time.sleep(0.1)
 
             # 根据撤单类型选择对应的control_id
             control_id_map = {
@@ -48,7 +47,8 @@ class TradingService:
             # 默认为全部撤单
             control_id = control_id_map.get(cancel_type, 30001)
 
-            # 点击对应的撤单按钮
+            # 等待撤单按钮出现后点击
+            self.window_service.wait_for_element(window, control_id)
             self.window_service.click_element(window, control_id)
 
             operation_name = {
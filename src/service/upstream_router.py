@@ -0,0 +1,259 @@
+"""
+上游路由
+代理只转发到允许列表中的host，每个host有独立的并发上限、超时和熔断器，
+一个上游变慢或出错时快速失败，不会占满HTTP线程影响下单等其它接口
+
+路由示例(按顺序匹配,第一条命中的生效,未写的字段使用默认值):
+    {'host': '*.10jqka.com.cn', 'max_concurrency': 16, 'read_timeout': 5}
+    {'host': 'basic.10jqka.com.cn', 'failure_threshold': 3, 'reset_timeout': 10}
+host 使用通配符(fnmatch)，同一条规则匹配到的每个host各自计数；
+最多保留 MAX_HOSTS 个host的状态，超出时淘汰最久未使用的空闲host（允许未列出的host时客户端可以请求任意host）
+
+熔断器:
+1. 关闭 - 正常转发，连续失败（超时、连接失败、5xx）达到 failure_threshold 次后打开
+2. 打开 - 直接返回503，reset_timeout 秒后进入半开
+3. 半开 - 只放行一个试探请求，成功则关闭，失败则重新打开
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from fnmatch import fnmatchcase
+from urllib.parse import urlsplit
+
+
+class UpstreamRejected(Exception):
+    """路由拒绝转发: 403 不在允许列表 / 503 熔断中或并发已满"""
+
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+
+class CircuitBreaker:
+    """连续失败计数熔断器（线程安全）"""
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, failure_threshold=5, reset_timeout=30):
+        """
+        :param failure_threshold: 连续失败多少次后打开
+        :param reset_timeout: 打开后多少秒放行试探请求
+        """
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0
+        self.trips = 0
+        self._probing = False
+        self._lock = threading.Lock()
+
+    def is_open(self):
+        """是否处于打开状态且还未到试探时间（不占用试探名额）"""
+        with self._lock:
+            return self.state == self.OPEN and time.monotonic() < self.opened_at + self.reset_timeout
+
+    def allow(self):
+        """
+        请求能否转发；半开状态下只有一个请求能拿到试探名额
+        :return: bool
+        """
+        with self._lock:
+            if self.state == self.OPEN:
+                if time.monotonic() < self.opened_at + self.reset_timeout:
+                    return False
+                self.state = self.HALF_OPEN
+                self._probing = False
+            if self.state == self.HALF_OPEN:
+                if self._probing:
+                    return False
+                self._probing = True
+            return True
+
+    def record(self, success):
+        """记录一次转发结果"""
+        with self._lock:
+            if success:
+                self.state = self.CLOSED
+                self.failures = 0
+                self._probing = False
+                return
+            if self.state == self.OPEN:
+                # 打开前已经发出的请求陆续失败,不延长打开时间
+                return
+            self.failures += 1
+            if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+                self.trips += 1
+                self.state = self.OPEN
+                self.opened_at = time.monotonic()
+                self._probing = False
+
+
+class HostRoute:
+    """单个host的并发上限、超时和熔断器"""
+
+    def __init__(self, host, max_concurrency=16, connect_timeout=3, read_timeout=10, queue_timeout=0.5,
+                 failure_threshold=5, reset_timeout=30):
+        """
+        :param host: host(含端口)
+        :param max_concurrency: 同时转发到该host的请求数上限
+        :param connect_timeout: 连接超时（秒）
+        :param read_timeout: 读取超时（秒）
+        :param queue_timeout: 并发已满时最多等待多少秒，超时返回503
+        :param failure_threshold: 熔断器连续失败次数
+        :param reset_timeout: 熔断器打开后多少秒试探
+        """
+        self.host = host
+        self.max_concurrency = max_concurrency
+        self.timeout = (connect_timeout, read_timeout)
+        self.queue_timeout = queue_timeout
+        self.breaker = CircuitBreaker(failure_threshold, reset_timeout)
+        self._semaphore = threading.BoundedSemaphore(max_concurrency)
+        self._lock = threading.Lock()
+        self.stats = {
+            'active': 0,
+            'forwarded': 0,
+            'failures': 0,
+            'rejected_open': 0,
+            'rejected_busy': 0
+        }
+
+    def acquire(self, wait=True):
+        """
+        占用一个并发名额
+        :param wait: 并发已满时是否等待queue_timeout（事件循环中传False）
+        :raises UpstreamRejected: 熔断中或并发已满(503)
+        """
+        if self.breaker.is_open():
+            self._record('rejected_open')
+            raise UpstreamRejected(503, f"上游 {self.host} 暂时不可用(熔断中)")
+        timeout = self.queue_timeout if wait else 0
+        acquired = self._semaphore.acquire(timeout=timeout) if timeout > 0 else self._semaphore.acquire(blocking=False)
+        if not acquired:
+            self._record('rejected_busy')
+            raise UpstreamRejected(503, f"上游 {self.host} 繁忙(并发已满)")
+        if not self.breaker.allow():
+            self._semaphore.release()
+            self._record('rejected_open')
+            raise UpstreamRejected(503, f"上游 {self.host} 暂时不可用(熔断中)")
+        with self._lock:
+            self.stats['active'] += 1
+            self.stats['forwarded'] += 1
+
+    def release(self):
+        """释放并发名额（响应读完或出错后调用）"""
+        with self._lock:
+            self.stats['active'] -= 1
+        self._semaphore.release()
+
+    def record(self, success):
+        """记录转发结果（超时、连接失败、5xx为失败）"""
+        if not success:
+            self._record('failures')
+        self.breaker.record(success)
+
+    def is_idle(self):
+        """没有进行中的请求且熔断器关闭（淘汰后重新创建不会丢失熔断状态）"""
+        with self._lock:
+            active = self.stats['active']
+        return active == 0 and self.breaker.state == CircuitBreaker.CLOSED
+
+    def get_stats(self):
+        with self._lock:
+            stats = self.stats.copy()
+        stats['max_concurrency'] = self.max_concurrency
+        stats['state'] = self.breaker.state
+        stats['consecutive_failures'] = self.breaker.failures
+        stats['trips'] = self.breaker.trips
+        return stats
+
+    def _record(self, key):
+        with self._lock:
+            self.stats[key] += 1
+
+
+class UpstreamRouter:
+    """按host匹配路由（线程安全）"""
+
+    MAX_HOSTS = 256     # 最多保留状态的host数量
+
+    DEFAULT_SETTINGS = {
+        'max_concurrency': 16,
+        'connect_timeout': 3,
+        'read_timeout': 10,
+        'queue_timeout': 0.5,
+        'failure_threshold': 5,
+        'reset_timeout': 30
+    }
+
+    def __init__(self, routes=None, default=None, allow_unlisted=True):
+        """
+        :param routes: [{'host', 'max_concurrency', 'connect_timeout', 'read_timeout', 'queue_timeout',
+                        'failure_threshold', 'reset_timeout'}]，按顺序匹配
+        :param default: 路由中未写的字段和未列出的host使用的设置
+        :param allow_unlisted: 是否转发未列出的host（False时返回403）
+        """
+        self.default = dict(self.DEFAULT_SETTINGS, **(default or {}))
+        self.routes = [dict(route) for route in (routes or [])]
+        self.allow_unlisted = allow_unlisted
+        self._hosts = OrderedDict()     # host -> HostRoute，按最近使用排序
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, config):
+        """根据 AppModel.get_proxy_routes_config() 创建"""
+        return cls(
+            routes=config.get('routes', []),
+            default=config.get('default', {}),
+            allow_unlisted=config.get('allow_unlisted', False)
+        )
+
+    def route_for(self, target_url):
+        """
+        取URL对应host的路由
+        :return: HostRoute
+        :raises UpstreamRejected: host不在允许列表(403)
+        """
+        parts = urlsplit(target_url)
+        host = parts.netloc.lower()
+        with self._lock:
+            route = self._hosts.get(host)
+            if route is not None:
+                self._hosts.move_to_end(host)
+                return route
+
+        hostname = (parts.hostname or '').lower()
+        settings = None
+        for rule in self.routes:
+            if fnmatchcase(hostname, rule.get('host', '*').lower()):
+                settings = {k: v for k, v in rule.items() if k in self.DEFAULT_SETTINGS}
+                break
+        if settings is None and not self.allow_unlisted:
+            raise UpstreamRejected(403, f"不允许代理的host: {hostname}")
+
+        with self._lock:
+            route = self._hosts.get(host)
+            if route is None:
+                route = self._hosts[host] = HostRoute(host, **dict(self.default, **(settings or {})))
+                self._evict()
+            else:
+                self._hosts.move_to_end(host)
+        return route
+
+    def _evict(self):
+        """超出MAX_HOSTS时淘汰最久未使用的空闲host，都不空闲时淘汰最久未使用的（调用方需持有锁）"""
+        while len(self._hosts) > self.MAX_HOSTS:
+            victim = next((host for host, route in self._hosts.items() if route.is_idle()), None)
+            if victim is None:
+                victim = next(iter(self._hosts))
+            del self._hosts[victim]
+
+    def get_stats(self):
+        """各host的并发、熔断状态"""
+        with self._lock:
+            routes = list(self._hosts.values())
+        return {route.host: route.get_stats() for route in routes}
@@ -0,0 +1,205 @@
+"""
+窗口句柄索引
+缓存 进程路径 -> 窗口句柄 的映射，避免每次激活窗口都完整枚举桌面窗口
+
+工作方式:
+1. 命中时只做廉价校验(IsWindow + IsWindowVisible + PID比对)，微秒级
+2. 校验失败或未命中时才执行一次EnumWindows，并同时刷新所有进程路径的索引
+3. 窗口枚举通过可替换的后端实现，非Windows环境可使用FakeWindowBackend
+"""
+
+import threading
+
+
+class Win32WindowBackend:
+    """基于win32gui/psutil的窗口枚举后端"""
+
+    def __init__(self):
+        # 延迟导入，保证模块在非Windows环境下也能被导入
+        import psutil
+        import win32gui
+        import win32process
+        self._psutil = psutil
+        self._win32gui = win32gui
+        self._win32process = win32process
+
+    def enum_visible_windows(self):
+        """
+        枚举所有可见的顶层窗口
+        :return: 窗口句柄列表(按EnumWindows顺序)
+        """
+        handles = []
+
+        def callback(hwnd, extra):
+            if self._win32gui.IsWindowVisible(hwnd):
+                handles.append(hwnd)
+            return True
+
+        self._win32gui.EnumWindows(callback, None)
+        return handles
+
+    def get_window_pid(self, hwnd):
+        """获取窗口所属进程ID"""
+        _, pid = self._win32process.GetWindowThreadProcessId(hwnd)
+        return pid
+
+    def get_process_path(self, pid):
+        """
+        获取进程可执行文件路径
+        :return: 路径字符串，进程不存在或无权限时返回None
+        """
+        try:
+            return self._psutil.Process(pid).exe()
+        except (self._psutil.NoSuchProcess, self._psutil.AccessDenied):
+            return None
+
+    def is_window(self, hwnd):
+        return bool(self._win32gui.IsWindow(hwnd))
+
+    def is_visible(self, hwnd):
+        return bool(self._win32gui.IsWindowVisible(hwnd))
+
+
+class FakeWindowBackend:
+    """
+    内存中的窗口后端
+    用于在Linux等非Windows环境下测试窗口索引逻辑
+    """
+
+    def __init__(self):
+        self.windows = {}      # hwnd -> {'pid': pid, 'visible': bool}
+        self.processes = {}    # pid -> 进程路径
+        self.enum_calls = 0
+        self.path_lookups = 0
+
+    def add_window(self, hwnd, pid, path, visible=True):
+        """添加一个模拟窗口"""
+        self.windows[hwnd] = {'pid': pid, 'visible': visible}
+        self.processes[pid] = path
+
+    def close_window(self, hwnd):
+        """关闭一个模拟窗口"""
+        self.windows.pop(hwnd, None)
+
+    def enum_visible_windows(self):
+        self.enum_calls += 1
+        return [hwnd for hwnd, info in self.windows.items() if info['visible']]
+
+    def get_window_pid(self, hwnd):
+        info = self.windows.get(hwnd)
+        return info['pid'] if info else 0
+
+    def get_process_path(self, pid):
+        self.path_lookups += 1
+        return self.processes.get(pid)
+
+    def is_window(self, hwnd):
+        return hwnd in self.windows
+
+    def is_visible(self, hwnd):
+        info = self.windows.get(hwnd)
+        return bool(info and info['visible'])
+
+
+class WindowIndex:
+    """进程路径 -> 窗口句柄 索引（线程安全）"""
+
+    _instance = None
+    _instance_lock = threading.Lock()
+
+    @classmethod
+    def get_instance(cls):
+        """获取全局共享的窗口索引（默认使用Win32后端）"""
+        if not cls._instance:
+            with cls._instance_lock:
+                if not cls._instance:
+                    cls._instance = cls()
+        return cls._instance
+
+    def __init__(self, backend=None):
+        """
+        初始化窗口索引
+        :param backend: 窗口枚举后端，默认使用Win32WindowBackend
+        """
+        self.backend = backend or Win32WindowBackend()
+        self._index = {}        # 小写进程路径 -> (hwnd, pid)
+        self._lock = threading.Lock()
+        self.stats = {
+            'hits': 0,
+            'misses': 0,
+            'refreshes': 0
+        }
+
+    def resolve(self, app_path):
+        """
+        查找指定程序的窗口句柄
+        :param app_path: 应用程序完整路径
+        :return: 窗口句柄，未找到返回None
+        """
+        if not app_path:
+            return None
+        key = app_path.lower()
+
+        with self._lock:
+            entry = self._index.get(key)
+            if entry and self._is_valid(*entry):
+                self.stats['hits'] += 1
+                return entry[0]
+
+            self.stats['misses'] += 1
+            self._refresh()
+            entry = self._index.get(key)
+            return entry[0] if entry else None
+
+    def invalidate(self, app_path=None):
+        """
+        使索引失效
+        :param app_path: 指定程序路径，不传则清空整个索引
+        """
+        with self._lock:
+            if app_path is None:
+                self._index.clear()
+            else:
+                self._index.pop(app_path.lower(), None)
+
+    def get_stats(self):
+        """获取命中统计"""
+        with self._lock:
+            stats = self.stats.copy()
+            stats['indexed_apps'] = len(self._index)
+
+        lookups = stats['hits'] + stats['misses']
+        if lookups > 0:
+            stats['hit_rate'] = f"{stats['hits'] / lookups * 100:.2f}%"
+        else:
+            stats['hit_rate'] = "0%"
+        return stats
+
+    def _is_valid(self, hwnd, pid):
+        """廉价校验缓存的句柄是否仍然属于原进程且可见"""
+        try:
+            return (self.backend.is_window(hwnd)
+                    and self.backend.is_visible(hwnd)
+                    and self.backend.get_window_pid(hwnd) == pid)
+        except Exception:
+            return False
+
+    def _refresh(self):
+        """完整枚举一次窗口，重建索引（调用方需持有锁）"""
+        self.stats['refreshes'] += 1
+        index = {}
+        pid_paths = {}  # 同一进程通常有多个窗口，只查一次进程路径
+
+        for hwnd in self.backend.enum_visible_windows():
+            try:
+                pid = self.backend.get_window_pid(hwnd)
+            except Exception:
+                continue
+            if pid not in pid_paths:
+                pid_paths[pid] = self.backend.get_process_path(pid)
+            path = pid_paths[pid]
+            if path:
+                # 与原先WindowMonitor的枚举逻辑保持一致：同一程序有多个窗口时取第一个（Z序最上层）
+                index.setdefault(path.lower(), (hwnd, pid))
+
+        self._index = index
@@ -2,9 +2,8 @@ import threading
 import time
 import win32gui
 import win32con
-import win32process
-import psutil
 from src.util.logger import Logger
+from src.service.window_index import WindowIndex
 
 
 class WindowMonitor:
@@ -25,6 +24,7 @@ class WindowMonitor:
         self._target_app_path = None
         self._target_hwnd = None
         self._lock = threading.Lock()
+        self._window_index = WindowIndex.get_instance()
 
     def start(self, app_path: str) -> bool:
         """
@@ -65,29 +65,10 @@ class WindowMonitor:
 
     def _find_target_window(self) -> int:
         """
-        查找目标窗口句柄
+        查找目标窗口句柄（通过共享的窗口索引，命中时无需枚举窗口）
         :return: 窗口句柄，未找到返回None
         """
-        hwnd_found = None
-        target_path = self._target_app_path.lower() if self._target_app_path else None
-
-        def callback(hwnd, extra):
-            nonlocal hwnd_found
-            if win32gui.IsWindowVisible(hwnd):
-                try:
-                    _, pid = win32process.GetWindowThreadProcessId(hwnd)
-                    proc = psutil.Process(pid)
-                    if proc.exe().lower() == target_path:
-                        hwnd_found = hwnd
-                        return False  # 停止枚举
-                except (psutil.NoSuchProcess, psutil.AccessDenied):
-                    pass
-            return True
-
-        if target_path:
-            win32gui.EnumWindows(callback, None)
-
-        return hwnd_found
+        return self._window_index.resolve(self._target_app_path)
 
     def _restore_window(self, hwnd: int) -> bool:
         """
@@ -1,18 +1,43 @@
 import win32gui
 import win32con
-import win32api
 import time
-import psutil
 import win32process
 import ctypes
+import hashlib
+import win32clipboard
 from src.util.logger import Logger
+from src.util.wait import wait_until, wait_for_change, WaitTimeoutError
+from src.util.tracing import Tracer, traced
 from pywinauto import Desktop
 from pywinauto.clipboard import GetData
-from config.key_config import KEY_MAP
+from dataclasses import replace
+from src.models.app_model import AppModel
+from src.service.window_index import WindowIndex
+from src.service.element_cache import ElementCache
+from src.service.key_injector import SendInputInjector, inject_batches
+from src.util.key_compiler import PacingProfile, CompiledKeyCache, compile_combination, build_batches
 
 class WindowService:
-    def __init__(self):
+    def __init__(self, window_index=None, element_cache=None, key_injector=None, key_pacing=None):
+        """
+        :param window_index: 窗口句柄索引，默认使用全局共享索引
+        :param element_cache: 控件元素缓存，默认使用全局共享缓存
+        :param key_injector: 按键注入器，默认使用SendInput
+        :param key_pacing: 按键节奏配置(PacingProfile)，默认读取配置文件
+        """
         self.logger = Logger()
+        self.window_index = window_index or WindowIndex.get_instance()
+        self.element_cache = element_cache or ElementCache.get_instance()
+        self.key_injector = key_injector or SendInputInjector()
+        self.key_pacing = key_pacing or self._load_key_pacing()
+        self.key_cache = CompiledKeyCache.get_instance()
+
+    def _load_key_pacing(self):
+        """读取按键节奏配置，未知的配置项记录日志后忽略"""
+        pacing, ignored = PacingProfile.from_config(AppModel().get_key_pacing_config())
+        if ignored:
+            self.logger.add_log(f"忽略未知的按键节奏配置项: {', '.join(ignored)}")
+        return pacing
 
     def get_window_info(self, hwnd):
         """
@@ -57,47 +82,51 @@ class WindowService:
             self.logger.add_log(f"获取窗口信息失败: {str(e)}")
             raise Exception(f"获取窗口信息失败: {str(e)}")
 
+    @traced()
     def activate_window(self, app_path):
         """
         激活指定应用程序窗口
         :param app_path: 应用程序完整路径
         :return: 成功返回窗口句柄，失败抛出异常
         """
-        hwnd_found = None
-        
-        def callback(hwnd, extra):
-            nonlocal hwnd_found
-            if win32gui.IsWindowVisible(hwnd):
-                _, pid = win32process.GetWindowThreadProcessId(hwnd)
-                try:
-                    proc = psutil.Process(pid)
-                    if proc.exe().lower() == app_path.lower():
-                        hwnd_found = hwnd
-                        if win32gui.IsIconic(hwnd):
-                            win32gui.ShowWindow(hwnd, win32con.SW_RESTORE)
-                        if not win32gui.IsWindow(hwnd):
-                            raise Exception("无效的窗口句柄")
-                        if not win32gui.IsWindowVisible(hwnd):
-                            raise Exception("窗口不可见或已关闭")
-                        try:
-                            win32gui.SetForegroundWindow(hwnd)
-                        except Exception as e:
-                            self.logger.add_log(f"win32gui.SetForegroundWindow 失败，尝试使用 pywinauto.set_focus()，句柄：{hwnd}，错误：{str(e)}")
-                            try:
-                                from pywinauto import Application
-                                app = Application(backend='uia').connect(handle=hwnd)
-                                app.window(handle=hwnd).set_focus()
-                            except Exception as e2:
-                                raise Exception(f"设置前台窗口失败，句柄：{hwnd}，错误1：{str(e)}，错误2：{str(e2)}")
-                except (psutil.NoSuchProcess, psutil.AccessDenied):
-                    pass
-            return True
+        hwnd = self.window_index.resolve(app_path)
+        if not hwnd:
+            raise Exception("未找到匹配窗口")
 
-        win32gui.EnumWindows(callback, None)
-        
-        if hwnd_found:
-            return hwnd_found
-        raise Exception("未找到匹配窗口")
+        try:
+            if win32gui.IsIconic(hwnd):
+                win32gui.ShowWindow(hwnd, win32con.SW_RESTORE)
+            if not win32gui.IsWindow(hwnd):
+                raise Exception("无效的窗口句柄")
+            if not win32gui.IsWindowVisible(hwnd):
+                raise Exception("窗口不可见或已关闭")
+            try:
+                win32gui.SetForegroundWindow(hwnd)
+            except Exception as e:
+                self.logger.add_log(f"win32gui.SetForegroundWindow 失败，尝试使用 pywinauto.set_focus()，句柄：{hwnd}，错误：{str(e)}")
+                try:
+                    from pywinauto import Application
+                    app = Application(backend='uia').connect(handle=hwnd)
+                    app.window(handle=hwnd).set_focus()
+                except Exception as e2:
+                    raise Exception(f"设置前台窗口失败，句柄：{hwnd}，错误1：{str(e)}，错误2：{str(e2)}")
+        except Exception:
+            # 句柄可能已失效，下次重新枚举
+            self.window_index.invalidate(app_path)
+            raise
+
+        return hwnd
+
+    def get_cache_stats(self):
+        """
+        获取窗口相关缓存的统计信息
+        :return: 统计数据字典
+        """
+        return {
+            "window_index": self.window_index.get_stats(),
+            "element_cache": self.element_cache.get_stats(),
+            "key_cache": self.key_cache.get_stats()
+        }
 
     def activate_window_by_pid(self, pid, retries=3, delay=0.5):
         """
@@ -160,97 +189,29 @@ class WindowService:
 
         raise Exception(f"未找到匹配窗口，进程ID：{pid}，重试次数：{retries}")
 
-    def _process_single_key(self, key: str):
-        """
-        处理单个按键
-        :param key: 单个按键字符串
-        """
-        if key == '':  # 处理空字符停顿
-            time.sleep(0.5)
-            return
-        
-        if len(key) == 1:
-            vk = ord(key.upper())
-        elif key in KEY_MAP:
-            vk = KEY_MAP[key]
-        else:
-            for char in key:
-                vk = ord(char.upper())
-                win32api.keybd_event(vk, 0, 0, 0)
-                win32api.keybd_event(vk, 0, win32con.KEYEVENTF_KEYUP, 0)
-                time.sleep(0.05)
-            return
-        
-        win32api.keybd_event(vk, 0, 0, 0)
-        win32api.keybd_event(vk, 0, win32con.KEYEVENTF_KEYUP, 0)
-        time.sleep(0.05)
-
+    @traced()
     def send_key(self, keys):
         """
-        发送组合键（支持格式：'CTRL C' 或单个键，花括号内为组合键）
-        :param keys: 组合键字符串（用空格连接）或单个键
-        """
-        key_sequence = [k.strip().upper() for k in keys.split(' ')]
-        for key in key_sequence:
-            if key.startswith('{') and key.endswith('}'):
-                combination = key[1:-1]
-                self.send_key_combination(combination)
-            else:
-                self._process_single_key(key)
-
-    def _get_virtual_key_codes(self, key_sequence: list):
-        """
-        将按键序列转换为虚拟键码
-        :param key_sequence: 按键序列
-        :return: 虚拟键码列表
+        发送按键（空格分隔多个按键，花括号内为组合键，例如 '600000 ENTER 21 ENTER'、'{CTRL+C}'）
+        按键串先编译为虚拟键码序列（结果由key_cache缓存），按key_pacing的间隔分批提交，
+        间隔为0的连续按键合并为一次SendInput
+        :param keys: 按键字符串
         """
-        vk_codes = []
-        for key in key_sequence:
-            if len(key) == 1:
-                vk_codes.append(ord(key.upper()))
-            elif key in KEY_MAP:
-                vk_codes.append(KEY_MAP[key])
-            else:
-                raise ValueError(f"无效的按键: {key}")
-        return vk_codes
+        inject_batches(self.key_injector, self.key_cache.get(keys, self.key_pacing))
 
-    def _press_modifier_keys(self, vk_codes: list, delay: float) -> None:
-        """
-        按下所有修饰键
-        :param vk_codes: 虚拟键码列表
-        :param delay: 按键之间的延迟时间
-        """
-        for vk in vk_codes[:-1]:
-            win32api.keybd_event(vk, 0, 0, 0)
-            time.sleep(delay)
-
-    def _release_modifier_keys(self, vk_codes: list, delay: float) -> None:
-        """
-        释放所有修饰键
-        :param vk_codes: 虚拟键码列表
-        :param delay: 按键之间的延迟时间
-        """
-        for vk in reversed(vk_codes[:-1]):
-            win32api.keybd_event(vk, 0, win32con.KEYEVENTF_KEYUP, 0)
-            time.sleep(delay)
-
-    def send_key_combination(self, keys: str, delay: float = 0.1):
+    @traced()
+    def send_key_combination(self, keys: str, delay: float = None):
         """
         发送组合键（支持格式：'CTRL+SHIFT+A'）
         :param keys: 组合键字符串（用+连接）
-        :param delay: 按键之间的延迟时间（秒）
+        :param delay: 按键之间的延迟时间（秒），不传则使用按键节奏配置
         """
-        key_sequence = [k.strip().upper() for k in keys.split('+')]
-        key_sequence = [k.replace('\\PLUS', '+') for k in key_sequence]
-        
-        vk_codes = self._get_virtual_key_codes(key_sequence)
-
-        self._press_modifier_keys(vk_codes, delay)
-        win32api.keybd_event(vk_codes[-1], 0, 0, 0)
-        time.sleep(delay)
-        win32api.keybd_event(vk_codes[-1], 0, win32con.KEYEVENTF_KEYUP, 0)
-        self._release_modifier_keys(vk_codes, delay)
+        pacing = self.key_pacing
+        if delay is not None:
+            pacing = replace(pacing, combo_interval=delay)
+        inject_batches(self.key_injector, build_batches((compile_combination(keys),), pacing))
 
+    @traced()
     def get_target_window(self, window_params, retries=3, delay=0.5):
         """
         根据参数获取目标窗口
@@ -259,7 +220,9 @@ class WindowService:
         :param delay: 每次重试的延迟时间，默认0.5秒
         :return: 找到的窗口
         """
+        span = Tracer.get_instance().current()
         for i in range(retries):
+            span.set('attempts', i + 1)
             try:
                 dialogs = Desktop(backend='uia').windows(**window_params)
                 if dialogs:
@@ -272,35 +235,27 @@ class WindowService:
                 time.sleep(delay)
         return None
 
-    def find_element_in_window(self, window, control_id):
+    @traced()
+    def find_element_in_window(self, window, control_id, visible=False, refresh=False):
         """
-        在指定窗口中查找控件元素
+        在指定窗口中查找控件元素（同一窗口只遍历一次控件树，结果由element_cache缓存）
         :param window: 目标窗口
         :param control_id: 元素的control_id（支持单个id或id列表）
+        :param visible: 只返回可见的控件（仅单个id）
+        :param refresh: 先丢弃该窗口的缓存，重新遍历控件树
         :return: 找到的元素（单个id返回元素，多个id返回元素列表）
         """
-        descendants = window.descendants()
-        
-        # 如果传入的是单个id，保持原有逻辑
+        if refresh:
+            self.element_cache.invalidate(window)
         if isinstance(control_id, (int, str)):
-            for element in descendants:
-                if element.control_id() == control_id:
-                    return element
-            return None
-        
-        # 如果传入的是多个id，批量查找
+            return self.element_cache.find(window, control_id, visible=visible)
+
         elif isinstance(control_id, (list, tuple)):
-            result = []
-            control_id_set = set(control_id)  # 转换为集合提高查找效率
-            for element in descendants:
-                if element.control_id() in control_id_set:
-                    result.append(element)
-                    if len(result) == len(control_id_set):  # 找到所有目标后提前返回
-                        break
-            return result
-        
+            return self.element_cache.find_many(window, control_id)
+
         raise TypeError("control_id参数类型错误，应为int/str或list/tuple")
 
+    @traced()
     def get_clipboard(self, retries=3, delay=0.1):
         """
         获取剪切板里的数据
@@ -319,6 +274,95 @@ class WindowService:
                 time.sleep(delay)
         return None
 
+    @traced()
+    def clear_clipboard(self):
+        """
+        清空剪切板（复制前调用，便于通过"剪切板非空"判断复制已完成）
+        """
+        try:
+            win32clipboard.OpenClipboard()
+            try:
+                win32clipboard.EmptyClipboard()
+            finally:
+                win32clipboard.CloseClipboard()
+        except Exception as e:
+            self.logger.add_log(f"清空剪切板失败: {str(e)}")
+
+    @traced()
+    def wait_for_foreground(self, hwnd, timeout=0.5, interval=0.01):
+        """
+        等待指定窗口成为前台窗口
+        :param hwnd: 窗口句柄
+        :param timeout: 最长等待时间（秒），默认0.5秒
+        :param interval: 轮询间隔（秒）
+        :return: 是否已成为前台窗口（超时不抛异常，由后续操作自行校验）
+        """
+        try:
+            wait_until(lambda: win32gui.GetForegroundWindow() == hwnd,
+                       timeout=timeout, interval=interval)
+            return True
+        except WaitTimeoutError:
+            self.logger.add_log(f"等待窗口进入前台超时，句柄：{hwnd}")
+            return False
+
+    @traced()
+    def wait_for_element(self, window, control_id, timeout=2.0, interval=0.05):
+        """
+        等待窗口中出现指定控件（必须可见，隐藏页面上残留的同id控件不算）
+        :param window: 目标窗口
+        :param control_id: 元素的control_id
+        :param timeout: 最长等待时间（秒），默认2秒
+        :param interval: 轮询间隔（秒）
+        :return: 找到的元素，超时抛出异常
+        """
+        try:
+            return wait_until(lambda: self.find_element_in_window(window, control_id, visible=True),
+                              timeout=timeout, interval=interval)
+        except WaitTimeoutError as e:
+            raise Exception(f"未找到control_id为{control_id}的元素: {str(e)}")
+
+    def element_fingerprint(self, window, control_id):
+        """
+        控件当前显示内容的指纹（截图的摘要），用于判断刷新后的表格是否已显示新数据
+        :return: 指纹字符串，控件不存在或不可见时返回None
+        """
+        element = self.find_element_in_window(window, control_id, visible=True)
+        if element is None:
+            return None
+        return hashlib.md5(element.capture_as_image().tobytes()).hexdigest()
+
+    @traced()
+    def wait_for_content(self, read, before, timeout=2.0, settle=0.3):
+        """
+        等待切换页面或刷新后内容就绪（内容相对before变化并稳定；一直未变化时最多等待settle秒）
+        :param read: 无参可调用对象，返回内容指纹（如element_fingerprint），不可读时返回None
+        :param before: 发送按键前读取的指纹
+        :return: 最后读取的指纹，超时抛出异常
+        """
+        try:
+            return wait_for_change(read, before, timeout=timeout, settle=settle)
+        except WaitTimeoutError as e:
+            raise Exception(f"等待页面内容就绪失败: {str(e)}")
+
+    @traced()
+    def wait_for_clipboard_change(self, previous=None, timeout=2.0, interval=0.02):
+        """
+        等待剪切板内容发生变化（非空且不同于previous）
+        :param previous: 变化前的剪切板内容
+        :param timeout: 最长等待时间（秒），默认2秒
+        :param interval: 轮询间隔（秒）
+        :return: 新的剪切板内容，超时抛出异常
+        """
+        def changed():
+            data = GetData()
+            return data if data and data != previous else None
+
+        try:
+            return wait_until(changed, timeout=timeout, interval=interval)
+        except WaitTimeoutError as e:
+            raise Exception(f"获取剪切板数据失败: {str(e)}")
+
+    @traced()
     def click_element(self, window, control_id, retries=3, delay=0.5):
         """
         点击元素
@@ -335,17 +379,21 @@ class WindowService:
                 element.click_input()
                 return
             except Exception as e:
+                # 缓存的元素可能已失效，重试前强制重新遍历控件树
+                self.element_cache.invalidate(window)
                 if i == retries - 1:
                     raise Exception(f"点击元素失败: {str(e)}")
                 time.sleep(delay)
 
-    def input_text_to_element(self, window, control_id, text, delay=0.5):
+    @traced()
+    def input_text_to_element(self, window, control_id, text, delay=0.5, clear=False):
         """
         向指定输入框元素输入文本内容
         :param window: 目标窗口
         :param control_id: 输入框元素的control_id
         :param text: 要输入的文本内容
-        :param delay: 操作间隔时间，默认0.5秒
+        :param delay: 等待输入框获得焦点的最长时间，默认0.5秒
+        :param clear: 输入前先清空输入框原有内容
         :return: 成功返回True，失败抛出异常
         """
         try:
@@ -354,9 +402,15 @@ class WindowService:
             if input_element is None:
                 raise Exception(f"未找到control_id为{control_id}的输入框元素")
 
-            # 聚焦输入框
+            # 聚焦输入框，等待获得键盘焦点（最长delay秒）
             input_element.set_focus()
-            time.sleep(delay)
+            try:
+                wait_until(input_element.has_keyboard_focus, timeout=delay)
+            except WaitTimeoutError:
+                self.logger.add_log(f"等待输入框(control_id:{control_id})获得焦点超时，继续输入")
+
+            if clear:
+                input_element.set_edit_text('')
 
             # 输入新内容
             input_element.type_keys(text)
@@ -368,6 +422,7 @@ class WindowService:
             self.logger.add_log(error_msg)
             raise Exception(error_msg)
 
+    @traced()
     def find_element_by_tree_path(self, window, root_control_id, path_names):
         """
         在树形结构中按路径查找元素
@@ -0,0 +1,212 @@
+"""
+按键序列编译器
+把 send_key 使用的按键字符串编译成虚拟键码序列，再按节奏配置生成可一次性提交的按键批次
+纯Python实现，不依赖win32，可在任意平台测试
+
+按键字符串语法(与原先的send_key一致):
+- 空格分隔多个按键，空按键(连续空格)表示停顿
+- 单个字符 -> ord(字符大写)
+- KEY_MAP 中的名称(ENTER、F5等) -> 对应虚拟键码
+- 其它多字符串(例如股票代码) -> 逐个字符按键
+- {CTRL+C} 花括号内为组合键，用'+'连接，\\PLUS 表示加号本身
+"""
+
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, fields
+from config.key_config import KEY_MAP
+
+# 编译结果中的按键单元类型
+TAP = 'tap'        # ('tap', vk)         单击一个键
+COMBO = 'combo'    # ('combo', (vk, ...)) 组合键，按顺序按下、逆序释放
+PAUSE = 'pause'    # ('pause',)          停顿
+
+
+@dataclass(frozen=True)
+class PacingProfile:
+    """
+    按键节奏配置（默认与原先keybd_event实现的节奏一致）
+    key_interval: 相邻按键之间的间隔（秒），0表示连续按键合并为一次提交
+    combo_interval: 组合键内各个按下/释放动作之间的间隔（秒）
+    pause: 空按键代表的停顿时长（秒）
+    """
+    key_interval: float = 0.05
+    combo_interval: float = 0.1
+    pause: float = 0.5
+
+    @classmethod
+    def from_config(cls, config):
+        """
+        从配置字典创建，忽略未知的配置项
+        :return: (PacingProfile, 被忽略的配置项列表)
+        """
+        known = {field.name for field in fields(cls)}
+        profile = cls(**{key: value for key, value in config.items() if key in known})
+        return profile, sorted(key for key in config if key not in known)
+
+
+def _resolve_vk(key):
+    """将单个按键名解析为虚拟键码"""
+    if len(key) == 1:
+        return ord(key.upper())
+    if key in KEY_MAP:
+        return KEY_MAP[key]
+    raise ValueError(f"无效的按键: {key}")
+
+
+def compile_combination(keys):
+    """
+    编译组合键（格式：'CTRL+SHIFT+A'）
+    :param keys: 组合键字符串（用+连接）
+    :return: ('combo', 虚拟键码元组)
+    """
+    key_sequence = [k.strip().upper() for k in keys.split('+')]
+    key_sequence = [k.replace('\\PLUS', '+') for k in key_sequence]
+    return (COMBO, tuple(_resolve_vk(k) for k in key_sequence))
+
+
+def compile_keys(keys):
+    """
+    编译按键字符串
+    :param keys: 按键字符串，例如 '600000 ENTER 21 ENTER' 或 '{CTRL+C}'
+    :return: 按键单元元组（不可变，可安全缓存和共享）
+    """
+    units = []
+    for key in (k.strip().upper() for k in keys.split(' ')):
+        if key == '':
+            units.append((PAUSE,))
+        elif key.startswith('{') and key.endswith('}'):
+            units.append(compile_combination(key[1:-1]))
+        elif len(key) == 1:
+            units.append((TAP, ord(key)))
+        elif key in KEY_MAP:
+            units.append((TAP, KEY_MAP[key]))
+        else:
+            units.extend((TAP, ord(char)) for char in key)
+    return tuple(units)
+
+
+def build_batches(units, pacing):
+    """
+    按节奏配置把按键单元展开为按键批次
+    同一批次内的按键事件应在一次SendInput调用中提交，批次之间按delay等待
+
+    :param units: compile_keys/compile_combination的编译结果
+    :param pacing: PacingProfile
+    :return: ((events, delay), ...)，events为((vk, is_key_up), ...)
+    """
+    # 先展开为(事件, 事件后等待时间)的平铺序列
+    steps = []
+    leading_delay = 0.0
+    for unit in units:
+        kind = unit[0]
+        if kind == PAUSE:
+            if steps:
+                event, delay = steps[-1]
+                steps[-1] = (event, delay + pacing.pause)
+            else:
+                leading_delay += pacing.pause
+        elif kind == TAP:
+            vk = unit[1]
+            steps.append(((vk, False), 0.0))
+            steps.append(((vk, True), pacing.key_interval))
+        else:
+            # 与原先send_key_combination一致：每个按下后等待，主键释放后立即逆序释放修饰键，每个修饰键释放后等待
+            vk_codes = unit[1]
+            for vk in vk_codes:
+                steps.append(((vk, False), pacing.combo_interval))
+            steps.append(((vk_codes[-1], True), 0.0))
+            for vk in reversed(vk_codes[:-1]):
+                steps.append(((vk, True), pacing.combo_interval))
+
+    # 再把无需等待的连续事件合并为同一批次
+    batches = []
+    if leading_delay:
+        batches.append(((), leading_delay))
+    current = []
+    for event, delay in steps:
+        current.append(event)
+        if delay > 0:
+            batches.append((tuple(current), delay))
+            current = []
+    if current:
+        batches.append((tuple(current), 0.0))
+    return tuple(batches)
+
+
+class CompiledKeyCache:
+    """
+    编译结果的LRU缓存（线程安全）
+    策略会反复发送相同的按键串（'600000 ENTER 21 ENTER'、'F5'、'{CTRL+C}'），
+    命中时直接返回已展开的按键批次，热路径上不再做任何解析
+    """
+
+    _instance = None
+    _instance_lock = threading.Lock()
+
+    @classmethod
+    def get_instance(cls):
+        """获取全局共享的按键缓存"""
+        if not cls._instance:
+            with cls._instance_lock:
+                if not cls._instance:
+                    cls._instance = cls()
+        return cls._instance
+
+    def __init__(self, max_size=512):
+        """
+        :param max_size: 最多缓存的按键串数量，超出时淘汰最久未使用的
+        """
+        self.max_size = max_size
+        self._entries = OrderedDict()   # (按键串, PacingProfile) -> 按键批次
+        self._lock = threading.Lock()
+        self.stats = {
+            'hits': 0,
+            'misses': 0,
+            'evictions': 0
+        }
+
+    def get(self, keys, pacing):
+        """
+        获取按键串在指定节奏下的按键批次（无效按键串抛出ValueError，不会被缓存）
+        :param keys: 按键字符串
+        :param pacing: PacingProfile
+        :return: build_batches 的结果
+        """
+        cache_key = (keys, pacing)
+        with self._lock:
+            batches = self._entries.get(cache_key)
+            if batches is not None:
+                self._entries.move_to_end(cache_key)
+                self.stats['hits'] += 1
+                return batches
+            self.stats['misses'] += 1
+
+        batches = build_batches(compile_keys(keys), pacing)
+
+        with self._lock:
+            self._entries[cache_key] = batches
+            self._entries.move_to_end(cache_key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.stats['evictions'] += 1
+        return batches
+
+    def clear(self):
+        """清空缓存"""
+        with self._lock:
+            self._entries.clear()
+
+    def get_stats(self):
+        """获取缓存统计"""
+        with self._lock:
+            stats = self.stats.copy()
+            stats['size'] = len(self._entries)
+            stats['max_size'] = self.max_size
+
+        lookups = stats['hits'] + stats['misses']
+        if lookups > 0:
+            stats['hit_rate'] = f"{stats['hits'] / lookups * 100:.2f}%"
+        else:
+            stats['hit_rate'] = "0%"
+        return stats
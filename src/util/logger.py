@@ -1,21 +1,37 @@
+"""
+日志
+add_log 只把日志放入内存队列，不等待磁盘和界面:
+1. 写文件 - 后台写线程批量取出队列中的日志，一次写入并flush（app.log，格式与原先的logging输出一致）
+2. 界面 - 绑定Text组件后，由Tk主线程通过 after() 定时取出日志插入，每次最多UI_BATCH_SIZE条，
+   其它线程不再直接操作Tk组件；界面跟不上时只显示最近的MAX_CACHE_SIZE条
+3. 队列积压超过MAX_PENDING条（磁盘异常等）时丢弃新日志并计数，调用方不会被阻塞
+"""
+
+import atexit
+import threading
 import time
 import tkinter as tk
-from tkinter import ttk
-import logging
-from datetime import datetime
 from collections import deque
+from datetime import datetime
 from threading import Lock
 
+
 class Logger:
     _instance = None
-    MAX_CACHE_SIZE = 1000  # 最大缓存1000条日志
+    MAX_CACHE_SIZE = 1000       # 最大缓存1000条日志（绑定界面时回放）
+    MAX_PENDING = 100000        # 等待写入文件的日志上限
+    WRITE_BATCH_SIZE = 1000     # 写线程每次最多写入的条数
+    FLUSH_INTERVAL = 0.2        # 写线程最长等待时间（秒），没有被唤醒时也按此间隔检查队列
+    UI_INTERVAL_MS = 100        # 界面刷新间隔（毫秒）
+    UI_BATCH_SIZE = 200         # 每次刷新最多插入的条数
+    MAX_UI_LINES = 1000         # Text组件最多保留的行数
 
     def __new__(cls):
         if not cls._instance:
             cls._instance = super().__new__(cls)
             cls._instance.__initialized = False
         return cls._instance
-    
+
     @classmethod
     def get_instance(cls):
         if not cls._instance:
@@ -28,46 +44,152 @@ class Logger:
             self.log_cache = deque(maxlen=self.MAX_CACHE_SIZE)
             self.lock = Lock()
             self.__initialized = True
-            
-            # 初始化文件日志
-            self.file_logger = logging.getLogger('FileLogger')
-            self.file_logger.setLevel(logging.INFO)
-            # 使用utf-8编码写入日志文件，避免中文乱码
-            file_handler = logging.FileHandler('app.log', encoding='utf-8')
-            formatter = logging.Formatter('%(asctime)s - %(message)s')
-            file_handler.setFormatter(formatter)
-            self.file_logger.addHandler(file_handler)
+
+            # 待写入文件/界面的日志: (时间戳, 内容)，deque的append/popleft是线程安全的
+            self._pending = deque()
+            self._ui_pending = deque(maxlen=self.MAX_CACHE_SIZE)
+            self._wakeup = threading.Event()
+            self._running = True
+            # written/batches/write_errors只由写线程修改，dropped在锁内修改
+            self.stats = {
+                'written': 0,
+                'dropped': 0,
+                'batches': 0,
+                'write_errors': 0
+            }
+
+            # 初始化文件日志（使用utf-8编码写入日志文件，避免中文乱码）
+            self._file = open('app.log', 'a', encoding='utf-8')
+            self._writer = threading.Thread(target=self._write_loop, daemon=True, name='Logger-Writer')
+            self._writer.start()
+            # 写线程是守护线程，退出前把剩余日志写完
+            atexit.register(self.close)
 
     def bind_ui(self, log_text_widget):
-        """绑定UI组件（可延迟调用）"""
+        """绑定UI组件（可延迟调用，需在Tk主线程中调用）"""
         with self.lock:
             self.ui_handler = log_text_widget
             # 回放缓存日志
-            for msg in self.log_cache:
-                self._write_to_ui(msg)
+            self._ui_pending.clear()
+            self._ui_pending.extend(self.log_cache)
+        log_text_widget.after(0, self._drain_ui)
 
     def add_log(self, message: str):
-        """添加日志（线程安全）"""
-        with self.lock:
-            # 记录到文件
-            self.file_logger.info(message)
-            
-            # 缓存日志
-            self.log_cache.append(message)
-            
-            # 如果UI已绑定，实时显示
-            if self.ui_handler:
-                self._write_to_ui(message)
-
-    def _write_to_ui(self, message):
-        """写入UI组件（内部方法）"""
+        """添加日志（线程安全，不阻塞）"""
+        entry = (time.time(), message)
+        if len(self._pending) >= self.MAX_PENDING:
+            with self.lock:
+                self.stats['dropped'] += 1
+            return
+        self._pending.append(entry)
+
+        # 缓存日志
+        self.log_cache.append(entry)
+
+        # 如果UI已绑定，交给Tk主线程显示
+        if self.ui_handler is not None:
+            self._ui_pending.append(entry)
+
+        if not self._wakeup.is_set():
+            self._wakeup.set()
+
+    def flush(self, timeout=5):
+        """
+        等待此前的日志写入文件
+        :return: 是否在timeout内写完
+        """
+        done = threading.Event()
+        self._pending.append(done)
+        self._wakeup.set()
+        return done.wait(timeout)
+
+    def close(self, timeout=5):
+        """写完剩余日志并停止写线程"""
+        if not self._running:
+            return
+        self.flush(timeout)
+        self._running = False
+        self._wakeup.set()
+        self._writer.join(timeout)
+        self._file.close()
+
+    def get_stats(self):
+        """获取日志队列统计"""
+        stats = self.stats.copy()
+        stats['pending'] = len(self._pending)
+        stats['ui_pending'] = len(self._ui_pending)
+        return stats
+
+    def _write_loop(self):
+        """写线程：批量写入文件"""
+        while self._running:
+            self._wakeup.wait(self.FLUSH_INTERVAL)
+            self._wakeup.clear()
+            while self._pending:
+                self._write_batch()
+
+    def _write_batch(self):
+        """取出最多WRITE_BATCH_SIZE条写入文件；遇到flush()的标记时写完当前批次后通知"""
+        lines = []
+        waiters = []
+        while len(lines) < self.WRITE_BATCH_SIZE:
+            try:
+                entry = self._pending.popleft()
+            except IndexError:
+                break
+            if isinstance(entry, threading.Event):
+                waiters.append(entry)
+                break
+            lines.append(f"{self._format_time(entry[0])} - {entry[1]}\n")
+
+        if lines:
+            try:
+                self._file.write(''.join(lines))
+                self._file.flush()
+                self.stats['written'] += len(lines)
+                self.stats['batches'] += 1
+            except Exception as e:
+                self.stats['write_errors'] += 1
+                print(f"日志文件写入失败: {str(e)}")
+        for waiter in waiters:
+            waiter.set()
+
+    def _drain_ui(self):
+        """Tk主线程中定时执行：把待显示的日志插入Text组件"""
+        widget = self.ui_handler
+        if widget is None:
+            return
+        lines = []
+        while self._ui_pending and len(lines) < self.UI_BATCH_SIZE:
+            timestamp, message = self._ui_pending.popleft()
+            lines.append(f"{self._timestamp(timestamp)} - {message}\n")
+        if lines:
+            self._write_to_ui(widget, ''.join(lines))
         try:
-            self.ui_handler.config(state='normal')
-            self.ui_handler.insert(tk.END, f"{self._timestamp()} - {message}\n")
-            self.ui_handler.config(state='disabled')
-            self.ui_handler.see(tk.END)
+            widget.after(self.UI_INTERVAL_MS, self._drain_ui)
+        except Exception:
+            # 组件已销毁
+            self.ui_handler = None
+
+    def _write_to_ui(self, widget, text):
+        """写入UI组件（内部方法，只在Tk主线程中调用）"""
+        try:
+            widget.config(state='normal')
+            widget.insert(tk.END, text)
+            # 只保留最近的MAX_UI_LINES行
+            lines = int(widget.index('end-1c').split('.')[0])
+            if lines > self.MAX_UI_LINES:
+                widget.delete('1.0', f"{lines - self.MAX_UI_LINES + 1}.0")
+            widget.config(state='disabled')
+            widget.see(tk.END)
         except Exception as e:
             print(f"UI日志写入失败: {str(e)}")
 
-    def _timestamp(self):
-        return datetime.now().strftime("%Y-%m-%d %H:%M:%S")
\ No newline at end of file
+    @staticmethod
+    def _format_time(timestamp):
+        """与原先logging的 %(asctime)s 格式一致，如 2024-01-01 09:30:00,123"""
+        return time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(timestamp)) + f",{int(timestamp % 1 * 1000):03d}"
+
+    def _timestamp(self, timestamp=None):
+        moment = datetime.fromtimestamp(timestamp) if timestamp is not None else datetime.now()
+        return moment.strftime("%Y-%m-%d %H:%M:%S")
@@ -0,0 +1,298 @@
+"""
+进程内指标
+计数器和延迟直方图，按Prometheus文本格式导出（/metrics）
+
+1. 分片: 每个指标按线程ID分成若干分片，各有一把锁，记录时只锁自己的分片，
+   读取（导出）时合并所有分片；HTTP工作线程之间基本不会竞争同一把锁
+2. 直方图为对数-线性分桶（HDR风格）: 按微秒记录，每个2的幂区间再等分为32个桶，
+   相对误差约1.6%，不需要预先设定桶边界，几微秒到几分钟的延迟都能得到准确的P50/P99
+3. 回调指标: 导出时调用函数取值，用于已有的统计字典（代理缓存、下单队列等）
+
+用法:
+    registry = MetricsRegistry.get_instance()
+    latency = registry.histogram('http_request_duration_seconds', 'HTTP请求耗时', ('route', 'status'))
+    latency.observe(0.012, ('/xiadan', '200'))
+    latency.percentile(0.99, ('/xiadan', '200'))
+"""
+
+import threading
+
+SHARDS = 16
+SUB_BUCKET_BITS = 5
+SUB_BUCKETS = 1 << SUB_BUCKET_BITS
+QUANTILES = (0.5, 0.9, 0.99, 0.999)
+
+
+def bucket_index(value):
+    """微秒值 -> 桶序号（小于SUB_BUCKETS的值每个值一个桶）"""
+    if value < SUB_BUCKETS:
+        return value
+    shift = value.bit_length() - SUB_BUCKET_BITS - 1
+    return ((shift + 1) << SUB_BUCKET_BITS) + (value >> shift) - SUB_BUCKETS
+
+
+def bucket_range(index):
+    """桶序号 -> [下界, 上界) 微秒"""
+    if index < SUB_BUCKETS:
+        return index, index + 1
+    shift = (index >> SUB_BUCKET_BITS) - 1
+    mantissa = (index & (SUB_BUCKETS - 1)) + SUB_BUCKETS
+    return mantissa << shift, (mantissa + 1) << shift
+
+
+class _Shard:
+    __slots__ = ('lock', 'values')
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.values = {}    # 标签值元组 -> 数值（计数器）或 [桶计数dict, 次数, 总和, 最大值]（直方图）
+
+
+class _Metric:
+    """分片存储的公共部分"""
+
+    type = None
+
+    def __init__(self, name, help_text, labelnames=(), shards=SHARDS):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self._shards = [_Shard() for _ in range(shards)]
+
+    def _shard(self):
+        # native_id 是连续分配的系统线程号，取模后分布均匀（get_ident是地址，低位相同）
+        return self._shards[threading.get_native_id() % len(self._shards)]
+
+    def _check_labels(self, labels):
+        if len(labels) != len(self.labelnames):
+            raise Exception(f"指标 {self.name} 需要标签 {self.labelnames}，实际为 {labels}")
+
+
+class Counter(_Metric):
+    """只增计数器"""
+
+    type = 'counter'
+
+    def inc(self, labels=(), amount=1):
+        shard = self._shard()
+        with shard.lock:
+            value = shard.values.get(labels)
+            if value is None:
+                self._check_labels(labels)
+                value = 0
+            shard.values[labels] = value + amount
+
+    def collect(self):
+        """
+        合并所有分片
+        :return: {标签值元组: 数值}
+        """
+        merged = {}
+        for shard in self._shards:
+            with shard.lock:
+                items = list(shard.values.items())
+            for labels, value in items:
+                merged[labels] = merged.get(labels, 0) + value
+        return merged
+
+    def value(self, labels=()):
+        return self.collect().get(labels, 0)
+
+
+class Histogram(_Metric):
+    """对数-线性分桶的延迟直方图（单位: 秒，内部按微秒记录）"""
+
+    type = 'summary'
+
+    def observe(self, seconds, labels=()):
+        micros = max(0, int(seconds * 1_000_000))
+        index = bucket_index(micros)
+        shard = self._shard()
+        with shard.lock:
+            state = shard.values.get(labels)
+            if state is None:
+                self._check_labels(labels)
+                state = shard.values[labels] = [{}, 0, 0, 0]
+            buckets = state[0]
+            buckets[index] = buckets.get(index, 0) + 1
+            state[1] += 1
+            state[2] += micros
+            if micros > state[3]:
+                state[3] = micros
+
+    def collect(self):
+        """
+        合并所有分片
+        :return: {标签值元组: {'buckets': {桶序号: 次数}, 'count', 'sum'(微秒), 'max'(微秒)}}
+        """
+        merged = {}
+        for shard in self._shards:
+            with shard.lock:
+                items = [(labels, dict(state[0]), state[1], state[2], state[3])
+                         for labels, state in shard.values.items()]
+            for labels, buckets, count, total, maximum in items:
+                target = merged.get(labels)
+                if target is None:
+                    target = merged[labels] = {'buckets': {}, 'count': 0, 'sum': 0, 'max': 0}
+                for index, hits in buckets.items():
+                    target['buckets'][index] = target['buckets'].get(index, 0) + hits
+                target['count'] += count
+                target['sum'] += total
+                target['max'] = max(target['max'], maximum)
+        return merged
+
+    @staticmethod
+    def quantiles(data, quantiles=QUANTILES):
+        """
+        由合并后的数据计算分位数
+        :param data: collect() 返回的单个标签的数据
+        :return: [秒]，与quantiles一一对应
+        """
+        count = data['count']
+        if not count:
+            return [0.0 for _ in quantiles]
+        ordered = sorted(data['buckets'].items())
+        results = []
+        position = 0
+        seen = ordered[0][1]
+        for q in quantiles:
+            rank = max(1, int(q * count + 0.5))
+            while seen < rank and position + 1 < len(ordered):
+                position += 1
+                seen += ordered[position][1]
+            low, high = bucket_range(ordered[position][0])
+            # 取桶中点，不超过记录到的最大值
+            results.append(min((low + high - 1) / 2, data['max']) / 1_000_000)
+        return results
+
+    def percentile(self, q, labels=()):
+        """某个标签组合的分位数（秒），没有记录时返回0"""
+        data = self.collect().get(labels)
+        return self.quantiles(data, (q,))[0] if data else 0.0
+
+    def snapshot(self):
+        """
+        各标签组合的统计
+        :return: {标签值元组: {'count', 'avg_ms', 'p50_ms', 'p90_ms', 'p99_ms', 'p999_ms', 'max_ms'}}
+        """
+        result = {}
+        for labels, data in self.collect().items():
+            p50, p90, p99, p999 = self.quantiles(data)
+            result[labels] = {
+                'count': data['count'],
+                'avg_ms': round(data['sum'] / data['count'] / 1000, 3),
+                'p50_ms': round(p50 * 1000, 3),
+                'p90_ms': round(p90 * 1000, 3),
+                'p99_ms': round(p99 * 1000, 3),
+                'p999_ms': round(p999 * 1000, 3),
+                'max_ms': round(data['max'] / 1000, 3)
+            }
+        return result
+
+
+class Gauge:
+    """回调指标: 导出时调用func取值"""
+
+    type = 'gauge'
+
+    def __init__(self, name, help_text, func, labelnames=()):
+        """
+        :param func: 无参函数；没有标签时返回数值，有标签时返回 {标签值元组: 数值}
+        """
+        self.name = name
+        self.help = help_text
+        self.func = func
+        self.labelnames = tuple(labelnames)
+
+    def collect(self):
+        value = self.func()
+        return value if self.labelnames else {(): value}
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(labelnames, labels, extra=None):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(labelnames, labels)]
+    if extra:
+        pairs.append(f'{extra[0]}="{extra[1]}"')
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _format_value(value):
+    if isinstance(value, float):
+        return repr(round(value, 9))
+    return str(value)
+
+
+class MetricsRegistry:
+    """指标注册表（单例，线程安全）"""
+
+    _instance = None
+    _instance_lock = threading.Lock()
+
+    def __init__(self):
+        self._metrics = {}  # 名称 -> 指标，按注册顺序导出
+        self._lock = threading.Lock()
+
+    @classmethod
+    def get_instance(cls):
+        if not cls._instance:
+            with cls._instance_lock:
+                if not cls._instance:
+                    cls._instance = cls()
+        return cls._instance
+
+    def counter(self, name, help_text, labelnames=()):
+        """取或创建计数器"""
+        return self._register(Counter, name, help_text, labelnames)
+
+    def histogram(self, name, help_text, labelnames=()):
+        """取或创建延迟直方图"""
+        return self._register(Histogram, name, help_text, labelnames)
+
+    def gauge(self, name, help_text, func, labelnames=()):
+        """注册回调指标（同名时替换，便于重建服务对象后重新绑定）"""
+        gauge = Gauge(name, help_text, func, labelnames)
+        with self._lock:
+            self._metrics[name] = gauge
+        return gauge
+
+    def unregister(self, name):
+        with self._lock:
+            self._metrics.pop(name, None)
+
+    def render(self):
+        """导出为Prometheus文本格式（0.0.4）"""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            try:
+                collected = metric.collect()
+            except Exception:
+                # 回调取值失败（如服务尚未初始化）时跳过该指标，不影响其它指标
+                continue
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.type}")
+            for labels, value in sorted(collected.items()):
+                if metric.type != 'summary':
+                    lines.append(f"{metric.name}{_format_labels(metric.labelnames, labels)} {_format_value(value)}")
+                    continue
+                for q, seconds in zip(QUANTILES, Histogram.quantiles(value)):
+                    lines.append(f"{metric.name}{_format_labels(metric.labelnames, labels, ('quantile', q))} "
+                                 f"{_format_value(seconds)}")
+                label_text = _format_labels(metric.labelnames, labels)
+                lines.append(f"{metric.name}_sum{label_text} {_format_value(value['sum'] / 1_000_000)}")
+                lines.append(f"{metric.name}_count{label_text} {value['count']}")
+        return '\n'.join(lines) + '\n'
+
+    def _register(self, cls, name, help_text, labelnames):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(name, help_text, labelnames)
+            elif not isinstance(metric, cls) or metric.labelnames != tuple(labelnames):
+                raise Exception(f"指标 {name} 已注册为不同的类型或标签")
+            return metric
@@ -0,0 +1,182 @@
+"""
+剪切板表格解析器
+解析从同花顺复制出来的制表符分隔表格（持仓、当日成交等）
+
+特性:
+1. 表头布局按表头行缓存 - 不同券商表头名称/顺序不同，同一券商的同一张表只解析一次表头
+2. 默认保留字符串 - 与原先的接口返回一致；typed=True 时按列转换数值
+3. 每列一个类型 - 列类型由整张表的全部数据推断（不按第一行、不跨表缓存）:
+   全部为整数 -> int，全部为数字且含小数 -> Decimal（不丢精度），出现任何非数字的值 -> 整列保留字符串；
+   数值列中的空值为None
+4. 紧凑的行对象 - TableRow 使用 __slots__ + 元组存储，按列名访问
+5. 流式解析 - 未类型化时 iter_rows 逐行惰性产出，不需要先切分整个字符串
+"""
+
+import io
+import re
+from collections.abc import Mapping
+from decimal import Decimal
+from functools import lru_cache
+
+# 列名包含这些关键字的列始终按文本处理（例如证券代码 600000 虽然是数字，也不应转换）
+TEXT_COLUMN_KEYWORDS = ('代码', '编号', '名称', '市场', '帐户', '账户', '账号', '时间', '日期', '操作', '备注', '币种', '标志')
+
+# 整列的不重复值以换行连接后一次匹配；有前导零的数字（如 002229）是编码而不是数值，不匹配
+_INT_COLUMN = re.compile(r'(?:[+-]?(?:0|[1-9]\d*)\n)*')
+_DECIMAL_COLUMN = re.compile(r'(?:[+-]?(?:(?:0|[1-9]\d*)(?:\.\d*)?|\.\d+)\n)*')
+
+
+def infer_column_type(values):
+    """
+    推断一列的类型
+    :param values: 该列的全部字符串值
+    :return: int、Decimal 或 str（整列为空时按文本处理）
+    """
+    distinct = {raw for raw in values if raw}
+    if not distinct:
+        return str
+    text = '\n'.join(distinct) + '\n'
+    if _INT_COLUMN.fullmatch(text):
+        return int
+    if _DECIMAL_COLUMN.fullmatch(text):
+        return Decimal
+    return str
+
+
+class TableSchema:
+    """表头布局：列名、列位置和始终按文本处理的列"""
+
+    __slots__ = ('columns', 'index', 'candidate_columns')
+
+    def __init__(self, columns):
+        self.columns = tuple(columns)
+        self.index = {name: i for i, name in enumerate(self.columns)}
+        # 可能是数值的列，实际类型由每张表的数据推断
+        self.candidate_columns = tuple(
+            i for i, name in enumerate(self.columns) if not self._is_text_column(name)
+        )
+
+    @staticmethod
+    def _is_text_column(name):
+        return name == '' or any(keyword in name for keyword in TEXT_COLUMN_KEYWORDS)
+
+    def infer_types(self, rows_values):
+        """
+        按整张表的数据推断列类型
+        :param rows_values: 每行的字符串值列表
+        :return: ((列位置, int或Decimal), ...)，只包含数值列
+        """
+        converters = []
+        for i in self.candidate_columns:
+            column_type = infer_column_type(values[i] for values in rows_values)
+            if column_type is not str:
+                converters.append((i, column_type))
+        return tuple(converters)
+
+    def convert(self, rows_values):
+        """
+        转换整张表的数值列
+        :param rows_values: 每行的字符串值列表（会被原地修改）
+        :return: 值元组列表
+        """
+        for i, converter in self.infer_types(rows_values):
+            # 同一列中相同的值复用同一个对象，减少内存
+            memo = {}
+            for values in rows_values:
+                raw = values[i]
+                if not raw:
+                    values[i] = None
+                    continue
+                value = memo.get(raw)
+                if value is None:
+                    value = memo[raw] = converter(raw)
+                values[i] = value
+        return [tuple(values) for values in rows_values]
+
+
+@lru_cache(maxsize=32)
+def get_schema(header_line):
+    """
+    获取表头布局（按表头行缓存）
+    :param header_line: 表头行（制表符分隔）
+    """
+    return TableSchema(header_line.split('\t'))
+
+
+class TableRow(Mapping):
+    """表格中的一行，只读映射，按列名访问值"""
+
+    __slots__ = ('_schema', '_values')
+
+    def __init__(self, schema, values):
+        self._schema = schema
+        self._values = values
+
+    def __getitem__(self, name):
+        return self._values[self._schema.index[name]]
+
+    def __iter__(self):
+        return iter(self._schema.columns)
+
+    def __len__(self):
+        return len(self._values)
+
+    def __repr__(self):
+        return f"TableRow({self.to_dict()!r})"
+
+    def to_dict(self):
+        """转换为普通字典（用于JSON序列化）"""
+        return dict(zip(self._schema.columns, self._values))
+
+
+def iter_rows(table_data, typed=False):
+    """
+    解析表格，逐行产出TableRow（列数与表头不一致的行会被跳过）
+    :param table_data: 表格字符串，第一行为表头
+    :param typed: 是否转换数值列（需要先读完整张表推断列类型，不再是流式的）
+    """
+    if not table_data:
+        return
+    lines = io.StringIO(table_data)
+    header = lines.readline().rstrip('\r\n')
+    if not header:
+        return
+    schema = get_schema(header)
+    width = len(schema.columns)
+    rows_values = (line.rstrip('\r\n').split('\t') for line in lines)
+    rows_values = (values for values in rows_values if len(values) == width)
+    if typed:
+        for values in schema.convert(list(rows_values)):
+            yield TableRow(schema, values)
+    else:
+        for values in rows_values:
+            yield TableRow(schema, tuple(values))
+
+
+def parse_table(table_data, typed=False):
+    """
+    解析整张表格
+    :param table_data: 表格字符串，第一行为表头
+    :param typed: 是否转换数值列
+    :return: TableRow列表
+    """
+    return list(iter_rows(table_data, typed))
+
+
+def typed_records(records):
+    """
+    把字符串字典列表（接口默认返回的持仓、成交）按列转换为数值，用于 ?typed=1 的JSON输出
+    列类型规则与 parse_table(typed=True) 相同；Decimal转为float，输出为JSON数字
+    :param records: [{列名: 字符串}, ...]，各行的列相同
+    :return: 新的字典列表
+    """
+    if not records:
+        return []
+    columns = list(records[0])
+    schema = TableSchema(columns)
+    rows_values = [[str(record.get(name, '')) for name in columns] for record in records]
+    rows = schema.convert(rows_values)
+    return [
+        {name: float(value) if isinstance(value, Decimal) else value for name, value in zip(columns, values)}
+        for values in rows
+    ]
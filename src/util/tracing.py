@@ -0,0 +1,315 @@
+"""
+分阶段耗时追踪
+一次GUI操作（如 /position）由若干阶段组成: 激活窗口、查找窗口（含重试）、遍历控件树、剪切板、验证码OCR等，
+每个阶段记录为一个span，span可以嵌套，整次操作构成一条trace
+
+1. 当前span保存在contextvars中: 同一线程内自动嵌套；跨线程时由提交方复制上下文
+   （下单执行器在submit时调用 contextvars.copy_context()，工作线程中的span挂到HTTP请求的trace下）
+2. 采样: 只在开始一条trace时按 sample_rate 决定是否记录，未采样的trace中所有span直接跳过
+3. 完成的trace保存在环形缓冲区中（最多max_traces条），每条trace最多max_spans个span，超出的只计数
+
+用法:
+    tracer = Tracer.get_instance()
+    with tracer.span('get_position', root=True):
+        with tracer.span('activate_window'):
+            ...
+
+    @traced(root=True)
+    def get_position(self): ...
+"""
+
+import contextvars
+import functools
+import itertools
+import random
+import threading
+import time
+from collections import deque
+
+# 未采样trace中的占位，嵌套的span遇到它直接跳过
+_UNSAMPLED = object()
+_current_span = contextvars.ContextVar('current_span', default=None)
+
+
+class Trace:
+    """一条trace（一次完整操作）"""
+
+    def __init__(self, trace_id, max_spans):
+        self.trace_id = trace_id
+        self.max_spans = max_spans
+        self.started_at = time.time()
+        self.spans = []
+        self.dropped_spans = 0
+        self.root = None
+        self._lock = threading.Lock()
+
+    def add(self, span):
+        """登记span，超过max_spans返回False"""
+        with self._lock:
+            if len(self.spans) >= self.max_spans:
+                self.dropped_spans += 1
+                return False
+            self.spans.append(span)
+            return True
+
+    def to_dict(self):
+        """按父子关系组织为树，时间为相对trace开始的毫秒数"""
+        with self._lock:
+            spans = list(self.spans)
+        origin = self.root.start
+        nodes = {}
+        for span in spans:
+            nodes[span.span_id] = span.to_dict(origin)
+        for span in spans:
+            if span.parent is not None and span.parent.span_id in nodes:
+                nodes[span.parent.span_id]['children'].append(nodes[span.span_id])
+        return {
+            'trace_id': self.trace_id,
+            'name': self.root.name,
+            'started_at': self.started_at,
+            'duration_ms': nodes[self.root.span_id]['duration_ms'],
+            'error': self.root.error,
+            'span_count': len(spans),
+            'dropped_spans': self.dropped_spans,
+            'root': nodes[self.root.span_id]
+        }
+
+
+class Span:
+    """trace中的一个阶段"""
+
+    __slots__ = ('trace', 'span_id', 'parent', 'name', 'attrs', 'start', 'end', 'error', 'thread', '_token')
+
+    def __init__(self, trace, span_id, parent, name, attrs):
+        self.trace = trace
+        self.span_id = span_id
+        self.parent = parent
+        self.name = name
+        self.attrs = attrs
+        self.start = time.perf_counter()
+        self.end = None
+        self.error = None
+        self.thread = threading.current_thread().name
+        self._token = None
+
+    def set(self, key, value):
+        """补充属性（如重试次数、候选数量）"""
+        self.attrs[key] = value
+
+    def to_dict(self, origin):
+        end = self.end if self.end is not None else time.perf_counter()
+        data = {
+            'name': self.name,
+            'start_ms': round((self.start - origin) * 1000, 3),
+            'duration_ms': round((end - self.start) * 1000, 3),
+            'thread': self.thread,
+            'children': []
+        }
+        if self.end is None:
+            data['unfinished'] = True
+        if self.attrs:
+            data['attrs'] = dict(self.attrs)
+        if self.error:
+            data['error'] = self.error
+        return data
+
+
+class _NoopSpan:
+    """未采样或未开启追踪时返回，调用方无需判断"""
+
+    __slots__ = ()
+
+    def set(self, key, value):
+        pass
+
+
+NOOP_SPAN = _NoopSpan()
+
+
+class Tracer:
+    """追踪器（单例，线程安全）"""
+
+    _instance = None
+    _instance_lock = threading.Lock()
+
+    def __init__(self, enabled=True, sample_rate=1.0, max_traces=200, max_spans=500):
+        """
+        :param enabled: 是否开启
+        :param sample_rate: 采样率(0~1)，开始一条trace时按此概率决定是否记录
+        :param max_traces: 环形缓冲区保存的trace条数
+        :param max_spans: 每条trace最多记录的span数（轮询等待中反复查找控件时避免无限增长）
+        """
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self.stats = {
+            'started': 0,
+            'sampled': 0,
+            'completed': 0,
+            'dropped_spans': 0
+        }
+        self.configure(enabled, sample_rate, max_traces, max_spans)
+
+    @classmethod
+    def get_instance(cls):
+        if not cls._instance:
+            with cls._instance_lock:
+                if not cls._instance:
+                    cls._instance = cls()
+        return cls._instance
+
+    def configure(self, enabled=True, sample_rate=1.0, max_traces=200, max_spans=500):
+        """修改配置（环形缓冲区中已有的trace保留最近的max_traces条）"""
+        with self._lock:
+            self.enabled = enabled
+            self.sample_rate = max(0.0, min(1.0, float(sample_rate)))
+            self.max_spans = max_spans
+            previous = getattr(self, '_traces', ())
+            self._traces = deque(previous, maxlen=max_traces)
+
+    def span(self, name, root=False, force=False, **attrs):
+        """
+        记录一个阶段（上下文管理器，返回Span或NOOP_SPAN）
+        :param name: 阶段名称
+        :param root: 当前没有trace时是否开始一条新trace（否则不记录）
+        :param force: 开始新trace时忽略采样率
+        :param attrs: 附加属性
+        """
+        return _SpanContext(self, name, root, force, attrs)
+
+    def start(self, name, root=False, force=False, **attrs):
+        """
+        开始一个span，需与 finish() 成对调用（用于无法使用with的场景，如请求钩子）
+        :return: Span，或None（未记录）
+        """
+        parent = _current_span.get()
+        if parent is _UNSAMPLED:
+            return None
+        if parent is None:
+            if not root or not self.enabled:
+                return None
+            with self._lock:
+                self.stats['started'] += 1
+            if not force and (self.sample_rate <= 0 or random.random() >= self.sample_rate):
+                # 记下未采样，嵌套的span不再逐个判断
+                span = _Unsampled(_current_span.set(_UNSAMPLED))
+                return span
+            trace = Trace(next(self._ids), self.max_spans)
+            span = Span(trace, next(self._ids), None, name, attrs)
+            trace.root = span
+            with self._lock:
+                self.stats['sampled'] += 1
+        else:
+            span = Span(parent.trace, next(self._ids), parent, name, attrs)
+        if not span.trace.add(span):
+            return None
+        span._token = _current_span.set(span)
+        return span
+
+    def finish(self, span, error=None):
+        """结束span；根span结束时trace进入环形缓冲区"""
+        if span is None:
+            return
+        if isinstance(span, _Unsampled):
+            _current_span.reset(span.token)
+            return
+        span.end = time.perf_counter()
+        if error is not None:
+            span.error = f"{type(error).__name__}: {error}"
+        try:
+            _current_span.reset(span._token)
+        except ValueError:
+            # 在复制出的上下文中结束（如提交到其它线程的任务），直接恢复父span
+            _current_span.set(span.parent)
+        if span.parent is None:
+            with self._lock:
+                self.stats['completed'] += 1
+                self.stats['dropped_spans'] += span.trace.dropped_spans
+                self._traces.append(span.trace)
+
+    def current(self):
+        """当前的Span（未记录时返回NOOP_SPAN）"""
+        span = _current_span.get()
+        return span if isinstance(span, Span) else NOOP_SPAN
+
+    def get_traces(self, limit=50, name=None, min_ms=0):
+        """
+        最近完成的trace（新的在前）
+        :param name: 只返回根span为该名称的trace
+        :param min_ms: 只返回总耗时不小于该值的trace
+        """
+        with self._lock:
+            traces = list(self._traces)
+        result = []
+        for trace in reversed(traces):
+            if name and trace.root.name != name:
+                continue
+            data = trace.to_dict()
+            if data['duration_ms'] < min_ms:
+                continue
+            result.append(data)
+            if len(result) >= limit:
+                break
+        return result
+
+    def clear(self):
+        with self._lock:
+            self._traces.clear()
+
+    def get_stats(self):
+        with self._lock:
+            stats = self.stats.copy()
+            stats['buffered'] = len(self._traces)
+            stats['max_traces'] = self._traces.maxlen
+        stats['enabled'] = self.enabled
+        stats['sample_rate'] = self.sample_rate
+        return stats
+
+
+class _Unsampled:
+    """未采样trace的根，只用于恢复上下文"""
+
+    __slots__ = ('token',)
+
+    def __init__(self, token):
+        self.token = token
+
+
+class _SpanContext:
+    __slots__ = ('tracer', 'name', 'root', 'force', 'attrs', 'span')
+
+    def __init__(self, tracer, name, root, force, attrs):
+        self.tracer = tracer
+        self.name = name
+        self.root = root
+        self.force = force
+        self.attrs = attrs
+        self.span = None
+
+    def __enter__(self):
+        self.span = self.tracer.start(self.name, self.root, self.force, **self.attrs)
+        return self.span if isinstance(self.span, Span) else NOOP_SPAN
+
+    def __exit__(self, exc_type, exc, tb):
+        self.tracer.finish(self.span, exc)
+        return False
+
+
+def traced(name=None, root=False):
+    """
+    方法/函数装饰器: 调用期间记录一个span
+    :param name: span名称，默认为函数的限定名（如 WindowService.get_target_window）
+    :param root: 没有进行中的trace时是否开始新trace（入口方法使用）
+    """
+    def decorator(func):
+        span_name = name or func.__qualname__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            # 快速路径: 没有进行中的trace且不是入口方法，或trace未采样
+            parent = _current_span.get()
+            if parent is _UNSAMPLED or (parent is None and not root):
+                return func(*args, **kwargs)
+            with Tracer.get_instance().span(span_name, root=root):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
@@ -0,0 +1,79 @@
+"""
+条件轮询等待
+用短轮询间隔+硬性截止时间代替固定的time.sleep，客户端响应多快流程就走多快
+- wait_until: 等待条件成立（窗口进入前台、控件出现、剪切板有数据）
+- wait_for_change: 等待内容变化（刷新后的表格、资金面板）
+"""
+
+import time
+
+
+class WaitTimeoutError(Exception):
+    """等待条件超时"""
+
+
+def wait_until(condition, timeout=2.0, interval=0.01, message=None):
+    """
+    轮询等待条件成立
+    :param condition: 无参可调用对象，返回真值表示条件成立（调用抛出的异常视为条件未成立）
+    :param timeout: 最长等待时间（秒）
+    :param interval: 轮询间隔（秒）
+    :param message: 超时异常的描述信息
+    :return: condition最后一次返回的真值
+    :raises WaitTimeoutError: 超过截止时间条件仍未成立
+    """
+    deadline = time.monotonic() + timeout
+    last_error = None
+    while True:
+        try:
+            result = condition()
+            if result:
+                return result
+        except Exception as e:
+            last_error = e
+
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            detail = message or "等待条件超时"
+            if last_error is not None:
+                detail = f"{detail}，最后一次错误: {str(last_error)}"
+            raise WaitTimeoutError(f"{detail}（{timeout}秒）")
+        time.sleep(min(interval, remaining))
+
+
+def wait_for_change(read, before, timeout=2.0, settle=0.3, interval=0.05, message=None):
+    """
+    等待内容相对操作前发生变化并稳定下来（连续两次读取相同）
+    切换页面或刷新(F4/F5)后，控件本身往往早已存在，只能通过内容判断新数据是否已显示
+    :param read: 无参可调用对象，返回内容指纹（返回None或抛出异常视为尚不可读）
+    :param before: 操作前的指纹，None表示操作前不可读（如页面未显示），此时只需等待内容稳定
+    :param timeout: 最长等待时间（秒）
+    :param settle: 内容一直等于before时最多等待的时间（刷新后数据可能确实没有变化）
+    :param interval: 轮询间隔（秒）
+    :param message: 超时异常的描述信息
+    :return: 最后读取的指纹
+    :raises WaitTimeoutError: 超过截止时间内容仍不可读或未稳定
+    """
+    start = time.monotonic()
+    deadline = start + timeout
+    last = None
+    last_error = None
+    while True:
+        try:
+            current = read()
+        except Exception as e:
+            current = None
+            last_error = e
+
+        now = time.monotonic()
+        if current is not None and current == last and (current != before or now - start >= settle):
+            return current
+        last = current
+
+        remaining = deadline - now
+        if remaining <= 0:
+            detail = message or "等待内容变化超时"
+            if last_error is not None:
+                detail = f"{detail}，最后一次错误: {str(last_error)}"
+            raise WaitTimeoutError(f"{detail}（{timeout}秒）")
+        time.sleep(min(interval, remaining))
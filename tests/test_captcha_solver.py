@@ -0,0 +1,98 @@
+"""
+验证码识别引擎选择测试
+未安装tesserocr时不启动OCR工作进程，在调用线程中直接通过tesseract命令行识别
+
+运行: python -m pytest tests/test_captcha_solver.py
+"""
+
+import multiprocessing
+import os
+import stat
+import sys
+import textwrap
+
+import pytest
+from PIL import Image, ImageDraw
+
+from src.service import ocr_worker
+from src.service.captcha_solver import CaptchaSolver, CliOcrEngine, OcrWorker, to_png_bytes
+
+TSV_HEADER = 'level\tpage_num\tblock_num\tpar_num\tline_num\tword_num\tleft\ttop\twidth\theight\tconf\ttext'
+
+
+def captcha_image():
+    image = Image.new('RGB', (60, 24), color='white')
+    ImageDraw.Draw(image).text((8, 6), '4821', fill='black')
+    return image
+
+
+@pytest.fixture
+def without_tesserocr(monkeypatch):
+    monkeypatch.setattr(ocr_worker, 'tesserocr_available', lambda: False)
+
+
+def test_without_tesserocr_uses_cli_engine(without_tesserocr, monkeypatch):
+    calls = []
+
+    def fake_cli(tesseract_cmd, png_bytes, timeout=10):
+        calls.append((tesseract_cmd, png_bytes[:8]))
+        return '4821', 0.9
+    monkeypatch.setattr(ocr_worker, 'recognize_with_cli', fake_cli)
+
+    solver = CaptchaSolver('tesseract', ocr_workers=2)
+    try:
+        assert all(isinstance(item, CliOcrEngine) for item in solver.workers)
+        solver.warmup()
+        result = solver.solve(captcha_image())
+    finally:
+        solver.close()
+
+    assert result.text == '4821'
+    assert result.source == 'ocr'
+    assert calls[-1] == ('tesseract', b'\x89PNG\r\n\x1a\n')
+    assert multiprocessing.active_children() == []
+    stats = solver.get_stats()
+    assert stats['ocr_engine'] == 'cli'
+    assert stats['worker_restarts'] == 0
+
+
+def test_cli_engine_errors_counted(without_tesserocr, monkeypatch):
+    def broken_cli(tesseract_cmd, png_bytes, timeout=10):
+        raise RuntimeError("tesseract退出码1")
+    monkeypatch.setattr(ocr_worker, 'recognize_with_cli', broken_cli)
+
+    solver = CaptchaSolver('tesseract')
+    result = solver.solve(captcha_image())
+
+    assert result.text == ''
+    assert solver.get_stats()['ocr_errors'] == 1
+
+
+def test_with_tesserocr_uses_worker_process(monkeypatch):
+    monkeypatch.setattr(ocr_worker, 'tesserocr_available', lambda: True)
+
+    solver = CaptchaSolver('tesseract', ocr_workers=2)
+
+    # 工作进程在首次使用时才启动
+    assert all(isinstance(item, OcrWorker) and item._process is None for item in solver.workers)
+    assert solver.get_stats()['ocr_engine'] == 'tesserocr'
+
+
+@pytest.mark.skipif(os.name == 'nt', reason="模拟的tesseract是shell脚本")
+def test_cli_engine_runs_tesseract_command(tmp_path):
+    # 模拟的tesseract：读取stdin中的图片，输出tsv
+    fake = tmp_path / 'tesseract'
+    fake.write_text(textwrap.dedent(f"""\
+        #!{sys.executable}
+        import sys
+        assert sys.argv[1:3] == ['stdin', 'stdout']
+        assert sys.stdin.buffer.read().startswith(b'\\x89PNG')
+        print({TSV_HEADER!r})
+        print('5\\t1\\t1\\t1\\t1\\t1\\t0\\t0\\t10\\t10\\t93.5\\t4821')
+    """))
+    fake.chmod(fake.stat().st_mode | stat.S_IEXEC)
+
+    engine = CliOcrEngine(str(fake))
+    png = to_png_bytes(Image.new('L', (10, 10), color=255))
+
+    assert engine.recognize(png) == ('4821', 0.935)
@@ -0,0 +1,133 @@
+"""
+控件元素缓存测试
+使用模拟的窗口和元素，验证遍历次数、失效元素重新遍历、未找到控件的遍历间隔和可见性检查
+
+运行: python -m pytest tests/test_element_cache.py
+"""
+
+import time
+
+import pytest
+
+from src.service.element_cache import ElementCache
+
+
+class FakeElement:
+    """模拟pywinauto的UIA元素：destroyed后访问属性抛异常"""
+
+    def __init__(self, control_id, visible=True):
+        self._control_id = control_id
+        self.visible = visible
+        self.destroyed = False
+
+    def control_id(self):
+        return self._control_id
+
+    def is_enabled(self):
+        if self.destroyed:
+            raise RuntimeError("元素已销毁")
+        return True
+
+    def is_visible(self):
+        if self.destroyed:
+            raise RuntimeError("元素已销毁")
+        return self.visible
+
+
+class FakeWindow:
+    def __init__(self, handle, elements):
+        self.handle = handle
+        self.elements = elements
+        self.walks = 0
+
+    def descendants(self):
+        self.walks += 1
+        return list(self.elements)
+
+
+@pytest.fixture
+def cache():
+    return ElementCache(miss_interval=0.1)
+
+
+def test_one_walk_serves_all_lookups(cache):
+    window = FakeWindow(1, [FakeElement(i) for i in (1528, 1034, 12093, 1006)])
+
+    for _ in range(3):
+        for control_id in (1528, 1034, 12093, 1006):
+            assert cache.find(window, control_id).control_id() == control_id
+    assert window.walks == 1
+    assert [e.control_id() for e in cache.find_many(window, [1006, 1528])] == [1006, 1528]
+    assert window.walks == 1
+
+
+def test_new_handle_is_new_window(cache):
+    cache.find(FakeWindow(1, [FakeElement(1)]), 1)
+    window = FakeWindow(2, [FakeElement(1)])
+    cache.find(window, 1)
+    assert window.walks == 1
+
+
+def test_destroyed_element_triggers_rewalk(cache):
+    old = FakeElement(1)
+    window = FakeWindow(1, [old])
+    assert cache.find(window, 1) is old
+
+    old.destroyed = True
+    new = FakeElement(1)
+    window.elements = [new]
+    assert cache.find(window, 1) is new
+    assert window.walks == 2
+    assert cache.get_stats()['stale'] == 1
+
+
+def test_missing_control_rewalks_after_interval(cache):
+    window = FakeWindow(1, [FakeElement(1)])
+    assert cache.find(window, 2405) is None
+    # 轮询期间不重复遍历
+    assert cache.find(window, 2405) is None
+    assert window.walks == 1
+
+    window.elements.append(FakeElement(2405))
+    time.sleep(0.15)
+    assert cache.find(window, 2405) is not None
+    assert window.walks == 2
+
+
+def test_hidden_control_found_unless_visible_required(cache):
+    hidden = FakeElement(1047, visible=False)
+    window = FakeWindow(1, [hidden])
+
+    assert cache.find(window, 1047) is hidden
+    assert cache.find(window, 1047, visible=True) is None
+
+
+def test_visible_wait_sees_cached_control_become_visible(cache):
+    element = FakeElement(1047, visible=False)
+    window = FakeWindow(1, [element])
+    assert cache.find(window, 1047, visible=True) is None
+
+    element.visible = True
+    assert cache.find(window, 1047, visible=True) is element
+    assert window.walks == 1
+
+
+def test_visible_wait_picks_up_replaced_control(cache):
+    window = FakeWindow(1, [FakeElement(1047, visible=False)])
+    assert cache.find(window, 1047, visible=True) is None
+
+    # 切换页面后出现新的同id控件，旧控件仍隐藏在树中靠后的位置
+    shown = FakeElement(1047)
+    window.elements = [shown, FakeElement(1047, visible=False)]
+    assert cache.find(window, 1047, visible=True) is None
+    time.sleep(0.15)
+    assert cache.find(window, 1047, visible=True) is shown
+    assert window.walks == 2
+
+
+def test_invalidate_forces_rewalk(cache):
+    window = FakeWindow(1, [FakeElement(1)])
+    cache.find(window, 1)
+    cache.invalidate(window)
+    cache.find(window, 1)
+    assert window.walks == 2
@@ -0,0 +1,50 @@
+"""
+HTTP/2 上游传输的连接池指标测试
+验证读取httpcore连接池内部属性失败时不报错，代理服务的指标中省略连接数和使用率
+
+运行: python -m pytest tests/test_http2_transport.py
+"""
+
+import pytest
+
+from src.service.http2_transport import Http2Transport
+from src.service.proxy_service import ProxyService
+
+
+@pytest.fixture
+def proxy_service():
+    service = ProxyService(upstream_scheme='http', max_retries=0, http2=True)
+    yield service
+    service.close()
+
+
+def test_pool_stats():
+    transport = Http2Transport()
+    try:
+        assert transport.get_pool_stats() == {'connections': 0, 'idle_connections': 0}
+    finally:
+        transport.close()
+
+
+def test_pool_stats_without_pool_internals(monkeypatch):
+    transport = Http2Transport()
+    try:
+        # 模拟httpx/httpcore版本变化后没有 _pool 属性
+        monkeypatch.delattr(transport._transport, '_pool')
+        assert transport.get_pool_stats() == {}
+    finally:
+        monkeypatch.undo()
+        transport.close()
+
+
+def test_proxy_stats_omit_connection_gauges(proxy_service, monkeypatch):
+    assert proxy_service.get_pool_stats()['utilization'] == "0.00%"
+
+    monkeypatch.setattr(proxy_service.http2_transport, 'get_pool_stats', lambda: {})
+    pool = proxy_service.get_pool_stats()
+    assert pool == {'protocol': 'HTTP/2', 'active_requests': 0, 'peak_active_requests': 0}
+
+    stats = proxy_service.get_stats()
+    assert stats['upstream_protocol'] == 'HTTP/2'
+    assert 'upstream_connections' not in stats
+    assert 'upstream_utilization' not in stats
@@ -0,0 +1,171 @@
+"""
+固定线程池HTTP服务器测试
+验证空闲连接超时关闭且不占用工作线程、工作线程占满时连接排队、shutdown() 断开连接并结束工作线程
+
+运行: python -m pytest tests/test_http_server.py
+"""
+
+import socket
+import threading
+import time
+
+import pytest
+
+from src.service.http_server import create_server
+from src.util.wait import wait_until
+
+REQUEST = b"GET / HTTP/1.1\r\nHost: localhost\r\n\r\n"
+
+
+class BlockingApp:
+    """WSGI应用：block为True时每个请求都等待放行"""
+
+    def __init__(self, block=False):
+        self.release = threading.Event()
+        if not block:
+            self.release.set()
+        self.started = 0
+        self.lock = threading.Lock()
+
+    def __call__(self, environ, start_response):
+        with self.lock:
+            self.started += 1
+        self.release.wait(5)
+        start_response('200 OK', [('Content-Type', 'text/plain'), ('Content-Length', '2')])
+        return [b'ok']
+
+
+@pytest.fixture
+def serve():
+    servers = []
+
+    def start(app, **kwargs):
+        server = create_server('127.0.0.1', 0, app, **kwargs)
+        thread = threading.Thread(target=server.serve_forever, kwargs={'poll_interval': 0.05}, daemon=True)
+        thread.start()
+        servers.append((server, thread))
+        return server
+
+    yield start
+    for server, thread in servers:
+        server.shutdown()
+        thread.join(2)
+        server.server_close()
+
+
+def connect(server):
+    return socket.create_connection(server.server_address, timeout=5)
+
+
+def read_all(sock):
+    chunks = []
+    while True:
+        chunk = sock.recv(4096)
+        if not chunk:
+            return b''.join(chunks)
+        chunks.append(chunk)
+
+
+def request(server):
+    with connect(server) as sock:
+        sock.sendall(REQUEST)
+        return read_all(sock)
+
+
+def test_request_served_and_connection_closed(serve):
+    server = serve(BlockingApp(), threads=2, idle_timeout=1)
+
+    response = request(server)
+
+    assert response.startswith(b"HTTP/1.1 200")
+    # 不支持持久连接：每个响应后都关闭连接
+    assert b"Connection: close" in response
+    assert response.endswith(b"ok")
+
+
+def test_idle_connection_closed_after_timeout(serve):
+    server = serve(BlockingApp(), threads=2, idle_timeout=0.3)
+    sock = connect(server)
+    start = time.monotonic()
+
+    assert read_all(sock) == b''
+    assert 0.3 <= time.monotonic() - start < 2
+    sock.close()
+    stats = wait_until(lambda: (s := server.get_stats())['idle'] == 0 and s, timeout=1)
+    assert stats['idle_timeouts'] == 1
+    assert stats['idle_timeout_seconds'] == 0.3
+
+
+def test_idle_connections_do_not_occupy_workers(serve):
+    server = serve(BlockingApp(), threads=1, idle_timeout=5)
+    idle = [connect(server) for _ in range(3)]
+    try:
+        wait_until(lambda: server.get_stats()['idle'] == 3, timeout=1)
+
+        # 唯一的工作线程没有被空闲连接占用
+        start = time.monotonic()
+        assert request(server).startswith(b"HTTP/1.1 200")
+        assert time.monotonic() - start < 1
+
+        # 空闲连接发出请求后照常处理
+        idle[0].sendall(REQUEST)
+        assert read_all(idle[0]).startswith(b"HTTP/1.1 200")
+        assert server.get_stats()['active'] == 0
+    finally:
+        for sock in idle:
+            sock.close()
+
+
+def test_saturated_pool_queues_connections(serve):
+    app = BlockingApp(block=True)
+    server = serve(app, threads=2, idle_timeout=5)
+    responses = []
+    clients = [threading.Thread(target=lambda: responses.append(request(server))) for _ in range(4)]
+    for client in clients:
+        client.start()
+
+    # 两个工作线程都在处理，其余连接排队而不是新建线程
+    stats = wait_until(lambda: (s := server.get_stats())['active'] == 2 and s['queued'] == 2 and s, timeout=2)
+    assert app.started == 2
+    assert stats['threads'] == 2
+
+    app.release.set()
+    for client in clients:
+        client.join(5)
+    assert len(responses) == 4
+    assert all(r.startswith(b"HTTP/1.1 200") for r in responses)
+    stats = server.get_stats()
+    assert stats['max_queued'] >= 2
+    assert stats['accepted'] == 4
+    assert (stats['active'], stats['queued']) == (0, 0)
+
+
+def test_shutdown_closes_connections_and_stops_workers():
+    app = BlockingApp(block=True)
+    server = create_server('127.0.0.1', 0, app, threads=1, idle_timeout=30)
+    serving = threading.Thread(target=server.serve_forever, kwargs={'poll_interval': 0.05}, daemon=True)
+    serving.start()
+
+    idle = connect(server)
+    running, queued = connect(server), connect(server)
+    running.sendall(REQUEST)
+    wait_until(lambda: app.started == 1, timeout=2)
+    queued.sendall(REQUEST)
+    wait_until(lambda: server.get_stats()['queued'] == 1 and server.get_stats()['idle'] == 1, timeout=2)
+
+    server.shutdown()
+    serving.join(2)
+    assert not serving.is_alive()
+    # 等待中的空闲连接和排队中的连接被断开
+    assert read_all(idle) == b''
+    assert read_all(queued) == b''
+
+    # 处理中的请求结束后工作线程退出
+    app.release.set()
+    for worker in server._workers:
+        worker.join(2)
+    assert not any(worker.is_alive() for worker in server._workers)
+    assert app.started == 1
+    server.server_close()
+    for sock in (idle, running, queued):
+        sock.close()
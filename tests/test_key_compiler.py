@@ -0,0 +1,124 @@
+"""
+按键序列编译测试
+用RecordingInjector记录注入的事件和等待时间，与原先send_key(keybd_event逐个按键+time.sleep)的顺序和节奏逐一对照
+
+运行: python -m pytest tests/test_key_compiler.py
+"""
+
+import pytest
+
+from config.key_config import KEY_MAP
+from src.models.app_model import AppModel
+from src.service.key_injector import RecordingInjector, inject_batches
+from src.util.key_compiler import (PacingProfile, CompiledKeyCache, build_batches, compile_combination,
+                                   compile_keys, COMBO, PAUSE, TAP)
+
+CTRL, ENTER, F5 = KEY_MAP['CTRL'], KEY_MAP['ENTER'], KEY_MAP['F5']
+
+
+def down(vk):
+    return ('down', vk)
+
+
+def up(vk):
+    return ('up', vk)
+
+
+def sleep(seconds):
+    return ('sleep', seconds)
+
+
+def replay(keys, pacing=PacingProfile()):
+    """注入按键串，返回按时间顺序的 down/up/sleep 记录（与原先send_key的调用序列同一格式）"""
+    timeline = []
+
+    class TimelineInjector(RecordingInjector):
+        def send(self, events):
+            super().send(events)
+            timeline.extend(up(vk) if is_up else down(vk) for vk, is_up in events)
+
+    injector = TimelineInjector()
+    inject_batches(injector, build_batches(compile_keys(keys), pacing), sleep=lambda s: timeline.append(sleep(s)))
+    return timeline
+
+
+def tap(vk, interval=0.05):
+    """原先 _process_single_key: 按下、释放、sleep(0.05)"""
+    return [down(vk), up(vk), sleep(interval)]
+
+
+def test_default_pacing_is_50_100_ms():
+    pacing = PacingProfile()
+    assert (pacing.key_interval, pacing.combo_interval, pacing.pause) == (0.05, 0.1, 0.5)
+
+
+def test_app_model_default_pacing_matches(tmp_path, monkeypatch):
+    # 没有配置文件时使用默认配置
+    monkeypatch.chdir(tmp_path)
+    profile, ignored = PacingProfile.from_config(AppModel().get_key_pacing_config())
+    assert profile == PacingProfile()
+    assert ignored == []
+
+
+def test_from_config_ignores_unknown_keys():
+    profile, ignored = PacingProfile.from_config({'key_interval': 0.02, 'batch': True})
+    assert profile == PacingProfile(key_interval=0.02)
+    assert ignored == ['batch']
+
+
+def test_compile_stock_code_and_enter():
+    assert compile_keys('600000 ENTER') == tuple((TAP, ord(c)) for c in '600000') + ((TAP, ENTER),)
+
+
+def test_stock_code_and_enter_matches_send_key():
+    expected = [step for c in '600000' for step in tap(ord(c))] + tap(ENTER)
+    assert replay('600000 ENTER') == expected
+
+
+def test_single_chars_and_named_keys():
+    assert compile_keys('a F5') == ((TAP, ord('A')), (TAP, F5))
+    assert replay('F5') == tap(F5)
+
+
+def test_compile_ctrl_c():
+    assert compile_keys('{CTRL+C}') == ((COMBO, (CTRL, ord('C'))),)
+    assert compile_keys('{ctrl+c}') == compile_keys('{CTRL+C}')
+
+
+def test_ctrl_c_matches_send_key_combination():
+    # 原先 send_key_combination(delay=0.1): 按下修饰键、sleep、按下主键、sleep、释放主键、释放修饰键、sleep
+    assert replay('{CTRL+C}') == [down(CTRL), sleep(0.1), down(ord('C')), sleep(0.1), up(ord('C')), up(CTRL), sleep(0.1)]
+
+
+def test_plus_escape_is_literal_plus():
+    # \\PLUS 替换为'+'后按单个字符处理(ord('+'))，与原先一致
+    assert compile_keys('{CTRL+\\PLUS}') == ((COMBO, (CTRL, ord('+'))),)
+    assert compile_combination('SHIFT+\\PLUS') == (COMBO, (KEY_MAP['SHIFT'], ord('+')))
+
+
+def test_empty_key_is_pause():
+    assert compile_keys('1  2') == ((TAP, ord('1')), (PAUSE,), (TAP, ord('2')))
+    # 原先: 1之后sleep(0.05)，空按键再sleep(0.5)
+    assert replay('1  2') == [down(ord('1')), up(ord('1')), sleep(0.55), *tap(ord('2'))]
+
+
+def test_invalid_combination_raises():
+    with pytest.raises(ValueError):
+        compile_keys('{CTRL+NOPE}')
+
+
+def test_zero_interval_sends_one_batch():
+    batches = build_batches(compile_keys('600000 ENTER'), PacingProfile(key_interval=0))
+    assert len(batches) == 1
+    assert len(batches[0][0]) == 14
+
+
+def test_cache_returns_same_batches():
+    cache = CompiledKeyCache(max_size=2)
+    pacing = PacingProfile()
+    first = cache.get('600000 ENTER', pacing)
+    assert cache.get('600000 ENTER', pacing) is first
+    cache.get('F5', pacing)
+    cache.get('{CTRL+C}', pacing)
+    stats = cache.get_stats()
+    assert (stats['hits'], stats['misses'], stats['evictions'], stats['size']) == (1, 3, 1, 2)
@@ -0,0 +1,178 @@
+"""
+下单执行器测试
+使用FakeGuiBackend，验证先进先出、票据编号、等待超时取消、合并激活、队列满拒绝和停止
+
+运行: python -m pytest tests/test_order_executor.py
+"""
+
+import threading
+import time
+from concurrent.futures import TimeoutError as FutureTimeoutError
+
+import pytest
+
+from src.service.order_executor import FakeGuiBackend, OrderExecutor
+
+
+@pytest.fixture
+def backend():
+    return FakeGuiBackend()
+
+
+@pytest.fixture
+def executor(backend):
+    executor = OrderExecutor(backend, max_queue_size=8)
+    yield executor
+    executor.stop(timeout=2)
+
+
+def blocker():
+    """返回 (任务, 放行事件, 已开始事件)：任务在放行前一直占用工作线程"""
+    release, started = threading.Event(), threading.Event()
+
+    def action(backend):
+        started.set()
+        release.wait(5)
+        return 'blocker'
+    return action, release, started
+
+
+def test_tasks_run_in_submission_order(executor, backend):
+    action, release, started = blocker()
+    executor.start()
+    executor.submit(action, name='blocker')
+    started.wait(1)
+    tickets = [executor.submit(lambda b, i=i: b.perform(f"order-{i}"), name=f"order-{i}") for i in range(6)]
+    release.set()
+
+    assert [executor.wait(t, timeout=2) for t in tickets] == [f"order-{i}" for i in range(6)]
+    assert backend.actions == [f"order-{i}" for i in range(6)]
+
+
+def test_ticket_ids_and_status(executor):
+    executor.start()
+    first = executor.submit(lambda b: 1, name='first')
+    second = executor.submit(lambda b: 2, name='second')
+    assert second.ticket_id == first.ticket_id + 1
+
+    executor.wait(second, timeout=2)
+    assert executor.get_ticket(first.ticket_id) is first
+    data = executor.get_ticket(second.ticket_id).to_dict()
+    assert data['ticket'] == second.ticket_id
+    assert data['name'] == 'second'
+    assert data['status'] == 'done'
+    assert 'wait_ms' in data and 'service_ms' in data
+    assert executor.get_ticket(99999) is None
+
+
+def test_failed_task_reported(executor):
+    executor.start()
+
+    def fail(backend):
+        raise ValueError("未找到下单窗口")
+    ticket = executor.submit(fail, name='xiadan')
+    with pytest.raises(ValueError):
+        executor.wait(ticket, timeout=2)
+    assert ticket.to_dict()['status'] == 'failed'
+    assert ticket.to_dict()['error'] == "未找到下单窗口"
+    assert executor.get_stats()['failed'] == 1
+
+
+def test_wait_timeout_cancels_queued_task(executor, backend):
+    action, release, started = blocker()
+    executor.start()
+    executor.submit(action, name='blocker')
+    started.wait(1)
+    ticket = executor.submit(lambda b: b.perform('late-order'), name='xiadan')
+
+    with pytest.raises(FutureTimeoutError, match="已取消"):
+        executor.wait(ticket, timeout=0.05)
+    release.set()
+    executor.wait(executor.submit(lambda b: None, name='after'), timeout=2)
+
+    # 客户端超时后任务不会再执行，避免重试时重复下单
+    assert 'late-order' not in backend.actions
+    assert ticket.to_dict()['status'] == 'cancelled'
+    assert executor.get_stats()['cancelled'] == 1
+
+
+def test_wait_timeout_while_running_is_not_cancelled(executor):
+    action, release, started = blocker()
+    executor.start()
+    ticket = executor.submit(action, name='slow')
+    started.wait(1)
+
+    with pytest.raises(FutureTimeoutError, match="仍在执行中"):
+        executor.wait(ticket, timeout=0.05)
+    release.set()
+    assert ticket.result(timeout=2) == 'blocker'
+
+
+def test_consecutive_activations_coalesced(executor, backend):
+    action, release, started = blocker()
+    executor.start()
+    executor.submit(action, name='blocker')
+    started.wait(1)
+    tickets = [executor.submit(lambda b: None, name='xiadan', activate=True) for _ in range(5)]
+    release.set()
+    for ticket in tickets:
+        executor.wait(ticket, timeout=2)
+
+    assert backend.activations == 1
+    assert executor.get_stats()['coalesced_activations'] == 4
+
+
+def test_task_without_activation_breaks_coalescing(executor, backend):
+    action, release, started = blocker()
+    executor.start()
+    executor.submit(action, name='blocker')
+    started.wait(1)
+    tickets = [
+        executor.submit(lambda b: None, name='xiadan', activate=True),
+        executor.submit(lambda b: None, name='position'),
+        executor.submit(lambda b: None, name='xiadan', activate=True),
+    ]
+    release.set()
+    for ticket in tickets:
+        executor.wait(ticket, timeout=2)
+
+    assert backend.activations == 2
+
+
+def test_full_queue_rejects(backend):
+    executor = OrderExecutor(backend, max_queue_size=2)
+    executor.submit(lambda b: None)
+    executor.submit(lambda b: None)
+    with pytest.raises(Exception, match="下单队列已满"):
+        executor.submit(lambda b: None)
+    assert executor.get_stats()['rejected'] == 1
+
+
+def test_stop_runs_queued_tasks_first(backend):
+    executor = OrderExecutor(backend, max_queue_size=8)
+    executor.start()
+    tickets = [executor.submit(lambda b, i=i: b.perform(i)) for i in range(3)]
+    executor.stop(timeout=2)
+
+    assert [t.result(timeout=0) for t in tickets] == [0, 1, 2]
+    assert not executor._thread.is_alive()
+
+
+def test_stop_with_full_queue_returns_within_timeout(backend):
+    executor = OrderExecutor(backend, max_queue_size=4)
+    action, release, started = blocker()
+    executor.start()
+    executor.submit(action, name='blocker')
+    started.wait(1)
+    queued = [executor.submit(lambda b: b.perform('queued')) for _ in range(4)]
+
+    start = time.monotonic()
+    executor.stop(timeout=0.2)
+    assert time.monotonic() - start < 1
+
+    release.set()
+    executor._thread.join(2)
+    assert not executor._thread.is_alive()
+    assert all(t.future.cancelled() for t in queued)
+    assert backend.actions == []
+    assert executor.get_stats()['cancelled'] == 4
@@ -0,0 +1,132 @@
+"""
+闪电下单测试
+模拟的下单弹窗在发送按键后延迟出现、点击确认后延迟关闭（关闭前查找弹窗仍会返回它），
+验证连续的单笔下单和批量下单都只在本笔按键调起的弹窗中填写数量和确认
+
+运行: python -m pytest tests/test_order_placer.py
+"""
+
+import itertools
+import time
+
+import pytest
+
+from src.service.order_executor import FakeGuiBackend, OrderExecutor
+from src.service.order_placer import OrderPlacer
+
+OPEN_DELAY = 0.03
+CLOSE_DELAY = 0.1
+
+
+class FakeDialog:
+    _handles = itertools.count(1)
+
+    def __init__(self, code, opens_at):
+        self.handle = next(self._handles)
+        self.code = code
+        self.opens_at = opens_at
+        self.closes_at = None
+        self.amount = None
+
+    def is_visible(self):
+        now = time.monotonic()
+        return now >= self.opens_at and (self.closes_at is None or now < self.closes_at)
+
+
+class FakeWindowService:
+    """提供OrderPlacer所需方法的模拟WindowService，记录每个弹窗中确认的代码和数量"""
+
+    def __init__(self, close_on_confirm=True):
+        self.close_on_confirm = close_on_confirm
+        self.dialogs = []
+        self.confirmed = []
+        self.keys = []
+
+    def send_key(self, keys):
+        self.keys.append(keys)
+        self.dialogs.append(FakeDialog(keys.split()[0], time.monotonic() + OPEN_DELAY))
+
+    def get_target_window(self, params, retries=3, delay=0.5):
+        # 与Desktop().windows()一样返回第一个显示中的弹窗，上一笔的弹窗未关闭时会先返回它
+        return next((dialog for dialog in self.dialogs if dialog.is_visible()), None)
+
+    def input_text_to_element(self, window, control_id, text):
+        window.amount = text
+
+    def click_element(self, window, control_id):
+        if control_id == 1006 and window.closes_at is None:
+            self.confirmed.append((window.code, window.amount))
+            if self.close_on_confirm:
+                window.closes_at = time.monotonic() + CLOSE_DELAY
+
+
+ORDERS = [("600000", "1", 100), ("000001", "2", 200), ("300033", "1", 300)]
+
+
+def test_build_keys():
+    assert OrderPlacer.build_keys('600000', '1') == '600000 ENTER 21 ENTER'
+    assert OrderPlacer.build_keys('600000', '2') == '600000 ENTER 23 ENTER'
+    assert OrderPlacer.build_keys('600000', '') == '600000 ENTER '
+
+
+def test_back_to_back_single_orders_use_their_own_dialog():
+    window_service = FakeWindowService()
+    placer = OrderPlacer(window_service)
+
+    for code, status, amount in ORDERS:
+        placer.place(code, status, amount)
+
+    assert window_service.confirmed == [(code, str(amount)) for code, _, amount in ORDERS]
+
+
+def test_queued_xiadan_requests_use_their_own_dialog():
+    # 执行器连续执行（合并激活）的多个 /xiadan 请求
+    window_service = FakeWindowService()
+    placer = OrderPlacer(window_service)
+    executor = OrderExecutor(FakeGuiBackend())
+    try:
+        tickets = [executor.submit(lambda b, o=order: placer.place(*o), name='xiadan', activate=True)
+                   for order in ORDERS]
+        executor.start()
+        for ticket in tickets:
+            executor.wait(ticket, timeout=5)
+    finally:
+        executor.stop()
+
+    assert window_service.confirmed == [(code, str(amount)) for code, _, amount in ORDERS]
+
+
+def test_waits_for_previous_dialog_before_sending_keys():
+    window_service = FakeWindowService()
+    placer = OrderPlacer(window_service)
+    placer.place("600000", "1", 100)
+    first = window_service.dialogs[0]
+
+    placer.place("000001", "2", 200)
+    # 第二笔的按键在第一笔的弹窗关闭之后才发送
+    assert window_service.dialogs[1].opens_at - OPEN_DELAY >= first.closes_at
+
+
+def test_previous_dialog_never_closing_fails_without_sending_keys(monkeypatch):
+    monkeypatch.setattr(OrderPlacer, 'DIALOG_TIMEOUT', 0.2)
+    window_service = FakeWindowService(close_on_confirm=False)
+    placer = OrderPlacer(window_service)
+    placer.place("600000", "1", 100)
+
+    with pytest.raises(Exception, match="上一笔的下单弹窗未关闭"):
+        placer.place("000001", "2", 200)
+    assert window_service.keys == ['600000 ENTER 21 ENTER']
+    assert window_service.confirmed == [("600000", "100")]
+
+
+def test_batch_uses_own_dialogs_and_reports_each_order():
+    window_service = FakeWindowService()
+    placer = OrderPlacer(window_service)
+    orders = [{"code": code, "status": status, "amount": amount} for code, status, amount in ORDERS]
+    orders.insert(1, {"code": "600036", "status": "9"})
+
+    results = placer.place_batch(orders)
+
+    assert [r['success'] for r in results] == [True, False, True, True]
+    assert results[1]['message'] == "status参数错误,1:闪电买入,2:闪电卖出"
+    assert window_service.confirmed == [(code, str(amount)) for code, _, amount in ORDERS]
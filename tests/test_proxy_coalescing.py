@@ -0,0 +1,146 @@
+"""
+代理请求合并测试
+本地慢速桩服务（每个请求延迟200ms，并统计每个路径收到的请求数），验证:
+1. 50个并发的相同GET只转发一次，所有请求拿到相同响应，coalesced_requests 为49
+2. 不同URL互不合并
+3. 上游返回500时，并发的等待者拿到同一个错误，且不缓存（下一批重新转发）
+4. 异步HTTP服务（aiohttp）走同一个合并表
+
+运行: python -m pytest tests/test_proxy_coalescing.py
+"""
+
+import asyncio
+import collections
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import aiohttp
+import pytest
+from flask import Flask, request
+
+from src.service.async_http_service import AsyncHttpApp
+from src.service.proxy_service import ProxyService
+
+DELAY = 0.2
+
+
+class SlowStubHandler(BaseHTTPRequestHandler):
+    """慢速桩上游：/error 开头的路径返回500，其它返回带路径的JSON"""
+
+    protocol_version = "HTTP/1.1"
+    hits = collections.Counter()
+    hits_lock = threading.Lock()
+
+    def do_GET(self):
+        with self.hits_lock:
+            self.hits[self.path] += 1
+        time.sleep(DELAY)
+        status = 500 if self.path.startswith('/error') else 200
+        body = json.dumps({"path": self.path, "served_at": time.time()}).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture(scope='module')
+def upstream():
+    """启动慢速桩上游，返回 host:port"""
+    SlowStubHandler.hits.clear()
+    server = ThreadingHTTPServer(('127.0.0.1', 0), SlowStubHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def proxy_service():
+    service = ProxyService(upstream_scheme='http', max_retries=0)
+    yield service
+    service.close()
+
+
+@pytest.fixture
+def app(proxy_service):
+    app = Flask(__name__)
+
+    @app.route('/proxy/<path:url>', methods=['GET'])
+    def proxy(url):
+        return proxy_service.proxy_request(url, request)
+    return app
+
+
+def concurrent_get(app, paths):
+    """每个路径一个线程并发请求，返回 [(状态码, 响应体)]"""
+    results = [None] * len(paths)
+    barrier = threading.Barrier(len(paths))
+
+    def worker(index):
+        client = app.test_client()
+        barrier.wait()
+        response = client.get(paths[index])
+        results[index] = (response.status_code, response.data)
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(len(paths))]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return results
+
+
+def test_identical_gets_forwarded_once(upstream, app, proxy_service):
+    results = concurrent_get(app, [f"/proxy/{upstream}/quote.json"] * 50)
+
+    assert SlowStubHandler.hits['/quote.json'] == 1
+    assert len(set(results)) == 1
+    assert results[0][0] == 200
+    stats = proxy_service.get_stats()
+    assert stats['coalesced_requests'] == 49
+    assert stats['inflight_requests'] == 0
+
+
+def test_distinct_urls_not_coalesced(upstream, app):
+    concurrent_get(app, [f"/proxy/{upstream}/distinct/{i % 10}.json" for i in range(50)])
+
+    distinct = {path: count for path, count in SlowStubHandler.hits.items() if path.startswith('/distinct/')}
+    assert distinct == {f"/distinct/{i}.json": 1 for i in range(10)}
+
+
+def test_upstream_error_shared_and_not_cached(upstream, app):
+    for batch in (1, 2):
+        results = concurrent_get(app, [f"/proxy/{upstream}/error.json"] * 20)
+        statuses = {status for status, _ in results}
+        assert len(statuses) == 1
+        assert statuses.pop() >= 500
+        # 每批转发一次，错误响应不缓存
+        assert SlowStubHandler.hits['/error.json'] == batch
+
+
+def test_async_server_shares_coalescing(upstream, proxy_service):
+    async def run():
+        server = AsyncHttpApp(proxy_service, host='127.0.0.1', port=0)
+        await server.start()
+        try:
+            async with aiohttp.ClientSession() as session:
+                async def fetch():
+                    async with session.get(f"http://127.0.0.1:{server.port}/proxy/{upstream}/async.json") as resp:
+                        return resp.status, await resp.read()
+                return await asyncio.gather(*[fetch() for _ in range(50)])
+        finally:
+            await server.stop()
+
+    results = asyncio.run(run())
+
+    assert SlowStubHandler.hits['/async.json'] == 1
+    assert len(set(results)) == 1
+    assert results[0][0] == 200
+    assert proxy_service.get_stats()['coalesced_requests'] == 49
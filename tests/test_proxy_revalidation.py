@@ -0,0 +1,235 @@
+"""
+代理缓存策略测试
+本地桩服务（每个请求延迟200ms，支持ETag/If-None-Match，路径决定Cache-Control），验证:
+1. host/路径规则匹配
+2. 过期后先返回旧响应，后台带If-None-Match刷新，上游只返回304
+3. 上游内容变化时后台刷新拿到新内容
+4. Cache-Control: no-store 不缓存、max-age 限制新鲜期、must-revalidate 过期后不返回旧响应
+5. 客户端带If-None-Match且与缓存一致时直接返回304
+6. 热点URL持续请求期间（新鲜期1秒），stale_ttl=30 时调用方不再等待上游，stale_ttl=0 时会等待
+
+运行: python -m pytest tests/test_proxy_revalidation.py
+"""
+
+import collections
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+from flask import Flask, request
+
+from src.service.cache_policy import CachePolicy
+from src.service.proxy_service import ProxyService
+from src.util.wait import wait_until
+
+DELAY = 0.2
+CACHE_CONTROL = {
+    '/nostore.json': 'no-store',
+    '/maxage.json': 'max-age=1',
+    '/strict.json': 'max-age=1, must-revalidate'
+}
+
+
+class EtagStubHandler(BaseHTTPRequestHandler):
+    """桩上游：ETag为路径+版本号，If-None-Match一致时返回304"""
+
+    protocol_version = "HTTP/1.1"
+    hits = collections.Counter()        # (路径, 状态码) -> 次数
+    versions = collections.Counter()    # 路径 -> 内容版本
+    lock = threading.Lock()
+
+    def do_GET(self):
+        time.sleep(DELAY)
+        with self.lock:
+            etag = f'"{self.path}-v{self.versions[self.path]}"'
+            not_modified = self.headers.get('If-None-Match') == etag
+            self.hits[(self.path, 304 if not_modified else 200)] += 1
+            version = self.versions[self.path]
+        self.send_response(304 if not_modified else 200)
+        self.send_header('ETag', etag)
+        if self.path in CACHE_CONTROL:
+            self.send_header('Cache-Control', CACHE_CONTROL[self.path])
+        if not_modified:
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+        body = f'{{"path": "{self.path}", "version": {version}}}'.encode('utf-8')
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def hits(path, status):
+    with EtagStubHandler.lock:
+        return EtagStubHandler.hits[(path, status)]
+
+
+@pytest.fixture(scope='module')
+def upstream():
+    """启动桩上游，返回 host:port"""
+    EtagStubHandler.hits.clear()
+    EtagStubHandler.versions.clear()
+    server = ThreadingHTTPServer(('127.0.0.1', 0), EtagStubHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def build(upstream):
+    """创建代理服务，返回 (proxy_service, get)；get(path) 返回 (响应, 耗时ms)"""
+    services = []
+
+    def factory(ttl=1, stale_ttl=10):
+        policy = CachePolicy(default_ttl=10, default_stale_ttl=stale_ttl, rules=[
+            {'host': '127.0.0.1', 'path': '/hot/*', 'ttl': ttl, 'stale_ttl': stale_ttl},
+        ])
+        proxy_service = ProxyService(upstream_scheme='http', max_retries=0, cache_policy=policy)
+        services.append(proxy_service)
+        app = Flask(__name__)
+
+        @app.route('/proxy/<path:url>', methods=['GET'])
+        def proxy(url):
+            return proxy_service.proxy_request(url, request)
+
+        client = app.test_client()
+
+        def get(path, headers=None):
+            start = time.perf_counter()
+            response = client.get(f"/proxy/{upstream}{path}", headers=headers or {})
+            return response, (time.perf_counter() - start) * 1000
+        return proxy_service, get
+
+    yield factory
+    for proxy_service in services:
+        proxy_service.close()
+
+
+def wait_refresh(proxy_service, timeout=2):
+    """等待后台刷新结束"""
+    def idle():
+        with proxy_service._refresh_lock:
+            return not proxy_service._refreshing
+    wait_until(idle, timeout=timeout, interval=0.01)
+
+
+def test_rules():
+    policy = CachePolicy(default_ttl=10, default_stale_ttl=30, rules=[
+        {'host': 'basic.10jqka.com.cn', 'path': '/mapp/*', 'ttl': 60, 'stale_ttl': 120},
+        {'host': '*.10jqka.com.cn', 'ttl': 5},
+    ])
+    # host+路径匹配、通配host匹配、未命中用默认值
+    assert policy.rule_for("https://basic.10jqka.com.cn/mapp/300033/stock_base_info.json") == (60, 120)
+    assert policy.rule_for("https://d.10jqka.com.cn/v6/line/hs_300033/01/last.js") == (5, 30)
+    assert policy.rule_for("https://example.com/a.json") == (10, 30)
+
+
+def test_cache_control_lifetime():
+    policy = CachePolicy(default_ttl=10, default_stale_ttl=30)
+    assert policy.lifetime("https://example.com/a", {'cache-control': 'public, max-age=3'}) == (3, 30)
+    assert policy.lifetime("https://example.com/a", {'Cache-Control': 'max-age=3, stale-while-revalidate=7'}) == (3, 7)
+    assert policy.lifetime("https://example.com/a", {'Cache-Control': 'no-cache'}) == (0, 0)
+
+
+def test_stale_served_then_revalidated_with_304(build):
+    proxy_service, get = build()
+    path = '/hot/quote.json'
+
+    response, _ = get(path)
+    body = response.data
+    time.sleep(1.1)
+    response, stale_ms = get(path)
+
+    # 过期后先返回旧响应，不等待上游
+    assert response.status_code == 200 and response.data == body
+    assert stale_ms < DELAY * 1000 / 2
+    wait_refresh(proxy_service)
+    # 后台刷新带If-None-Match，上游只返回304
+    assert (hits(path, 200), hits(path, 304)) == (1, 1)
+
+    get(path)
+    stats = proxy_service.get_stats()
+    # 刷新后重新变为新鲜
+    assert stats['stale_hits'] == 1
+    assert stats['background_refreshes'] == 1
+    assert stats['not_modified'] == 1
+
+
+def test_changed_upstream_refreshed(build):
+    proxy_service, get = build()
+    path = '/hot/changed.json'
+    get(path)
+
+    with EtagStubHandler.lock:
+        EtagStubHandler.versions[path] += 1
+    time.sleep(1.1)
+    get(path)
+    wait_refresh(proxy_service)
+    response, _ = get(path)
+
+    assert b'"version": 1' in response.data
+
+
+def test_client_if_none_match_gets_304(build):
+    proxy_service, get = build()
+    response, _ = get('/hot/etag.json')
+
+    response, _ = get('/hot/etag.json', {'If-None-Match': response.headers.get('ETag')})
+
+    assert response.status_code == 304
+    assert response.data == b''
+    assert proxy_service.get_stats()['client_not_modified'] == 1
+
+
+def test_no_store_not_cached(build):
+    _, get = build()
+    get('/nostore.json')
+    get('/nostore.json')
+    assert hits('/nostore.json', 200) == 2
+
+
+def test_max_age_overrides_default_ttl(build):
+    proxy_service, get = build()
+    get('/maxage.json')
+    time.sleep(1.1)
+    get('/maxage.json')
+    wait_refresh(proxy_service)
+    # 默认新鲜期10秒，max-age=1 使其1秒后就需要刷新
+    assert hits('/maxage.json', 304) == 1
+
+
+def test_must_revalidate_waits_for_upstream(build):
+    _, get = build()
+    get('/strict.json')
+    time.sleep(1.1)
+    _, strict_ms = get('/strict.json')
+    assert strict_ms >= DELAY * 1000
+
+
+def hot_latencies(get, path, duration=1.6):
+    """每20ms请求一次热点URL，返回调用方延迟列表(ms)"""
+    latencies = []
+    deadline = time.perf_counter() + duration
+    while time.perf_counter() < deadline:
+        latencies.append(get(path)[1])
+        time.sleep(0.02)
+    return latencies
+
+
+def test_hot_url_never_waits_with_stale_ttl(build):
+    _, get = build(ttl=1, stale_ttl=30)
+    latencies = hot_latencies(get, '/hot/latency-30.json')
+    # 只有第一次请求等待上游，过期后都先返回旧响应
+    assert sum(1 for ms in latencies if ms >= DELAY * 1000) == 1
+
+    _, get = build(ttl=1, stale_ttl=0)
+    latencies = hot_latencies(get, '/hot/latency-0.json')
+    # 没有stale期时每次过期都要等待上游
+    assert sum(1 for ms in latencies if ms >= DELAY * 1000) >= 2
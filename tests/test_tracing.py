@@ -0,0 +1,159 @@
+"""
+分阶段耗时追踪测试
+用模拟的GUI流水线（FakeGuiBackend + 与PositionService相同结构的@traced方法）验证:
+1. HTTP请求线程中的根span与下单执行器工作线程中的span属于同一条trace，按调用层级嵌套
+2. 执行器的排队时间记录在span属性中，激活窗口单独一个span
+3. 异常记录在span上，trace仍然完成
+4. 采样率0时不记录（force可强制记录），环形缓冲区只保留最近max_traces条，max_spans限制单条trace
+
+运行: python -m pytest tests/test_tracing.py
+"""
+
+import threading
+import time
+
+import pytest
+
+from src.service.order_executor import FakeGuiBackend, OrderExecutor
+from src.util.tracing import Tracer, traced
+
+
+class FakePositionService:
+    """与PositionService.get_position相同的阶段划分，每个阶段用sleep模拟耗时"""
+
+    def __init__(self, fail_copy=False):
+        self.fail_copy = fail_copy
+
+    @traced(root=True)
+    def get_position(self):
+        self.get_target_window()
+        self._copy_table()
+        return self._format_hold_data()
+
+    @traced()
+    def get_target_window(self):
+        span = Tracer.get_instance().current()
+        for attempt in range(3):
+            span.set('attempts', attempt + 1)
+            self.find_element_in_window()
+            if attempt == 1:
+                return 'window'
+            time.sleep(0.01)
+
+    @traced()
+    def find_element_in_window(self):
+        time.sleep(0.002)
+
+    @traced()
+    def _copy_table(self):
+        time.sleep(0.02)
+        if self.fail_copy:
+            raise Exception("获取剪切板数据失败")
+
+    @traced()
+    def _format_hold_data(self):
+        return [{'证券代码': '600000'}]
+
+
+@pytest.fixture
+def tracer():
+    tracer = Tracer.get_instance()
+    tracer.configure(sample_rate=1.0, max_traces=200, max_spans=500)
+    tracer.clear()
+    yield tracer
+    tracer.configure()
+    tracer.clear()
+
+
+@pytest.fixture
+def executor():
+    executor = OrderExecutor(FakeGuiBackend(activate_delay=0.005), name='Trace-Executor')
+    executor.start()
+    yield executor
+    executor.stop()
+
+
+def run_request(tracer, executor, service, force=False):
+    """与 FlaskApp.run_gui_task 相同: 请求线程中开始根span，提交到执行器等待结果"""
+    with tracer.span('get_position', root=True, force=force, route='/position'):
+        return executor.execute(lambda backend: service.get_position(), name='get_position', activate=True)
+
+
+def test_spans_nest_across_executor_thread(tracer, executor):
+    # 先占住执行器，使请求的任务排队
+    blocker = threading.Thread(target=executor.execute, args=(lambda backend: time.sleep(0.05),),
+                               kwargs={'name': 'blocker'})
+    blocker.start()
+    time.sleep(0.01)
+    request_thread = threading.Thread(target=run_request, args=(tracer, executor, FakePositionService()),
+                                      name='HTTP-Request')
+    request_thread.start()
+    request_thread.join()
+    blocker.join()
+
+    root = tracer.get_traces(limit=1)[0]['root']
+    # 根span在请求线程
+    assert root['thread'] == 'HTTP-Request'
+    assert root['attrs'] == {'route': '/position'}
+
+    # 执行器工作线程中的span挂在请求的trace下，排队时间记录在属性中
+    job = root['children'][0]
+    assert job['name'] == 'OrderExecutor.get_position'
+    assert job['thread'] == 'Trace-Executor'
+    assert job['attrs']['wait_ms'] >= 30
+
+    # 激活窗口与业务方法依次嵌套
+    assert [child['name'] for child in job['children']] == ['OrderExecutor.activate', 'FakePositionService.get_position']
+    position = job['children'][1]
+    window = position['children'][0]
+    assert window['attrs'] == {'attempts': 2}
+    assert len(window['children']) == 2
+
+    # 子span的时间落在父span内
+    for child in position['children']:
+        assert child['start_ms'] >= position['start_ms']
+        assert child['start_ms'] + child['duration_ms'] <= position['start_ms'] + position['duration_ms'] + 0.01
+
+
+def test_error_recorded_on_span_and_trace(tracer, executor):
+    with pytest.raises(Exception, match="获取剪切板数据失败"):
+        run_request(tracer, executor, FakePositionService(fail_copy=True))
+
+    trace = tracer.get_traces(limit=1)[0]
+    position = trace['root']['children'][0]['children'][1]
+    copy = [node for node in position['children'] if node['name'].endswith('_copy_table')]
+    assert copy and 'error' in copy[0]
+    assert trace['error'] is not None
+
+
+def test_sample_rate_zero_and_force(tracer):
+    tracer.configure(sample_rate=0, max_traces=5)
+    service = FakePositionService()
+
+    service.get_position()
+    assert tracer.get_traces() == []
+
+    with tracer.span('forced', root=True, force=True):
+        service.get_position()
+    assert [t['name'] for t in tracer.get_traces()] == ['forced']
+
+
+def test_ring_buffer_and_span_cap(tracer):
+    tracer.configure(sample_rate=1, max_traces=5, max_spans=4)
+    service = FakePositionService()
+    completed = tracer.get_stats()['completed']
+
+    for _ in range(8):
+        service.get_position()
+
+    traces = tracer.get_traces()
+    # 环形缓冲区只保留最近5条
+    assert len(traces) == 5
+    # max_spans限制单条trace
+    assert traces[0]['span_count'] == 4
+    assert traces[0]['dropped_spans'] > 0
+
+    # 没有根span时普通阶段不开始trace
+    service.find_element_in_window()
+    assert len(tracer.get_traces()) == 5
+    assert tracer.get_stats()['completed'] == completed + 8
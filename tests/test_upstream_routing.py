@@ -0,0 +1,266 @@
+"""
+代理上游路由测试
+本地桩服务可按路径注入延迟和错误（/slow/* 延迟SLOW秒，/error/* 返回500，/heal 之后 /error/* 恢复正常），验证:
+1. 不在允许列表的host返回403，不转发
+2. 每个host的读取超时生效（504）
+3. 熔断: 连续失败达到阈值后直接返回503且不再转发；reset_timeout后只放行一个试探请求，成功后恢复
+4. 每个host的并发上限: 超出的请求在queue_timeout后返回503，慢上游不占满HTTP服务的工作线程
+5. 异步HTTP服务（aiohttp）共用同一个路由表和熔断器
+6. 允许未列出的host时，保留状态的host数量有上限，进行中和熔断中的host不被淘汰
+
+运行: python -m pytest tests/test_upstream_routing.py
+"""
+
+import asyncio
+import collections
+import http.client
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import aiohttp
+import pytest
+from flask import Flask, jsonify, request
+
+from src.service.async_http_service import AsyncHttpApp
+from src.service.http_server import create_server
+from src.service.proxy_service import ProxyService
+from src.service.upstream_router import UpstreamRouter
+
+SLOW = 1.0
+
+
+class FaultyStubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    hits = collections.Counter()
+    lock = threading.Lock()
+    healed = threading.Event()
+
+    def do_GET(self):
+        with self.lock:
+            self.hits[self.path.split('?')[0].rsplit('/', 1)[0]] += 1
+        if self.path == '/heal':
+            self.healed.set()
+        if self.path.startswith('/slow/'):
+            time.sleep(SLOW)
+        status = 500 if self.path.startswith('/error/') and not self.healed.is_set() else 200
+        body = b'{"ok": true}'
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def upstream_port():
+    """启动可注入延迟和错误的桩上游，返回端口"""
+    FaultyStubHandler.hits.clear()
+    FaultyStubHandler.healed.clear()
+    server = ThreadingHTTPServer(('127.0.0.1', 0), FaultyStubHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield server.server_address[1]
+    server.shutdown()
+    server.server_close()
+
+
+def build_app(proxy_service):
+    app = Flask(__name__)
+
+    @app.route('/health')
+    def health():
+        return jsonify({"status": "ok"})
+
+    @app.route('/proxy/<path:url>', methods=['GET'])
+    def proxy(url):
+        return proxy_service.proxy_request(url, request)
+    return app
+
+
+def make_router(**default):
+    settings = {'max_concurrency': 4, 'read_timeout': 5, 'queue_timeout': 0.1,
+                'failure_threshold': 3, 'reset_timeout': 1}
+    settings.update(default)
+    return UpstreamRouter(routes=[{'host': '127.0.0.1'}], default=settings, allow_unlisted=False)
+
+
+def get(port, path, timeout=30):
+    """返回 (状态码, 耗时ms)"""
+    conn = http.client.HTTPConnection('127.0.0.1', port, timeout=timeout)
+    start = time.perf_counter()
+    conn.request('GET', path)
+    response = conn.getresponse()
+    response.read()
+    conn.close()
+    return response.status, (time.perf_counter() - start) * 1000
+
+
+def concurrent(port, paths):
+    results = [None] * len(paths)
+
+    def worker(index):
+        results[index] = get(port, paths[index])
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(len(paths))]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return results
+
+
+@pytest.fixture
+def serve():
+    """serve(router, threads) 启动挂载代理服务的HTTP服务，返回 (端口, ProxyService)，测试结束后关闭"""
+    started = []
+
+    def start(router, threads=16):
+        proxy_service = ProxyService(upstream_scheme='http', max_retries=0, router=router)
+        server = create_server('127.0.0.1', 0, build_app(proxy_service), threads=threads)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        started.append((server, proxy_service))
+        return server.server_address[1], proxy_service
+
+    yield start
+    for server, proxy_service in started:
+        server.shutdown()
+        server.server_close()
+        proxy_service.close()
+
+
+def test_unlisted_host_rejected(upstream_port, serve):
+    port, _ = serve(make_router())
+
+    status, _ = get(port, f"/proxy/localhost:{upstream_port}/ok/1")
+    assert status == 403
+    assert FaultyStubHandler.hits['/ok'] == 0
+
+    status, _ = get(port, f"/proxy/127.0.0.1:{upstream_port}/ok/1")
+    assert status == 200
+    assert FaultyStubHandler.hits['/ok'] == 1
+
+
+def test_per_host_read_timeout(upstream_port, serve):
+    port, _ = serve(make_router(read_timeout=0.3))
+
+    status, ms = get(port, f"/proxy/127.0.0.1:{upstream_port}/slow/1")
+    assert status == 504
+    assert ms < SLOW * 1000
+
+
+def test_circuit_opens_after_consecutive_failures(upstream_port, serve):
+    host = f"127.0.0.1:{upstream_port}"
+    port, _ = serve(make_router())
+
+    # 重试策略把500转换为502
+    statuses = [get(port, f"/proxy/{host}/error/{i}")[0] for i in range(3)]
+    assert all(status >= 500 for status in statuses)
+    assert FaultyStubHandler.hits['/error'] == 3
+
+    statuses = [get(port, f"/proxy/{host}/error/{i}")[0] for i in range(20)]
+    assert statuses == [503] * 20
+    assert FaultyStubHandler.hits['/error'] == 3
+    # 熔断按host，其它路径同样直接返回503
+    assert get(port, f"/proxy/{host}/ok/2")[0] == 503
+    assert FaultyStubHandler.hits['/ok'] == 0
+
+
+def test_circuit_half_open_allows_single_probe(upstream_port, serve):
+    host = f"127.0.0.1:{upstream_port}"
+    port, _ = serve(make_router())
+    for i in range(3):
+        get(port, f"/proxy/{host}/error/{i}")
+    assert get(port, f"/proxy/{host}/ok/1")[0] == 503
+
+    get(upstream_port, '/heal')
+    time.sleep(1.1)
+    # 试探请求走慢路径，其余请求在它完成前到达
+    results = concurrent(port, [f"/proxy/{host}/slow/probe-{i}" for i in range(10)])
+    statuses = collections.Counter(status for status, _ in results)
+    assert statuses == {200: 1, 503: 9}
+    assert FaultyStubHandler.hits['/slow'] == 1
+
+    # 试探成功后恢复转发
+    assert get(port, f"/proxy/{host}/error/after")[0] == 200
+
+
+def test_per_host_concurrency_limit(upstream_port, serve):
+    host = f"127.0.0.1:{upstream_port}"
+    port, proxy_service = serve(make_router())
+
+    results = concurrent(port, [f"/proxy/{host}/slow/{i}" for i in range(12)])
+    statuses = collections.Counter(status for status, _ in results)
+    assert statuses == {200: 4, 503: 8}
+    assert FaultyStubHandler.hits['/slow'] == 4
+    # 超出上限的请求在queue_timeout后快速失败，不等慢上游
+    assert max(ms for status, ms in results if status == 503) < SLOW * 1000
+    assert proxy_service.get_stats()['upstream_routes'][host]['active'] == 0
+
+
+def test_concurrency_limit_keeps_workers_free(upstream_port, serve):
+    """64个客户端请求慢上游时，同一HTTP服务（16个工作线程）的 /health 仍然及时响应"""
+    host = f"127.0.0.1:{upstream_port}"
+    port, _ = serve(make_router(max_concurrency=8))
+
+    flood = threading.Thread(target=concurrent, args=(port, [f"/proxy/{host}/slow/flood-{i}" for i in range(64)]))
+    flood.start()
+    time.sleep(0.3)
+    try:
+        status, ms = get(port, '/health')
+    finally:
+        flood.join()
+    assert status == 200
+    assert ms < SLOW * 1000
+
+
+def test_async_server_shares_router(upstream_port):
+    host = f"127.0.0.1:{upstream_port}"
+    proxy_service = ProxyService(upstream_scheme='http', max_retries=0, router=make_router())
+
+    async def run():
+        server = AsyncHttpApp(proxy_service, host='127.0.0.1', port=0)
+        await server.start()
+        try:
+            async with aiohttp.ClientSession() as session:
+                async def fetch(path):
+                    async with session.get(f"http://127.0.0.1:{server.port}{path}") as resp:
+                        await resp.read()
+                        return resp.status
+                rejected = await fetch(f"/proxy/localhost:{upstream_port}/ok/3")
+                statuses = [await fetch(f"/proxy/{host}/error/async-{i}") for i in range(5)]
+                return rejected, statuses
+        finally:
+            await server.stop()
+
+    try:
+        rejected, statuses = asyncio.run(run())
+        assert rejected == 403
+        assert statuses == [500, 500, 500, 503, 503]
+        # 异步服务打开的熔断器对Flask服务同样生效
+        assert build_app(proxy_service).test_client().get(f"/proxy/{host}/ok/4").status_code == 503
+    finally:
+        proxy_service.close()
+
+
+def test_unlisted_hosts_bounded(monkeypatch):
+    monkeypatch.setattr(UpstreamRouter, 'MAX_HOSTS', 4)
+    router = UpstreamRouter(allow_unlisted=True)
+    busy = router.route_for('http://busy.example.com/quote.json')
+    busy.acquire()
+    tripped = router.route_for('http://down.example.com/quote.json')
+    for _ in range(5):
+        tripped.record(False)
+
+    for i in range(20):
+        router.route_for(f'http://client-{i}.example.com/quote.json')
+
+    hosts = router.get_stats()
+    assert len(hosts) == 4
+    # 最近使用的保留，进行中和熔断中的不淘汰
+    assert set(hosts) == {'busy.example.com', 'down.example.com', 'client-18.example.com', 'client-19.example.com'}
+    assert router.route_for('http://busy.example.com/other.json') is busy
+    assert router.route_for('http://down.example.com/other.json') is tripped
+    busy.release()
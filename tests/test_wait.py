@@ -0,0 +1,86 @@
+"""
+条件轮询等待测试
+验证 wait_for_change 不会在内容变化前返回（切换页面/刷新后控件早已存在的情况），
+内容未变化时最多等待settle秒，以及超时
+
+运行: python -m pytest tests/test_wait.py
+"""
+
+import time
+
+import pytest
+
+from src.util.wait import wait_for_change, wait_until, WaitTimeoutError
+
+
+class ChangingContent:
+    """在change_after秒后从old变为new的内容"""
+
+    def __init__(self, old, new, change_after):
+        self.old = old
+        self.new = new
+        self.changed_at = time.monotonic() + change_after
+        self.reads = 0
+
+    def read(self):
+        self.reads += 1
+        return self.new if time.monotonic() >= self.changed_at else self.old
+
+
+def test_wait_until_returns_value_and_times_out():
+    assert wait_until(lambda: 42, timeout=0.1) == 42
+    with pytest.raises(WaitTimeoutError):
+        wait_until(lambda: None, timeout=0.05, interval=0.01)
+
+
+def test_waits_for_content_to_change():
+    content = ChangingContent('旧持仓', '新持仓', change_after=0.15)
+    start = time.monotonic()
+
+    result = wait_for_change(content.read, '旧持仓', timeout=2.0, settle=1.0, interval=0.01)
+
+    assert result == '新持仓'
+    elapsed = time.monotonic() - start
+    # 不是空等：内容变化前不返回；也不等满settle
+    assert 0.15 <= elapsed < 0.5
+
+
+def test_unchanged_content_waits_settle_only():
+    start = time.monotonic()
+
+    result = wait_for_change(lambda: '持仓', '持仓', timeout=2.0, settle=0.2, interval=0.01)
+
+    assert result == '持仓'
+    assert 0.2 <= time.monotonic() - start < 0.5
+
+
+def test_hidden_before_waits_until_readable_and_stable():
+    content = ChangingContent(None, '资金面板', change_after=0.1)
+
+    assert wait_for_change(content.read, None, timeout=2.0, settle=1.0, interval=0.01) == '资金面板'
+    # 变为可读后还需再读一次确认稳定
+    assert content.reads >= 2
+
+
+def test_content_must_be_stable():
+    values = iter(['A', 'B', 'C', 'C'])
+    assert wait_for_change(lambda: next(values), 'old', timeout=1.0, interval=0.01) == 'C'
+
+
+def test_read_errors_treated_as_not_ready():
+    calls = []
+
+    def read():
+        calls.append(1)
+        if len(calls) < 3:
+            raise RuntimeError("控件正在重建")
+        return '表格'
+
+    assert wait_for_change(read, None, timeout=1.0, interval=0.01) == '表格'
+
+
+def test_timeout_when_never_readable():
+    with pytest.raises(WaitTimeoutError, match="最后一次错误"):
+        wait_for_change(lambda: 1 / 0, None, timeout=0.05, interval=0.01)
+    with pytest.raises(WaitTimeoutError):
+        wait_for_change(lambda: None, 'old', timeout=0.05, interval=0.01)
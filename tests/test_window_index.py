@@ -0,0 +1,109 @@
+"""
+窗口句柄索引测试
+使用FakeWindowBackend模拟桌面窗口，验证命中、失效句柄剔除和重新枚举
+
+运行: python -m pytest tests/test_window_index.py
+"""
+
+import pytest
+
+from src.service.window_index import FakeWindowBackend, WindowIndex
+
+THS_PATH = r"C:\同花顺软件\同花顺\hexin.exe"
+XIADAN_PATH = r"C:\同花顺软件\同花顺\xiadan.exe"
+
+
+@pytest.fixture
+def backend():
+    backend = FakeWindowBackend()
+    backend.add_window(100, 1, THS_PATH)
+    backend.add_window(200, 2, XIADAN_PATH)
+    return backend
+
+
+@pytest.fixture
+def index(backend):
+    return WindowIndex(backend)
+
+
+def test_miss_enumerates_once_then_hits(backend, index):
+    assert index.resolve(THS_PATH) == 100
+    assert backend.enum_calls == 1
+
+    for _ in range(10):
+        assert index.resolve(THS_PATH) == 100
+    # 一次枚举同时建立了所有程序的索引
+    assert index.resolve(XIADAN_PATH) == 200
+    assert backend.enum_calls == 1
+
+    stats = index.get_stats()
+    assert stats['hits'] == 11
+    assert stats['misses'] == 1
+    assert stats['indexed_apps'] == 2
+
+
+def test_path_match_is_case_insensitive(index):
+    assert index.resolve(THS_PATH.upper()) == 100
+
+
+def test_unknown_app_returns_none(backend, index):
+    assert index.resolve(r"C:\other.exe") is None
+    assert index.resolve(None) is None
+    assert backend.enum_calls == 1
+
+
+def test_first_window_of_process_wins(backend):
+    # 同一进程的多个可见窗口，按枚举顺序取第一个
+    backend.add_window(101, 1, THS_PATH)
+    backend.add_window(102, 1, THS_PATH)
+    index = WindowIndex(backend)
+
+    assert index.resolve(THS_PATH) == 100
+    # 同一进程只查一次进程路径
+    assert backend.path_lookups == 2
+
+
+def test_closed_window_evicted_and_refreshed(backend, index):
+    assert index.resolve(THS_PATH) == 100
+
+    backend.close_window(100)
+    backend.add_window(300, 3, THS_PATH)
+    assert index.resolve(THS_PATH) == 300
+    assert backend.enum_calls == 2
+    assert index.resolve(THS_PATH) == 300
+    assert backend.enum_calls == 2
+
+
+def test_hidden_window_evicted(backend, index):
+    assert index.resolve(THS_PATH) == 100
+
+    backend.windows[100]['visible'] = False
+    assert index.resolve(THS_PATH) is None
+    assert backend.enum_calls == 2
+
+
+def test_reused_hwnd_with_other_pid_evicted(backend, index):
+    assert index.resolve(THS_PATH) == 100
+
+    # 句柄被系统复用给了另一个进程的窗口
+    backend.close_window(100)
+    backend.add_window(100, 9, r"C:\other.exe")
+    backend.add_window(400, 4, THS_PATH)
+    assert index.resolve(THS_PATH) == 400
+    assert backend.enum_calls == 2
+
+
+def test_invalidate_forces_refresh(backend, index):
+    index.resolve(THS_PATH)
+    index.resolve(XIADAN_PATH)
+
+    index.invalidate(THS_PATH)
+    assert index.resolve(XIADAN_PATH) == 200
+    assert backend.enum_calls == 1
+    assert index.resolve(THS_PATH) == 100
+    assert backend.enum_calls == 2
+
+    index.invalidate()
+    assert index.get_stats()['indexed_apps'] == 0
+    assert index.resolve(XIADAN_PATH) == 200
+    assert backend.enum_calls == 3